@@ -0,0 +1,713 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарки KeywordManager на синтетическом семантическом ядре
+
+Запуск:
+    python benchmark.py memory --count 200000
+    python benchmark.py ingest --count 1000000
+    python benchmark.py search --count 1000000
+    python benchmark.py export --count 500000
+    python benchmark.py wordstat --count 300000 --sheets 3
+    python benchmark.py normalize --count 200000
+    python benchmark.py project --count 3000000
+    python benchmark.py snapshot --count 3000000
+    python benchmark.py wordstat-api --count 2000
+    python benchmark.py google-api --count 10000
+    python benchmark.py minus-words --count 200000 --patterns 20000
+    python benchmark.py cluster --sizes 10000,100000,1000000
+    python benchmark.py serp-cluster --sizes 30000,100000,300000
+    python benchmark.py dedup --count 1000000
+    python benchmark.py lemma --count 1000000
+    python benchmark.py query --count 3000000
+"""
+
+import argparse
+import gc
+import random
+import re
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, '.')
+from src.core.export_manager import ExportManager
+from src.core.keyword_manager import Keyword, KeywordManager
+from src.core.lemmatizer import Lemmatizer
+from src.core import normalizer
+from src.core.snapshot import KeywordSnapshot
+from src.services.wordstat_parser import WordstatParser
+
+WORDS = [
+    "бурение", "скважин", "геологоразведка", "цена", "купить", "под", "ключ",
+    "на", "воду", "глубина", "москва", "область", "услуги", "стоимость",
+    "отзывы", "работы", "метр", "артезианская", "песок", "оборудование",
+]
+
+
+def generate_phrases(count: int, seed: int = 42):
+    """Уникальные фразы из 2-5 слов, похожие на выгрузку Wordstat"""
+    rnd = random.Random(seed)
+    return [" ".join(rnd.choices(WORDS, k=rnd.randint(1, 4)) + [str(i)])
+            for i in range(count)]
+
+
+SYLLABLES = ["ба", "ве", "ги", "до", "ку", "ла", "ми", "но", "пе", "ро", "су", "та", "фи",
+             "ха", "це", "чу", "ша", "зо", "ре", "ны", "ло", "ка", "ти", "бу", "ме"]
+
+
+def generate_topic_phrases(count: int, seed: int = 42, topic_size: int = 10):
+    """
+    Фразы, сгруппированные по темам (для кластеризации): у каждой темы свои
+    2-3 «главных» слова, к которым добавляются общие слова из WORDS
+    """
+    rnd = random.Random(seed)
+    topics = [["".join(rnd.choices(SYLLABLES, k=rnd.randint(4, 5)))
+               for _ in range(rnd.randint(2, 3))]
+              for _ in range(max(count // topic_size, 1))]
+    phrases = []
+    for _ in range(count):
+        heads = rnd.choice(topics)
+        words = rnd.sample(heads, rnd.randint(1, len(heads)))
+        phrases.append(" ".join(words + rnd.choices(WORDS, k=rnd.randint(0, 2))))
+    return phrases
+
+
+def measure_memory(build):
+    """Память (байт), удерживаемая результатом build()"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def bench_memory(args):
+    """Память на одно ключевое слово: список Keyword против колонок"""
+    phrases = generate_phrases(args.count)
+    print(f"📊 Память на ключевое слово ({args.count} фраз)")
+
+    def build_objects():
+        # Представление до перехода на колонки: список Keyword + set текстов
+        keywords = [Keyword(text=phrase, frequency=i) for i, phrase in enumerate(phrases)]
+        return keywords, {kw.text for kw in keywords}
+
+    def build_columns():
+        manager = KeywordManager()
+        for i, phrase in enumerate(phrases):
+            manager._store.append(Keyword(text=phrase).text, frequency=i)
+            manager._keyword_set.add(manager._store.texts[-1])
+        return manager
+
+    for title, build in (("Список Keyword", build_objects), ("Колоночное хранилище", build_columns)):
+        used = measure_memory(build)
+        print(f"   {title:<22} {used / args.count:8.1f} байт/фраза")
+
+
+def bench_ingest(args):
+    """Скорость загрузки: add_keyword по одной фразе против пакетного пути"""
+    phrases = generate_phrases(args.count)
+    frequencies = list(range(args.count))
+    sample = min(args.count, args.sample)
+    print(f"🚀 Скорость загрузки ({args.count} фраз, построчно - первые {sample})")
+
+    manager = KeywordManager()
+    started = time.perf_counter()
+    for phrase, frequency in zip(phrases[:sample], frequencies):
+        manager.add_keyword(phrase, frequency=frequency)
+    per_row = sample / (time.perf_counter() - started)
+
+    manager = KeywordManager()
+    started = time.perf_counter()
+    for start in range(0, args.count, args.batch_size):
+        stop = start + args.batch_size
+        manager.add_keywords_batch(phrases[start:stop], frequency=frequencies[start:stop])
+    batched = args.count / (time.perf_counter() - started)
+
+    print(f"   add_keyword            {per_row:12,.0f} строк/с")
+    print(f"   add_keywords_batch     {batched:12,.0f} строк/с  (x{batched / per_row:.1f})")
+
+
+def bench_search(args):
+    """Задержка find_keywords: триграммный индекс против полного просмотра"""
+    manager = KeywordManager()
+    manager.add_keywords_batch(generate_phrases(args.count))
+    print(f"🔍 Поиск по {args.count} фразам")
+
+    started = time.perf_counter()
+    manager.find_keywords("геологоразведка москва")
+    print(f"   построение индекса     {time.perf_counter() - started:8.2f} с")
+
+    texts = manager._store.live_texts()
+    for pattern, mode in (("артезианская скважин", 'substring'), ("отзывы", 'word'),
+                          ("купить бур", 'prefix'), ("12345", 'substring')):
+        started = time.perf_counter()
+        found = manager.find_keywords(pattern, mode=mode, limit=args.limit)
+        indexed = time.perf_counter() - started
+        started = time.perf_counter()
+        [text for text in texts if pattern in text]
+        scan = time.perf_counter() - started
+        print(f"   {pattern!r:<24} {mode:<10} {indexed * 1000:8.1f} мс  "
+              f"(просмотр {scan * 1000:.1f} мс, найдено {len(found)})")
+
+
+def bench_export(args):
+    """Пиковая память экспорта: DataFrame + to_dict против потоковой выгрузки"""
+    manager = KeywordManager()
+    manager.add_keywords_batch(generate_phrases(args.count), frequency=list(range(args.count)))
+    exporter = ExportManager(manager, chunk_size=args.chunk_size)
+    print(f"📤 Экспорт {args.count} фраз")
+
+    def whole():
+        df = manager.to_dataframe()
+        return len(str(df.to_dict('records')))
+
+    def streamed(fmt, compress=False):
+        return lambda: sum(len(chunk) for chunk in exporter.stream(fmt, compress=compress))
+
+    for title, export in (("to_dict (как раньше)", whole), ("ndjson", streamed('ndjson')),
+                          ("ndjson + gzip", streamed('ndjson', True)), ("csv", streamed('csv'))):
+        gc.collect()
+        tracemalloc.start()
+        started = time.perf_counter()
+        size = export()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"   {title:<22} пик {peak / 2 ** 20:8.1f} МБ  {elapsed:6.2f} с  ({size / 2 ** 20:.1f} МБ)")
+
+
+def bench_wordstat(args):
+    """Пиковая память загрузки выгрузки Wordstat: pd.read_excel против потокового парсера"""
+    import os
+    import tempfile
+
+    import pandas as pd
+    from openpyxl import Workbook
+
+    path = os.path.join(tempfile.mkdtemp(), "wordstat.xlsx")
+    workbook = Workbook(write_only=True)
+    phrases = generate_phrases(args.count)
+    per_sheet = args.count // args.sheets
+    for number in range(args.sheets):
+        sheet = workbook.create_sheet(f"Лист {number + 1}")
+        sheet.append(["Формулировка", "Число запросов"])
+        for i, phrase in enumerate(phrases[number * per_sheet:(number + 1) * per_sheet]):
+            sheet.append([phrase, i])
+    workbook.save(path)
+    print(f"📗 Выгрузка Wordstat: {args.count} фраз, {args.sheets} листа, "
+          f"{os.path.getsize(path) / 2 ** 20:.1f} МБ")
+
+    def read_excel():
+        manager = KeywordManager()
+        for df in pd.read_excel(path, sheet_name=None).values():
+            manager.add_keywords_batch(df.iloc[:, 0], frequency=df.iloc[:, 1])
+        return manager
+
+    def streamed():
+        manager = KeywordManager()
+        WordstatParser(batch_size=args.batch_size).load_into(manager, path)
+        return manager
+
+    for title, load in (("pd.read_excel", read_excel), ("WordstatParser", streamed)):
+        gc.collect()
+        tracemalloc.start()
+        started = time.perf_counter()
+        manager = load()
+        elapsed = time.perf_counter() - started
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"   {title:<16} пик {peak / 2 ** 20:8.1f} МБ  "
+              f"(из них ядро {current / 2 ** 20:.1f} МБ)  {elapsed:6.2f} с  {len(manager)} фраз")
+        del manager
+    os.remove(path)
+
+
+def bench_normalize(args):
+    """Стоимость нормализации одной фразы: прежний путь через re.sub против модуля normalizer"""
+    rnd = random.Random(7)
+    unique = [rnd.choice((str.upper, str.title, str))(phrase) + rnd.choice(("", "!", " ?"))
+              for phrase in generate_phrases(args.unique)]
+    stream = [rnd.choice(unique) for _ in range(args.count)]
+    print(f"🧹 Нормализация: {args.unique} уникальных фраз, поток из {args.count} с повторами")
+
+    def legacy(text):
+        cleaned = re.sub(r'\s+', ' ', text.strip().lower())
+        return re.sub(r'[^\w\s\-]', '', cleaned)
+
+    def timed(title, phrases, run, baseline=None):
+        started = time.perf_counter()
+        run(phrases)
+        per_phrase = (time.perf_counter() - started) / len(phrases) * 1e9
+        note = f"  (x{baseline / per_phrase:.1f})" if baseline else ""
+        print(f"   {title:<34} {per_phrase:8.0f} нс/фраза{note}")
+        return per_phrase
+
+    normalizer.clear_cache()
+    baseline = timed("уникальные: re.sub (прежний путь)", unique,
+                     lambda phrases: [legacy(text) for text in phrases])
+    timed("уникальные: normalize", unique,
+          lambda phrases: [normalizer.normalize(text) for text in phrases], baseline)
+    timed("уникальные: normalize_batch", unique, normalizer.normalize_batch, baseline)
+
+    baseline = timed("поток: re.sub (прежний путь)", stream,
+                     lambda phrases: [legacy(text) for text in phrases])
+    timed("поток: normalize (LRU-кэш)", stream,
+          lambda phrases: [normalizer.normalize(text) for text in phrases], baseline)
+    info = normalizer.cache_info()
+    print(f"   кэш: {info.hits} попаданий, {info.misses} промахов, {info.currsize} записей")
+
+
+def bench_project(args):
+    """Сохранение проекта в SQLite и время повторного открытия"""
+    import os
+    import shutil
+    import tempfile
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "project.sqlite")
+    phrases = generate_phrases(args.count)
+    print(f"💾 Проект из {args.count} фраз")
+
+    manager = KeywordManager(project_path=path)
+    started = time.perf_counter()
+    for start in range(0, args.count, args.batch_size):
+        stop = min(start + args.batch_size, args.count)
+        manager.add_keywords_batch(phrases[start:stop], frequency=list(range(start, stop)),
+                                   source="wordstat")
+    print(f"   загрузка и запись      {time.perf_counter() - started:8.2f} с  "
+          f"({os.path.getsize(path) / 2 ** 20:.0f} МБ)")
+    manager.close()
+    del manager, phrases
+    gc.collect()
+
+    started = time.perf_counter()
+    manager = KeywordManager(project_path=path)
+    print(f"   открытие               {time.perf_counter() - started:8.2f} с  "
+          f"({len(manager)} фраз)")
+    started = time.perf_counter()
+    manager.get_keyword("геологоразведка 1")
+    print(f"   первый поиск по тексту {time.perf_counter() - started:8.2f} с  (ленивый индекс)")
+    manager.close()
+    shutil.rmtree(directory)
+
+
+def bench_snapshot(args):
+    """Бинарный снимок: запись, открытие через mmap и DataFrame без копирования"""
+    import os
+    import shutil
+    import tempfile
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "core.kcsnap")
+    manager = KeywordManager()
+    manager.add_keywords_batch(generate_phrases(args.count),
+                               frequency=list(range(args.count)), source="wordstat")
+    print(f"📸 Снимок из {args.count} фраз")
+
+    started = time.perf_counter()
+    manager.save_snapshot(path)
+    print(f"   запись                 {time.perf_counter() - started:8.2f} с  "
+          f"({os.path.getsize(path) / 2 ** 20:.0f} МБ)")
+    del manager
+    gc.collect()
+
+    started = time.perf_counter()
+    snapshot = KeywordSnapshot(path)
+    print(f"   открытие (mmap)        {(time.perf_counter() - started) * 1000:8.1f} мс")
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    frame = snapshot.to_dataframe()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"   to_dataframe           {elapsed:8.2f} с  (выделено {peak / 2 ** 20:.1f} МБ "
+          f"при {frame.memory_usage(deep=False).sum() / 2 ** 20:.0f} МБ колонок)")
+
+    queries = [f"геологоразведка {number}" for number in range(1000)]
+    started = time.perf_counter()
+    for query in queries:
+        snapshot.find(query)
+    print(f"   find                   {(time.perf_counter() - started) * 1000:8.1f} мкс/запрос")
+    del frame
+    snapshot.close()
+    shutil.rmtree(directory)
+
+
+def bench_wordstat_api(args):
+    """Обогащение частотностью через API Wordstat (локальная заглушка с задержкой)"""
+    from src.services.wordstat_stub import StubWordstatServer
+    from src.services.yandex_wordstat import YandexWordstatClient, enrich_frequencies
+
+    phrases = generate_phrases(args.count)
+    print(f"📡 Частотность {args.count} фраз: задержка API {args.latency * 1000:.0f} мс, "
+          f"лимит {args.rate:.0f} вызовов/с")
+
+    variants = (("по одной фразе", 1, 1),
+                (f"пакеты по {YandexWordstatClient.MAX_PHRASES}",
+                 YandexWordstatClient.MAX_PHRASES, 1),
+                (f"пакеты, {YandexWordstatClient.MAX_REPORTS} отчётов параллельно",
+                 YandexWordstatClient.MAX_PHRASES, YandexWordstatClient.MAX_REPORTS))
+    for title, batch_size, workers in variants:
+        manager = KeywordManager()
+        manager.add_keywords_batch(phrases)
+        with StubWordstatServer(latency=args.latency) as server:
+            client = YandexWordstatClient("token", url=server.url, batch_size=batch_size,
+                                          max_workers=workers, rate=args.rate,
+                                          poll_interval=args.latency)
+            started = time.perf_counter()
+            stats = enrich_frequencies(manager, client)
+            elapsed = time.perf_counter() - started
+            client.close()
+        print(f"   {title:38} {stats['updated'] / elapsed * 60:10.0f} фраз/мин  "
+              f"({stats['calls']} вызовов, {elapsed:.1f} с)")
+
+
+def bench_google_api(args):
+    """CPC и конкуренция через Google Ads API (локальная заглушка с задержкой)"""
+    from src.services.google_ads_stub import StubGoogleAdsServer
+    from src.services.google_api import GoogleAdsClient, enrich_metrics
+
+    phrases = generate_phrases(args.count)
+    print(f"📡 Метрики Google Ads для {args.count} фраз: задержка API "
+          f"{args.latency * 1000:.0f} мс, лимит {args.rate:.0f} запросов/с")
+
+    variants = (("по 100 фраз", 100, 1),
+                (f"пакеты по {args.batch_size}", args.batch_size, 1),
+                (f"пакеты, {args.workers} запроса параллельно", args.batch_size, args.workers))
+    for title, batch_size, workers in variants:
+        manager = KeywordManager()
+        manager.add_keywords_batch(phrases)
+        with StubGoogleAdsServer(latency=args.latency) as server:
+            client = GoogleAdsClient("dev", "token", "1234567890", url=server.url,
+                                     batch_size=batch_size, max_workers=workers, rate=args.rate)
+            stats = enrich_metrics(manager, client)
+            client.close()
+        latency = stats['latency']
+        print(f"   {title:32} {stats['keywords_per_sec']:10.0f} фраз/с  "
+              f"({stats['requests']} запросов за {stats['elapsed']:.1f} с, {server.connections} "
+              f"соединений; задержка p50 {latency['p50_ms']:.0f} мс, "
+              f"p99 {latency['p99_ms']:.0f} мс)")
+    print(f"   гистограмма последнего прогона: {latency['buckets']}")
+
+
+def bench_minus_words(args):
+    """Фильтр минус-слов: перебор паттернов против скомпилированного MinusWordMatcher"""
+    from src.core.minus_words import MinusWordMatcher
+
+    rnd = random.Random(3)
+    phrases = [normalizer.normalize(phrase) for phrase in generate_phrases(args.count)]
+    letters = "абвгдеёжзийклмнопрстуфхцчшщыэюя"
+    patterns = ["".join(rnd.choices(letters, k=rnd.randint(4, 10))) for _ in range(args.patterns)]
+    patterns += ["геологоразведка", "купить", "отзывы"]
+    print(f"🚫 Минус-слова: {len(patterns)} паттернов, {args.count} фраз")
+
+    sample = phrases[:args.sample]
+    started = time.perf_counter()
+    naive = [any(pattern in text for pattern in patterns) for text in sample]
+    baseline = (time.perf_counter() - started) / len(sample)
+    print(f"   {'перебор паттернов (any)':<28} {baseline * 1e6:10.1f} мкс/фраза  "
+          f"(по {len(sample)} фразам)")
+
+    for mode in ('substring', 'word', 'stem'):
+        started = time.perf_counter()
+        matcher = MinusWordMatcher(patterns, mode)
+        built = time.perf_counter() - started
+        started = time.perf_counter()
+        mask = matcher.match_many(phrases, normalized=True)
+        per_phrase = (time.perf_counter() - started) / len(phrases)
+        if mode == 'substring':
+            assert mask[:len(sample)].tolist() == naive
+        print(f"   {mode:<28} {per_phrase * 1e6:10.1f} мкс/фраза  (x{baseline / per_phrase:.0f}, "
+              f"сборка {built:.2f} с, исключено {int(mask.sum())})")
+
+
+def bench_cluster(args):
+    """Кластеризация: время на фразу должно почти не расти с размером ядра"""
+    from src.core.clustering import KeywordClusterer, cluster_names
+
+    print(f"🧩 Кластеризация (порог {args.threshold}, режим {args.mode}, "
+          f"процессов {args.workers})")
+    baseline = None
+    for size in (int(value) for value in args.sizes.split(',')):
+        phrases = generate_topic_phrases(size)
+        clusterer = KeywordClusterer(args.threshold, max_workers=args.workers, mode=args.mode)
+        started = time.perf_counter()
+        labels = clusterer.fit(phrases)
+        rows, heads = cluster_names(labels)
+        elapsed = time.perf_counter() - started
+        per_phrase = elapsed / size
+        baseline = baseline or per_phrase
+        stats = clusterer.stats
+        print(f"   {size:>9} фраз  {elapsed:7.2f} с  {per_phrase * 1e6:6.1f} мкс/фраза "
+              f"(x{per_phrase / baseline:.2f})  кандидатов {stats['candidates']:>9}  "
+              f"кластеров {len(set(heads.tolist())):>7}  в кластерах {len(rows)}")
+
+    if args.core:
+        manager = KeywordManager()
+        manager.add_keywords_batch(generate_topic_phrases(args.core))
+        stats = manager.cluster_keywords(args.threshold, max_workers=args.workers,
+                                         mode=args.mode)
+        print(f"   ядро {len(manager)} фраз: {stats['clusters']} кластеров, "
+              f"категория записана {stats['clustered']} фразам за {stats['seconds']:.2f} с")
+
+
+def generate_serps(phrases, seed: int = 42, topic_size: int = 8, depth: int = 10):
+    """
+    Синтетические выдачи: у темы свой набор страниц, в топ фразы попадают
+    7 страниц темы, 2 случайные и одна из немногих «вездесущих»
+    """
+    rnd = random.Random(seed)
+    topics = max(len(phrases) // topic_size, 1)
+    serps = {}
+    for number, phrase in enumerate(phrases):
+        topic = number % topics
+        urls = [f"https://topic{topic}.ru/page{page}" for page in rnd.sample(range(12), 7)]
+        urls += [f"https://site{rnd.randrange(len(phrases))}.ru/" for _ in range(2)]
+        urls.append(f"https://hub{rnd.randrange(20)}.ru/")
+        serps[phrase] = urls[:depth]
+    return serps
+
+
+def bench_serp_cluster(args):
+    """Кластеризация по выдаче: загрузка в кэш, повторный прогон из кэша"""
+    import os
+    import tempfile
+
+    import numpy as np
+
+    from src.services.serp import SerpCache, SerpClusterer, StaticSerpProvider
+
+    print(f"🔗 Кластеризация по выдаче (порог {args.overlap} URL, режим {args.mode})")
+    for size in (int(value) for value in args.sizes.split(',')):
+        phrases = [f"запрос {number}" for number in range(size)]
+        provider = StaticSerpProvider(generate_serps(phrases))
+        with tempfile.TemporaryDirectory() as directory:
+            cache = SerpCache(os.path.join(directory, "serp.sqlite"))
+            timings = []
+            for _ in range(2):
+                clusterer = SerpClusterer(provider, cache, min_overlap=args.overlap,
+                                          mode=args.mode, batch_size=10000)
+                started = time.perf_counter()
+                labels = clusterer.fit(phrases)
+                timings.append(time.perf_counter() - started)
+            cache.close()
+        stats = clusterer.stats
+        clusters = int((np.bincount(labels) > 1).sum())
+        print(f"   {size:>8} фраз  с поставщиком {timings[0]:6.2f} с  из кэша {timings[1]:6.2f} с "
+              f"({timings[1] / size * 1e6:.1f} мкс/фраза)  кандидатов {stats['candidates']:>9}  "
+              f"кластеров {clusters}")
+
+
+def bench_dedup(args):
+    """Неявные дубликаты: пакетная загрузка с индексами и повторная дедупликация ядра"""
+    rnd = random.Random(5)
+    phrases = generate_topic_phrases(args.count)
+    # Часть фраз повторяется с другим порядком слов
+    shuffled = []
+    for phrase in rnd.sample(phrases, args.count // 10):
+        words = phrase.split()
+        rnd.shuffle(words)
+        shuffled.append(" ".join(words))
+    print(f"♊ Неявные дубликаты: {args.count} фраз + {len(shuffled)} перестановок")
+
+    for modes in ((), ('sorted',), ('sorted', 'lemma', 'stopwords')):
+        manager = KeywordManager(dedup_modes=modes)
+        started = time.perf_counter()
+        stats = manager.add_keywords_batch(phrases + shuffled)
+        elapsed = time.perf_counter() - started
+        print(f"   загрузка, режимы {', '.join(modes) or 'нет':<26} {elapsed:6.2f} с  "
+              f"добавлено {stats['added']}, дубликатов {stats['duplicates']}")
+
+    manager = KeywordManager()
+    manager.add_keywords_batch(phrases + shuffled)
+    for modes in (('sorted',), ('sorted', 'lemma', 'stopwords')):
+        started = time.perf_counter()
+        stats = manager.deduplicate(modes, dry_run=True)
+        elapsed = time.perf_counter() - started
+        print(f"   дедупликация ядра {len(manager)} фраз, {', '.join(modes):<22} {elapsed:6.2f} с "
+              f"({elapsed / len(manager) * 1e6:.2f} мкс/фраза)  дубликатов {stats['duplicates']}")
+
+
+def bench_lemma(args):
+    """Индекс лемм: построение колонки лемм и задержка поиска по лемме"""
+    phrases = generate_topic_phrases(args.count)
+    manager = KeywordManager(lemmatizer=Lemmatizer(args.backend, max_workers=args.workers))
+    manager.add_keywords_batch(phrases)
+    print(f"🔤 Индекс лемм: {len(manager)} фраз, {manager.lemmatizer.backend}")
+
+    started = time.perf_counter()
+    manager.find_keywords("цена", mode='lemma')
+    print(f"   построение колонки и индекса     {time.perf_counter() - started:7.2f} с  "
+          f"кэш {manager.lemmatizer.cache_info()}")
+
+    rnd = random.Random(3)
+    queries = [rnd.choice(phrase.split()) for phrase in rnd.sample(phrases, args.queries)]
+    for title, batch in (("лемма слова фразы", queries), ("частая лемма", ["цена"] * 20)):
+        started = time.perf_counter()
+        found = sum(manager.list_keywords(query=query, mode='lemma', limit=100)['total']
+                    for query in batch)
+        elapsed = (time.perf_counter() - started) / len(batch)
+        print(f"   {title:<32} {elapsed * 1000:7.2f} мс  (страница 100 из "
+              f"{found / len(batch):.0f} фраз в среднем)")
+
+    # Для сравнения - лемматизация каждой фразы при каждом запросе
+    lemma = manager.lemmatizer.lemma(queries[0])
+    texts = [view.text for view in manager.get_all_keywords()]
+    started = time.perf_counter()
+    found = [text for text in texts if lemma in manager.lemmatizer.lemmatize_words(text.split())]
+    print(f"   полный просмотр (один запрос)    {time.perf_counter() - started:7.2f} с  "
+          f"({len(found)} фраз)")
+
+
+def bench_query(args):
+    """Фильтры ядра: сочетания условий KeywordQuery на большом ядре"""
+    rnd = random.Random(9)
+    phrases = generate_phrases(args.count)
+    manager = KeywordManager(lemmatizer=Lemmatizer('stem'))
+    manager.add_keywords_batch(
+        phrases, frequency=[rnd.randint(0, 100000) for _ in phrases],
+        category=[f"группа {rnd.randint(1, 20)}" for _ in phrases],
+        source=[rnd.choice(["wordstat", "ads", "url"]) for _ in phrases])
+    print(f"🧮 Фильтры по {len(manager)} фразам")
+    # Индекс лемм строится один раз при первом запросе по лемме
+    started = time.perf_counter()
+    manager.filter_keywords(lemma="скважина")
+    print(f"   построение индекса лемм          {time.perf_counter() - started:7.2f} с")
+
+    today = datetime.now().date().isoformat()
+    filters = [
+        ("частотность + слова", dict(min_frequency=1000, max_frequency=50000, max_words=3)),
+        ("+ категории + источник", dict(min_frequency=1000, max_frequency=50000, max_words=3,
+                                        category=["группа 3", "группа 7"], source="ads")),
+        ("+ дата добавления", dict(min_frequency=1000, max_words=3, source="ads",
+                                   added_from=today)),
+        ("слово + частотность", dict(contains="москва", mode='word', min_frequency=95000)),
+        ("лемма + категория", dict(lemma="скважины", category="группа 3")),
+        ("regex + категория + слова", dict(regex=r"^цена .* \d+7$", category="группа 3",
+                                           min_words=3)),
+    ]
+    for title, conditions in filters:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            selection = manager.filter_keywords(**conditions)
+            timings.append(time.perf_counter() - started)
+        page = [view.text for view in selection[:100]]
+        print(f"   {title:<32} {sorted(timings)[len(timings) // 2] * 1000:7.1f} мс  "
+              f"найдено {len(selection)}, страница {len(page)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки KeyCollector")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    memory = commands.add_parser("memory", help="память на одно ключевое слово")
+    memory.add_argument("--count", type=int, default=200000)
+    memory.set_defaults(func=bench_memory)
+
+    ingest = commands.add_parser("ingest", help="скорость пакетной загрузки")
+    ingest.add_argument("--count", type=int, default=1000000)
+    ingest.add_argument("--sample", type=int, default=100000,
+                        help="сколько фраз грузить построчно для сравнения")
+    ingest.add_argument("--batch-size", type=int, default=100000)
+    ingest.set_defaults(func=bench_ingest)
+
+    search = commands.add_parser("search", help="задержка поиска по подстроке")
+    search.add_argument("--count", type=int, default=1000000)
+    search.add_argument("--limit", type=int, default=1000)
+    search.set_defaults(func=bench_search)
+
+    export = commands.add_parser("export", help="пиковая память экспорта")
+    export.add_argument("--count", type=int, default=500000)
+    export.add_argument("--chunk-size", type=int, default=10000)
+    export.set_defaults(func=bench_export)
+
+    wordstat = commands.add_parser("wordstat", help="память загрузки Excel-выгрузки Wordstat")
+    wordstat.add_argument("--count", type=int, default=300000)
+    wordstat.add_argument("--sheets", type=int, default=3)
+    wordstat.add_argument("--batch-size", type=int, default=5000)
+    wordstat.set_defaults(func=bench_wordstat)
+
+    normalize = commands.add_parser("normalize", help="стоимость нормализации фразы")
+    normalize.add_argument("--count", type=int, default=200000)
+    normalize.add_argument("--unique", type=int, default=20000,
+                           help="сколько разных фраз в потоке (повторы попадают в кэш)")
+    normalize.set_defaults(func=bench_normalize)
+
+    project = commands.add_parser("project", help="сохранение и открытие проекта SQLite")
+    project.add_argument("--count", type=int, default=3000000)
+    project.add_argument("--batch-size", type=int, default=100000)
+    project.set_defaults(func=bench_project)
+
+    snapshot = commands.add_parser("snapshot", help="бинарный снимок ядра через mmap")
+    snapshot.add_argument("--count", type=int, default=3000000)
+    snapshot.set_defaults(func=bench_snapshot)
+
+    wordstat_api = commands.add_parser("wordstat-api",
+                                       help="обогащение частотностью через API Wordstat")
+    wordstat_api.add_argument("--count", type=int, default=2000)
+    wordstat_api.add_argument("--latency", type=float, default=0.05,
+                              help="задержка ответа заглушки API (с)")
+    wordstat_api.add_argument("--rate", type=float, default=20.0,
+                              help="ограничение вызовов API в секунду")
+    wordstat_api.set_defaults(func=bench_wordstat_api)
+
+    google_api = commands.add_parser("google-api", help="CPC и конкуренция через Google Ads API")
+    google_api.add_argument("--count", type=int, default=10000)
+    google_api.add_argument("--batch-size", type=int, default=2000)
+    google_api.add_argument("--workers", type=int, default=4)
+    google_api.add_argument("--latency", type=float, default=0.2,
+                            help="задержка ответа заглушки API (с)")
+    google_api.add_argument("--rate", type=float, default=10.0,
+                            help="ограничение запросов в секунду")
+    google_api.set_defaults(func=bench_google_api)
+
+    minus_words = commands.add_parser("minus-words", help="фильтр по большому списку минус-слов")
+    minus_words.add_argument("--count", type=int, default=200000)
+    minus_words.add_argument("--patterns", type=int, default=20000)
+    minus_words.add_argument("--sample", type=int, default=2000,
+                             help="сколько фраз проверять перебором для сравнения")
+    minus_words.set_defaults(func=bench_minus_words)
+
+    cluster = commands.add_parser("cluster", help="масштабирование кластеризации фраз")
+    cluster.add_argument("--sizes", default="10000,100000,1000000")
+    cluster.add_argument("--threshold", type=float, default=0.5)
+    cluster.add_argument("--workers", type=int, default=1)
+    cluster.add_argument("--mode", choices=('hard', 'soft', 'components'), default='hard')
+    cluster.add_argument("--core", type=int, default=100000,
+                         help="размер ядра для записи категорий через KeywordManager (0 - нет)")
+    cluster.set_defaults(func=bench_cluster)
+
+    serp_cluster = commands.add_parser("serp-cluster", help="кластеризация по общим URL выдачи")
+    serp_cluster.add_argument("--sizes", default="30000,100000,300000")
+    serp_cluster.add_argument("--overlap", type=int, default=4)
+    serp_cluster.add_argument("--mode", choices=('hard', 'soft'), default='hard')
+    serp_cluster.set_defaults(func=bench_serp_cluster)
+
+    dedup = commands.add_parser("dedup", help="неявные дубликаты при загрузке и в готовом ядре")
+    dedup.add_argument("--count", type=int, default=1000000)
+    dedup.set_defaults(func=bench_dedup)
+
+    lemma = commands.add_parser("lemma", help="построение индекса лемм и поиск по лемме")
+    lemma.add_argument("--count", type=int, default=1000000)
+    lemma.add_argument("--queries", type=int, default=200)
+    lemma.add_argument("--backend", default='auto', choices=('auto', 'pymorphy', 'stem'))
+    lemma.add_argument("--workers", type=int, default=1)
+    lemma.set_defaults(func=bench_lemma)
+
+    query = commands.add_parser("query", help="сочетания фильтров на большом ядре")
+    query.add_argument("--count", type=int, default=3000000)
+    query.add_argument("--repeat", type=int, default=5)
+    query.set_defaults(func=bench_query)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
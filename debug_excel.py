@@ -1,71 +1,58 @@
 #!/usr/bin/env python3
 """Отладка чтения Excel файла"""
 
-import pandas as pd
 import sys
-import os
+
+from openpyxl import load_workbook
+
+sys.path.insert(0, '.')
+from src.services.wordstat_parser import WordstatParser, parse_frequency
 
 def debug_excel():
     """Отладка чтения Excel файла"""
     print("🔍 Отладка Excel файла...")
-    
+
     file_path = "data/input/геологоразведка wordstat.xlsx"
-    
+    parser = WordstatParser()
+
     try:
-        # Читаем Excel файл
-        df = pd.read_excel(file_path, sheet_name=0)
-        
-        print(f"📊 Информация о файле:")
-        print(f"   Размер: {df.shape[0]} строк, {df.shape[1]} колонок")
-        print(f"   Колонки: {list(df.columns)}")
-        
-        print(f"\n📋 Первые 5 строк:")
-        for i in range(min(5, len(df))):
-            row = df.iloc[i]
-            print(f"   Строка {i}:")
-            for j, (col_name, value) in enumerate(zip(df.columns, row)):
-                print(f"      Колонка {j} '{col_name}': {repr(value)} (тип: {type(value).__name__})")
-            print()
-        
-        print(f"📈 Анализ колонки с частотностью:")
-        
-        # Ищем колонку с числами
-        for i, col_name in enumerate(df.columns):
-            col_data = df.iloc[:, i]
-            numeric_count = col_data.apply(lambda x: isinstance(x, (int, float)) and not pd.isna(x)).sum()
-            
-            print(f"   Колонка {i} '{col_name}':")
-            print(f"      Числовых значений: {numeric_count}")
-            
-            if numeric_count > 0:
-                sample_numbers = col_data[col_data.apply(lambda x: isinstance(x, (int, float)) and not pd.isna(x))].head(3)
-                print(f"      Примеры чисел: {list(sample_numbers)}")
-        
-        # Пробуем разные способы чтения
-        print(f"\n🔬 Тестируем чтение частотности:")
-        
-        for i in range(min(10, len(df))):
-            row = df.iloc[i]
-            keyword = row.iloc[0] if len(row) > 0 else None
-            frequency_raw = row.iloc[1] if len(row) > 1 else None
-            
-            # Пробуем преобразовать в число
-            frequency = 0
-            if pd.notna(frequency_raw):
-                try:
-                    if isinstance(frequency_raw, (int, float)):
-                        frequency = int(frequency_raw)
-                    else:
-                        frequency = int(float(str(frequency_raw)))
-                except:
-                    frequency = 0
-            
-            print(f"   '{keyword}': частота_raw={repr(frequency_raw)} → frequency={frequency}")
-    
+        # Читаем Excel файл потоково (read-only), только первые строки каждого листа
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+
+        for sheet in workbook.worksheets:
+            head = list(sheet.iter_rows(max_row=parser.DETECT_ROWS, values_only=True))
+
+            print(f"📊 Лист '{sheet.title}':")
+            print(f"   Размер: {sheet.max_row} строк, {sheet.max_column} колонок")
+
+            print(f"\n📋 Первые 5 строк:")
+            for i, row in enumerate(head[:5]):
+                print(f"   Строка {i}:")
+                for j, value in enumerate(row):
+                    print(f"      Колонка {j}: {repr(value)} (тип: {type(value).__name__})")
+                print()
+
+            # Так же, как парсер: колонки определяются один раз по первым строкам
+            layout = parser.detect_layout(head)
+            print(f"📈 Определение колонок: {layout}")
+            if layout is None:
+                continue
+
+            # Пробуем разные способы чтения
+            print(f"\n🔬 Тестируем чтение частотности:")
+            rows = head[layout.first_row:layout.first_row + 10]
+            raw = [row[layout.frequency_column] if layout.frequency_column is not None else None
+                   for row in rows]
+            for row, frequency_raw, frequency in zip(rows, raw, parse_frequency(raw)):
+                keyword = row[layout.phrase_column]
+                print(f"   '{keyword}': частота_raw={repr(frequency_raw)} → frequency={frequency}")
+
+        workbook.close()
+
     except Exception as e:
         print(f"❌ Ошибка: {e}")
         import traceback
         traceback.print_exc()
 
 if __name__ == "__main__":
-    debug_excel()
\ No newline at end of file
+    debug_excel()
@@ -10,15 +10,19 @@ def add_wordstat_integration_method():
     """
     
     method_code = '''
-def add_to_manager_fixed(self, keyword_manager, 
+def add_to_manager_fixed(self, keyword_manager, file_path: str,
                         min_frequency: int = 0,
                         exclude_patterns: list = None,
                         max_keywords: int = None) -> dict:
     """
     Исправленный метод добавления ключевых слов в KeywordManager
     
+    Файл читается пакетами (iter_batches), фильтры применяются к пакету
+    целиком, а добавление идёт через add_keywords_batch.
+    
     Args:
         keyword_manager: Объект KeywordManager
+        file_path: Путь к выгрузке Wordstat (.xlsx)
         min_frequency: Минимальная частотность (по умолчанию 0)
         exclude_patterns: Паттерны для исключения (например, ['snowrunner'])
         max_keywords: Максимальное количество (None = все)
@@ -26,76 +30,37 @@ def add_to_manager_fixed(self, keyword_manager,
     Returns:
         dict: Статистика добавления
     """
-    if exclude_patterns is None:
-        exclude_patterns = []
-    
-    stats = {
-        'total': len(self.keywords),
-        'added': 0,
-        'skipped': 0,
-        'duplicates': 0,
-        'errors': 0
-    }
-    
-    print(f"🚀 Добавление ключевых слов в KeywordManager...")
-    print(f"📊 Параметры:")
-    print(f"   - Всего ключевых слов: {stats['total']}")
-    print(f"   - Минимальная частота: {min_frequency}")
-    print(f"   - Исключения: {exclude_patterns}")
-    print(f"   - Лимит: {max_keywords or 'без ограничений'}")
-    
-    for i, keyword_data in enumerate(self.keywords):
-        try:
-            # Получаем данные
-            keyword_text = keyword_data.get('keyword', '').strip()
-            frequency = keyword_data.get('frequency', 0)
-            
-            # Пропускаем пустые
-            if not keyword_text:
-                stats['skipped'] += 1
-                continue
-            
-            # Фильтр по частоте
-            if frequency < min_frequency:
-                stats['skipped'] += 1
-                continue
-            
-            # Фильтр по исключениям
-            skip_keyword = False
-            for pattern in exclude_patterns:
-                if pattern.lower() in keyword_text.lower():
-                    skip_keyword = True
-                    break
-            
-            if skip_keyword:
-                stats['skipped'] += 1
-                continue
-            
-            # Лимит количества
-            if max_keywords and stats['added'] >= max_keywords:
-                break
-            
-            # ✅ ПРАВИЛЬНО добавляем с именованными параметрами
-            success = keyword_manager.add_keyword(
-                keyword=keyword_text,
-                frequency=frequency,  # ← Передаем реальную частотность!
-                cpc=0.0
-            )
-            
-            if success:
-                stats['added'] += 1
-                
-                # Показываем первые 10 для контроля
-                if stats['added'] <= 10:
-                    print(f"   ✅ '{keyword_text}' → {frequency:,} запросов")
-                elif stats['added'] % 50 == 0:
-                    print(f"   📈 Добавлено: {stats['added']}...")
-            else:
-                stats['duplicates'] += 1
-                
-        except Exception as e:
-            stats['errors'] += 1
-            print(f"   ❌ Ошибка: {e}")
+    import re
+    
+    exclude = None
+    if exclude_patterns:
+        exclude = re.compile("|".join(re.escape(p.lower()) for p in exclude_patterns))
+    
+    stats = {'total': 0, 'added': 0, 'skipped': 0, 'duplicates': 0, 'errors': 0}
+    
+    for batch in self.iter_batches(file_path):
+        stats['total'] += len(batch)
+        keep = batch['frequency'] >= min_frequency
+        if exclude is not None:
+            keep &= ~batch['keyword'].str.lower().str.contains(exclude)
+        stats['skipped'] += int((~keep).sum())
+        batch = batch[keep]
+        
+        # Лимит количества
+        if max_keywords is not None:
+            batch = batch.head(max_keywords - stats['added'])
+        
+        # ✅ ПРАВИЛЬНО добавляем пакетом вместе с частотностью
+        result = keyword_manager.add_keywords_batch(
+            batch['keyword'],
+            frequency=batch['frequency'].to_numpy(),  # ← Передаем реальную частотность!
+            source="wordstat"
+        )
+        for key in ('added', 'duplicates', 'errors'):
+            stats[key] += result[key]
+        
+        if max_keywords is not None and stats['added'] >= max_keywords:
+            break
     
     # Итоговая статистика
     print(f"\\n📊 Статистика добавления:")
@@ -127,78 +92,48 @@ def create_fixed_test():
 from wordstat_parser import WordstatParser
 from keyword_manager import KeywordManager
 
-# Добавьте метод add_to_manager_fixed в WordstatParser (код выше)
-# Или используйте этот код:
-
 def test_fixed_integration():
     """Исправленный тест интеграции"""
     
     print("🧪 ИСПРАВЛЕННЫЙ ТЕСТ WordstatParser + KeywordManager")
     print("="*70)
     
-    # 1. Загружаем данные
+    # 1. Создаем парсер и менеджер
     parser = WordstatParser()
-    parser.parse_file("data/input/геологоразведка wordstat.xlsx")
-    
-    print(f"📁 Загружено из WordStat: {len(parser.keywords)} ключевых слов")
-    
-    # 2. Создаем менеджер
     manager = KeywordManager()
     
-    # 3. Добавляем ВСЕ ключевые слова напрямую
+    # 2. Читаем файл потоково и добавляем ВСЕ ключевые слова пакетами
     print(f"\\n🚀 Добавляем ВСЕ ключевые слова...")
     
-    added = 0
-    errors = 0
-    
-    for keyword_data in parser.keywords:
-        try:
-            keyword_text = keyword_data.get('keyword', '').strip()
-            frequency = keyword_data.get('frequency', 0)
-            
-            if not keyword_text:
-                continue
-            
-            # ✅ КЛЮЧЕВОЕ ИСПРАВЛЕНИЕ: передаем frequency правильно
-            success = manager.add_keyword(
-                keyword=keyword_text,
-                frequency=frequency,  # ← Реальная частотность из WordStat
-                cpc=0.0
-            )
-            
-            if success:
-                added += 1
-                
-                # Показываем первые 5 для проверки
-                if added <= 5:
-                    print(f"   ✅ '{keyword_text}' → freq: {frequency}")
-            
-        except Exception as e:
-            errors += 1
-            print(f"   ❌ Ошибка: {e}")
-    
-    # 4. Результаты
+    # ✅ КЛЮЧЕВОЕ ИСПРАВЛЕНИЕ: frequency передается вместе с фразами
+    stats = parser.load_into(manager, "data/input/геологоразведка wordstat.xlsx")
+    added = stats['added']
+    errors = stats['errors']
+    
+    print(f"📁 Загружено из WordStat: {stats['rows']} ключевых слов")
+    
+    # 3. Результаты
     total_in_manager = len(manager.keywords)
     
     print(f"\\n📊 РЕЗУЛЬТАТЫ:")
-    print(f"   📁 В WordStat файле: {len(parser.keywords)}")
+    print(f"   📁 В WordStat файле: {stats['rows']}")
     print(f"   ✅ Добавлено: {added}")
     print(f"   🎯 В менеджере: {total_in_manager}")
     print(f"   ❌ Ошибок: {errors}")
     
-    # 5. Проверяем частотность
+    # 4. Проверяем частотность
     print(f"\\n🏆 Топ-5 по частотности:")
-    sorted_kw = sorted(manager.keywords, key=lambda x: x.frequency, reverse=True)
+    sorted_kw = manager.list_keywords(sort='frequency', descending=True, limit=5)['keywords']
     
     for i, kw in enumerate(sorted_kw[:5], 1):
         print(f"   {i}. '{kw.text}' → {kw.frequency:,} запросов")
     
-    # 6. Итоговая проверка
+    # 5. Итоговая проверка
     highest_freq = sorted_kw[0].frequency if sorted_kw else 0
     
     if total_in_manager >= 350 and highest_freq > 10000:
         print(f"\\n🎉 ПОЛНЫЙ УСПЕХ!")
-        print(f"   ✅ Добавлено {total_in_manager} из {len(parser.keywords)} ключевых слов")
+        print(f"   ✅ Добавлено {total_in_manager} из {stats['rows']} ключевых слов")
         print(f"   ✅ Частотность правильная: max = {highest_freq:,}")
         return True
     else:
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+Конфигурация gunicorn: несколько процессов над одним файлом проекта
+
+Запуск:
+    gunicorn -c gunicorn.conf.py main:app
+
+Приложение не загружается в мастер-процессе (preload_app выключен):
+каждый воркер сам импортирует main.py и открывает проект своим
+соединением SQLite.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+# KeywordManager потокобезопасен, поэтому воркер может обслуживать запросы в потоках
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+preload_app = False
+accesslog = os.environ.get('ACCESS_LOG') or None
+
+# Воркеры наследуют окружение мастера: при нескольких процессах проект
+# открывается в режиме shared (см. main.SHARED_PROJECT)
+if workers > 1:
+    os.environ.setdefault('SHARED_PROJECT', '1')
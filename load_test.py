@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Нагрузочный тест API в нескольких процессах gunicorn
+
+Для каждого количества воркеров поднимается gunicorn над одним файлом
+проекта (режим shared), клиенты в отдельных процессах в течение
+--duration секунд шлют запросы чтения (поиск, статистика, страница
+списка) и, при --write-ratio > 0, добавление фраз. Печатаются запросы
+в секунду и задержки; после прогона с записями проверяется, что все
+воркеры видят одинаковое количество ключевых слов.
+
+Запуск:
+    python load_test.py --count 200000 --workers 1 2 4 --clients 16
+    python load_test.py --workers 4 --write-ratio 0.05
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+sys.path.insert(0, '.')
+from benchmark import WORDS, generate_phrases
+from src.core.keyword_manager import KeywordManager
+
+READ_PATHS = (
+    lambda rnd: f"/api/search?q={quote(rnd.choice(WORDS)[:5])}&limit=20",
+    lambda rnd: "/api/stats",
+    lambda rnd: "/api/keywords?limit=50&sort=frequency&order=desc",
+    lambda rnd: f"/api/keywords?limit=50&q={quote(rnd.choice(WORDS))}&mode=word",
+)
+
+
+def request(port: int, method: str, path: str, body=None):
+    """Один запрос на новом соединении (синхронные воркеры gunicorn не держат keep-alive)"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                     headers=headers)
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def client(port: int, duration: float, write_ratio: float, tag: str):
+    """Процесс-клиент: (запросов, ошибок, добавлено фраз, задержки в мс)"""
+    rnd = random.Random(tag)
+    deadline = time.perf_counter() + duration
+    done = errors = added = 0
+    latencies = []
+    while True:
+        started = time.perf_counter()
+        if started >= deadline:
+            break
+        try:
+            if rnd.random() < write_ratio:
+                status, body = request(port, 'POST', '/api/keywords', {
+                    'keywords': [f"нагрузка {tag} {done} {rnd.choice(WORDS)}"]})
+                if status == 200:
+                    added += json.loads(body)['added']
+            else:
+                status, _ = request(port, 'GET', rnd.choice(READ_PATHS)(rnd))
+        except OSError:
+            status = None
+        latencies.append((time.perf_counter() - started) * 1000)
+        done += 1
+        errors += status != 200
+    return done, errors, added, latencies
+
+
+def start_server(workers: int, port: int, directory: str) -> subprocess.Popen:
+    env = dict(os.environ,
+               PROJECT_PATH=os.path.join(directory, 'project.sqlite'),
+               UPLOAD_DIR=os.path.join(directory, 'temp'),
+               WEB_CONCURRENCY=str(workers),
+               BIND=f'127.0.0.1:{port}',
+               # Один и тот же режим при любом числе воркеров - сравнение честное
+               SHARED_PROJECT='1')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'main:app'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    # Каждый воркер загружает проект сам; ждём, пока подряд ответят несколько запросов
+    deadline = time.time() + 300
+    successes = 0
+    while successes < workers * 3:
+        if server.poll() is not None or time.time() > deadline:
+            raise RuntimeError("gunicorn не запустился")
+        try:
+            status, _ = request(port, 'GET', '/api/stats')
+            successes = successes + 1 if status == 200 else 0
+        except OSError:
+            successes = 0
+            time.sleep(0.2)
+    return server
+
+
+def stop_server(server: subprocess.Popen):
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(60)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)] if values else 0.0
+
+
+def run(args, workers: int, directory: str):
+    server = start_server(workers, args.port, directory)
+    try:
+        with multiprocessing.Pool(args.clients) as pool:
+            results = pool.starmap(client, [(args.port, args.duration, args.write_ratio,
+                                             f"{workers}-{number}")
+                                            for number in range(args.clients)])
+        done = sum(result[0] for result in results)
+        errors = sum(result[1] for result in results)
+        added = sum(result[2] for result in results)
+        latencies = [value for result in results for value in result[3]]
+        print(f"   {workers:>7} | {done / args.duration:>10.1f} | {percentile(latencies, 0.5):>8.1f}"
+              f" | {percentile(latencies, 0.99):>8.1f} | {errors:>6}")
+
+        # Каждый запрос попадает в произвольный воркер - все должны видеть одно ядро
+        totals = {json.loads(request(args.port, 'GET', '/api/stats')[1])['total']
+                  for _ in range(workers * 5)}
+        return added, totals
+    finally:
+        stop_server(server)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=200000, help="фраз в проекте")
+    parser.add_argument("--workers", type=int, nargs='+', default=[1, 2, 4],
+                        help="количества воркеров gunicorn")
+    parser.add_argument("--clients", type=int, default=16, help="параллельных клиентов")
+    parser.add_argument("--duration", type=float, default=10.0, help="длительность прогона (с)")
+    parser.add_argument("--write-ratio", type=float, default=0.0,
+                        help="доля запросов на добавление")
+    parser.add_argument("--port", type=int, default=5055)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='keycollector-load-')
+    try:
+        manager = KeywordManager(project_path=os.path.join(directory, 'project.sqlite'))
+        rnd = random.Random(7)
+        phrases = generate_phrases(args.count)
+        manager.add_keywords_batch(phrases, frequency=[rnd.randint(0, 100000) for _ in phrases])
+        manager.close()
+        expected = args.count
+
+        print(f"🚀 Нагрузка: {args.count} фраз, {args.clients} клиентов, {args.duration:.0f} с, "
+              f"доля записей {args.write_ratio:.0%}, процессоров: {os.cpu_count()}")
+        print("   воркеров |   запр./с  | p50, мс  | p99, мс  | ошибок")
+        for workers in args.workers:
+            added, totals = run(args, workers, directory)
+            expected += added
+            if totals != {expected}:
+                print(f"   ❌ Воркеры видят разное ядро: {sorted(totals)}, ожидалось {expected}")
+            elif added:
+                print(f"   ✅ Добавлено {added} фраз, все воркеры видят {expected}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,69 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import atexit
 import os
 import sys
-from flask import Flask, render_template_string, request, jsonify
-
-# Добавляем путь к модулям
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
-
-# Импортируем наш модуль
-from core.keyword_manager import KeywordManager
-from core.keyword_manager import KeywordManager
-from core.data_parser import DataParser
-
-# Создаем Flask приложение и менеджер ключевых слов
-app = Flask(__name__)
-keyword_manager = KeywordManager()
+import logging
+import tempfile
+from flask import Flask, Response, render_template_string, request, jsonify, stream_with_context
+
+# Добавляем корень проекта в путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Импортируем наши модули
+from src.core.keyword_manager import KeywordManager
+from src.core.data_parser import DataParser
+from src.core.export_manager import COMPRESSED_FORMATS, EXPORT_FORMATS, ExportManager
+from src.core.import_jobs import ImportJobManager, JobRegistry
+from src.core.lemmatizer import Lemmatizer
+from src.services.crawler import PageCrawler
+from src.services.frequency_cache import FrequencyCache
+
+# Папка для временного хранения загруженных файлов
+UPLOAD_DIR = os.environ.get('UPLOAD_DIR', '/app/data/temp')
+# Файл проекта: ядро переживает перезапуск контейнера (пустая строка - хранить только в памяти)
+PROJECT_PATH = os.environ.get('PROJECT_PATH', '/app/data/project.sqlite')
+# Несколько процессов (воркеры gunicorn) работают с одним файлом проекта:
+# записи сериализуются блокировкой SQLite, чтение подтягивает чужие изменения
+SHARED_PROJECT = bool(PROJECT_PATH) and os.environ.get('SHARED_PROJECT', '') == '1'
+# Кэш частотности и CPC, общий для всех проектов (пустая строка - без кэша)
+FREQUENCY_CACHE_PATH = os.environ.get('FREQUENCY_CACHE_PATH', '/app/data/frequency_cache.sqlite')
+FREQUENCY_CACHE_TTL_DAYS = float(os.environ.get('FREQUENCY_CACHE_TTL_DAYS', '30'))
+# Импорт по списку страниц и sitemap: предел страниц и запросов к одному хосту
+CRAWL_MAX_PAGES = int(os.environ.get('CRAWL_MAX_PAGES', '1000'))
+CRAWL_PER_HOST = int(os.environ.get('CRAWL_PER_HOST', '2'))
+# Режимы неявных дубликатов при добавлении через запятую: sorted, lemma, stopwords
+DEDUP_MODES = [mode.strip() for mode in os.environ.get('DEDUP_MODES', '').split(',')
+               if mode.strip()]
+# Процессов для кластеризации больших ядер
+CLUSTER_WORKERS = int(os.environ.get('CLUSTER_WORKERS', str(os.cpu_count() or 1)))
+# Леммы: pymorphy3 (если установлен) или stem, индекс лемм строится при
+# загрузке проекта (LEMMA_INDEX=1) или при первом поиске, новые слова
+# первой загрузки разбираются LEMMA_WORKERS процессами
+LEMMA_BACKEND = os.environ.get('LEMMA_BACKEND', 'auto')
+LEMMA_INDEX = os.environ.get('LEMMA_INDEX', '') == '1'
+LEMMA_WORKERS = int(os.environ.get('LEMMA_WORKERS', str(os.cpu_count() or 1)))
 
 # Создаем Flask приложение и менеджеры
 app = Flask(__name__)
-keyword_manager = KeywordManager()
+lemmatizer = Lemmatizer(LEMMA_BACKEND, max_workers=LEMMA_WORKERS)
+keyword_manager = KeywordManager(project_path=PROJECT_PATH or None, shared=SHARED_PROJECT,
+                                 dedup_modes=DEDUP_MODES, lemmatizer=lemmatizer,
+                                 index_lemmas=LEMMA_INDEX)
+atexit.register(keyword_manager.close)
 data_parser = DataParser()
+export_manager = ExportManager(keyword_manager)
+job_registry = None
+if SHARED_PROJECT:
+    # Задачу выполняет принявший её процесс, опрос может прийти в любой другой
+    job_registry = JobRegistry(os.path.join(os.path.dirname(os.path.abspath(PROJECT_PATH)),
+                                            'import_jobs.sqlite'))
+import_jobs = ImportJobManager(keyword_manager, registry=job_registry)
+frequency_cache = None
+if FREQUENCY_CACHE_PATH:
+    frequency_cache = FrequencyCache(FREQUENCY_CACHE_PATH, ttl=FREQUENCY_CACHE_TTL_DAYS * 24 * 3600)
+    atexit.register(frequency_cache.close)
 
 # HTML шаблон с интерфейсом для работы с ключевыми словами
 HTML_TEMPLATE = """
@@ -77,6 +120,10 @@ HTML_TEMPLATE = """
                     <div class="stat-number" id="categories">{{ stats.get('categories', 0) }}</div>
                     <div>Категорий</div>
                 </div>
+                <div class="stat-card">
+                    <div class="stat-number" id="median-frequency">{{ stats.get('p50_frequency', 0) }}</div>
+                    <div>Медиана частотности (p90: {{ stats.get('p90_frequency', 0) }})</div>
+                </div>
             </div>
         </div>
 
@@ -144,12 +191,29 @@ HTML_TEMPLATE = """
 
         <!-- Список ключевых слов -->
         <div class="section">
-            <h3>📝 Ключевые слова ({{ keywords|length }})</h3>
-            <div class="keyword-list" id="keyword-list">
-                {% for keyword in keywords %}
+            <h3>📝 Ключевые слова (<span id="keywords-total">{{ page.total }}</span>)</h3>
+            <div class="form-group">
+                <input type="text" id="search-input" placeholder="Поиск по фразе" style="width: 200px;">
+                <select id="sort-field">
+                    <option value="added">По добавлению</option>
+                    <option value="frequency">По частотности</option>
+                    <option value="text">По алфавиту</option>
+                    <option value="word_count">По числу слов</option>
+                </select>
+                <select id="sort-order">
+                    <option value="asc">По возрастанию</option>
+                    <option value="desc">По убыванию</option>
+                </select>
+                <input type="number" id="min-frequency" placeholder="Частотность от" style="width: 130px;">
+                <input type="number" id="max-words" placeholder="Слов до" style="width: 80px;">
+                <button onclick="searchKeywords()">Показать</button>
+                <button onclick="showAll()">Сбросить</button>
+            </div>
+            <div class="keyword-list" id="keyword-list" data-cursor="{{ page.next_cursor or '' }}">
+                {% for keyword in page.keywords %}
                 <div class="keyword-item">
                     <strong>{{ keyword.text }}</strong> 
-                    <small>(слов: {{ keyword.word_count() }}, добавлено: {{ keyword.added_date.strftime('%H:%M') }})</small>
+                    <small>(слов: {{ keyword.word_count() }}, частотность: {{ keyword.frequency }}, добавлено: {{ keyword.added_date.strftime('%H:%M') }})</small>
                 </div>
                 {% endfor %}
             </div>
@@ -180,20 +244,70 @@ HTML_TEMPLATE = """
             });
         }
 
-        // Функция поиска
-        function searchKeywords() {
-            const query = document.getElementById('search-input').value;
-            
-            fetch(`/api/search?q=${encodeURIComponent(query)}`)
+        // Параметры списка из формы фильтров
+        function listingParams() {
+            const params = new URLSearchParams({
+                sort: document.getElementById('sort-field').value,
+                order: document.getElementById('sort-order').value,
+                limit: PAGE_SIZE
+            });
+            const query = document.getElementById('search-input').value.trim();
+            const minFrequency = document.getElementById('min-frequency').value;
+            const maxWords = document.getElementById('max-words').value;
+            if (query) params.set('q', query);
+            if (minFrequency) params.set('min_frequency', minFrequency);
+            if (maxWords) params.set('max_words', maxWords);
+            return params;
+        }
+
+        // Подгрузка следующей страницы списка (курсорная пагинация)
+        const PAGE_SIZE = 100;
+        let loadingPage = false;
+
+        function loadPage(reset) {
+            const container = document.getElementById('keyword-list');
+            const cursor = container.dataset.cursor;
+            if (loadingPage || (!reset && !cursor)) return;
+
+            const params = listingParams();
+            if (!reset) params.set('cursor', cursor);
+            loadingPage = true;
+            fetch(`/api/keywords?${params}`)
             .then(response => response.json())
             .then(data => {
+                if (data.error) {
+                    alert(data.error);
+                    return;
+                }
+                if (reset) {
+                    container.innerHTML = '';
+                    container.scrollTop = 0;
+                }
                 displayKeywords(data.keywords);
-            });
+                container.dataset.cursor = data.next_cursor || '';
+                document.getElementById('keywords-total').textContent = data.total;
+            })
+            .finally(() => { loadingPage = false; });
+        }
+
+        // Бесконечная прокрутка: дозагружаем, когда до конца списка меньше экрана
+        document.getElementById('keyword-list').addEventListener('scroll', function() {
+            if (this.scrollTop + 2 * this.clientHeight >= this.scrollHeight) {
+                loadPage(false);
+            }
+        });
+
+        // Функция поиска
+        function searchKeywords() {
+            loadPage(true);
         }
 
         // Показать все ключевые слова
         function showAll() {
-            location.reload();
+            document.getElementById('search-input').value = '';
+            document.getElementById('min-frequency').value = '';
+            document.getElementById('max-words').value = '';
+            loadPage(true);
         }
 
         // Очистить все ключевые слова
@@ -204,19 +318,77 @@ HTML_TEMPLATE = """
             }
         }
 
-        // Отображение ключевых слов
+        // Отображение ключевых слов (добавляет строки в конец списка)
         function displayKeywords(keywords) {
             const container = document.getElementById('keyword-list');
-            container.innerHTML = '';
             
             keywords.forEach(kw => {
                 const div = document.createElement('div');
                 div.className = 'keyword-item';
-                div.innerHTML = `<strong>${kw.text}</strong> <small>(слов: ${kw.word_count})</small>`;
+                const strong = document.createElement('strong');
+                strong.textContent = kw.text;
+                const small = document.createElement('small');
+                small.textContent = ` (слов: ${kw.word_count}, частотность: ${kw.frequency})`;
+                div.append(strong, small);
                 container.appendChild(div);
             });
         }
 
+        // Опрос фоновой задачи импорта до завершения
+        function pollJob(jobId, statusDiv) {
+            fetch(`/api/jobs/${jobId}`)
+            .then(response => response.json())
+            .then(job => {
+                const eta = job.eta !== null ? `, осталось ~${Math.ceil(job.eta)} с` : '';
+                const progress = job.progress !== null ? ` (${Math.round(job.progress * 100)}%)` : '';
+                const counters = `разобрано: ${job.rows_parsed}, добавлено: ${job.rows_added}, дубликатов: ${job.duplicates}`;
+                
+                if (job.status === 'queued' || job.status === 'running') {
+                    statusDiv.innerHTML = `⏳ ${job.description}${progress}: ${counters}, ${job.throughput} строк/с${eta} ` +
+                        `<button onclick="cancelJob('${job.id}')">Отменить</button>`;
+                    statusDiv.style.color = '#007bff';
+                    setTimeout(() => pollJob(jobId, statusDiv), 1000);
+                } else if (job.status === 'done') {
+                    statusDiv.innerHTML = `✅ ${job.description}: ${counters}`;
+                    statusDiv.style.color = '#28a745';
+                    setTimeout(() => location.reload(), 2000);
+                } else if (job.status === 'cancelled') {
+                    statusDiv.innerHTML = `⏹️ Импорт отменён: ${counters}`;
+                    statusDiv.style.color = '#6c757d';
+                } else {
+                    statusDiv.innerHTML = `❌ Ошибка импорта: ${job.error}`;
+                    statusDiv.style.color = '#dc3545';
+                }
+            })
+            .catch(() => setTimeout(() => pollJob(jobId, statusDiv), 3000));
+        }
+
+        // Отмена фоновой задачи импорта
+        function cancelJob(jobId) {
+            fetch(`/api/jobs/${jobId}/cancel`, {method: 'POST'});
+        }
+
+        // Постановка задачи импорта: сервер сразу отвечает номером задачи
+        function startImport(request, statusDiv) {
+            statusDiv.innerHTML = '⏳ Задача импорта отправлена...';
+            statusDiv.style.color = '#007bff';
+            
+            return fetch(request.url, request.options)
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    pollJob(data.job_id, statusDiv);
+                } else {
+                    statusDiv.innerHTML = `❌ Ошибки: ${data.errors.join(', ')}`;
+                    statusDiv.style.color = '#dc3545';
+                }
+            })
+            .catch(error => {
+                statusDiv.innerHTML = `❌ Ошибка импорта: ${error}`;
+                statusDiv.style.color = '#dc3545';
+            });
+        }
+
         // Функция импорта из текста
         function importFromText() {
             const text = document.getElementById('import-text').value.trim();
@@ -227,26 +399,17 @@ HTML_TEMPLATE = """
                 return;
             }
 
-            fetch('/api/import/text', {
-                method: 'POST',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({
-                    text: text,
-                    delimiter: delimiter
-                })
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (data.errors && data.errors.length > 0) {
-                    alert('Ошибки: ' + data.errors.join(', '));
-                } else {
-                    alert(`Успешно импортировано: ${data.imported} ключевых слов\\nДубликатов пропущено: ${data.duplicates}`);
-                    location.reload();
+            startImport({
+                url: '/api/import/text',
+                options: {
+                    method: 'POST',
+                    headers: {'Content-Type': 'application/json'},
+                    body: JSON.stringify({
+                        text: text,
+                        delimiter: delimiter
+                    })
                 }
-            })
-            .catch(error => {
-                alert('Ошибка импорта: ' + error);
-            });
+            }, document.getElementById('upload-status'));
         }
 
         // Функция импорта с URL
@@ -258,73 +421,33 @@ HTML_TEMPLATE = """
                 return;
             }
 
-            // Показываем индикатор загрузки
-            document.getElementById('url-input').disabled = true;
-            
-            fetch('/api/import/url', {
-                method: 'POST',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({url: url})
-            })
-            .then(response => response.json())
-            .then(data => {
-                document.getElementById('url-input').disabled = false;
-                
-                if (data.errors && data.errors.length > 0) {
-                    alert('Ошибки: ' + data.errors.join(', '));
-                } else {
-                    alert(`Успешно импортировано с ${url}:\\n${data.imported} ключевых слов\\nДубликатов: ${data.duplicates}`);
-                    location.reload();
+            startImport({
+                url: '/api/import/url',
+                options: {
+                    method: 'POST',
+                    headers: {'Content-Type': 'application/json'},
+                    body: JSON.stringify({url: url})
                 }
-            })
-            .catch(error => {
-                document.getElementById('url-input').disabled = false;
-                alert('Ошибка загрузки: ' + error);
-            });
+            }, document.getElementById('upload-status'));
         }
 
         // Функция загрузки файла
         function uploadFile() {
             const fileInput = document.getElementById('file-input');
-            const statusDiv = document.getElementById('upload-status');
             
             if (!fileInput.files || fileInput.files.length === 0) {
                 alert('Выберите файл для загрузки!');
                 return;
             }
             
-            const file = fileInput.files[0];
             const formData = new FormData();
-            formData.append('file', file);
-            
-            // Показываем статус загрузки
-            statusDiv.innerHTML = '⏳ Загрузка и обработка файла...';
-            statusDiv.style.color = '#007bff';
+            formData.append('file', fileInput.files[0]);
             
-            fetch('/api/import/file', {
-                method: 'POST',
-                body: formData
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (data.success) {
-                    statusDiv.innerHTML = `✅ Успешно загружено: ${data.imported} ключевых слов (дубликатов: ${data.duplicates})`;
-                    statusDiv.style.color = '#28a745';
-                    
-                    // Очищаем поле файла
-                    fileInput.value = '';
-                    
-                    // Перезагружаем страницу через 2 секунды
-                    setTimeout(() => location.reload(), 2000);
-                } else {
-                    statusDiv.innerHTML = `❌ Ошибки: ${data.errors.join(', ')}`;
-                    statusDiv.style.color = '#dc3545';
-                }
-            })
-            .catch(error => {
-                statusDiv.innerHTML = `❌ Ошибка загрузки: ${error}`;
-                statusDiv.style.color = '#dc3545';
-            });
+            startImport({
+                url: '/api/import/file',
+                options: {method: 'POST', body: formData}
+            }, document.getElementById('upload-status'))
+            .then(() => { fileInput.value = ''; });
         }
     </script>
 </body>
@@ -334,10 +457,55 @@ HTML_TEMPLATE = """
 @app.route('/')
 def home():
     """Главная страница с интерфейсом управления ключевыми словами"""
-    stats = keyword_manager.get_statistics()
-    return render_template_string(HTML_TEMPLATE, 
-                                keywords=keyword_manager.keywords, 
-                                stats=stats)
+    # Представления читаются при рендеринге - ядро не должно меняться до его конца
+    with keyword_manager.reading():
+        stats = keyword_manager.get_statistics()
+        # Рендерим только первый экран, остальное страница подгружает через /api/keywords
+        page = keyword_manager.list_keywords(limit=100)
+        return render_template_string(HTML_TEMPLATE, 
+                                    page=page, 
+                                    stats=stats)
+
+@app.route('/api/keywords', methods=['GET'])
+def list_keywords():
+    """API для постраничного просмотра ключевых слов (сортировка и фильтры)"""
+    args = request.args
+    with keyword_manager.reading():
+        try:
+            page = keyword_manager.list_keywords(
+                sort=args.get('sort', 'added'),
+                descending=args.get('order', 'asc') == 'desc',
+                cursor=args.get('cursor') or None,
+                limit=min(args.get('limit', 100, type=int), 1000),
+                query=args.get('q', ''),
+                mode=args.get('mode', 'substring'),
+                min_frequency=args.get('min_frequency', type=int),
+                max_frequency=args.get('max_frequency', type=int),
+                min_words=args.get('min_words', type=int),
+                max_words=args.get('max_words', type=int),
+                category=args.get('category'),
+                source=args.get('source'),
+                added_from=args.get('added_from'),
+                added_to=args.get('added_to'),
+                regex=args.get('regex')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        keywords = [{
+            'text': kw.text,
+            'word_count': kw.word_count(),
+            'frequency': kw.frequency,
+            'category': kw.category,
+            'source': kw.source,
+            'added_date': kw.added_date.isoformat()
+        } for kw in page['keywords']]
+    
+    return jsonify({
+        'keywords': keywords,
+        'total': page['total'],
+        'next_cursor': page['next_cursor']
+    })
 
 @app.route('/api/keywords', methods=['POST'])
 def add_keywords():
@@ -352,20 +520,91 @@ def add_keywords():
 def search_keywords():
     """API для поиска ключевых слов"""
     query = request.args.get('q', '')
-    found_keywords = keyword_manager.find_keywords(query)
+    mode = request.args.get('mode', 'substring')
+    limit = request.args.get('limit', type=int)
     
-    # Преобразуем в словари для JSON
-    keywords_data = []
-    for kw in found_keywords:
-        keywords_data.append({
-            'text': kw.text,
-            'word_count': kw.word_count(),
-            'frequency': kw.frequency,
-            'category': kw.category
-        })
+    with keyword_manager.reading():
+        try:
+            found_keywords = keyword_manager.find_keywords(query, mode=mode, limit=limit)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Преобразуем в словари для JSON
+        keywords_data = []
+        for kw in found_keywords:
+            keywords_data.append({
+                'text': kw.text,
+                'word_count': kw.word_count(),
+                'frequency': kw.frequency,
+                'category': kw.category
+            })
     
     return jsonify({'keywords': keywords_data})
 
+@app.route('/api/minus-words', methods=['POST'])
+def apply_minus_words():
+    """
+    API для применения минус-слов ко всему ядру
+    
+    Тело запроса: minus_words - список (или текст, по слову на строку),
+    mode - substring, word или stem, dry_run - только посчитать совпадения.
+    """
+    data = request.get_json() or {}
+    minus_words = data.get('minus_words', [])
+    if isinstance(minus_words, str):
+        minus_words = minus_words.splitlines()
+    
+    try:
+        stats = keyword_manager.apply_minus_words(minus_words, mode=data.get('mode', 'substring'),
+                                                  dry_run=bool(data.get('dry_run')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(stats)
+
+@app.route('/api/dedup', methods=['POST'])
+def deduplicate_keywords():
+    """
+    API для удаления неявных дубликатов из ядра
+    
+    Тело запроса: modes - список режимов (sorted, lemma, stopwords),
+    keep - first или frequency, dry_run - только найти дубликаты.
+    """
+    data = request.get_json() or {}
+    try:
+        stats = keyword_manager.deduplicate(data.get('modes'), keep=data.get('keep', 'first'),
+                                            dry_run=bool(data.get('dry_run')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(stats)
+
+@app.route('/api/cluster', methods=['POST'])
+def cluster_keywords():
+    """
+    API для кластеризации ядра: кластер записывается в категорию фраз
+    
+    Тело запроса: threshold - порог сходства (0, 1], min_size - минимальный
+    размер кластера, mode - hard, soft или components, dry_run - только
+    посчитать кластеры. skipped_postings в ответе - сколько слишком длинных
+    списков словопозиций пропущено (часть похожих пар не найдена).
+    """
+    data = request.get_json() or {}
+    try:
+        stats = keyword_manager.cluster_keywords(float(data.get('threshold', 0.5)),
+                                                 min_size=int(data.get('min_size', 2)),
+                                                 max_workers=CLUSTER_WORKERS,
+                                                 dry_run=bool(data.get('dry_run')),
+                                                 mode=data.get('mode', 'hard'))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(stats)
+
+@app.route('/api/lemmas')
+def get_lemmas():
+    """API для частых лемм ядра (top - сколько лемм вернуть) и статистики кэша лемм"""
+    top = min(request.args.get('top', 100, type=int), 10000)
+    return jsonify({'lemmas': keyword_manager.get_lemma_counts(top),
+                    'cache': keyword_manager.lemmatizer.cache_info()})
+
 @app.route('/api/clear', methods=['DELETE'])
 def clear_keywords():
     """API для очистки всех ключевых слов"""
@@ -375,91 +614,99 @@ def clear_keywords():
 @app.route('/api/stats')
 def get_stats():
     """API для получения статистики"""
-    return jsonify(keyword_manager.get_statistics())
+    stats = keyword_manager.get_statistics()
+    if frequency_cache is not None:
+        # Попадания в кэш - сэкономленные запросы к Wordstat и Google Ads
+        stats['frequency_cache'] = frequency_cache.stats()
+    return jsonify(stats)
 
 @app.route('/api/export')
 def export_keywords():
-    """API для экспорта ключевых слов"""
-    df = keyword_manager.to_dataframe()
+    """
+    API для потокового экспорта ключевых слов
+    
+    Параметр format: ndjson (по умолчанию), csv или xlsx. Ответ отдаётся
+    порциями и сжимается gzip, если клиент это поддерживает.
+    """
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Неподдерживаемый формат: {fmt}'}), 400
+    
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    compress = fmt not in COMPRESSED_FORMATS and 'gzip' in request.accept_encodings
+    headers = {'Content-Disposition': f'attachment; filename=keywords.{extension}',
+               'Vary': 'Accept-Encoding'}
+    if compress:
+        headers['Content-Encoding'] = 'gzip'
+    
+    return Response(stream_with_context(export_manager.stream(fmt, compress=compress)),
+                    mimetype=mimetype, headers=headers)
+
+def job_accepted(job):
+    """Ответ на постановку задачи импорта в очередь"""
     return jsonify({
-        'keywords': df.to_dict('records'),
-        'total': len(df)
-    })
+        'success': True,
+        'job_id': job.id,
+        'status_url': f'/api/jobs/{job.id}'
+    }), 202
 
 @app.route('/api/import/text', methods=['POST'])
 def import_from_text():
-    """API для импорта из текста"""
-    try:
-        data = request.get_json()
-        text = data.get('text', '')
-        delimiter = data.get('delimiter', '\n')
-        
-        # Парсим текст
-        parse_result = data_parser.parse_text(text, delimiter)
-        
-        if parse_result.errors:
-            return jsonify({
-                'success': False,
-                'errors': parse_result.errors
-            }), 400
-        
-        # Добавляем ключевые слова
-        import_stats = keyword_manager.add_keywords_bulk(parse_result.keywords)
-        
-        return jsonify({
-            'success': True,
-            'imported': import_stats['added'],
-            'duplicates': import_stats['duplicates'],
-            'total_parsed': parse_result.total_processed,
-            'metadata': parse_result.metadata
-        })
-        
-    except Exception as e:
+    """API для импорта из текста (фоновая задача)"""
+    data = request.get_json()
+    text = data.get('text', '')
+    delimiter = data.get('delimiter', '\n')
+    
+    if not text.strip():
         return jsonify({
             'success': False,
-            'errors': [f'Ошибка импорта: {str(e)}']
-        }), 500
+            'errors': ['Пустой текст']
+        }), 400
+    
+    job = import_jobs.submit('text', lambda: data_parser.iter_text(text, delimiter),
+                             description=f'Текст ({len(text)} символов)',
+                             total_rows=text.count(delimiter or '\n') + 1, source='text')
+    return job_accepted(job)
 
 @app.route('/api/import/url', methods=['POST'])
 def import_from_url():
-    """API для импорта с веб-страницы"""
-    try:
-        data = request.get_json()
-        url = data.get('url', '')
-        
-        if not url:
-            return jsonify({
-                'success': False,
-                'errors': ['URL не указан']
-            }), 400
-        
-        # Парсим URL
-        parse_result = data_parser.parse_url_content(url)
-        
-        if parse_result.errors:
-            return jsonify({
-                'success': False,
-                'errors': parse_result.errors
-            }), 400
-        
-        # Добавляем ключевые слова (ограничиваем количество для безопасности)
-        limited_keywords = parse_result.keywords[:100]  # Максимум 100 ключевых слов с одного URL
-        import_stats = keyword_manager.add_keywords_bulk(limited_keywords)
-        
+    """
+    API для импорта с веб-страниц (фоновая задача)
+    
+    Тело запроса: url - одна страница, urls - список страниц, sitemap или
+    sitemaps - адреса sitemap; max_pages - сколько страниц обойти (целое > 0,
+    не больше CRAWL_MAX_PAGES).
+    """
+    data = request.get_json() or {}
+    urls = data.get('urls') or ([data['url']] if data.get('url') else [])
+    sitemaps = data.get('sitemaps') or ([data['sitemap']] if data.get('sitemap') else [])
+    
+    if not urls and not sitemaps:
         return jsonify({
-            'success': True,
-            'imported': import_stats['added'],
-            'duplicates': import_stats['duplicates'],
-            'total_parsed': len(limited_keywords),
-            'url': url,
-            'metadata': parse_result.metadata
-        })
-        
-    except Exception as e:
+            'success': False,
+            'errors': ['URL не указан']
+        }), 400
+    
+    try:
+        max_pages = int(data.get('max_pages', CRAWL_MAX_PAGES))
+    except (TypeError, ValueError):
+        max_pages = 0
+    if max_pages <= 0:
         return jsonify({
             'success': False,
-            'errors': [f'Ошибка импорта с URL: {str(e)}']
-        }), 500
+            'errors': [f"max_pages должно быть целым числом больше 0: {data.get('max_pages')!r}"]
+        }), 400
+    
+    crawler = PageCrawler(max_pages=min(max_pages, CRAWL_MAX_PAGES),
+                          per_host=CRAWL_PER_HOST, batch_size=data_parser.batch_size)
+    
+    def batches():
+        return data_parser.iter_urls(urls, sitemaps, crawler=crawler)
+    
+    description = urls[0] if len(urls) == 1 and not sitemaps else ', '.join(sitemaps + urls)
+    job = import_jobs.submit('url', batches, description=description[:200], source='url',
+                             on_finish=crawler.close)
+    return job_accepted(job)
 
 @app.route('/api/parser/formats')
 def get_supported_formats():
@@ -477,81 +724,95 @@ def get_supported_formats():
 
 @app.route('/api/import/file', methods=['POST'])
 def import_from_file():
-    """API для импорта из загруженного файла"""
-    try:
-        # Проверяем наличие файла
-        if 'file' not in request.files:
-            return jsonify({
-                'success': False,
-                'errors': ['Файл не выбран']
-            }), 400
-        
-        file = request.files['file']
-        
-        if file.filename == '':
-            return jsonify({
-                'success': False,
-                'errors': ['Имя файла не указано']
-            }), 400
-        
-        # Сохраняем файл временно
-        import tempfile
-        import os
-        
-        # Создаем временную папку если её нет
-        temp_dir = '/app/data/temp'
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        # Сохраняем файл
-        temp_path = os.path.join(temp_dir, file.filename)
-        file.save(temp_path)
-        
-        try:
-            # Автоматически определяем формат и парсим
-            parse_result = data_parser.auto_detect_format(temp_path)
-            
-            if parse_result.errors:
-                return jsonify({
-                    'success': False,
-                    'errors': parse_result.errors
-                }), 400
-            
-            # Добавляем ключевые слова
-            import_stats = keyword_manager.add_keywords_bulk(parse_result.keywords)
-            
-            return jsonify({
-                'success': True,
-                'imported': import_stats['added'],
-                'duplicates': import_stats['duplicates'],
-                'errors_count': import_stats['errors'],
-                'total_parsed': parse_result.total_processed,
-                'file_name': file.filename,
-                'source_type': parse_result.source_type,
-                'metadata': parse_result.metadata
-            })
-            
-        finally:
-            # Удаляем временный файл
-            try:
-                os.remove(temp_path)
-            except:
-                pass
-        
-    except Exception as e:
+    """API для импорта из загруженного файла (фоновая задача)"""
+    # Проверяем наличие файла
+    if 'file' not in request.files:
+        return jsonify({
+            'success': False,
+            'errors': ['Файл не выбран']
+        }), 400
+    
+    file = request.files['file']
+    
+    if file.filename == '':
+        return jsonify({
+            'success': False,
+            'errors': ['Имя файла не указано']
+        }), 400
+    
+    extension = os.path.splitext(file.filename)[1].lower()
+    if extension not in data_parser.get_supported_formats():
         return jsonify({
             'success': False,
-            'errors': [f'Ошибка обработки файла: {str(e)}']
-        }), 500
+            'errors': [f'Неподдерживаемый формат файла: {extension}']
+        }), 400
+    
+    # Сохраняем файл под уникальным именем: задача читает его уже после ответа
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix=extension, dir=UPLOAD_DIR)
+    with os.fdopen(fd, 'wb') as target:
+        file.save(target)
+    
+    def remove_temp_file():
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+    
+    try:
+        total_rows = data_parser.estimate_rows(temp_path)
+    except Exception:
+        total_rows = None
+    
+    job = import_jobs.submit('file', lambda: data_parser.iter_file(temp_path),
+                             description=file.filename, total_rows=total_rows,
+                             source=extension.lstrip('.'), on_finish=remove_temp_file)
+    return job_accepted(job)
+
+@app.route('/api/jobs')
+def list_jobs():
+    """API для списка задач импорта"""
+    return jsonify({'jobs': import_jobs.statuses()})
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """API для состояния задачи импорта (прогресс, скорость, оценка времени)"""
+    state = import_jobs.status(job_id)
+    if state is None:
+        return jsonify({'error': 'Задача не найдена'}), 404
+    return jsonify(state)
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """API для отмены задачи импорта"""
+    if import_jobs.status(job_id) is None:
+        return jsonify({'error': 'Задача не найдена'}), 404
+    cancelled = import_jobs.cancel(job_id)
+    return jsonify({'cancelled': cancelled, 'job': import_jobs.status(job_id)})
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    
     print("🚀 Запуск KeyCollector Python Clone...")
     print("📁 Рабочая директория:", os.getcwd())
+    print("💾 Проект:", PROJECT_PATH or "в памяти (PROJECT_PATH не задан)")
+    print("   Несколько воркеров: gunicorn -c gunicorn.conf.py main:app")
     print("🌐 Веб-интерфейс: http://localhost:5000")
     print("📊 API endpoints:")
     print("   POST /api/keywords - добавить ключевые слова")
-    print("   GET  /api/search - поиск ключевых слов") 
-    print("   GET  /api/stats - статистика")
-    print("   GET  /api/export - экспорт данных")
+    print("   GET  /api/keywords - список ключевых слов (курсор, сортировка, фильтры:")
+    print("        частотность, слова, категория, источник, даты, подстрока, regex, лемма)")
+    print("   GET  /api/search - поиск ключевых слов (mode=lemma - по леммам)") 
+    print("   POST /api/minus-words - применить минус-слова ко всему ядру")
+    print("   POST /api/cluster - кластеризация ядра в категории")
+    print("   POST /api/dedup - удалить неявные дубликаты (порядок слов, словоформы)")
+    print("   GET  /api/lemmas - частые леммы ядра")
+    print("   GET  /api/stats - статистика (и счётчики кэша частотности)")
+    print("   GET  /api/export?format=ndjson|csv|xlsx - потоковый экспорт данных")
+    print("   POST /api/import/file|text|url - импорт в фоне (возвращает job_id)")
+    print("        /api/import/url принимает url, urls или sitemap")
+    print("   GET  /api/jobs/<id> - прогресс задачи импорта, POST /api/jobs/<id>/cancel - отмена")
     print("⏹️  Для остановки нажмите Ctrl+C")
     
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
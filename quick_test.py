@@ -1,34 +1,19 @@
 import sys
-import pandas as pd
 
-sys.path.insert(0, 'src/core')
-from keyword_manager import KeywordManager
+sys.path.insert(0, '.')
+from src.core.keyword_manager import KeywordManager
+from src.services.wordstat_parser import WordstatParser
 
 print("🧪 БЫСТРЫЙ ТЕСТ WordStat")
 print("="*40)
 
-# Читаем Excel
-df = pd.read_excel("data/input/геологоразведка wordstat.xlsx")
-print(f"📊 Размер: {df.shape[0]} строк, {df.shape[1]} колонок")
-
-# Создаем менеджер
+# Создаем менеджер и парсер
 manager = KeywordManager()
+parser = WordstatParser()
 
-# Добавляем данные
-for index, row in df.iterrows():
-    keyword = str(row.iloc[0]).strip()
-    
-    # Пытаемся извлечь частотность из второй колонки
-    frequency = 0
-    if len(row) > 1:
-        try:
-            freq_val = str(row.iloc[1]).replace(",", "")
-            frequency = int(float(freq_val))
-        except:
-            frequency = 0
-    
-    if keyword != "nan":
-        manager.add_keyword(keyword=keyword, frequency=frequency, cpc=0.0)
+# Читаем Excel потоково и добавляем пакетами
+stats = parser.load_into(manager, "data/input/геологоразведка wordstat.xlsx")
+print(f"📊 Прочитано строк: {stats['rows']}, дубликатов: {stats['duplicates']}")
 
 total = len(manager.keywords)
 print(f"📊 Добавлено: {total} ключевых слов")
@@ -36,4 +21,4 @@ print(f"📊 Добавлено: {total} ключевых слов")
 if total >= 300:
     print("🎉 УСПЕХ!")
 else:
-    print("⚠️ Мало данных")
\ No newline at end of file
+    print("⚠️ Мало данных")
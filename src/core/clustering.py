@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Кластеризация ключевых фраз по составу слов
+Фразы превращаются в разреженные векторы основ слов с весами IDF,
+кандидаты в соседи берутся из инвертированного индекса по префиксам
+векторов (prefix filtering), поэтому объём работы растёт почти линейно
+с размером ядра, а не квадратично, как при попарном сравнении
+"""
+
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .normalizer import STOP_WORDS, stem
+
+# Допуск при сравнении весов с долей порога; префикс берётся с запасом
+# на погрешность накопленных сумм (лишний элемент префикса безопасен)
+_EPSILON = 1e-9
+_PREFIX_SLACK = 1e-6
+
+# Данные общей задачи в процессах пула (заполняются инициализатором)
+_SHARED: Optional[Dict[str, np.ndarray]] = None
+
+
+def tokenize(text: str) -> List[str]:
+    """Основы значимых слов нормализованной фразы без повторов"""
+    tokens = [stem(word) for word in text.split() if word not in STOP_WORDS]
+    return list(dict.fromkeys(tokens))
+
+
+def _ranges(starts: np.ndarray, lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Развернуть отрезки [start, start + length) в один массив позиций
+
+    Returns:
+        Tuple: номер отрезка и позиция для каждого элемента
+    """
+    owner = np.repeat(np.arange(len(starts), dtype=np.int64), lengths)
+    offsets = np.arange(len(owner), dtype=np.int64) - np.repeat(np.cumsum(lengths) - lengths,
+                                                                 lengths)
+    return owner, np.repeat(starts, lengths) + offsets
+
+
+def _pool_context():
+    """
+    Контекст запуска процессов пула или None, если пул сейчас запускать нельзя
+
+    Процесс, созданный fork, получает копию только текущего потока: блокировки,
+    которые в этот момент держали другие потоки (логирование, SQLite проекта,
+    задачи импорта), в нём не освободятся никогда. Поэтому fork допустим лишь
+    из главного потока без других потоков (CLI, бенчмарк, запуск приложения);
+    из потоков запросов и фоновых задач проверка идёт в текущем процессе.
+    """
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context()
+    if threading.current_thread() is threading.main_thread() and threading.active_count() == 1:
+        return multiprocessing.get_context('fork')
+    return None
+
+
+def _init_worker(shared: Dict[str, np.ndarray]):
+    global _SHARED
+    _SHARED = shared
+
+
+def _worker_edges(start: int, end: int) -> Tuple[np.ndarray, np.ndarray, int]:
+    return _chunk_edges(_SHARED, start, end)
+
+
+def _chunk_edges(shared: Dict[str, np.ndarray], start: int,
+                 end: int) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Пары похожих фраз для участка списков словопозиций [start, end)
+
+    Returns:
+        Tuple: первые и вторые строки рёбер и количество проверенных кандидатов
+    """
+    rows, list_end = shared['posting_rows'], shared['posting_end']
+    positions = np.arange(start, end, dtype=np.int64)
+    # Все пары внутри каждого списка: позиция p образует пары с p+1 .. конец списка
+    owner, second = _ranges(positions + 1, list_end[start:end] - positions - 1)
+    left, right = rows[positions[owner]], rows[second]
+    n = np.int64(len(shared['totals']))
+    unique = np.unique(left * n + right)
+    left, right = unique // n, unique % n
+
+    # Фильтр по весу: при сходстве t меньший вектор весит не меньше t от большего
+    totals, threshold = shared['totals'], float(shared['threshold'])
+    small = np.minimum(totals[left], totals[right])
+    large = np.maximum(totals[left], totals[right])
+    keep = small >= threshold * large - _EPSILON
+    left, right = left[keep], right[keep]
+    checked = len(left)
+    if not checked:
+        return left[:0], right[:0], checked
+
+    # Вес пересечения: каждая основа левой фразы сравнивается с основами
+    # правой по очереди (фразы короткие - несколько векторных проходов)
+    indptr, ranks, weights = shared['indptr'], shared['ranks'], shared['weights']
+    pair, entry = _ranges(indptr[left], indptr[left + 1] - indptr[left])
+    wanted = ranks[entry]
+    other_start = indptr[right][pair]
+    other_length = (indptr[right + 1] - indptr[right])[pair]
+    found = np.zeros(len(pair), dtype=np.bool_)
+    active = np.flatnonzero(other_length > 0)
+    offset = 0
+    while len(active):
+        found[active] |= ranks[other_start[active] + offset] == wanted[active]
+        offset += 1
+        active = active[other_length[active] > offset]
+    intersection = np.bincount(pair, weights=weights[entry] * found, minlength=checked)
+    union = totals[left] + totals[right] - intersection
+    similar = intersection >= threshold * union - _EPSILON
+    return left[similar], right[similar], checked
+
+
+def connected_components(count: int, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """
+    Компоненты связности графа рёбер (left, right) на count вершинах
+
+    Корень компоненты подвешивается к меньшему корню, после чего метки
+    сжимаются переходами по указателям - всё векторно, без обхода в Python.
+
+    Returns:
+        np.ndarray: Метка каждой вершины - наименьшая вершина её компоненты
+    """
+    labels = np.arange(count, dtype=np.int64)
+    while len(left):
+        first, second = labels[left], labels[right]
+        differ = first != second
+        if not differ.any():
+            break
+        # Вершины с одинаковыми метками уже в одной компоненте навсегда
+        left, right = left[differ], right[differ]
+        first, second = first[differ], second[differ]
+        np.minimum.at(labels, np.maximum(first, second), np.minimum(first, second))
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+    return labels
+
+
+def cluster_names(labels: np.ndarray, frequencies: Optional[Sequence[int]] = None,
+                  min_size: int = 2) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Строки, попавшие в кластеры размера не меньше min_size, и их «главные» фразы
+
+    Главная фраза кластера - самая частотная (при равенстве - первая).
+
+    Returns:
+        Tuple: номера строк и номер главной строки для каждой из них
+    """
+    count = len(labels)
+    rows = np.arange(count, dtype=np.int64)
+    frequencies = (np.zeros(count, dtype=np.int64) if frequencies is None
+                   else np.asarray(frequencies, dtype=np.int64))
+    order = np.lexsort((rows, -frequencies, labels))
+    first = np.ones(count, dtype=np.bool_)
+    first[1:] = labels[order][1:] != labels[order][:-1]
+    heads = np.empty(count, dtype=np.int64)
+    heads[labels[order][first]] = order[first]
+    clustered = np.flatnonzero(np.bincount(labels, minlength=count)[labels] >= min_size)
+    return clustered, heads[labels[clustered]]
+
+
+def serp_edges(indptr: np.ndarray, urls: np.ndarray, min_overlap: int = 3,
+               max_url_df: int = 1000,
+               chunk_pairs: int = 4_000_000) -> Tuple[np.ndarray, np.ndarray, Dict[str, int]]:
+    """
+    Пары фраз, у которых в выдаче не меньше min_overlap общих URL
+
+    Выдачи заданы CSR-матрицей: URL фразы i - urls[indptr[i]:indptr[i + 1]]
+    (целые номера URL без повторов внутри строки). Общие URL считаются по
+    инвертированному индексу URL -> фразы: для участка строк все соседи по
+    каждому URL разворачиваются в массив пар, совпадающие пары считаются
+    np.unique. URL из выдач больше чем max_url_df фраз (главные страницы
+    агрегаторов, энциклопедий) не учитываются - они склеивали бы разные темы.
+
+    Returns:
+        Tuple: первые и вторые строки рёбер (first < second) и статистика
+    """
+    count = len(indptr) - 1
+    rows = np.repeat(np.arange(count, dtype=np.int64), np.diff(indptr))
+    urls = np.asarray(urls, dtype=np.int64)
+    df = np.bincount(urls) if len(urls) else np.zeros(0, dtype=np.int64)
+    kept = df[urls] <= max_url_df
+    rows, urls = rows[kept], urls[kept]
+    indptr = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=count), out=indptr[1:])
+
+    order = np.argsort(urls, kind='stable')
+    postings = rows[order]
+    posting_ptr = np.zeros(len(df) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(urls, minlength=len(df)), out=posting_ptr[1:])
+
+    # Участки строк примерно по chunk_pairs развёрнутых соседей: все пары
+    # строки попадают в один участок, поэтому счётчики общих URL полные
+    expanded = np.cumsum(np.bincount(rows, weights=df[urls], minlength=count))
+    cuts = np.unique(np.r_[0, np.searchsorted(expanded, np.arange(
+        chunk_pairs, expanded[-1] if count else 0, chunk_pairs)), count])
+    first, second = [], []
+    candidates = 0
+    size = np.int64(count)
+    for low, high in zip(cuts[:-1].tolist(), cuts[1:].tolist()):
+        entries = np.arange(indptr[low], indptr[high], dtype=np.int64)
+        owner, position = _ranges(posting_ptr[urls[entries]],
+                                  posting_ptr[urls[entries] + 1] - posting_ptr[urls[entries]])
+        left, right = rows[entries][owner], postings[position]
+        later = right > left
+        keys, shared = np.unique(left[later] * size + right[later], return_counts=True)
+        candidates += len(keys)
+        keys = keys[shared >= min_overlap]
+        first.append(keys // size)
+        second.append(keys % size)
+
+    empty = np.zeros(0, dtype=np.int64)
+    first = np.concatenate(first or [empty])
+    second = np.concatenate(second or [empty])
+    stats = {'urls': int((df > 0).sum()), 'hub_urls': int((df > max_url_df).sum()),
+             'candidates': candidates, 'edges': len(first)}
+    return first, second, stats
+
+
+def greedy_clusters(count: int, left: np.ndarray, right: np.ndarray,
+                    frequencies: Optional[Sequence[int]] = None,
+                    mode: str = 'hard') -> np.ndarray:
+    """
+    Кластеры вокруг самых частотных фраз по графу рёбер (left, right)
+
+    Фразы перебираются по убыванию частотности; ещё не распределённая фраза
+    становится главной в новом кластере, кандидаты - её свободные соседи.
+    В режиме soft в кластер попадают все кандидаты, в режиме hard - только
+    связанные со всеми уже принятыми фразами кластера. Проверка hard -
+    пересечение битовых масок: соседи каждого кандидата среди кандидатов
+    собираются в целое число, принятые фразы - в другое.
+
+    Returns:
+        np.ndarray: Метка каждой фразы - номер главной фразы её кластера
+    """
+    if mode not in ('hard', 'soft'):
+        raise ValueError(f"Неизвестный режим кластеризации: {mode}")
+    rows = np.arange(count, dtype=np.int64)
+    frequencies = (np.zeros(count, dtype=np.int64) if frequencies is None
+                   else np.asarray(frequencies, dtype=np.int64))
+    order = np.lexsort((rows, -frequencies))
+    rank = np.empty(count, dtype=np.int64)
+    rank[order] = rows
+
+    # Симметричная смежность в CSR, соседи упорядочены по частотности
+    source = np.concatenate([left, right])
+    target = np.concatenate([right, left])
+    arranged = np.lexsort((rank[target], source))
+    neighbours = target[arranged]
+    indptr = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(source, minlength=count), out=indptr[1:])
+
+    labels = np.full(count, -1, dtype=np.int64)
+    local = np.full(count, -1, dtype=np.int64)
+    for head in order[np.diff(indptr)[order] > 0].tolist():
+        if labels[head] >= 0:
+            continue
+        labels[head] = head
+        candidates = neighbours[indptr[head]:indptr[head + 1]]
+        candidates = candidates[labels[candidates] < 0]
+        if mode == 'soft' or len(candidates) < 2:
+            labels[candidates] = head
+            continue
+        local[candidates] = np.arange(len(candidates))
+        accepted = 0
+        for index, candidate in enumerate(candidates.tolist()):
+            linked = local[neighbours[indptr[candidate]:indptr[candidate + 1]]]
+            mask = sum(1 << bit for bit in linked[linked >= 0].tolist())
+            if mask & accepted == accepted:
+                accepted |= 1 << index
+                labels[candidate] = head
+        local[candidates] = -1
+    unassigned = labels < 0
+    labels[unassigned] = rows[unassigned]
+    return labels
+
+
+class KeywordClusterer:
+    """
+    Кластеризация фраз по взвешенному коэффициенту Жаккара
+
+    Фраза - множество основ слов (tokenize) с весами IDF; две фразы похожи,
+    если вес общих основ не меньше threshold от веса объединения. Кластеры
+    строятся по графу похожих пар вокруг самых частотных фраз (см.
+    greedy_clusters): в режиме hard фраза принимается в кластер, только если
+    похожа на все его фразы, в режиме soft - если похожа на главную. Режим
+    components - компоненты связности графа (одиночная связь): быстрее, но
+    цепочки «a~b, b~c» склеивают в один кластер и непохожие фразы a и c.
+
+    Соседи ищутся без перебора всех пар: основы фразы упорядочены от редких
+    к частым, и в индекс попадает только префикс, без которого оставшийся вес
+    меньше доли threshold. У похожих фраз префиксы обязательно пересекаются,
+    поэтому сравниваются лишь фразы из общих списков словопозиций. Основы,
+    встречающиеся слишком часто (max_df), считаются стоп-словами ядра.
+
+        clusterer = KeywordClusterer(threshold=0.5)
+        labels = clusterer.fit(["бурение скважин", "бурение скважины цена", "насос"])
+        # [0, 0, 2]
+    """
+
+    MODES = ('hard', 'soft', 'components')
+
+    def __init__(self, threshold: float = 0.5, max_df: float = 0.05,
+                 max_postings: int = 1000, chunk_pairs: int = 1_000_000,
+                 max_workers: int = 1, parallel_from: int = 200_000, mode: str = 'hard'):
+        """
+        Args:
+            threshold: Порог сходства (0, 1]
+            max_df: Доля фраз, начиная с которой основа не учитывается
+                    (но не меньше max_postings фраз)
+            max_postings: Более длинные списки словопозиций префиксов
+                          пропускаются (ограничение квадратичной работы)
+            chunk_pairs: Пар-кандидатов на одну векторную задачу
+            max_workers: Процессов для проверки кандидатов (1 - в текущем;
+                         вызов не из главного потока всегда идёт в текущем)
+            parallel_from: Пул процессов запускается для ядер от этого размера
+            mode: hard, soft или components
+
+        Raises:
+            ValueError: Порог вне (0, 1] или неизвестный режим
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError(f"Порог сходства должен быть в (0, 1]: {threshold}")
+        if mode not in self.MODES:
+            raise ValueError(f"Неизвестный режим кластеризации: {mode}")
+        self.mode = mode
+        self.threshold = float(threshold)
+        self.max_df = max_df
+        self.max_postings = max(int(max_postings), 2)
+        self.chunk_pairs = max(int(chunk_pairs), 1)
+        self.max_workers = max(int(max_workers), 1)
+        self.parallel_from = parallel_from
+        self.stats: Dict[str, float] = {}
+
+    # --- Векторы ---
+
+    def _vectorize(self, texts: Sequence[str]) -> Dict[str, np.ndarray]:
+        """CSR-матрица основ: строки упорядочены по рангу (редкие основы первыми)"""
+        count = len(texts)
+        # Списки слов по фразам не накапливаются (миллион списков - лишние
+        # проходы сборщика мусора): слова всех фраз - один общий список
+        lengths = np.fromiter((len(text.split()) for text in texts), dtype=np.int64, count=count)
+        # Слова кодируются хешированием pandas, основа считается один раз
+        # на уникальное слово (кэш stem на миллионном ядре не помещается)
+        codes, words = pd.factorize(pd.Series(' '.join(texts).split(), dtype=object))
+        vocabulary: Dict[str, int] = {}
+        token_of = np.fromiter((-1 if word in STOP_WORDS
+                                else vocabulary.setdefault(stem(word), len(vocabulary))
+                                for word in words), dtype=np.int64, count=len(words))
+        ids = token_of[codes] if len(codes) else np.zeros(0, dtype=np.int64)
+        entry_rows = np.repeat(np.arange(count, dtype=np.int64), lengths)
+        # Повтор основы в строке («скважина скважины») учитывается один раз
+        size = max(len(vocabulary), 1)
+        pairs = np.unique(entry_rows[ids >= 0] * size + ids[ids >= 0])
+        entry_rows, ids = pairs // size, pairs % size
+
+        df = np.bincount(ids, minlength=len(vocabulary))
+        stop_df = max(self.max_df * count, self.max_postings)
+        kept = df[ids] <= stop_df
+        ids, entry_rows = ids[kept], entry_rows[kept]
+        # Ранг основы: по возрастанию частоты, то есть по убыванию веса
+        ranks_of = np.empty(len(vocabulary), dtype=np.int64)
+        ranks_of[np.lexsort((np.arange(len(vocabulary)), df))] = np.arange(len(vocabulary))
+        idf = np.log((1.0 + count) / (1.0 + df)) + 1.0
+
+        order = np.lexsort((ranks_of[ids], entry_rows))
+        ids, entry_rows = ids[order], entry_rows[order]
+        indptr = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(entry_rows, minlength=count), out=indptr[1:])
+        self.stats.update(vocabulary=len(vocabulary),
+                          stop_tokens=int((df > stop_df).sum()))
+        return {'indptr': indptr, 'rows': entry_rows, 'ranks': ranks_of[ids],
+                'weights': idf[ids]}
+
+    def _postings(self, vectors: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Списки словопозиций префиксов: строки, отсортированные по (ранг, строка),
+        и конец списка для каждой позиции
+        """
+        indptr, rows, weights = vectors['indptr'], vectors['rows'], vectors['weights']
+        totals = np.bincount(rows, weights=weights, minlength=len(indptr) - 1)
+        vectors['totals'] = totals
+        # Вес хвоста строки, начиная с элемента: элемент в префиксе, пока хвост >= t * W
+        before = np.cumsum(weights) - weights
+        row_start = before[np.minimum(indptr[:-1], max(len(before) - 1, 0))] \
+            if len(before) else before
+        suffix = totals[rows] - (before - row_start[rows])
+        prefix = suffix >= (self.threshold - _PREFIX_SLACK) * totals[rows]
+
+        prefix_rows, prefix_ranks = rows[prefix], vectors['ranks'][prefix]
+        order = np.lexsort((prefix_rows, prefix_ranks))
+        prefix_rows, prefix_ranks = prefix_rows[order], prefix_ranks[order]
+        starts = np.flatnonzero(np.r_[True, prefix_ranks[1:] != prefix_ranks[:-1]]) \
+            if len(prefix_ranks) else np.zeros(0, dtype=np.int64)
+        lengths = np.diff(np.r_[starts, len(prefix_ranks)])
+        usable = (lengths >= 2) & (lengths <= self.max_postings)
+        self.stats['skipped_postings'] = int((lengths > self.max_postings).sum())
+
+        keep = np.repeat(usable, lengths)
+        lengths = lengths[usable]
+        posting_rows = prefix_rows[keep]
+        posting_end = np.repeat(np.cumsum(lengths), lengths)
+        return posting_rows, posting_end
+
+    def _tasks(self, posting_end: np.ndarray) -> List[Tuple[int, int]]:
+        """Участки списков словопозиций примерно по chunk_pairs пар"""
+        if not len(posting_end):
+            return []
+        ends = np.unique(posting_end)
+        lengths = np.diff(np.r_[0, ends])
+        pairs = np.cumsum(lengths * (lengths - 1) // 2)
+        bounds = np.searchsorted(pairs, np.arange(self.chunk_pairs, pairs[-1], self.chunk_pairs))
+        cuts = np.unique(np.r_[0, ends[np.minimum(bounds, len(ends) - 1)], ends[-1]])
+        return list(zip(cuts[:-1].tolist(), cuts[1:].tolist()))
+
+    # --- Кластеризация ---
+
+    def fit(self, texts: Sequence[str], frequencies: Optional[Sequence[int]] = None) -> np.ndarray:
+        """
+        Кластеризовать нормализованные фразы
+
+        Частотность (frequencies) задаёт порядок выбора главных фраз в режимах
+        hard и soft (без неё - порядок фраз).
+
+        Returns:
+            np.ndarray: Метка кластера каждой фразы - номер главной фразы
+            (в режиме components - первой фразы кластера)
+        """
+        started = time.perf_counter()
+        self.stats = {'phrases': len(texts)}
+        vectors = self._vectorize(texts)
+        posting_rows, posting_end = self._postings(vectors)
+        shared = {'indptr': vectors['indptr'], 'ranks': vectors['ranks'],
+                  'weights': vectors['weights'], 'totals': vectors['totals'],
+                  'threshold': np.float64(self.threshold),
+                  'posting_rows': posting_rows, 'posting_end': posting_end}
+        tasks = self._tasks(posting_end)
+
+        workers = min(self.max_workers, len(tasks))
+        context = _pool_context() if workers > 1 else None
+        if len(texts) < self.parallel_from or context is None:
+            workers = 1
+        if workers > 1:
+            # При fork массивы наследуются процессами без копирования через pickle
+            with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                     initargs=(shared,)) as pool:
+                results = list(pool.map(_worker_edges, *zip(*tasks)))
+        else:
+            results = [_chunk_edges(shared, start, end) for start, end in tasks]
+
+        empty = np.zeros(0, dtype=np.int64)
+        left = np.concatenate([result[0] for result in results] or [empty])
+        right = np.concatenate([result[1] for result in results] or [empty])
+        # Пара с общими основами в префиксах попадает в несколько списков и задач
+        size = np.int64(max(len(texts), 1))
+        unique = np.unique(left * size + right)
+        left, right = unique // size, unique % size
+        if self.mode == 'components':
+            labels = connected_components(len(texts), left, right)
+        else:
+            labels = greedy_clusters(len(texts), left, right, frequencies, self.mode)
+        self.stats.update(candidates=sum(result[2] for result in results), edges=len(left),
+                          tasks=len(tasks), workers=max(workers, 1),
+                          seconds=round(time.perf_counter() - started, 3))
+        return labels
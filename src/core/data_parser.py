@@ -1,275 +1,271 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-Рабочий тест с DataParser для обработки WordStat файла
+Модуль разбора входных данных
+Текст, файлы (TXT, CSV, Excel, JSON) и веб-страницы (списком или по sitemap);
+данные отдаются пакетами, чтобы большие файлы не загружались в память целиком
 """
 
-import sys
+import csv
+import json
+import logging
 import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
-# Добавляем папки в путь
-sys.path.insert(0, 'src/core')
-
-def test_wordstat_with_dataparser():
-    """Тест обработки WordStat файла через DataParser"""
-    
-    print("🧪 ТЕСТ: DataParser + WordStat файл")
-    print("="*50)
-    
-    try:
-        # Импортируем классы
-        from data_parser import DataParser
-        from keyword_manager import KeywordManager
-        
-        print("✅ Импорты успешны!")
-        
-        # Создаем объекты
-        parser = DataParser()
-        manager = KeywordManager()
-        
-        print("✅ Объекты созданы!")
-        
-        # Парсим WordStat файл как Excel
-        print(f"\n📁 Парсим WordStat Excel файл...")
-        
-        result = parser.parse_excel(
-            file_path="data/input/геологоразведка wordstat.xlsx",
-            sheet_name=0,      # Первый лист
-            keyword_column=0,  # Первая колонка (ключевые слова)
-            has_header=True    # Есть заголовки
-        )
-        
-        print(f"📊 Результат парсинга:")
-        print(f"   - Найдено ключевых слов: {len(result.keywords)}")
-        print(f"   - Ошибок: {len(result.errors)}")
-        print(f"   - Источник: {result.source_type}")
-        
-        if result.errors:
-            print(f"⚠️ Ошибки:")
-            for error in result.errors:
-                print(f"   - {error}")
-        
-        # Показываем первые 5 ключевых слов из результата
-        print(f"\n🔍 Первые 5 ключевых слов из парсера:")
-        for i, keyword in enumerate(result.keywords[:5], 1):
-            print(f"   {i}. '{keyword}'")
-        
-        if not result.keywords:
-            print("❌ Ключевые слова не найдены!")
-            print(f"📋 Метаданные: {result.metadata}")
-            return False
-        
-        # Добавляем ключевые слова в менеджер
-        print(f"\n🚀 Добавляем ключевые слова в менеджер...")
-        
-        added = 0
-        for keyword in result.keywords:
-            if keyword.strip():  # Только непустые
-                success = manager.add_keyword(
-                    keyword=keyword,
-                    frequency=0,  # DataParser не извлекает частотность
-                    cpc=0.0
-                )
-                if success:
-                    added += 1
-        
-        total = len(manager.keywords)
-        
-        print(f"\n📊 РЕЗУЛЬТАТЫ:")
-        print(f"   📁 Извлечено парсером: {len(result.keywords)}")
-        print(f"   ✅ Добавлено в менеджер: {added}")
-        print(f"   🎯 Всего в менеджере: {total}")
-        
-        # Показываем результат в менеджере
-        print(f"\n🔍 Первые 5 в менеджере:")
-        for i, kw in enumerate(manager.keywords[:5]):
-            print(f"   {i+1}. '{kw.text}' (freq: {kw.frequency})")
-        
-        # Оценка успешности
-        if total >= 300:  # Должно быть около 352
-            print(f"\n🎉 УСПЕХ! Добавлено {total} ключевых слов!")
-            return True
-        elif total >= 100:
-            print(f"\n✅ ЧАСТИЧНЫЙ УСПЕХ! Добавлено {total} ключевых слов")
-            print("⚠️ Но частотность не извлечена (DataParser не поддерживает)")
-            return True
-        else:
-            print(f"\n⚠️ МАЛО ДАННЫХ! Только {total} ключевых слов")
-            return False
-            
-    except Exception as e:
-        print(f"❌ Ошибка: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
-
-
-def test_excel_structure():
-    """Анализируем структуру Excel файла"""
-    
-    print("\n" + "="*50)
-    print("🔍 АНАЛИЗ СТРУКТУРЫ EXCEL ФАЙЛА")
-    print("="*50)
-    
-    try:
-        import pandas as pd
-        
-        # Читаем Excel файл
-        df = pd.read_excel("data/input/геологоразведка wordstat.xlsx")
-        
-        print(f"📊 Структура файла:")
-        print(f"   - Размер: {df.shape[0]} строк, {df.shape[1]} колонок")
-        print(f"   - Колонки: {list(df.columns)}")
-        
-        # Показываем первые 5 строк
-        print(f"\n📋 Первые 5 строк:")
-        for i in range(min(5, len(df))):
-            row = df.iloc[i]
-            print(f"   Строка {i+1}:")
-            for j, (col_name, value) in enumerate(row.items()):
-                print(f"     {j}: {col_name} = '{value}'")
-            print()
-        
-        # Ищем колонку с частотностью
-        print(f"🔍 Поиск колонки с частотностью:")
-        for col in df.columns:
-            if any(word in str(col).lower() for word in ['частот', 'запрос', 'frequency', 'count']):
-                print(f"   ✅ Возможная колонка частотности: '{col}'")
-                # Показываем несколько значений
-                values = df[col].head()
-                print(f"      Первые значения: {list(values)}")
-        
-        return df
-        
-    except Exception as e:
-        print(f"❌ Ошибка анализа Excel: {e}")
-        return None
+import pandas as pd
+
+from ..services.crawler import PageCrawler
+from ..services.wordstat_parser import (FREQUENCY_HEADERS, PHRASE_HEADERS, WordstatParser,
+                                        parse_frequency)
+
+
+@dataclass
+class ParseResult:
+    """Результат разбора источника целиком"""
+    keywords: List[str] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    total_processed: int = 0
+    source_type: str = ""
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+class DataParser:
+    """
+    Разбор источников ключевых слов
+
+    Методы iter_* отдают пакеты pd.DataFrame с колонкой keyword (и frequency,
+    если она есть в источнике) - их используют фоновые задачи импорта.
+    Методы parse_* собирают весь источник в ParseResult.
+    """
+
+    SUPPORTED_FORMATS = ['.csv', '.txt', '.xlsx', '.xls', '.json']
+
+    def __init__(self, batch_size: int = 10000):
+        """
+        Args:
+            batch_size: Количество строк в одном пакете
+        """
+        self.batch_size = batch_size
+        self.logger = logging.getLogger(__name__)
+
+    def get_supported_formats(self) -> List[str]:
+        """Поддерживаемые расширения файлов"""
+        return list(self.SUPPORTED_FORMATS)
 
+    def _batches(self, keywords: List[Any], frequencies: Optional[List[Any]] = None):
+        """Нарезать список на пакеты DataFrame"""
+        for start in range(0, len(keywords), self.batch_size):
+            batch = {'keyword': keywords[start:start + self.batch_size]}
+            if frequencies is not None:
+                batch['frequency'] = parse_frequency(frequencies[start:start + self.batch_size])
+            yield pd.DataFrame(batch)
 
-def create_custom_wordstat_parser(df):
-    """Создаем кастомный парсер для WordStat на основе анализа"""
-    
-    print("\n" + "="*50)
-    print("🛠️ СОЗДАНИЕ КАСТОМНОГО WORDSTAT ПАРСЕРА")
-    print("="*50)
-    
-    try:
-        from keyword_manager import KeywordManager
-        
-        manager = KeywordManager()
-        
-        # Определяем колонки
-        keyword_col = None
-        frequency_col = None
-        
-        # Ищем колонку ключевых слов (обычно первая)
-        for i, col in enumerate(df.columns):
-            if i == 0 or any(word in str(col).lower() for word in ['ключ', 'слов', 'фраз', 'запрос']):
-                keyword_col = col
-                print(f"✅ Колонка ключевых слов: '{col}'")
-                break
-        
-        # Ищем колонку частотности
-        for col in df.columns:
-            if any(word in str(col).lower() for word in ['частот', 'запрос', 'frequency', 'count']):
-                frequency_col = col
-                print(f"✅ Колонка частотности: '{col}'")
-                break
-        
-        if not keyword_col:
-            print("❌ Не найдена колонка ключевых слов")
-            return False
-        
-        # Обрабатываем данные
-        print(f"\n🚀 Обработка данных...")
-        
-        added = 0
-        for index, row in df.iterrows():
+    # --- Текст ---
+
+    def iter_text(self, text: str, delimiter: str = '\n') -> Iterator[pd.DataFrame]:
+        """Ключевые слова из текста, разделённые delimiter"""
+        parts = [part.strip() for part in text.split(delimiter or '\n')]
+        yield from self._batches([part for part in parts if part])
+
+    # --- Файлы ---
+
+    def estimate_rows(self, file_path: str) -> Optional[int]:
+        """
+        Примерное количество строк в файле (для оценки оставшегося времени)
+
+        Returns:
+            int или None, если оценить дёшево нельзя
+        """
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension in ('.txt', '.csv'):
+            lines = 0
+            with open(file_path, 'rb') as source:
+                for block in iter(lambda: source.read(1 << 20), b''):
+                    lines += block.count(b'\n')
+            return lines
+        if extension in ('.xlsx', '.xlsm'):
+            from openpyxl import load_workbook
+
+            workbook = load_workbook(file_path, read_only=True)
             try:
-                keyword = str(row[keyword_col]).strip()
-                frequency = 0
-                
-                if frequency_col and pd.notna(row[frequency_col]):
-                    try:
-                        frequency = int(float(str(row[frequency_col]).replace(',', '').replace(' ', '')))
-                    except:
-                        frequency = 0
-                
-                if keyword and keyword.lower() not in ['nan', 'none', '']:
-                    success = manager.add_keyword(
-                        keyword=keyword,
-                        frequency=frequency,
-                        cpc=0.0
-                    )
-                    
-                    if success:
-                        added += 1
-                        
-                        # Показываем первые 10
-                        if added <= 10:
-                            print(f"   ✅ '{keyword}' → {frequency}")
-                
-            except Exception as e:
-                if added <= 5:  # Показываем только первые ошибки
-                    print(f"   ❌ Ошибка в строке {index}: {e}")
-        
-        total = len(manager.keywords)
-        
-        print(f"\n📊 РЕЗУЛЬТАТ КАСТОМНОГО ПАРСЕРА:")
-        print(f"   📁 Строк в файле: {len(df)}")
-        print(f"   ✅ Добавлено: {added}")
-        print(f"   🎯 В менеджере: {total}")
-        
-        # Топ по частотности
-        if total > 0:
-            sorted_kw = sorted(manager.keywords, key=lambda x: x.frequency, reverse=True)
-            max_freq = sorted_kw[0].frequency
-            
-            print(f"\n🏆 Топ-5 по частотности:")
-            for i, kw in enumerate(sorted_kw[:5], 1):
-                print(f"   {i}. '{kw.text}' → {kw.frequency:,}")
-            
-            if total >= 350 and max_freq > 10000:
-                print(f"\n🎉 КАСТОМНЫЙ ПАРСЕР - ПОЛНЫЙ УСПЕХ!")
-                print(f"   ✅ Все {total} ключевых слов с частотностью!")
-                return True
-            elif total >= 300:
-                print(f"\n✅ КАСТОМНЫЙ ПАРСЕР - УСПЕХ!")
-                print(f"   ✅ {total} ключевых слов добавлено!")
-                return True
-        
-        return False
-        
-    except Exception as e:
-        print(f"❌ Ошибка кастомного парсера: {e}")
-        return False
-
-
-if __name__ == "__main__":
-    print("🔧 Запуск полного теста WordStat...")
-    print("="*60)
-    
-    # Тест 1: Стандартный DataParser
-    success1 = test_wordstat_with_dataparser()
-    
-    # Тест 2: Анализ структуры файла
-    df = test_excel_structure()
-    
-    # Тест 3: Кастомный парсер
-    success3 = False
-    if df is not None:
-        success3 = create_custom_wordstat_parser(df)
-    
-    # Итоговый результат
-    print(f"\n" + "="*60)
-    print(f"📊 ИТОГОВЫЕ РЕЗУЛЬТАТЫ:")
-    print(f"   🔧 DataParser: {'✅' if success1 else '❌'}")
-    print(f"   🔍 Анализ файла: {'✅' if df is not None else '❌'}")
-    print(f"   🛠️ Кастомный парсер: {'✅' if success3 else '❌'}")
-    
-    if success3:
-        print(f"\n🎊 ПОБЕДА! Кастомный парсер справился с задачей!")
-    elif success1:
-        print(f"\n✅ DataParser работает, но без частотности")
-    else:
-        print(f"\n🔧 Нужна дополнительная отладка")
\ No newline at end of file
+                rows = [sheet.max_row for sheet in workbook.worksheets]
+            finally:
+                workbook.close()
+            return None if None in rows else sum(rows)
+        return None
+
+    def iter_file(self, file_path: str) -> Iterator[pd.DataFrame]:
+        """
+        Пакеты ключевых слов из файла (формат по расширению)
+
+        Raises:
+            ValueError: Неподдерживаемый формат
+        """
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == '.txt':
+            return self._iter_txt(file_path)
+        if extension == '.csv':
+            return self._iter_csv(file_path)
+        if extension in ('.xlsx', '.xlsm'):
+            return self._iter_xlsx(file_path)
+        if extension == '.xls':
+            return self._iter_xls(file_path)
+        if extension == '.json':
+            return self._iter_json(file_path)
+        raise ValueError(f"Неподдерживаемый формат файла: {extension}")
+
+    def _iter_txt(self, file_path: str) -> Iterator[pd.DataFrame]:
+        batch = []
+        with open(file_path, encoding='utf-8-sig', errors='replace') as source:
+            for line in source:
+                line = line.strip()
+                if line:
+                    batch.append(line)
+                if len(batch) >= self.batch_size:
+                    yield pd.DataFrame({'keyword': batch})
+                    batch = []
+        if batch:
+            yield pd.DataFrame({'keyword': batch})
+
+    def _iter_csv(self, file_path: str) -> Iterator[pd.DataFrame]:
+        with open(file_path, encoding='utf-8-sig', errors='replace') as source:
+            sample = source.read(64 * 1024)
+        try:
+            delimiter = csv.Sniffer().sniff(sample, delimiters=',;\t').delimiter
+        except csv.Error:
+            delimiter = ','
+
+        # Колонки определяются один раз по первой строке
+        first = next(csv.reader([sample.splitlines()[0] if sample else ""], delimiter=delimiter), [])
+        names = [value.strip().lower() for value in first]
+        has_header = any(name in PHRASE_HEADERS or name in FREQUENCY_HEADERS for name in names)
+        keyword_column = next((i for i, name in enumerate(names) if name in PHRASE_HEADERS), 0)
+        frequency_column = next((i for i, name in enumerate(names) if name in FREQUENCY_HEADERS), None)
+
+        chunks = pd.read_csv(file_path, sep=delimiter, header=0 if has_header else None,
+                             dtype=str, keep_default_na=False, encoding='utf-8-sig',
+                             encoding_errors='replace', on_bad_lines='skip',
+                             chunksize=self.batch_size)
+        for number, chunk in enumerate(chunks):
+            if number == 0 and not has_header and chunk.shape[1] > 1:
+                # Без заголовка: вторая колонка - частотность, если она числовая
+                if parse_frequency(chunk.iloc[:, 1]).any():
+                    frequency_column = 1
+            batch = {'keyword': chunk.iloc[:, keyword_column].str.strip()}
+            if frequency_column is not None and frequency_column < chunk.shape[1]:
+                batch['frequency'] = parse_frequency(chunk.iloc[:, frequency_column])
+            batch = pd.DataFrame(batch)
+            yield batch[batch['keyword'] != ""]
+
+    def _iter_xlsx(self, file_path: str) -> Iterator[pd.DataFrame]:
+        parser = WordstatParser(batch_size=self.batch_size)
+        for batch in parser.iter_batches(file_path):
+            yield batch.drop(columns='sheet')
+
+    def _iter_xls(self, file_path: str) -> Iterator[pd.DataFrame]:
+        # Старый формат читается только целиком (xlrd), но в листе не больше 65536 строк
+        parser = WordstatParser()
+        for df in pd.read_excel(file_path, sheet_name=None, header=None).values():
+            df = df.astype(object).where(df.notna(), None)
+            layout = parser.detect_layout(list(df.head(parser.DETECT_ROWS).itertuples(
+                index=False, name=None)))
+            if layout is None:
+                continue
+            rows = df.iloc[layout.first_row:]
+            rows = rows[rows.iloc[:, layout.phrase_column].notna()]
+            keywords = rows.iloc[:, layout.phrase_column].astype(str).tolist()
+            frequencies = (rows.iloc[:, layout.frequency_column].tolist()
+                           if layout.frequency_column is not None else [None] * len(keywords))
+            yield from self._batches(keywords, frequencies)
+
+    def _iter_json(self, file_path: str) -> Iterator[pd.DataFrame]:
+        with open(file_path, encoding='utf-8-sig') as source:
+            data = json.load(source)
+        if isinstance(data, dict):
+            data = data.get('keywords', [])
+        if not isinstance(data, list):
+            raise ValueError("JSON должен содержать массив ключевых слов")
+
+        keywords, frequencies = [], []
+        for item in data:
+            if isinstance(item, dict):
+                keywords.append(item.get('keyword') or item.get('text'))
+                frequencies.append(item.get('frequency'))
+            else:
+                keywords.append(item)
+                frequencies.append(None)
+        yield from self._batches(keywords, frequencies)
+
+    # --- Веб-страницы ---
+
+    def fetch_url_keywords(self, url: str, timeout: float = 15.0) -> List[str]:
+        """
+        Фразы со страницы: meta keywords, title и заголовки h1-h3
+
+        Raises:
+            requests.RequestException: Ошибка загрузки страницы
+            TimeoutError, ValueError: Страница грузится слишком долго или это не HTML
+        """
+        crawler = PageCrawler(max_workers=1, timeout=timeout, page_timeout=timeout)
+        try:
+            return crawler.fetch(url).phrases
+        finally:
+            crawler.close()
+
+    def iter_urls(self, urls: Iterable[str] = (), sitemaps: Iterable[str] = (),
+                  crawler: Optional[PageCrawler] = None) -> Iterator[pd.DataFrame]:
+        """
+        Фразы со списка страниц и страниц из sitemap (параллельный обход)
+
+        Args:
+            urls: Адреса страниц
+            sitemaps: Адреса sitemap (sitemapindex раскрывается)
+            crawler: Настроенный обходчик (по умолчанию с пакетами по batch_size);
+                     после обхода в crawler.stats и crawler.errors - его итоги
+
+        Raises:
+            ValueError: Не загрузилась ни одна страница
+        """
+        if crawler is None:
+            crawler = PageCrawler(batch_size=self.batch_size)
+        for batch in crawler.iter_batches(urls, sitemaps):
+            yield pd.DataFrame({'keyword': batch})
+        if not crawler.stats['pages'] and crawler.errors:
+            raise ValueError(f"Не загружено ни одной страницы: {crawler.errors[0]}")
+
+    # --- Разбор целиком (ParseResult) ---
+
+    def _collect(self, batches, source_type: str, **metadata) -> ParseResult:
+        result = ParseResult(source_type=source_type, metadata=metadata)
+        try:
+            for batch in batches:
+                result.keywords.extend(batch['keyword'].tolist())
+        except Exception as e:
+            result.errors.append(str(e))
+        result.total_processed = len(result.keywords)
+        return result
+
+    def parse_text(self, text: str, delimiter: str = '\n') -> ParseResult:
+        """Разобрать текст целиком"""
+        if not text.strip():
+            return ParseResult(errors=["Пустой текст"], source_type='text')
+        return self._collect(self.iter_text(text, delimiter), 'text', delimiter=delimiter)
+
+    def auto_detect_format(self, file_path: str) -> ParseResult:
+        """Разобрать файл целиком, формат определяется по расширению"""
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension not in self.SUPPORTED_FORMATS and extension != '.xlsm':
+            return ParseResult(errors=[f"Неподдерживаемый формат файла: {extension}"],
+                               source_type=extension.lstrip('.'))
+        return self._collect(self.iter_file(file_path), extension.lstrip('.'),
+                             file_name=os.path.basename(file_path))
+
+    def parse_url_content(self, url: str) -> ParseResult:
+        """Разобрать веб-страницу"""
+        try:
+            keywords = self.fetch_url_keywords(url)
+        except Exception as e:
+            return ParseResult(errors=[f"Ошибка загрузки {url}: {e}"], source_type='url')
+        return ParseResult(keywords=keywords, total_processed=len(keywords),
+                           source_type='url', metadata={'url': url})
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Поиск неявных дубликатов: фразы, отличающиеся порядком слов, формами
+слов, буквой ё или служебными словами
+Каждый режим сводит фразу к каноническому ключу; в индексе хранятся
+64-битные хеши ключей, поэтому проверка новой фразы - O(1)
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .keyword_store import KeywordStore, StoreListener
+from .lemmatizer import Lemmatizer, default_lemmatizer
+from .normalizer import STOP_WORDS
+
+DEDUP_MODES = ('sorted', 'lemma', 'stopwords')
+
+# Ключ - полиномиальный хеш последовательности хешей слов по модулю 2**64;
+# одна формула для одиночной фразы (Python) и пакета (NumPy)
+_MULTIPLIER = 0x9E3779B97F4A7C15
+_MASK = (1 << 64) - 1
+
+
+def _check(mode: str):
+    if mode not in DEDUP_MODES:
+        raise ValueError(f"Неизвестный режим дедупликации: {mode}")
+
+
+def _tokens(text: str, mode: str, lemmatizer: Optional[Lemmatizer]) -> List[str]:
+    """Слова ключа: в sorted и lemma порядок не важен, в stopwords сохраняется"""
+    words = text.replace('ё', 'е').split()
+    if mode == 'sorted':
+        return sorted(set(words))
+    if mode == 'lemma':
+        return sorted(set((lemmatizer or default_lemmatizer()).lemmatize_words(words)))
+    # Фраза только из служебных слов остаётся как есть
+    return [word for word in words if word not in STOP_WORDS] or words
+
+
+def signature(text: str, mode: str, lemmatizer: Optional[Lemmatizer] = None) -> str:
+    """
+    Канонический ключ нормализованной фразы (в читаемом виде)
+
+    - sorted - слова по алфавиту без повторов: «цена купить бур» = «купить бур цена»;
+    - lemma - то же по леммам слов (Lemmatizer): «бурение скважины» = «скважин бурение»;
+    - stopwords - фраза без служебных слов: «бурение на воду» = «бурение воду».
+
+    Во всех режимах ё заменяется на е.
+
+    Raises:
+        ValueError: Неизвестный режим
+    """
+    _check(mode)
+    return ' '.join(_tokens(text, mode, lemmatizer))
+
+
+def signature_hash(text: str, mode: str, lemmatizer: Optional[Lemmatizer] = None) -> int:
+    """Хеш ключа одной фразы (совпадает с signature_hashes)"""
+    _check(mode)
+    hashes = [hash(token) & _MASK for token in _tokens(text, mode, lemmatizer)]
+    if mode != 'stopwords':
+        # Порядок без учёта слов - по возрастанию хешей, как в пакетном варианте
+        hashes.sort()
+    value = 0
+    for position, token in enumerate(hashes):
+        value = (value + token * pow(_MULTIPLIER, position, 1 << 64)) & _MASK
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def signature_hashes(texts: Sequence[str], mode: str,
+                     lemmatizer: Optional[Lemmatizer] = None) -> np.ndarray:
+    """
+    Хеши ключей (int64) пакета фраз одним векторным проходом
+
+    Слова всех фраз кодируются pandas.factorize, лемма и хеш считаются
+    один раз на уникальное слово; сортировка, удаление повторов и свёртка
+    в хеш фразы - операции NumPy над всеми словами сразу.
+    """
+    _check(mode)
+    count = len(texts)
+    lengths = np.fromiter((len(text.split()) for text in texts), dtype=np.int64, count=count)
+    codes, words = pd.factorize(pd.Series(' '.join(texts).replace('ё', 'е').split(),
+                                          dtype=object))
+    tokens = ((lemmatizer or default_lemmatizer()).lemmatize_words(list(words))
+              if mode == 'lemma' else list(words))
+    token_hashes = np.fromiter((hash(token) for token in tokens), dtype=np.int64,
+                               count=len(tokens)).view(np.uint64)
+    rows = np.repeat(np.arange(count, dtype=np.int64), lengths)
+    values = token_hashes[codes] if len(codes) else np.zeros(0, dtype=np.uint64)
+
+    if mode == 'stopwords':
+        stop = np.fromiter((word in STOP_WORDS for word in words), dtype=np.bool_,
+                           count=len(words))[codes] if len(codes) else np.zeros(0, np.bool_)
+        meaningful = np.bincount(rows, weights=~stop, minlength=count)
+        keep = ~stop | (meaningful[rows] == 0)
+        rows, values = rows[keep], values[keep]
+    else:
+        order = np.lexsort((values, rows))
+        rows, values = rows[order], values[order]
+        single = np.ones(len(rows), dtype=np.bool_)
+        single[1:] = (rows[1:] != rows[:-1]) | (values[1:] != values[:-1])
+        rows, values = rows[single], values[single]
+
+    starts = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=count), out=starts[1:])
+    positions = np.arange(len(rows), dtype=np.int64) - starts[rows]
+    powers = np.ones(max(int(positions.max()) + 1 if len(positions) else 1, 1), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        powers[1:] = _MULTIPLIER
+        powers = np.cumprod(powers, dtype=np.uint64)
+        terms = values * powers[positions]
+    result = np.zeros(count, dtype=np.uint64)
+    filled = starts[1:] > starts[:-1]
+    if filled.any():
+        result[filled] = np.add.reduceat(terms, starts[:-1][filled])
+    return result.view(np.int64)
+
+
+def duplicate_mask(hashes: Dict[str, np.ndarray], order: Optional[np.ndarray] = None
+                   ) -> np.ndarray:
+    """
+    Строки, чей ключ хотя бы в одном режиме уже встречался раньше
+
+    Args:
+        hashes: {режим: хеши ключей по строкам}
+        order: Порядок, в котором строки «приходят» (первая остаётся); по умолчанию - как есть
+
+    Returns:
+        np.ndarray: Маска повторов в исходном порядке строк
+    """
+    count = len(next(iter(hashes.values()))) if hashes else 0
+    order = np.arange(count) if order is None else order
+    repeated = np.zeros(count, dtype=np.bool_)
+    for values in hashes.values():
+        repeated[order] |= pd.Series(values[order]).duplicated().to_numpy()
+    return repeated
+
+
+class DedupIndex(StoreListener):
+    """
+    Индексы ключей живых строк хранилища - по одному на режим
+
+    Для каждого режима хранится счётчик хеш -> количество строк
+    (при удалении одной из нескольких строк с тем же ключом ключ остаётся).
+    Индекс - наблюдатель хранилища и обновляется вместе с ним.
+    """
+
+    def __init__(self, store: KeywordStore, modes: Sequence[str],
+                 lemmatizer: Optional[Lemmatizer] = None):
+        """
+        Raises:
+            ValueError: Неизвестный режим
+        """
+        for mode in modes:
+            _check(mode)
+        self.modes = tuple(dict.fromkeys(modes))
+        self.lemmatizer = lemmatizer or default_lemmatizer()
+        self._counts: Dict[str, Counter] = {mode: Counter() for mode in self.modes}
+        self._prepared: Optional[Dict[str, np.ndarray]] = None
+        self.on_append(store, store.live_slots())
+        store.add_listener(self)
+
+    def _texts(self, store: KeywordStore, slots) -> List[str]:
+        texts = store.texts
+        return [texts[slot] for slot in slots if texts[slot] is not None]
+
+    @contextmanager
+    def prepared(self, hashes: Dict[str, np.ndarray]):
+        """
+        Хеши ключей строк, добавляемых внутри блока (уже посчитаны)
+
+        Используются первым on_append в блоке; если добавление не состоялось
+        (ошибка), при выходе они сбрасываются и не достаются следующему пакету.
+        """
+        self._prepared = hashes
+        try:
+            yield
+        finally:
+            self._prepared = None
+
+    def on_append(self, store: KeywordStore, slots):
+        prepared, self._prepared = self._prepared, None
+        if prepared is not None and len(next(iter(prepared.values()))) == len(slots):
+            for mode, counts in self._counts.items():
+                counts.update(prepared[mode].tolist())
+            return
+        texts = self._texts(store, slots)
+        for mode, counts in self._counts.items():
+            counts.update(signature_hashes(texts, mode, self.lemmatizer).tolist())
+
+    def on_delete(self, store: KeywordStore, slots: np.ndarray):
+        texts = self._texts(store, slots.tolist())
+        for mode, counts in self._counts.items():
+            for key in signature_hashes(texts, mode, self.lemmatizer).tolist():
+                counts[key] -= 1
+                if counts[key] <= 0:
+                    del counts[key]
+
+    def on_clear(self, store: KeywordStore):
+        for counts in self._counts.values():
+            counts.clear()
+
+    def find(self, text: str) -> Optional[str]:
+        """Режим, в котором у нормализованной фразы уже есть дубликат (или None)"""
+        for mode, counts in self._counts.items():
+            if signature_hash(text, mode, self.lemmatizer) in counts:
+                return mode
+        return None
+
+    def batch_hashes(self, texts: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Хеши ключей пакета по каждому режиму"""
+        return {mode: signature_hashes(texts, mode, self.lemmatizer)
+                for mode in self.modes}
+
+    def contains(self, hashes: Dict[str, np.ndarray]) -> np.ndarray:
+        """Маска строк пакета, ключ которых уже есть в индексе хотя бы одного режима"""
+        count = len(next(iter(hashes.values()))) if hashes else 0
+        found = np.zeros(count, dtype=np.bool_)
+        for mode, values in hashes.items():
+            counts = self._counts[mode]
+            found |= np.fromiter(map(counts.__contains__, values.tolist()), dtype=np.bool_,
+                                 count=count)
+        return found
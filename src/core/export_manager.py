@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль экспорта ключевых слов
+Потоковая выгрузка в NDJSON, CSV и XLSX порциями фиксированного размера
+"""
+
+import os
+import tempfile
+import zlib
+from typing import Iterable, Iterator, Optional
+
+# Формат -> (MIME-тип, расширение файла)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+
+# Форматы, которые уже сжаты и не выигрывают от gzip
+COMPRESSED_FORMATS = ('xlsx',)
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Сжать поток байтов в gzip на лету, не накапливая его целиком"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+class ExportManager:
+    """
+    Потоковый экспорт ключевых слов из KeywordManager
+
+    Данные читаются порциями (KeywordManager.iter_dataframes) и сразу
+    сериализуются, поэтому пиковая память не зависит от размера ядра.
+    """
+
+    def __init__(self, keyword_manager, chunk_size: int = 10000):
+        """
+        Args:
+            keyword_manager: Источник данных (KeywordManager)
+            chunk_size: Количество строк в одной порции
+        """
+        self.keyword_manager = keyword_manager
+        self.chunk_size = chunk_size
+
+    def _chunks(self):
+        return self.keyword_manager.iter_dataframes(self.chunk_size)
+
+    def iter_ndjson(self) -> Iterator[bytes]:
+        """По одному JSON-объекту на строку"""
+        for df in self._chunks():
+            if len(df):
+                text = df.to_json(orient='records', lines=True, force_ascii=False,
+                                  date_format='iso', date_unit='s')
+                yield (text.rstrip('\n') + '\n').encode('utf-8')
+
+    def iter_csv(self, delimiter: str = ',') -> Iterator[bytes]:
+        """CSV с BOM, чтобы Excel правильно определил кодировку UTF-8"""
+        header = True
+        for df in self._chunks():
+            text = df.to_csv(sep=delimiter, index=False, header=header,
+                             date_format='%Y-%m-%d %H:%M:%S')
+            yield (('\ufeff' if header else '') + text).encode('utf-8')
+            header = False
+
+    def iter_xlsx(self, block_size: int = 64 * 1024) -> Iterator[bytes]:
+        """
+        XLSX через write-only книгу openpyxl
+
+        Строки листа openpyxl пишет во временный файл, а не держит в памяти.
+        Архив xlsx можно собрать только целиком, поэтому книга сохраняется
+        во временный файл и отдаётся блоками.
+        """
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Ключевые слова")
+        header = True
+        for df in self._chunks():
+            if header:
+                sheet.append(list(df.columns))
+                header = False
+            for row in df.itertuples(index=False, name=None):
+                sheet.append(row)
+
+        with tempfile.TemporaryFile() as buffer:
+            workbook.save(buffer)
+            buffer.seek(0)
+            while True:
+                block = buffer.read(block_size)
+                if not block:
+                    break
+                yield block
+
+    def stream(self, fmt: str, compress: bool = False) -> Iterator[bytes]:
+        """
+        Поток байтов экспорта
+
+        Args:
+            fmt: 'ndjson', 'csv' или 'xlsx'
+            compress: Сжать gzip (для xlsx игнорируется)
+
+        Raises:
+            ValueError: Неизвестный формат
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Неподдерживаемый формат экспорта: {fmt}")
+        chunks = getattr(self, f"iter_{fmt}")()
+        if compress and fmt not in COMPRESSED_FORMATS:
+            chunks = gzip_stream(chunks)
+        return chunks
+
+    def export_to_file(self, file_path: str, fmt: Optional[str] = None) -> int:
+        """
+        Экспорт в файл
+
+        Формат определяется по расширению (keywords.csv, keywords.ndjson.gz ...).
+
+        Returns:
+            int: Количество записанных байт
+        """
+        name = file_path[:-3] if file_path.endswith('.gz') else file_path
+        fmt = fmt or os.path.splitext(name)[1].lstrip('.').lower()
+        written = 0
+        with open(file_path, 'wb') as output:
+            for chunk in self.stream(fmt, compress=file_path.endswith('.gz')):
+                output.write(chunk)
+                written += len(chunk)
+        return written
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Фоновые задачи импорта
+Разбор и загрузка выполняются в пуле потоков, клиент получает номер
+задачи сразу и опрашивает её состояние
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+
+class JobCancelled(Exception):
+    """Задача отменена пользователем"""
+
+
+class ImportJob:
+    """
+    Состояние одной задачи импорта
+
+    Счётчики обновляет поток-исполнитель, читают обработчики запросов,
+    поэтому изменения и снимок состояния идут под блокировкой задачи.
+    """
+
+    STATUSES = ('queued', 'running', 'done', 'failed', 'cancelled')
+
+    def __init__(self, kind: str, description: str = "", total_rows: Optional[int] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.description = description
+        self.total_rows = total_rows
+        self.status = 'queued'
+        self.error: Optional[str] = None
+        self.rows_parsed = 0
+        self.rows_added = 0
+        self.duplicates = 0
+        self.errors = 0
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'failed', 'cancelled')
+
+    def _set_status(self, status: str, error: Optional[str] = None):
+        with self._lock:
+            self.status = status
+            self.error = error
+            if status == 'running':
+                self.started_at = time.time()
+            elif status in ('done', 'failed', 'cancelled'):
+                self.finished_at = time.time()
+
+    def _record(self, parsed: int, stats: Dict[str, int]):
+        with self._lock:
+            self.rows_parsed += parsed
+            self.rows_added += stats['added']
+            self.duplicates += stats['duplicates']
+            self.errors += stats['errors']
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Снимок состояния для API: счётчики, скорость (строк/с) и оценка остатка (с)"""
+        with self._lock:
+            elapsed = None
+            if self.started_at is not None:
+                elapsed = (self.finished_at or time.time()) - self.started_at
+            throughput = self.rows_parsed / elapsed if elapsed else 0.0
+
+            eta = None
+            if self.status == 'running' and self.total_rows and throughput > 0:
+                eta = max(self.total_rows - self.rows_parsed, 0) / throughput
+            progress = None
+            if self.total_rows:
+                progress = 1.0 if self.status == 'done' else min(self.rows_parsed / self.total_rows, 1.0)
+
+            return {
+                'id': self.id,
+                'kind': self.kind,
+                'description': self.description,
+                'status': self.status,
+                'error': self.error,
+                'rows_parsed': self.rows_parsed,
+                'rows_added': self.rows_added,
+                'duplicates': self.duplicates,
+                'errors': self.errors,
+                'total_rows': self.total_rows,
+                'progress': progress,
+                'throughput': round(throughput, 1),
+                'elapsed': None if elapsed is None else round(elapsed, 2),
+                'eta': None if eta is None else round(eta, 1),
+                'cancel_requested': self.cancel_requested,
+            }
+
+
+class JobRegistry:
+    """
+    Состояние задач в общем файле SQLite
+
+    Нужен, когда приложение работает в нескольких процессах: задача
+    выполняется в процессе, который её принял, а опрос и отмена могут
+    прийти в любой другой. Исполнитель публикует снимок состояния
+    (ImportJob.to_dict) после каждого пакета, отмена передаётся флагом.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS import_jobs (
+        id TEXT PRIMARY KEY,
+        state TEXT NOT NULL,
+        finished INTEGER NOT NULL,
+        cancel INTEGER NOT NULL DEFAULT 0,
+        created REAL NOT NULL
+    )
+    """
+
+    def __init__(self, path: str, keep_finished: int = 100):
+        """
+        Args:
+            path: Путь к файлу (создаётся при отсутствии)
+            keep_finished: Сколько завершённых задач хранить для опроса
+        """
+        self.path = path
+        self.keep_finished = keep_finished
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                                     timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(self.SCHEMA)
+        self._lock = threading.Lock()
+
+    def publish(self, state: Dict[str, Any], created: float):
+        """Записать снимок состояния задачи (флаг отмены сохраняется)"""
+        finished = state['status'] in ('done', 'failed', 'cancelled')
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO import_jobs (id, state, finished, created) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET state = excluded.state, finished = excluded.finished",
+                (state['id'], json.dumps(state, ensure_ascii=False), int(finished), created))
+            if finished:
+                self._conn.execute(
+                    "DELETE FROM import_jobs WHERE id IN (SELECT id FROM import_jobs "
+                    "WHERE finished = 1 ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                    (self.keep_finished,))
+
+    @staticmethod
+    def _state(row) -> Dict[str, Any]:
+        state = json.loads(row[0])
+        state['cancel_requested'] = state['cancel_requested'] or bool(row[1])
+        return state
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Последний опубликованный снимок задачи (None, если не найдена)"""
+        with self._lock:
+            row = self._conn.execute("SELECT state, cancel FROM import_jobs WHERE id = ?",
+                                     (job_id,)).fetchone()
+        return self._state(row) if row else None
+
+    def list_states(self) -> List[Dict[str, Any]]:
+        """Снимки всех задач, новые в конце"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, cancel FROM import_jobs ORDER BY created").fetchall()
+        return [self._state(row) for row in rows]
+
+    def request_cancel(self, job_id: str) -> bool:
+        """Пометить незавершённую задачу на отмену (False, если нет такой)"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE import_jobs SET cancel = 1 WHERE id = ? AND finished = 0", (job_id,))
+        return cursor.rowcount > 0
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT cancel FROM import_jobs WHERE id = ?",
+                                     (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ImportJobManager:
+    """
+    Очередь задач импорта в KeywordManager
+
+    Задача - функция, возвращающая пакеты (pd.DataFrame с колонкой keyword
+    и необязательной frequency, или список строк). Пакеты разбираются
+    в потоке пула и передаются в add_keywords_batch; загрузка в менеджер
+    сериализуется, разбор разных задач идёт параллельно.
+
+    Задачи не зависят от HTTP-запроса: клиент может отключиться, задача
+    доработает, а её результат останется доступен по номеру.
+    """
+
+    def __init__(self, keyword_manager, max_workers: int = 2, keep_finished: int = 100,
+                 registry: Optional[JobRegistry] = None):
+        """
+        Args:
+            keyword_manager: Объект KeywordManager
+            max_workers: Количество потоков-исполнителей
+            keep_finished: Сколько завершённых задач хранить для опроса
+            registry: Общий реестр задач, если приложение запущено в нескольких
+                      процессах (status/statuses/cancel видят задачи всех процессов)
+        """
+        self.keyword_manager = keyword_manager
+        self.keep_finished = keep_finished
+        self.registry = registry
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='import-job')
+        self._jobs: 'OrderedDict[str, ImportJob]' = OrderedDict()
+        self._jobs_lock = threading.Lock()
+        self._ingest_lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def submit(self, kind: str, batches: Callable[[], Iterable], description: str = "",
+               total_rows: Optional[int] = None, source: str = "",
+               on_finish: Optional[Callable[[], None]] = None) -> ImportJob:
+        """
+        Поставить задачу в очередь
+
+        Args:
+            kind: Тип задачи ('file', 'text', 'url', ...)
+            batches: Функция без аргументов, возвращающая итератор пакетов
+                     (вызывается в потоке пула)
+            description: Описание для пользователя (имя файла, URL)
+            total_rows: Ожидаемое количество строк, если известно
+            source: Источник, записываемый в ключевые слова
+            on_finish: Вызывается после завершения задачи в любом исходе
+                       (например, удаление временного файла)
+
+        Returns:
+            ImportJob: Задача в состоянии 'queued'
+        """
+        job = ImportJob(kind, description, total_rows)
+        with self._jobs_lock:
+            self._jobs[job.id] = job
+            self._evict()
+        self._publish(job)
+        self._executor.submit(self._run, job, batches, source, on_finish)
+        return job
+
+    def _run(self, job: ImportJob, batches: Callable[[], Iterable], source: str,
+             on_finish: Optional[Callable[[], None]]):
+        try:
+            self._check_cancel(job)
+            job._set_status('running')
+            self._publish(job)
+            for batch in batches():
+                self._check_cancel(job)
+                self._ingest(job, batch, source)
+                self._publish(job)
+            job._set_status('done')
+            self.logger.info("Задача %s (%s) завершена: %s", job.id, job.description, job.to_dict())
+        except JobCancelled:
+            job._set_status('cancelled')
+            self.logger.info("Задача %s (%s) отменена", job.id, job.description)
+        except Exception as e:
+            job._set_status('failed', str(e))
+            self.logger.exception("Задача %s (%s) завершилась ошибкой", job.id, job.description)
+        finally:
+            self._publish(job)
+            if on_finish is not None:
+                try:
+                    on_finish()
+                except Exception:
+                    self.logger.exception("Ошибка при завершении задачи %s", job.id)
+
+    def _check_cancel(self, job: ImportJob):
+        """Прервать задачу, если отмену запросили здесь или в другом процессе"""
+        if not job.cancel_requested and self.registry is not None:
+            if self.registry.cancel_requested(job.id):
+                job._cancel.set()
+        if job.cancel_requested:
+            raise JobCancelled()
+
+    def _publish(self, job: ImportJob):
+        """Опубликовать состояние задачи в общем реестре"""
+        if self.registry is None:
+            return
+        try:
+            self.registry.publish(job.to_dict(), job.created_at)
+        except sqlite3.Error:
+            self.logger.exception("Не удалось опубликовать состояние задачи %s", job.id)
+
+    def _ingest(self, job: ImportJob, batch, source: str):
+        """Загрузить один пакет в менеджер"""
+        if isinstance(batch, pd.DataFrame):
+            keywords = batch['keyword']
+            frequency = batch['frequency'].to_numpy() if 'frequency' in batch else None
+        else:
+            keywords, frequency = batch, None
+        with self._ingest_lock:
+            stats = self.keyword_manager.add_keywords_batch(keywords, frequency=frequency,
+                                                            source=source)
+        job._record(len(keywords), stats)
+
+    def _evict(self):
+        """Забыть самые старые завершённые задачи сверх лимита"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(len(finished) - self.keep_finished, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[ImportJob]:
+        """Задача по номеру (None, если не найдена)"""
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[ImportJob]:
+        """Все известные задачи, новые в конце"""
+        with self._jobs_lock:
+            return list(self._jobs.values())
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Состояние задачи для API (в том числе принятой другим процессом)
+
+        Returns:
+            dict: ImportJob.to_dict() или None, если задача не найдена
+        """
+        job = self.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        return self.registry.get(job_id) if self.registry is not None else None
+
+    def statuses(self) -> List[Dict[str, Any]]:
+        """Состояния всех известных задач (всех процессов при общем реестре), новые в конце"""
+        if self.registry is None:
+            return [job.to_dict() for job in self.list_jobs()]
+        local = {job.id: job.to_dict() for job in self.list_jobs()}
+        states = [local.pop(state['id'], state) for state in self.registry.list_states()]
+        return states + list(local.values())
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Запросить отмену задачи
+
+        Задача останавливается перед следующим пакетом; уже загруженные
+        пакеты остаются в менеджере. Задача другого процесса отменяется
+        через общий реестр.
+
+        Returns:
+            bool: False, если задача не найдена или уже завершена
+        """
+        job = self.get(job_id)
+        if job is None:
+            return self.registry is not None and self.registry.request_cancel(job_id)
+        if job.finished:
+            return False
+        job._cancel.set()
+        return True
+
+    def shutdown(self, wait: bool = True):
+        """Отменить все задачи и остановить пул"""
+        for job in self.list_jobs():
+            job._cancel.set()
+        self._executor.shutdown(wait=wait)
@@ -5,12 +5,29 @@
 Основная логика для работы с семантическим ядром
 """
 
-import re
+import functools
+import logging
+from contextlib import contextmanager, nullcontext
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Optional, Set
+from typing import Any, Callable, Iterator, List, Dict, Optional, Sequence
 from dataclasses import dataclass
 from datetime import datetime
 
+from .clustering import KeywordClusterer, cluster_names
+from .dedup import DEDUP_MODES, DedupIndex, duplicate_mask, signature_hashes
+from .keyword_store import KeywordStore, KeywordView, KeywordSequence, KeywordSelection
+from .lemmatizer import LemmaIndex, Lemmatizer, default_lemmatizer
+from .listing import KeywordListing
+from .minus_words import MinusWordMatcher
+from .normalizer import normalize, normalize_batch, normalize_many
+from .project_store import ProjectStore
+from .query import KeywordQuery
+from .rwlock import ReadWriteLock
+from .snapshot import KeywordSnapshot, write_snapshot
+from .search_index import TrigramIndex
+from .statistics import RunningStatistics
+
 
 @dataclass
 class Keyword:
@@ -32,12 +49,8 @@ class Keyword:
         self.text = self._clean_keyword(self.text)
     
     def _clean_keyword(self, keyword: str) -> str:
-        """Очистка ключевого слова от лишних символов"""
-        # Убираем лишние пробелы и приводим к нижнему регистру
-        cleaned = re.sub(r'\s+', ' ', keyword.strip().lower())
-        # Убираем специальные символы (оставляем только буквы, цифры, пробелы, дефисы)
-        cleaned = re.sub(r'[^\w\s\-]', '', cleaned)
-        return cleaned
+        """Очистка ключевого слова от лишних символов (см. normalizer.normalize)"""
+        return normalize(keyword)
     
     def word_count(self) -> int:
         """Количество слов в ключевой фразе"""
@@ -47,14 +60,228 @@ class Keyword:
         return f"'{self.text}' (freq: {self.frequency}, cpc: {self.cpc})"
 
 
+def _as_series(values) -> pd.Series:
+    """Привести список / Series / массив NumPy или Arrow к pandas Series"""
+    if isinstance(values, pd.Series):
+        return values.reset_index(drop=True)
+    if hasattr(values, 'to_pandas'):  # pyarrow.Array / ChunkedArray
+        return values.to_pandas().reset_index(drop=True)
+    if not isinstance(values, (list, tuple, np.ndarray)):
+        values = list(values)
+    return pd.Series(values, dtype=object)
+
+
+def _numeric_column(values, count: int, name: str) -> np.ndarray:
+    """Числовая колонка из скаляра или массива (нечисловые значения -> 0)"""
+    dtype = np.int64 if name == 'frequency' else np.float64
+    if np.isscalar(values):
+        return np.full(count, values, dtype=dtype)
+    numeric = pd.to_numeric(_as_series(values), errors='coerce').fillna(0)
+    if len(numeric) != count:
+        raise ValueError(f"Длина колонки '{name}' не совпадает с числом ключевых слов")
+    return numeric.to_numpy().astype(dtype)
+
+
+def _select(values, mask: np.ndarray):
+    """Отобрать значения словарной колонки по маске (скаляр остаётся скаляром)"""
+    if values is None or isinstance(values, str):
+        return values
+    return _as_series(values)[mask].tolist()
+
+
+def _writes(method):
+    """Изменяющая операция менеджера (см. KeywordManager._write_scope)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._write_scope():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _reads(method):
+    """Читающая операция менеджера (см. KeywordManager._read_scope)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._read_scope():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class KeywordManager:
-    """Менеджер для управления коллекцией ключевых слов"""
+    """
+    Менеджер для управления коллекцией ключевых слов
+    
+    Потокобезопасен: операции чтения (поиск, списки, статистика, выгрузка)
+    выполняются параллельно под блокировкой чтения, изменения - по одному
+    под блокировкой записи. Долгая часть пакетного добавления (очистка
+    фраз) идёт до блокировки, поэтому поиск ждёт только вставку пакета.
+    Представления KeywordView читают колонки лениво - если результат
+    разбирается после вызова, а другие потоки могут менять ядро, чтение
+    оборачивается в reading().
+    """
+    
+    def __init__(self, verbose: bool = False,
+                 on_event: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                 project_path: Optional[str] = None, shared: bool = False,
+                 dedup_modes: Sequence[str] = (), lemmatizer: Optional[Lemmatizer] = None,
+                 index_lemmas: bool = False):
+        """
+        Инициализация менеджера ключевых слов
+        
+        Args:
+            verbose: Сообщать о каждом ключевом слове (по умолчанию только
+                     итоги пакетных операций)
+            on_event: Обработчик событий on_event(event, data), например
+                      ('batch_added', {'added': 10, ...})
+            project_path: Файл проекта SQLite; если задан, ядро загружается
+                          из него и изменения сохраняются пакетными транзакциями
+            shared: Проект одновременно открыт другими процессами (воркеры
+                    gunicorn): каждая запись выполняется в транзакции проекта,
+                    перед чтением подтягиваются чужие изменения
+            dedup_modes: Режимы поиска неявных дубликатов при добавлении
+                         (sorted, lemma, stopwords - см. dedup.signature);
+                         по умолчанию отсекаются только точные совпадения
+            lemmatizer: Лемматизатор с кэшем для индекса лемм и режима lemma
+                        (по умолчанию - общий для процесса)
+            index_lemmas: Лемматизировать фразы сразу при загрузке и добавлении;
+                          иначе индекс лемм строится при первом поиске по леммам
+        """
+        if shared and not project_path:
+            raise ValueError("Для режима shared нужен файл проекта")
+        self._store = KeywordStore()
+        self._lock = ReadWriteLock()
+        self._project = None
+        if project_path:
+            self._project = ProjectStore(project_path, shared=shared)
+            self._project.attach(self._store)
+        self._search_index = TrigramIndex(self._store)
+        self._statistics = RunningStatistics(self._store)
+        self._listing = KeywordListing(self._store)
+        self.lemmatizer = lemmatizer or default_lemmatizer()
+        self._lemma_index = LemmaIndex(self._store, self.lemmatizer, eager=index_lemmas)
+        self._dedup = (DedupIndex(self._store, dedup_modes, self.lemmatizer)
+                       if dedup_modes else None)
+        self.verbose = verbose
+        self.on_event = on_event
+        self.logger = logging.getLogger(__name__)
+    
+    def _emit(self, event: str, message: str, *args, level: int = logging.INFO,
+              **data):
+        """
+        Передать событие обработчику и в лог
+        
+        Сообщение форматируется логгером лениво (только если уровень включён).
+        """
+        if self.on_event is not None:
+            self.on_event(event, data)
+        self.logger.log(level, message, *args)
+    
+    def _persist(self, force: bool = False):
+        """
+        Сохранить изменения в проект (если он открыт)
+        
+        Пакетные операции сохраняются сразу, одиночные копятся и пишутся
+        одной транзакцией по накоплении или по времени.
+        """
+        if self._project is not None:
+            if force:
+                self._project.flush()
+            else:
+                self._project.maybe_flush()
+    
+    @property
+    def shared(self) -> bool:
+        """Проект открыт в режиме shared"""
+        return self._project is not None and self._project.shared
+    
+    @contextmanager
+    def _write_scope(self):
+        """
+        Контекст изменяющей операции: блокировка записи менеджера
+        
+        В режиме shared - ещё и транзакция проекта: блокировка записи SQLite
+        сериализует изменения всех процессов, хранилище сначала догоняет
+        чужие записи, свои изменения записываются при выходе.
+        """
+        with self._lock.write():
+            if self.shared:
+                with self._project.transaction():
+                    yield
+            else:
+                yield
+    
+    @contextmanager
+    def _read_scope(self):
+        """
+        Контекст читающей операции: блокировка чтения менеджера
+        
+        В режиме shared чужие изменения подтягиваются заранее под
+        блокировкой записи (внутри уже начатого чтения - нет, чтобы
+        не менять ядро под читающим потоком).
+        """
+        if not self._lock.owns_read:
+            self.sync()
+        with self._lock.read():
+            yield
+    
+    def reading(self):
+        """
+        Блок согласованного чтения
+        
+        Ядро не меняется, пока блок открыт, поэтому представления,
+        полученные внутри, можно безопасно разбирать:
+        
+            with manager.reading():
+                rows = [kw.to_dict() for kw in manager.find_keywords("бурение")]
+        """
+        return self._read_scope()
+    
+    def sync(self):
+        """Подтянуть изменения, записанные другими процессами (режим shared)"""
+        if self.shared and self._project.has_changes():
+            with self._lock.write():
+                self._project.sync()
+    
+    def flush(self):
+        """Записать несохранённые изменения в файл проекта"""
+        self._persist(force=True)
+    
+    def close(self):
+        """Сохранить изменения и закрыть файл проекта"""
+        with self._lock.write():
+            if self._project is not None:
+                self._project.close()
+                self._project = None
+    
+    @property
+    def _keyword_set(self):
+        """Тексты ключевых слов для быстрой проверки дубликатов (индекс хранилища)"""
+        return self._store.keys()
+    
+    @property
+    def dedup_modes(self) -> tuple:
+        """Включённые режимы неявных дубликатов"""
+        return self._dedup.modes if self._dedup is not None else ()
+    
+    @_writes
+    def set_dedup_modes(self, modes: Sequence[str]):
+        """
+        Включить другие режимы неявных дубликатов (индексы строятся заново)
+        
+        Raises:
+            ValueError: Неизвестный режим
+        """
+        dedup = DedupIndex(self._store, modes, self.lemmatizer) if modes else None
+        if self._dedup is not None:
+            self._store.remove_listener(self._dedup)
+        self._dedup = dedup
     
-    def __init__(self):
-        """Инициализация менеджера ключевых слов"""
-        self.keywords: List[Keyword] = []
-        self._keyword_set: Set[str] = set()  # Для быстрой проверки дубликатов
+    @property
+    def keywords(self) -> KeywordSequence:
+        """Ключевые слова в порядке добавления (ленивые представления)"""
+        return KeywordSequence(self._store)
         
+    @_writes
     def add_keyword(self, keyword: str, **kwargs) -> bool:
         """
         Добавить ключевое слово
@@ -66,19 +293,37 @@ class KeywordManager:
         Returns:
             bool: True если добавлено, False если дубликат
         """
-        # Создаем объект ключевого слова
+        # Создаем объект ключевого слова (валидация параметров и очистка)
         kw_obj = Keyword(text=keyword, **kwargs)
         
         # Проверяем на дубликаты
         if kw_obj.text in self._keyword_set:
-            print(f"Дубликат найден: '{kw_obj.text}'")
+            if self.verbose:
+                self._emit('keyword_duplicate', "Дубликат найден: '%s'", kw_obj.text,
+                           level=logging.DEBUG, text=kw_obj.text)
+            return False
+        mode = self._dedup.find(kw_obj.text) if self._dedup is not None else None
+        if mode is not None:
+            if self.verbose:
+                self._emit('keyword_duplicate', "Неявный дубликат (%s): '%s'", mode,
+                           kw_obj.text, level=logging.DEBUG, text=kw_obj.text, mode=mode)
             return False
         
-        # Добавляем ключевое слово
-        self.keywords.append(kw_obj)
-        self._keyword_set.add(kw_obj.text)
+        # Добавляем ключевое слово в колонки хранилища
+        self._store.append(
+            kw_obj.text,
+            frequency=kw_obj.frequency,
+            competition=kw_obj.competition,
+            cpc=kw_obj.cpc,
+            category=kw_obj.category,
+            source=kw_obj.source,
+            added_date=kw_obj.added_date
+        )
         
-        print(f"Добавлено: {kw_obj}")
+        if self.verbose:
+            self._emit('keyword_added', "Добавлено: %s", kw_obj,
+                       level=logging.DEBUG, text=kw_obj.text)
+        self._persist()
         return True
     
     def add_keywords_bulk(self, keywords: List[str]) -> Dict[str, int]:
@@ -91,117 +336,614 @@ class KeywordManager:
         Returns:
             Dict с статистикой добавления
         """
-        stats = {"added": 0, "duplicates": 0, "errors": 0}
+        return self.add_keywords_batch(keywords)
+    
+    def add_keywords_batch(self, keywords, frequency=None, competition=None, cpc=None,
+                           category: str = "", source: str = "") -> Dict[str, int]:
+        """
+        Пакетное добавление без создания объектов Keyword
         
-        for keyword in keywords:
-            try:
-                if self.add_keyword(keyword):
-                    stats["added"] += 1
-                else:
-                    stats["duplicates"] += 1
-            except Exception as e:
-                print(f"Ошибка при добавлении '{keyword}': {e}")
-                stats["errors"] += 1
+        Очистка выполняется векторными строковыми операциями pandas,
+        дубликаты отсекаются одним проходом, новые строки дописываются
+        в хранилище целыми колонками.
         
+        Args:
+            keywords: Список, pandas Series, массив NumPy или Arrow
+            frequency, competition, cpc: Скаляр или массив той же длины
+            category, source: Скаляр или массив той же длины
+            
+        Returns:
+            Dict со статистикой добавления (added, duplicates, errors)
+        """
+        raw = _as_series(keywords)
+        # Очистка и ключи неявных дубликатов - самая долгая часть - идут
+        # до блокировки записи
+        cleaned = normalize_batch(raw)
+        dedup = self._dedup
+        hashes = dedup.batch_hashes(cleaned.fillna("").tolist()) if dedup is not None else None
+        with self._write_scope():
+            if self._dedup is not dedup:
+                # Режимы сменились, пока пакет готовился
+                dedup = self._dedup
+                hashes = (dedup.batch_hashes(cleaned.fillna("").tolist())
+                          if dedup is not None else None)
+            return self._append_batch(raw, cleaned, frequency, competition, cpc,
+                                      category, source, hashes)
+    
+    def _append_batch(self, raw: pd.Series, cleaned: pd.Series, frequency, competition, cpc,
+                      category, source, hashes=None) -> Dict[str, int]:
+        """Отсечь дубликаты и дописать очищенный пакет (под блокировкой записи)"""
+        # Не строки (None, числа) считаются ошибками, как и в add_keyword
+        errors = cleaned.isna().to_numpy()
+        index = self._keyword_set
+        existing = np.fromiter(map(index.__contains__, cleaned.where(~errors, "")),
+                               dtype=np.bool_, count=len(cleaned))
+        new = ~errors & ~existing & ~cleaned.duplicated().to_numpy()
+        if hashes is not None:
+            # Неявные дубликаты: ключ уже в ядре или раньше в этом же пакете
+            candidates = np.flatnonzero(new)
+            hashes = {mode: values[candidates] for mode, values in hashes.items()}
+            near = self._dedup.contains(hashes) | duplicate_mask(hashes)
+            new[candidates[near]] = False
+            hashes = {mode: values[~near] for mode, values in hashes.items()}
+        
+        texts = cleaned[new].tolist()
+        columns = {'word_count': np.fromiter((len(text.split()) for text in texts),
+                                             dtype=np.int32, count=len(texts))}
+        for name, values in (('frequency', frequency), ('competition', competition), ('cpc', cpc)):
+            if values is not None:
+                columns[name] = _numeric_column(values, len(raw), name)[new]
+        
+        # Хеши пакета отдаются индексу только на время добавления
+        with self._dedup.prepared(hashes) if hashes is not None else nullcontext():
+            self._store.append_columns(
+                texts, columns,
+                category=_select(category, new),
+                source=_select(source, new)
+            )
+        
+        stats = {
+            "added": len(texts),
+            "duplicates": int((~errors).sum()) - len(texts),
+            "errors": int(errors.sum())
+        }
+        self._emit('batch_added', "Добавлено %d ключевых слов (дубликатов: %d, ошибок: %d)",
+                   stats['added'], stats['duplicates'], stats['errors'], **stats)
+        self._persist(force=True)
         return stats
     
+    @_writes
     def remove_keyword(self, keyword: str) -> bool:
         """Удалить ключевое слово"""
-        cleaned_keyword = Keyword(text=keyword).text
+        cleaned_keyword = normalize(keyword)
         
-        for i, kw in enumerate(self.keywords):
-            if kw.text == cleaned_keyword:
-                removed_kw = self.keywords.pop(i)
-                self._keyword_set.remove(removed_kw.text)
-                print(f"Удалено: {removed_kw}")
-                return True
+        slot = self._store.find(cleaned_keyword)
+        if slot is not None:
+            removed_kw = str(KeywordView(self._store, slot)) if self.verbose else None
+            self._store.delete(slot)
+            if self.verbose:
+                self._emit('keyword_removed', "Удалено: %s", removed_kw,
+                           level=logging.DEBUG, text=cleaned_keyword)
+            self._persist()
+            return True
         
-        print(f"Ключевое слово '{cleaned_keyword}' не найдено")
+        if self.verbose:
+            self._emit('keyword_not_found', "Ключевое слово '%s' не найдено", cleaned_keyword,
+                       level=logging.DEBUG, text=cleaned_keyword)
         return False
     
-    def find_keywords(self, pattern: str) -> List[Keyword]:
-        """Найти ключевые слова по паттерну"""
-        pattern = pattern.lower()
-        found = []
+    def remove_keywords_bulk(self, keywords: List[str]) -> Dict[str, int]:
+        """
+        Массовое удаление ключевых слов (например, списка минус-фраз)
         
-        for kw in self.keywords:
-            if pattern in kw.text:
-                found.append(kw)
+        Args:
+            keywords: Список ключевых слов
+            
+        Returns:
+            Dict со статистикой удаления
+        """
+        texts = normalize_many(keywords)
+        with self._write_scope():
+            slots = []
+            not_found = 0
+            for text in texts:
+                slot = self._store.find(text)
+                if slot is None:
+                    not_found += 1
+                else:
+                    slots.append(slot)
+            
+            removed = self._store.delete_many(slots)
+            self._persist(force=True)
+        stats = {"removed": removed, "not_found": not_found + len(slots) - removed}
+        self._emit('batch_removed', "Удалено %d ключевых слов (не найдено: %d)",
+                   stats['removed'], stats['not_found'], **stats)
+        return stats
+    
+    def apply_minus_words(self, minus_words, mode: str = 'substring',
+                          dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Применить минус-слова ко всему ядру: удалить совпавшие фразы
+    
+        Фразы проверяются по снимку текстов вне блокировки, удаление
+        выполняется одной пакетной операцией (remove_keywords_bulk).
+    
+        Args:
+            minus_words: Список минус-слов или готовый MinusWordMatcher
+            mode: substring, word или stem (если передан список)
+            dry_run: Только найти совпадения, ничего не удалять
+    
+        Returns:
+            Dict: checked, matched, removed и примеры совпавших фраз (sample)
+        """
+        matcher = (minus_words if isinstance(minus_words, MinusWordMatcher)
+                   else MinusWordMatcher(minus_words, mode))
+        with self._read_scope():
+            texts = list(self._store.live_texts())
+        mask = matcher.match_many(texts, normalized=True)
+        matched = [text for text, hit in zip(texts, mask) if hit]
+    
+        removed = 0
+        if matched and not dry_run:
+            removed = self.remove_keywords_bulk(matched)['removed']
+        stats = {'checked': len(texts), 'matched': len(matched), 'removed': removed,
+                 'sample': matched[:20]}
+        self._emit('minus_words_applied',
+                   "Минус-слова (%d, режим %s): совпало %d фраз, удалено %d",
+                   len(matcher), matcher.mode, stats['matched'], removed, **stats)
+        return stats
+    
+    def deduplicate(self, modes: Optional[Sequence[str]] = None, keep: str = 'first',
+                    dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Удалить неявные дубликаты из уже собранного ядра
+    
+        Ключи всех фраз считаются по снимку вне блокировки, повторы
+        находятся одним проходом pandas.duplicated по хешам каждого режима,
+        удаление - одна пакетная операция (remove_keywords_bulk).
+    
+        Args:
+            modes: Режимы (sorted, lemma, stopwords); по умолчанию - включённые
+                   в менеджере, а если их нет - все
+            keep: Какую фразу группы оставить: first - добавленную раньше,
+                  frequency - самую частотную
+            dry_run: Только найти дубликаты
+    
+        Returns:
+            Dict: checked, duplicates, removed, by_mode и примеры {дубликат: оставленная}
+    
+        Raises:
+            ValueError: Неизвестный режим или значение keep
+        """
+        if keep not in ('first', 'frequency'):
+            raise ValueError(f"Неизвестное значение keep: {keep}")
+        modes = tuple(modes or self.dedup_modes or DEDUP_MODES)
+        with self._read_scope():
+            texts = list(self._store.live_texts())
+            frequencies = self._store.live_column('frequency')
+        hashes = {mode: signature_hashes(texts, mode, self.lemmatizer) for mode in modes}
+        order = (np.lexsort((np.arange(len(texts)), -frequencies)) if keep == 'frequency'
+                 else np.arange(len(texts)))
+    
+        repeated = np.zeros(len(texts), dtype=np.bool_)
+        kept = np.arange(len(texts))
+        by_mode = {}
+        for mode, values in hashes.items():
+            # Среди ещё не отброшенных фраз остаётся первая в порядке order
+            rows = order[~repeated[order]]
+            codes, _ = pd.factorize(values[rows])
+            _, first = np.unique(codes, return_index=True)
+            owner = rows[first[codes]]
+            found = owner != rows
+            kept[rows[found]] = owner[found]
+            repeated[rows[found]] = True
+            by_mode[mode] = int(found.sum())
+    
+        duplicates = [texts[row] for row in np.flatnonzero(repeated).tolist()]
+        sample = {texts[row]: texts[kept[row]] for row in np.flatnonzero(repeated)[:20].tolist()}
+        removed = 0
+        if duplicates and not dry_run:
+            removed = self.remove_keywords_bulk(duplicates)['removed']
+        stats = {'checked': len(texts), 'duplicates': len(duplicates), 'removed': removed,
+                 'by_mode': by_mode, 'sample': sample}
+        self._emit('keywords_deduplicated',
+                   "Неявные дубликаты (%s): найдено %d из %d, удалено %d",
+                   ", ".join(modes), stats['duplicates'], stats['checked'], removed, **stats)
+        return stats
+    
+    def cluster_keywords(self, threshold: float = 0.5, min_size: int = 2,
+                         max_workers: int = 1, dry_run: bool = False,
+                         clusterer: Optional[KeywordClusterer] = None,
+                         mode: str = 'hard') -> Dict[str, Any]:
+        """
+        Разбить ядро на кластеры похожих фраз и записать их в категорию
+    
+        Кластер называется самой частотной фразой; фразы из кластеров меньше
+        min_size (одиночные) не меняются. Кластеризация идёт по снимку ядра
+        вне блокировки, категории записываются одной векторной операцией.
+    
+        Args:
+            threshold: Порог сходства фраз (см. KeywordClusterer)
+            min_size: Минимальный размер кластера
+            max_workers: Процессов для больших ядер
+            dry_run: Только посчитать кластеры, категории не менять
+            clusterer: Готовый KeywordClusterer с нужными параметрами
+            mode: hard, soft или components (см. KeywordClusterer)
+    
+        Returns:
+            Dict: keywords, clusters, clustered, largest, seconds, skipped_postings
+            (пропущенные длинные списки словопозиций - часть соседей не найдена)
+            и примеры (sample)
+        """
+        clusterer = clusterer or KeywordClusterer(threshold, max_workers=max_workers, mode=mode)
+        with self._read_scope():
+            epoch = self._store.epoch
+            slots = self._store.live_slots()
+            texts = list(self._store.live_texts())
+            frequencies = self._store.column('frequency')[slots]
+        labels = clusterer.fit(texts, frequencies)
+        rows, heads = cluster_names(labels, frequencies, min_size)
+        sizes = np.bincount(heads, minlength=len(texts))
+    
+        if len(rows) and not dry_run:
+            with self._write_scope():
+                targets = slots[rows]
+                if self._store.epoch != epoch:
+                    # Ядро уплотнялось - слоты находим заново по текстам
+                    found = [self._store.find(texts[row]) for row in rows.tolist()]
+                    targets = np.array([-1 if slot is None else slot for slot in found],
+                                       dtype=np.int64)
+                alive = targets >= 0
+                alive[alive] = self._store.alive_mask()[targets[alive]]
+                names = [texts[head] for head in heads[alive].tolist()]
+                self._store.set_values(targets[alive], 'category', names)
+                self._persist(force=True)
+    
+        largest = np.argsort(sizes)[::-1][:20]
+        stats = {'keywords': len(texts), 'clusters': int((sizes >= min_size).sum()),
+                 'clustered': len(rows), 'largest': int(sizes.max()) if len(texts) else 0,
+                 'seconds': clusterer.stats.get('seconds', 0.0),
+                 'skipped_postings': clusterer.stats.get('skipped_postings', 0),
+                 'sample': {texts[head]: int(sizes[head]) for head in largest.tolist()
+                            if sizes[head] >= min_size}}
+        self._emit('keywords_clustered', "Кластеризация: %d кластеров, %d фраз из %d (%.2f с)",
+                   stats['clusters'], stats['clustered'], stats['keywords'], stats['seconds'],
+                   **stats)
+        return stats
+    
+    @_reads
+    def get_keyword(self, keyword: str) -> Optional[KeywordView]:
+        """Получить ключевое слово по тексту (None если не найдено)"""
+        slot = self._store.find(normalize(keyword))
+        return KeywordView(self._store, slot) if slot is not None else None
+    
+    @_reads
+    def get_all_keywords(self) -> List[KeywordView]:
+        """Все ключевые слова в порядке добавления"""
+        return self._views(self._store.live_slots())
+    
+    @_writes
+    def update_keyword(self, keyword: str, **fields) -> bool:
+        """
+        Обновить поля ключевого слова
         
+        Args:
+            keyword: Текст ключевого слова
+            **fields: Новые значения (frequency, competition, cpc, category, source)
+            
+        Returns:
+            bool: True если ключевое слово найдено и обновлено
+        """
+        slot = self._store.find(normalize(keyword))
+        if slot is None:
+            return False
+        
+        for name, value in fields.items():
+            self._store.set_value(slot, name, value)
+        self._persist()
+        return True
+    
+    def update_keyword_frequency(self, keyword: str, frequency: int) -> bool:
+        """Обновить частотность ключевого слова"""
+        return self.update_keyword(keyword, frequency=frequency)
+    
+    def update_keywords_bulk(self, updates: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Массовое обновление полей (например, частотности из API)
+    
+        Все изменения выполняются под одной блокировкой записи и
+        сохраняются в проект одной транзакцией.
+    
+        Args:
+            updates: {текст ключевого слова: {поле: значение}}
+    
+        Returns:
+            Dict со статистикой (updated, not_found)
+        """
+        texts = normalize_many(updates)
+        with self._write_scope():
+            updated = 0
+            for text, fields in zip(texts, updates.values()):
+                slot = self._store.find(text)
+                if slot is None:
+                    continue
+                for name, value in fields.items():
+                    self._store.set_value(slot, name, value)
+                updated += 1
+            self._persist(force=True)
+        stats = {"updated": updated, "not_found": len(updates) - updated}
+        self._emit('batch_updated', "Обновлено %d ключевых слов (не найдено: %d)",
+                   stats['updated'], stats['not_found'], **stats)
+        return stats
+    
+    def _views(self, slots) -> List[KeywordView]:
+        """Представления для массива номеров слотов"""
+        return [KeywordView(self._store, int(slot)) for slot in slots]
+    
+    @_reads
+    def find_keywords(self, pattern: str, mode: str = 'substring',
+                      limit: Optional[int] = None) -> List[KeywordView]:
+        """
+        Найти ключевые слова по паттерну
+        
+        Кандидаты берутся из триграммного индекса и проверяются по тексту;
+        запросы короче триграммы проверяются полным просмотром. Поиск по
+        леммам - выборка из индекса лемм без проверки.
+        
+        Args:
+            pattern: Искомый текст
+            mode: 'substring' - подстрока, 'prefix' - начало фразы,
+                  'word' - целое слово (или несколько слов подряд),
+                  'lemma' - все леммы запроса в любой форме и порядке
+                  («бурение» находит «бурения скважин»)
+            limit: Максимальное количество результатов
+            
+        Returns:
+            Список найденных ключевых слов в порядке добавления
+        """
+        return self._views(self._find_slots(pattern, mode, limit))
+    
+    def _find_slots(self, pattern: str, mode: str = 'substring',
+                    limit: Optional[int] = None) -> List[int]:
+        """Номера слотов, подходящих под паттерн (см. find_keywords)"""
+        pattern = normalize(pattern)
+        if mode == 'lemma':
+            return self._lemma_index.slots(pattern, limit).tolist()
+        candidates = self._search_index.candidates(pattern, mode)
+        if candidates is None:
+            candidates = self._store.live_slots()
+        
+        if mode == 'prefix':
+            matches = lambda text: text.startswith(pattern)
+        elif mode == 'word':
+            padded = f" {pattern} "
+            matches = lambda text: padded in f" {text} "
+        else:
+            matches = lambda text: pattern in text
+        
+        texts = self._store.texts
+        found = []
+        for slot in candidates.tolist():
+            text = texts[slot]
+            if text is not None and matches(text):
+                found.append(slot)
+                if limit is not None and len(found) >= limit:
+                    break
         return found
     
-    def filter_by_word_count(self, min_words: int = 1, max_words: int = 10) -> List[Keyword]:
+    @_reads
+    def filter_keywords(self, query: Optional[KeywordQuery] = None,
+                        **conditions) -> KeywordSelection:
+        """
+        Ключевые слова, удовлетворяющие всем условиям, в порядке добавления
+        
+        Условия вычисляются масками над колонками хранилища (см. KeywordQuery),
+        результат - ленивая выборка: представления создаются при обращении.
+        
+            selection = manager.filter_keywords(min_frequency=100, max_words=3,
+                                                category="бурение", lemma="скважина")
+            len(selection), selection.column('frequency').sum()
+        
+        Args:
+            query: Готовый KeywordQuery (повторно используемый фильтр)
+            **conditions: Условия KeywordQuery, если query не передан
+        
+        Raises:
+            ValueError: Некорректное условие
+        """
+        query = query or KeywordQuery(**conditions)
+        mask = query.mask(self._store, self._search_index, self._lemma_index)
+        return KeywordSelection(self._store, np.flatnonzero(mask))
+    
+    def filter_by_word_count(self, min_words: int = 1, max_words: int = 10) -> KeywordSelection:
         """Фильтр по количеству слов"""
-        return [kw for kw in self.keywords 
-                if min_words <= kw.word_count() <= max_words]
+        return self.filter_keywords(min_words=min_words, max_words=max_words)
     
-    def filter_by_frequency(self, min_freq: int = 0, max_freq: int = 999999) -> List[Keyword]:
+    def filter_by_frequency(self, min_freq: int = 0, max_freq: int = 999999) -> KeywordSelection:
         """Фильтр по частотности"""
-        return [kw for kw in self.keywords 
-                if min_freq <= kw.frequency <= max_freq]
+        return self.filter_keywords(min_frequency=min_freq, max_frequency=max_freq)
     
-    def get_statistics(self) -> Dict:
-        """Получить статистику по ключевым словам"""
-        if not self.keywords:
-            return {
-                "total": 0,
-                "avg_frequency": 0,
-                "max_frequency": 0,
-                "min_frequency": 0,
-                "avg_word_count": 0,
-                "categories": 0
-            }
-        
-        frequencies = [kw.frequency for kw in self.keywords]
-        word_counts = [kw.word_count() for kw in self.keywords]
-        
+    @_reads
+    def list_keywords(self, sort: str = 'added', descending: bool = False,
+                      cursor: Optional[str] = None, limit: int = 100,
+                      query: str = "", mode: str = 'substring',
+                      min_frequency: Optional[int] = None, max_frequency: Optional[int] = None,
+                      min_words: Optional[int] = None, max_words: Optional[int] = None,
+                      category: Optional[str] = None, source: Optional[str] = None,
+                      added_from=None, added_to=None,
+                      regex: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Страница ключевых слов с сортировкой и фильтрами
+    
+        Args:
+            sort: 'added' (порядок добавления), 'frequency', 'text' или 'word_count'
+            descending: Сортировка по убыванию
+            cursor: next_cursor предыдущей страницы (None - первая страница)
+            limit: Размер страницы
+            query, mode: Поиск по тексту (см. find_keywords)
+            min_frequency, max_frequency, min_words, max_words: Диапазоны (включительно)
+            category, source: Только ключевые слова этой категории / источника
+            added_from, added_to: Диапазон даты добавления (datetime или ISO-строка)
+            regex: Регулярное выражение для очищенного текста
+    
+        Returns:
+            dict: {'keywords': список KeywordView, 'total': количество с учётом
+                   фильтров, 'next_cursor': курсор или None для последней страницы}
+    
+        Raises:
+            ValueError: Неизвестная сортировка, режим поиска, некорректные
+                        курсор, дата или регулярное выражение
+        """
+        text = {'lemma': query} if mode == 'lemma' else {'contains': query, 'mode': mode}
+        conditions = KeywordQuery(min_frequency=min_frequency, max_frequency=max_frequency,
+                                  min_words=min_words, max_words=max_words,
+                                  category=category, source=source, added_from=added_from,
+                                  added_to=added_to, regex=regex, **text)
+        mask = (None if conditions.empty
+                else conditions.mask(self._store, self._search_index, self._lemma_index))
+    
+        page = self._listing.page(sort, descending, cursor, limit, mask)
         return {
-            "total": len(self.keywords),
-            "avg_frequency": sum(frequencies) / len(frequencies) if frequencies else 0,
-            "max_frequency": max(frequencies) if frequencies else 0,
-            "min_frequency": min(frequencies) if frequencies else 0,
-            "avg_word_count": sum(word_counts) / len(word_counts) if word_counts else 0,
-            "categories": len(set(kw.category for kw in self.keywords if kw.category))
+            'keywords': self._views(page['slots']),
+            'total': page['total'],
+            'next_cursor': page['next_cursor']
         }
     
+    @_reads
+    def get_statistics(self) -> Dict:
+        """
+        Получить статистику по ключевым словам
+        
+        Агрегаты поддерживаются инкрементально (RunningStatistics), поэтому
+        вызов не зависит от размера семантического ядра. Перцентили
+        частотности приближённые (относительная погрешность ~1%).
+        """
+        return self._statistics.snapshot()
+    
+    @_reads
+    def get_category_counts(self) -> Dict[str, int]:
+        """Количество ключевых слов по категориям"""
+        return self._statistics.category_counts(self._store)
+    
+    @_reads
+    def get_lemma_counts(self, top: Optional[int] = None) -> Dict[str, int]:
+        """Количество ключевых слов с каждой леммой, по убыванию (top - первые top лемм)"""
+        counts = self._lemma_index.frequencies()
+        return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:top])
+    
+    @_reads
     def to_dataframe(self) -> pd.DataFrame:
         """Экспорт в pandas DataFrame"""
-        if not self.keywords:
+        store = self._store
+        if not len(store):
             return pd.DataFrame()
         
-        data = []
-        for kw in self.keywords:
-            data.append({
-                'keyword': kw.text,
-                'frequency': kw.frequency,
-                'competition': kw.competition,
-                'cpc': kw.cpc,
-                'category': kw.category,
-                'source': kw.source,
-                'word_count': kw.word_count(),
-                'added_date': kw.added_date
-            })
-        
-        return pd.DataFrame(data)
+        def decoded(name):
+            return pd.Categorical.from_codes(store.live_column(name),
+                                             categories=store.dictionaries[name].values)
+        
+        return pd.DataFrame({
+            'keyword': store.live_texts(),
+            'frequency': store.live_column('frequency'),
+            'competition': store.live_column('competition'),
+            'cpc': store.live_column('cpc'),
+            'category': decoded('category'),
+            'source': decoded('source'),
+            'word_count': store.live_column('word_count'),
+            'added_date': store.live_column('added_date')
+        })
+    
+    def iter_dataframes(self, chunk_size: int = 10000) -> Iterator[pd.DataFrame]:
+        """
+        Выгрузка порциями DataFrame (колонки как у to_dataframe)
+    
+        В памяти одновременно находится только одна порция (и список
+        ссылок на тексты выгружаемых строк). Строки, удалённые во время
+        выгрузки, пропускаются; добавленные после начала выгрузки в неё не
+        попадают. Если ядро уплотнилось между порциями, оставшиеся строки
+        находятся заново по текстам.
+        """
+        store = self._store
+        with self._read_scope():
+            slots = store.live_slots()
+            texts = list(store.live_texts())
+            epoch = store.epoch
+    
+        def decoded(name, chunk):
+            return pd.Categorical.from_codes(store.column(name)[chunk],
+                                             categories=store.dictionaries[name].values)
+    
+        for start in range(0, len(slots), chunk_size):
+            # Порция собирается под блокировкой чтения, отдаётся без неё -
+            # запись не ждёт, пока получатель обработает порцию
+            with self._read_scope():
+                if store.epoch != epoch:
+                    # Слоты перенумерованы - оставшиеся строки находим по текстам
+                    found = [store.find(text) for text in texts[start:]]
+                    slots = np.concatenate([slots[:start], np.array(
+                        [-1 if slot is None else slot for slot in found], dtype=np.int64)])
+                    epoch = store.epoch
+                chunk = slots[start:start + chunk_size]
+                chunk = chunk[chunk >= 0]
+                chunk = chunk[store.alive_mask()[chunk]]
+                frame = pd.DataFrame({
+                    'keyword': [store.texts[slot] for slot in chunk.tolist()],
+                    'frequency': store.column('frequency')[chunk],
+                    'competition': store.column('competition')[chunk],
+                    'cpc': store.column('cpc')[chunk],
+                    'category': decoded('category', chunk),
+                    'source': decoded('source', chunk),
+                    'word_count': store.column('word_count')[chunk],
+                    'added_date': store.column('added_date')[chunk]
+                })
+            yield frame
+    
+    @_reads
+    def save_snapshot(self, path: str) -> int:
+        """
+        Сохранить ядро в бинарный снимок (см. snapshot.write_snapshot)
+        
+        Returns:
+            int: Количество сохранённых ключевых слов
+        """
+        return write_snapshot(self._store, path)
+    
+    @_writes
+    def load_snapshot(self, path: str):
+        """Заменить содержимое менеджера данными снимка"""
+        with KeywordSnapshot(path) as snapshot:
+            snapshot.load_into(self._store)
+        self._emit('snapshot_loaded', "Загружено %d ключевых слов из снимка %s",
+                   len(self._store), path, count=len(self._store))
+        self._persist(force=True)
     
+    @_writes
     def clear_all(self):
         """Очистить все ключевые слова"""
-        count = len(self.keywords)
-        self.keywords.clear()
-        self._keyword_set.clear()
-        print(f"Удалено {count} ключевых слов")
+        count = len(self._store)
+        self._store.clear()
+        self._emit('cleared', "Удалено %d ключевых слов", count, count=count)
+        self._persist(force=True)
     
+    @_reads
+    def memory_usage(self) -> int:
+        """Оценка памяти, занимаемой хранилищем, в байтах"""
+        return self._store.memory_usage()
+    
+    @_reads
     def __len__(self):
         """Количество ключевых слов"""
-        return len(self.keywords)
+        return len(self._store)
     
     def __str__(self):
         """Строковое представление менеджера"""
-        return f"KeywordManager: {len(self.keywords)} ключевых слов"
+        return f"KeywordManager: {len(self._store)} ключевых слов"
 
 
 # Пример использования (для тестирования)
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
     # Создаем менеджер
     manager = KeywordManager()
     
@@ -0,0 +1,719 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Колоночное хранилище ключевых слов
+Хранит семантическое ядро в виде массивов NumPy вместо списка объектов
+"""
+
+import sys
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class DictionaryColumn:
+    """Словарное кодирование строковой колонки (категория, источник)"""
+
+    def __init__(self):
+        """Код 0 всегда соответствует пустой строке"""
+        self.values: List[str] = [""]
+        self._codes: Dict[str, int] = {"": 0}
+
+    def encode(self, value: str) -> int:
+        """Получить код значения, добавив его в словарь при необходимости"""
+        value = value or ""
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(sys.intern(value))
+            self._codes[value] = code
+        return code
+
+    def decode(self, code: int) -> str:
+        """Получить значение по коду"""
+        return self.values[code]
+
+    def lookup(self, value: str) -> Optional[int]:
+        """Код значения без добавления в словарь (None если значения нет)"""
+        return self._codes.get(value or "")
+
+    def clear(self):
+        """Сбросить словарь"""
+        self.values = [""]
+        self._codes = {"": 0}
+
+    def load(self, values: List[str]):
+        """Заменить словарь значениями в порядке кодов (values[0] == "")"""
+        self.values = [sys.intern(value) for value in values] or [""]
+        self._codes = {value: code for code, value in enumerate(self.values)}
+
+
+class StoreListener:
+    """
+    Наблюдатель за изменениями хранилища
+
+    Производные индексы и агрегаты (статистика и т.п.) переопределяют
+    нужные методы; по умолчанию методы ничего не делают.
+    """
+
+    def on_append(self, store: 'KeywordStore', slots: range):
+        """Добавлены строки в слоты slots"""
+
+    def on_delete(self, store: 'KeywordStore', slots: np.ndarray):
+        """Строки будут удалены (вызывается до удаления - значения ещё доступны)"""
+
+    def on_update(self, store: 'KeywordStore', slot: int, name: str, old, new):
+        """Изменено поле (значения в представлении колонки: коды словаря и т.п.)"""
+
+    def on_update_many(self, store: 'KeywordStore', slots: np.ndarray, name: str,
+                       old: np.ndarray, new: np.ndarray):
+        """Изменено поле в нескольких слотах; по умолчанию - on_update для каждого"""
+        for slot, old_value, new_value in zip(slots.tolist(), old, new):
+            self.on_update(store, slot, name, old_value, new_value)
+
+    def on_clear(self, store: 'KeywordStore'):
+        """Хранилище очищено"""
+
+
+class KeywordStore:
+    """
+    Колоночное хранилище ключевых слов
+
+    Текст хранится списком строк (тот же объект str является ключом индекса
+    текст -> слот), числовые поля - массивами NumPy с амортизированным
+    ростом, категория и источник - словарно закодированными колонками int32.
+
+    Удаление помечает слот как удалённый (tombstone) за O(1); когда удалённых
+    слотов становится много, хранилище уплотняется с сохранением порядка
+    добавления.
+    """
+
+    # Имя колонки -> тип данных
+    COLUMNS = {
+        'frequency': np.int64,
+        'competition': np.float64,
+        'cpc': np.float64,
+        'added_date': 'datetime64[us]',
+        'word_count': np.int32,
+        'category': np.int32,
+        'source': np.int32,
+    }
+    DICTIONARY_COLUMNS = ('category', 'source')
+
+    # Уплотнение запускается, когда удалённых слотов больше этой доли (и минимума)
+    COMPACT_RATIO = 0.25
+    COMPACT_MIN_DEAD = 1024
+
+    def __init__(self, capacity: int = 1024):
+        """
+        Инициализация хранилища
+
+        Args:
+            capacity: Начальная ёмкость массивов
+        """
+        self._size = 0  # Занятые слоты, включая удалённые
+        self._dead = 0
+        self._capacity = max(int(capacity), 1)
+        self.texts: List[Optional[str]] = []  # None в удалённых слотах
+        self._index_map: Optional[Dict[str, int]] = {}  # None - строится при первом обращении
+        self._alive = np.zeros(self._capacity, dtype=np.bool_)
+        # epoch меняется, когда слоты перенумеровываются (уплотнение, очистка),
+        # version - при любом изменении состава строк
+        self.epoch = 0
+        self.version = 0
+        self._live_slots_cache = None
+        self._listeners: List[StoreListener] = []
+        self._arrays: Dict[str, np.ndarray] = {
+            name: np.zeros(self._capacity, dtype=dtype)
+            for name, dtype in self.COLUMNS.items()
+        }
+        self.dictionaries: Dict[str, DictionaryColumn] = {
+            name: DictionaryColumn() for name in self.DICTIONARY_COLUMNS
+        }
+
+    @property
+    def _index(self) -> Dict[str, int]:
+        """Индекс текст -> слот (после load строится лениво)"""
+        if self._index_map is None:
+            if self._dead:
+                self._index_map = {text: slot for slot, text in enumerate(self.texts)
+                                   if text is not None}
+            else:
+                self._index_map = dict(zip(self.texts, range(self._size)))
+        return self._index_map
+
+    @_index.setter
+    def _index(self, index: Dict[str, int]):
+        self._index_map = index
+
+    def add_listener(self, listener: StoreListener):
+        """Подписать наблюдателя на изменения хранилища"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: StoreListener):
+        """Отписать наблюдателя"""
+        self._listeners.remove(listener)
+
+    def _reserve(self, required: int):
+        """Увеличить ёмкость массивов (удвоением) до required элементов"""
+        if required <= self._capacity:
+            return
+
+        capacity = max(self._capacity * 2, required)
+        for name, array in self._arrays.items():
+            self._arrays[name] = self._grow(array, capacity)
+        self._alive = self._grow(self._alive, capacity)
+        self._capacity = capacity
+
+    def _grow(self, array: np.ndarray, capacity: int) -> np.ndarray:
+        """Копия массива большей ёмкости"""
+        grown = np.zeros(capacity, dtype=array.dtype)
+        grown[:self._size] = array[:self._size]
+        return grown
+
+    def append(self, text: str, frequency: int = 0, competition: float = 0.0,
+               cpc: float = 0.0, category: str = "", source: str = "",
+               added_date: Optional[datetime] = None) -> int:
+        """
+        Добавить строку в хранилище
+
+        Args:
+            text: Уже очищенный текст ключевого слова
+            frequency, competition, cpc, category, source, added_date: Поля Keyword
+
+        Returns:
+            int: Номер слота добавленной строки
+        """
+        slot = self._size
+        self._reserve(slot + 1)
+
+        self.texts.append(text)
+        self._index[text] = slot
+        self._alive[slot] = True
+
+        arrays = self._arrays
+        arrays['frequency'][slot] = frequency
+        arrays['competition'][slot] = competition
+        arrays['cpc'][slot] = cpc
+        arrays['added_date'][slot] = np.datetime64(added_date or datetime.now(), 'us')
+        arrays['word_count'][slot] = len(text.split())
+        arrays['category'][slot] = self.dictionaries['category'].encode(category)
+        arrays['source'][slot] = self.dictionaries['source'].encode(source)
+
+        self._size += 1
+        self.version += 1
+        for listener in self._listeners:
+            listener.on_append(self, range(slot, slot + 1))
+        return slot
+
+    def append_columns(self, texts: List[str], columns: Dict[str, np.ndarray],
+                       category=None, source=None,
+                       added_date: Optional[datetime] = None) -> range:
+        """
+        Добавить пакет строк целыми колонками
+
+        Args:
+            texts: Очищенные уникальные тексты, которых ещё нет в хранилище
+            columns: Массивы значений числовых колонок (длины len(texts));
+                     отсутствующие колонки заполняются нулями
+            category, source: Скаляр или массив строк для словарных колонок
+            added_date: Дата добавления всего пакета (по умолчанию - сейчас)
+
+        Returns:
+            range: Номера слотов добавленных строк
+        """
+        count = len(texts)
+        start = self._size
+        stop = start + count
+        self._reserve(stop)
+
+        self.texts.extend(texts)
+        self._index.update(zip(texts, range(start, stop)))
+        self._alive[start:stop] = True
+
+        arrays = self._arrays
+        for name in ('frequency', 'competition', 'cpc', 'word_count'):
+            arrays[name][start:stop] = columns[name] if name in columns else 0
+        arrays['added_date'][start:stop] = np.datetime64(added_date or datetime.now(), 'us')
+        for name, values in (('category', category), ('source', source)):
+            arrays[name][start:stop] = self._encode_many(name, values, count)
+
+        self._size = stop
+        self.version += 1
+        slots = range(start, stop)
+        for listener in self._listeners:
+            listener.on_append(self, slots)
+        return slots
+
+    def append_encoded(self, texts: List[str], columns: Dict[str, np.ndarray],
+                       deleted: Optional[np.ndarray] = None) -> range:
+        """
+        Дописать слоты с уже закодированными колонками (синхронизация с проектом)
+
+        Args:
+            texts: Тексты по слотам (у удалённых значение игнорируется)
+            columns: Все колонки COLUMNS, коды словарей уже есть в dictionaries
+            deleted: Маска слотов, которые сразу помечаются удалёнными
+
+        Returns:
+            range: Номера добавленных слотов
+        """
+        count = len(texts)
+        start = self._size
+        stop = start + count
+        self._reserve(stop)
+
+        dead = np.zeros(count, dtype=np.bool_) if deleted is None else deleted
+        texts = [None if gone else text for text, gone in zip(texts, dead.tolist())]
+        self.texts.extend(texts)
+        if self._index_map is not None:
+            self._index.update((text, slot) for slot, text in enumerate(texts, start)
+                               if text is not None)
+        self._alive[start:stop] = True
+        for name in self.COLUMNS:
+            self._arrays[name][start:stop] = columns[name]
+
+        self._size = stop
+        self.version += 1
+        slots = range(start, stop)
+        for listener in self._listeners:
+            listener.on_append(self, slots)
+        # Удалённые слоты проходят обычный путь удаления, чтобы агрегаты их вычли
+        gone = np.flatnonzero(dead) + start
+        if len(gone):
+            for listener in self._listeners:
+                listener.on_delete(self, gone)
+            self._alive[gone] = False
+            self._dead += len(gone)
+        return slots
+
+    def _encode_many(self, name: str, values, count: int):
+        """Коды словарной колонки для скаляра или массива значений"""
+        dictionary = self.dictionaries[name]
+        if values is None or isinstance(values, str):
+            return dictionary.encode(values)
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object).fillna(""))
+        mapping = np.array([dictionary.encode(value) for value in uniques], dtype=np.int32)
+        return mapping[codes] if len(mapping) else np.zeros(count, dtype=np.int32)
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Колонка без копирования по всем слотам, включая удалённые
+
+        Для категории и источника возвращаются коды словаря.
+        Удалённые слоты отсекаются маской alive_mask().
+        """
+        return self._arrays[name][:self._size]
+
+    @property
+    def slot_count(self) -> int:
+        """Число занятых слотов, включая удалённые"""
+        return self._size
+
+    def alive_mask(self) -> np.ndarray:
+        """Маска живых слотов"""
+        return self._alive[:self._size]
+
+    def live_column(self, name: str) -> np.ndarray:
+        """Колонка только по живым строкам (без копирования, если удалённых нет)"""
+        column = self.column(name)
+        return column[self.alive_mask()] if self._dead else column
+
+    def live_slots(self) -> np.ndarray:
+        """Номера живых слотов в порядке добавления"""
+        cache = self._live_slots_cache
+        if cache is None or cache[0] != self.version:
+            if self._dead:
+                slots = np.flatnonzero(self.alive_mask())
+            else:
+                slots = np.arange(self._size)
+            self._live_slots_cache = cache = (self.version, slots)
+        return cache[1]
+
+    def live_texts(self) -> List[str]:
+        """Тексты живых строк в порядке добавления"""
+        if not self._dead:
+            return self.texts
+        return [text for text in self.texts if text is not None]
+
+    def is_alive(self, slot: int) -> bool:
+        """Занят ли слот живой строкой"""
+        return 0 <= slot < self._size and bool(self._alive[slot])
+
+    def get_value(self, slot: int, name: str):
+        """Значение поля в слоте в виде объекта Python"""
+        if name == 'text':
+            return self.texts[slot]
+        value = self._arrays[name][slot]
+        if name in self.dictionaries:
+            return self.dictionaries[name].decode(int(value))
+        return value.item()
+
+    def set_value(self, slot: int, name: str, value):
+        """Изменить поле в слоте (текст изменять нельзя - он является ключом)"""
+        if name in self.dictionaries:
+            value = self.dictionaries[name].encode(value)
+        elif name == 'added_date':
+            value = np.datetime64(value, 'us')
+        elif name not in ('frequency', 'competition', 'cpc'):
+            raise AttributeError(f"Поле '{name}' нельзя изменить")
+        column = self._arrays[name]
+        old = column[slot]
+        column[slot] = value
+        for listener in self._listeners:
+            listener.on_update(self, slot, name, old, column[slot])
+
+    def set_values(self, slots, name: str, values):
+        """
+        Изменить поле в нескольких слотах одной векторной операцией
+
+        Args:
+            slots: Номера слотов (без повторов)
+            name: Поле (как в set_value)
+            values: Скаляр или массив значений той же длины, что slots
+        """
+        slots = np.asarray(slots, dtype=np.int64)
+        if name in self.dictionaries:
+            values = self._encode_many(name, values, len(slots))
+        elif name == 'added_date':
+            values = np.asarray(values, dtype='datetime64[us]')
+        elif name not in ('frequency', 'competition', 'cpc'):
+            raise AttributeError(f"Поле '{name}' нельзя изменить")
+        column = self._arrays[name]
+        old = column[slots]
+        column[slots] = values
+        new = column[slots]
+        for listener in self._listeners:
+            listener.on_update_many(self, slots, name, old, new)
+
+    def find(self, text: str) -> Optional[int]:
+        """Найти слот по очищенному тексту за O(1)"""
+        return self._index.get(text)
+
+    def __contains__(self, text: str) -> bool:
+        return text in self._index
+
+    def keys(self):
+        """Множество (dict view) текстов живых строк"""
+        return self._index.keys()
+
+    def delete(self, slot: int):
+        """Пометить строку удалённой; при необходимости уплотнить хранилище"""
+        self.delete_many((slot,))
+
+    def delete_many(self, slots, compact: bool = True) -> int:
+        """
+        Пометить удалёнными несколько строк с одним уплотнением в конце
+
+        Args:
+            slots: Номера слотов
+            compact: Уплотнить хранилище, если удалённых стало много
+                     (False - номера слотов гарантированно сохраняются)
+
+        Returns:
+            int: Количество удалённых строк
+        """
+        slots = [slot for slot in dict.fromkeys(slots) if self.is_alive(slot)]
+        if not slots:
+            return 0
+
+        for listener in self._listeners:
+            listener.on_delete(self, np.asarray(slots, dtype=np.int64))
+        for slot in slots:
+            self._tombstone(slot)
+        self.version += 1
+        if compact:
+            self._maybe_compact()
+        return len(slots)
+
+    def _tombstone(self, slot: int):
+        """Пометить слот удалённым"""
+        del self._index[self.texts[slot]]
+        self.texts[slot] = None
+        self._alive[slot] = False
+        self._dead += 1
+
+    def _maybe_compact(self):
+        """Уплотнить, если удалённых слотов стало слишком много"""
+        if self._dead >= self.COMPACT_MIN_DEAD and self._dead >= self._size * self.COMPACT_RATIO:
+            self.compact()
+
+    def compact(self):
+        """Убрать удалённые слоты, сохранив порядок добавления"""
+        if not self._dead:
+            return
+
+        keep = self.alive_mask().copy()
+        live = self._size - self._dead
+        for array in self._arrays.values():
+            array[:live] = array[:self._size][keep]
+        self._alive[:live] = True
+        self._alive[live:self._size] = False
+
+        self.texts = [text for text in self.texts if text is not None]
+        self._index = {text: slot for slot, text in enumerate(self.texts)}
+        self._size = live
+        self._dead = 0
+        self.epoch += 1
+        self.version += 1
+
+    def load(self, texts: List[str], columns: Dict[str, np.ndarray],
+             dictionaries: Dict[str, List[str]], deleted=()):
+        """
+        Заменить содержимое готовыми колонками (открытие сохранённого проекта)
+
+        Массивы принимаются без копирования, индекс текстов строится при
+        первом поиске. Наблюдатели получают on_clear, один on_append на все
+        загруженные слоты и on_delete на удалённые.
+
+        Args:
+            texts: Тексты по слотам (значения удалённых слотов игнорируются)
+            columns: Массивы всех колонок COLUMNS длины len(texts), доступные на запись
+            dictionaries: Значения словарных колонок в порядке кодов
+            deleted: Номера удалённых слотов
+        """
+        self.clear()
+        size = len(texts)
+        for name, dtype in self.COLUMNS.items():
+            array = columns[name]
+            if array.dtype != np.dtype(dtype) or len(array) != size:
+                raise ValueError(f"Колонка '{name}' не соответствует хранилищу")
+            self._arrays[name] = array
+        for name, values in dictionaries.items():
+            self.dictionaries[name].load(values)
+
+        self.texts = texts
+        self._alive = np.ones(size, dtype=np.bool_)
+        self._capacity = size
+        self._size = size
+        gone = np.unique(np.asarray(deleted, dtype=np.int64))
+        for slot in gone.tolist():
+            texts[slot] = None
+        self._index = None
+        self.version += 1
+        if size:
+            for listener in self._listeners:
+                listener.on_append(self, range(0, size))
+        # Как в append_encoded: удалённые слоты проходят обычный путь удаления,
+        # чтобы агрегаты наблюдателей их вычли
+        if len(gone):
+            for listener in self._listeners:
+                listener.on_delete(self, gone)
+            self._alive[gone] = False
+            self._dead += len(gone)
+
+    def clear(self):
+        """Удалить все строки, сохранив выделенную ёмкость"""
+        self._alive[:self._size] = False
+        self._size = 0
+        self._dead = 0
+        self.texts = []
+        self._index = {}
+        for dictionary in self.dictionaries.values():
+            dictionary.clear()
+        self.epoch += 1
+        self.version += 1
+        for listener in self._listeners:
+            listener.on_clear(self)
+
+    def memory_usage(self) -> int:
+        """Оценка занимаемой памяти в байтах"""
+        total = sys.getsizeof(self.texts) + sys.getsizeof(self._index_map or {})
+        total += sum(sys.getsizeof(text) for text in self.texts if text is not None)
+        total += sum(array.nbytes for array in self._arrays.values())
+        total += self._alive.nbytes
+        for dictionary in self.dictionaries.values():
+            total += sum(sys.getsizeof(value) for value in dictionary.values)
+        return total
+
+    def __len__(self):
+        """Количество живых строк"""
+        return self._size - self._dead
+
+
+class KeywordView:
+    """
+    Лёгкое представление строки хранилища с интерфейсом Keyword
+
+    Не хранит данных: все поля читаются из колонок и записываются в них.
+    После уплотнения хранилища слот заново находится по тексту; обращение
+    к полям удалённого ключевого слова вызывает LookupError.
+    """
+
+    __slots__ = ('_store', '_slot', '_epoch', '_text')
+
+    def __init__(self, store: KeywordStore, slot: int):
+        self._store = store
+        self._slot = slot
+        self._epoch = store.epoch
+        self._text = store.texts[slot]
+
+    def _resolve(self) -> int:
+        """Актуальный слот строки"""
+        store = self._store
+        if self._epoch != store.epoch or store.texts[self._slot] is not self._text:
+            slot = store.find(self._text)
+            if slot is None:
+                raise LookupError(f"Ключевое слово '{self._text}' удалено")
+            self._slot, self._epoch = slot, store.epoch
+        return self._slot
+
+    def _get(self, name: str):
+        return self._store.get_value(self._resolve(), name)
+
+    def _set(self, name: str, value):
+        self._store.set_value(self._resolve(), name, value)
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @property
+    def frequency(self) -> int:
+        return self._get('frequency')
+
+    @frequency.setter
+    def frequency(self, value: int):
+        self._set('frequency', value)
+
+    @property
+    def competition(self) -> float:
+        return self._get('competition')
+
+    @competition.setter
+    def competition(self, value: float):
+        self._set('competition', value)
+
+    @property
+    def cpc(self) -> float:
+        return self._get('cpc')
+
+    @cpc.setter
+    def cpc(self, value: float):
+        self._set('cpc', value)
+
+    @property
+    def category(self) -> str:
+        return self._get('category')
+
+    @category.setter
+    def category(self, value: str):
+        self._set('category', value)
+
+    @property
+    def source(self) -> str:
+        return self._get('source')
+
+    @source.setter
+    def source(self, value: str):
+        self._set('source', value)
+
+    @property
+    def added_date(self) -> datetime:
+        return self._get('added_date')
+
+    @added_date.setter
+    def added_date(self, value: datetime):
+        self._set('added_date', value)
+
+    def word_count(self) -> int:
+        """Количество слов в ключевой фразе (предвычислено при добавлении)"""
+        return self._get('word_count')
+
+    def to_dict(self) -> Dict:
+        """Поля ключевого слова в виде словаря"""
+        return {
+            'text': self.text,
+            'frequency': self.frequency,
+            'competition': self.competition,
+            'cpc': self.cpc,
+            'category': self.category,
+            'source': self.source,
+            'added_date': self.added_date,
+        }
+
+    def __eq__(self, other):
+        if isinstance(other, KeywordView):
+            return self.to_dict() == other.to_dict()
+        return NotImplemented
+
+    __hash__ = None
+
+    def __str__(self):
+        return f"'{self.text}' (freq: {self.frequency}, cpc: {self.cpc})"
+
+    def __repr__(self):
+        return f"KeywordView({self.text!r}, frequency={self.frequency})"
+
+
+class KeywordSequence(Sequence):
+    """Ленивая последовательность представлений поверх хранилища"""
+
+    def __init__(self, store: KeywordStore):
+        self._store = store
+
+    def __len__(self):
+        return len(self._store)
+
+    def __getitem__(self, index):
+        slots = self._store.live_slots()
+        if isinstance(index, slice):
+            return [KeywordView(self._store, int(slot)) for slot in slots[index]]
+        if index < 0:
+            index += len(slots)
+        if not 0 <= index < len(slots):
+            raise IndexError("Индекс ключевого слова вне диапазона")
+        return KeywordView(self._store, int(slots[index]))
+
+    def __iter__(self):
+        store = self._store
+        for slot in store.live_slots():
+            yield KeywordView(store, int(slot))
+
+
+class KeywordSelection(Sequence):
+    """
+    Ленивая выборка ключевых слов: номера слотов и представления по запросу
+
+    Хранит только массив слотов; KeywordView создаются при обращении
+    к элементу, колонки выборки читаются срезом без представлений.
+    Выборка действительна до уплотнения хранилища.
+    """
+
+    def __init__(self, store: KeywordStore, slots: np.ndarray):
+        self._store = store
+        self._epoch = store.epoch
+        self.slots = np.asarray(slots, dtype=np.int64)
+
+    def _check(self):
+        if self._epoch != self._store.epoch:
+            raise LookupError("Выборка устарела: хранилище уплотнено или очищено")
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __getitem__(self, index):
+        self._check()
+        if isinstance(index, slice):
+            return KeywordSelection(self._store, self.slots[index])
+        return KeywordView(self._store, int(self.slots[index]))
+
+    def __iter__(self):
+        self._check()
+        store = self._store
+        for slot in self.slots.tolist():
+            yield KeywordView(store, slot)
+
+    def texts(self) -> List[str]:
+        """Тексты выбранных ключевых слов"""
+        self._check()
+        texts = self._store.texts
+        return [texts[slot] for slot in self.slots.tolist()]
+
+    def column(self, name: str) -> np.ndarray:
+        """Значения колонки по выборке (для категории и источника - коды словаря)"""
+        self._check()
+        return self._store.column(name)[self.slots]
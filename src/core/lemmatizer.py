@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Леммы ключевых фраз
+Лемматизатор с ограниченным кэшем слово -> лемма (один на менеджер и его
+индексы) и инвертированный индекс лемм по слотам хранилища: поиск фраз,
+содержащих лемму «бурение», - выборка из индекса, а не проход по ядру
+"""
+
+import importlib
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .keyword_store import KeywordStore, StoreListener
+from .normalizer import normalize, stem
+
+CACHE_SIZE = 200_000
+
+LEMMA_BACKENDS = ('auto', 'pymorphy', 'stem')
+
+# Морфологический анализатор процесса (загрузка словарей - около секунды)
+_MORPH = None
+
+
+def _load_morph():
+    """MorphAnalyzer из pymorphy3 или pymorphy2 (None, если не установлены)"""
+    global _MORPH
+    if _MORPH is None:
+        for name in ('pymorphy3', 'pymorphy2'):
+            try:
+                module = importlib.import_module(name)
+            except ImportError:
+                continue
+            _MORPH = module.MorphAnalyzer()
+            break
+    return _MORPH
+
+
+def _lemmatize_chunk(backend: str, words: Sequence[str]) -> List[str]:
+    """Леммы слов без кэша (выполняется и в процессах пула)"""
+    if backend == 'stem':
+        return [stem(word) for word in words]
+    morph = _load_morph()
+    lemmas = []
+    for word in words:
+        parses = morph.parse(word)
+        lemmas.append(parses[0].normal_form.replace('ё', 'е') if parses else word)
+    return lemmas
+
+
+class Lemmatizer:
+    """
+    Лемматизация слов с ограниченным LRU-кэшем
+
+    Словарная лемматизация pymorphy (pymorphy3 или pymorphy2, если
+    установлены) или, без них, основа слова stem. Кэш общий для всех
+    потребителей менеджера (индекс лемм, неявные дубликаты), поэтому каждое
+    слово ядра разбирается один раз. Большие пакеты новых слов (первая
+    загрузка проекта) разбираются пулом процессов.
+
+        lemmatizer = Lemmatizer()
+        lemmatizer.lemmatize("бурения скважины")  # ['бурение', 'скважина']
+    """
+
+    def __init__(self, backend: str = 'auto', cache_size: int = CACHE_SIZE,
+                 max_workers: int = 1, parallel_from: int = 50_000):
+        """
+        Args:
+            backend: auto (pymorphy, если установлен, иначе stem), pymorphy или stem
+            cache_size: Предел кэша слово -> лемма
+            max_workers: Процессов для больших пакетов новых слов (1 - в текущем;
+                         вызов не из главного потока всегда идёт в текущем)
+            parallel_from: Пул запускается для пакетов от этого числа новых слов
+
+        Raises:
+            ValueError: Неизвестный режим
+            ImportError: backend='pymorphy', но pymorphy не установлен
+        """
+        if backend not in LEMMA_BACKENDS:
+            raise ValueError(f"Неизвестный лемматизатор: {backend}")
+        if backend != 'stem' and _load_morph() is None:
+            if backend == 'pymorphy':
+                raise ImportError("Для лемматизации pymorphy установите pymorphy3")
+            backend = 'stem'
+        self.backend = backend
+        self.cache_size = max(int(cache_size), 1)
+        self.max_workers = max(int(max_workers), 1)
+        self.parallel_from = parallel_from
+        self._cache: 'OrderedDict[str, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _compute(self, words: List[str]) -> List[str]:
+        """
+        Леммы новых слов: в текущем процессе или пулом
+
+        Пул запускается только из главного потока без других потоков (загрузка
+        проекта при старте, скрипты): fork из потока запроса или задачи импорта
+        унёс бы в дочерний процесс блокировки, захваченные соседними потоками.
+        """
+        workers = self.max_workers if len(words) >= self.parallel_from else 1
+        methods = multiprocessing.get_all_start_methods()
+        if 'fork' in methods and (threading.current_thread() is not threading.main_thread()
+                                  or threading.active_count() > 1):
+            workers = 1
+        if workers == 1:
+            return _lemmatize_chunk(self.backend, words)
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        step = -(-len(words) // (workers * 4))
+        chunks = [words[start:start + step] for start in range(0, len(words), step)]
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            results = pool.map(_lemmatize_chunk, [self.backend] * len(chunks), chunks)
+            return [lemma for chunk in results for lemma in chunk]
+
+    def lemmatize_words(self, words: Sequence[str]) -> List[str]:
+        """
+        Леммы списка слов (нормализованных, в нижнем регистре)
+
+        Кэш просматривается одной блокировкой на пакет, недостающие
+        леммы вычисляются вне блокировки.
+        """
+        with self._lock:
+            cache = self._cache
+            lemmas = [cache.get(word) for word in words]
+            missing = list(dict.fromkeys(word for word, lemma in zip(words, lemmas)
+                                         if lemma is None))
+            for word, lemma in zip(words, lemmas):
+                if lemma is not None:
+                    cache.move_to_end(word)
+            self.hits += len(words) - len(missing)
+            self.misses += len(missing)
+        if not missing:
+            return lemmas
+
+        computed = dict(zip(missing, self._compute(missing)))
+        with self._lock:
+            cache.update(computed)
+            while len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        return [computed[word] if lemma is None else lemma for word, lemma in zip(words, lemmas)]
+
+    def lemma(self, word: str) -> str:
+        """Лемма одного слова"""
+        return self.lemmatize_words((word,))[0]
+
+    def lemmatize(self, text: str) -> List[str]:
+        """Леммы слов фразы (фраза нормализуется, ё заменяется на е)"""
+        return self.lemmatize_words(normalize(text).replace('ё', 'е').split())
+
+    def cache_info(self) -> Dict[str, object]:
+        """Статистика кэша: hits, misses, size, maxsize и backend"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._cache),
+                    'maxsize': self.cache_size, 'backend': self.backend}
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+
+_DEFAULT: Optional[Lemmatizer] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def default_lemmatizer() -> Lemmatizer:
+    """Лемматизатор процесса по умолчанию (создаётся при первом обращении)"""
+    global _DEFAULT
+    with _DEFAULT_LOCK:
+        if _DEFAULT is None:
+            _DEFAULT = Lemmatizer()
+        return _DEFAULT
+
+
+def _grow(array: np.ndarray, required: int) -> np.ndarray:
+    """Массив ёмкостью не меньше required (рост с запасом)"""
+    if required <= len(array):
+        return array
+    grown = np.zeros(max(required, 2 * len(array), 1024), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class LemmaIndex(StoreListener):
+    """
+    Колонка лемм и инвертированный индекс лемма -> слоты
+
+    Для каждого слота хранится отсортированный набор номеров лемм
+    (CSR: смещения и общий массив int32) - это «колонка лемм», которую
+    другие операции читают без повторной лемматизации. Инвертированный
+    индекс строится по ней одной сортировкой; слоты, добавленные после
+    построения, просматриваются по колонке, а накопившись, приводят
+    к перестроению (как в TrigramIndex).
+
+    Пока индекс не включён (eager=False), добавления не лемматизируются:
+    колонка строится пакетно при первом запросе, дальше поддерживается
+    при каждом добавлении. Удалённые слоты отсекаются маской хранилища,
+    после уплотнения колонка строится заново.
+    """
+
+    REBUILD_RATIO = 0.1
+    REBUILD_MIN = 20000
+
+    def __init__(self, store: KeywordStore, lemmatizer: Optional[Lemmatizer] = None,
+                 eager: bool = False):
+        """
+        Args:
+            store: Хранилище ключевых слов
+            lemmatizer: Лемматизатор (по умолчанию - общий для процесса)
+            eager: Лемматизировать строки сразу при добавлении и загрузке
+        """
+        self._store = store
+        self.lemmatizer = lemmatizer or default_lemmatizer()
+        self._lock = threading.Lock()
+        self._vocabulary: Dict[str, int] = {}
+        self._lemmas: List[str] = []
+        self._active = eager
+        self._reset()
+        if eager:
+            self._build()
+        store.add_listener(self)
+
+    def _reset(self):
+        """Пустая колонка и индекс в текущей эпохе хранилища"""
+        self._epoch = self._store.epoch
+        self._rows = 0
+        self._indptr = np.zeros(1024, dtype=np.int64)
+        self._ids = np.zeros(0, dtype=np.int32)
+        self._inverted_rows = 0
+        self._inverted: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    # --- Колонка лемм ---
+
+    def _lemma_rows(self, start: int, end: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Пары (слот от start, номер леммы) без повторов для слотов [start, end)"""
+        store = self._store
+        texts = [text or "" for text in store.texts[start:end]]
+        # Число слов уже есть в колонке хранилища (у удалённых слотов - 0 слов)
+        lengths = np.where(store.alive_mask()[start:end],
+                           store.column('word_count')[start:end], 0).astype(np.int64)
+        # Слова пакета кодируются pandas.factorize, лемма - одна на уникальное слово
+        codes, words = pd.factorize(pd.Series(' '.join(texts).replace('ё', 'е').split(),
+                                              dtype=object))
+        vocabulary, lemmas = self._vocabulary, self._lemmas
+        lemma_of = np.zeros(len(words), dtype=np.int64)
+        for position, lemma in enumerate(self.lemmatizer.lemmatize_words(list(words))):
+            code = vocabulary.get(lemma)
+            if code is None:
+                code = vocabulary[lemma] = len(lemmas)
+                lemmas.append(lemma)
+            lemma_of[position] = code
+        rows = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+        ids = lemma_of[codes] if len(codes) else np.zeros(0, dtype=np.int64)
+        size = max(len(lemmas), 1)
+        pairs = np.unique(rows * size + ids)
+        return pairs // size, pairs % size
+
+    def _extend(self, start: int, end: int):
+        """Добавить в колонку леммы слотов [start, end)"""
+        rows, ids = self._lemma_rows(start, end)
+        total = int(self._indptr[self._rows])
+        self._indptr = _grow(self._indptr, end + 1)
+        counts = np.bincount(rows, minlength=end - start)
+        np.cumsum(counts, out=self._indptr[start + 1:end + 1])
+        self._indptr[start + 1:end + 1] += total
+        self._ids = _grow(self._ids, total + len(ids))
+        self._ids[total:total + len(ids)] = ids
+        self._rows = end
+
+    def _build(self):
+        """Колонка лемм всех слотов хранилища заново"""
+        self._reset()
+        if self._store.slot_count:
+            self._extend(0, self._store.slot_count)
+
+    def _sync(self):
+        """Догнать хранилище и при необходимости перестроить инвертированный индекс"""
+        store = self._store
+        if not self._active or self._epoch != store.epoch or self._rows > store.slot_count:
+            self._active = True
+            self._build()
+        elif self._rows < store.slot_count:
+            self._extend(self._rows, store.slot_count)
+
+        pending = self._rows - self._inverted_rows
+        if self._inverted is None or pending > max(self.REBUILD_MIN,
+                                                   self.REBUILD_RATIO * self._inverted_rows):
+            self._invert()
+
+    def _invert(self):
+        """Инвертированный индекс (CSR лемма -> слоты) по колонке лемм"""
+        rows = self._rows
+        ids = self._ids[:self._indptr[rows]]
+        owners = np.repeat(np.arange(rows, dtype=np.int32), np.diff(self._indptr[:rows + 1]))
+        # Устойчивая сортировка сохраняет порядок слотов внутри леммы
+        order = np.argsort(ids, kind='stable')
+        offsets = np.zeros(len(self._lemmas) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ids, minlength=len(self._lemmas)), out=offsets[1:])
+        self._inverted = (offsets, owners[order])
+        self._inverted_rows = rows
+
+    def _postings(self, code: int) -> np.ndarray:
+        """Все слоты с леммой code (с удалёнными), по возрастанию"""
+        offsets, slots = self._inverted
+        indexed = (slots[offsets[code]:offsets[code + 1]] if code + 1 < len(offsets)
+                   else np.zeros(0, dtype=np.int32))
+        start = int(self._indptr[self._inverted_rows])
+        tail = np.flatnonzero(self._ids[start:self._indptr[self._rows]] == code)
+        if not len(tail):
+            return indexed
+        owners = np.searchsorted(self._indptr[:self._rows + 1], start + tail, side='right') - 1
+        return np.concatenate([indexed, owners.astype(np.int32)])
+
+    # --- StoreListener ---
+
+    def on_append(self, store: KeywordStore, slots):
+        with self._lock:
+            if self._active and self._epoch == store.epoch and slots.start == self._rows:
+                self._extend(slots.start, slots.stop)
+
+    def on_clear(self, store: KeywordStore):
+        with self._lock:
+            self._reset()
+
+    # --- Запросы ---
+
+    def slots(self, text: str, limit: Optional[int] = None) -> np.ndarray:
+        """
+        Живые слоты фраз, содержащих все леммы слов text, в порядке добавления
+
+        Args:
+            text: Слово или фраза («бурение», «бурения скважин»)
+            limit: Максимальное количество результатов
+        """
+        lemmas = set(self.lemmatizer.lemmatize(text))
+        with self._lock:
+            self._sync()
+            codes = [self._vocabulary.get(lemma) for lemma in lemmas]
+            if not codes or None in codes:
+                return np.zeros(0, dtype=np.int64)
+            postings = sorted((self._postings(code) for code in codes), key=len)
+        result = postings[0]
+        for other in postings[1:]:
+            result = np.intersect1d(result, other, assume_unique=True)
+        result = result.astype(np.int64)
+        result = result[self._store.alive_mask()[result]]
+        return result[:limit] if limit is not None else result
+
+    def lemmas(self, slot: int) -> List[str]:
+        """Леммы фразы в слоте (по возрастанию номера леммы)"""
+        with self._lock:
+            self._sync()
+            ids = self._ids[self._indptr[slot]:self._indptr[slot + 1]]
+            return [self._lemmas[code] for code in ids.tolist()]
+
+    def column(self) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """
+        Колонка лемм всех слотов
+
+        Returns:
+            tuple: (смещения по слотам, номера лемм int32, леммы по номерам)
+        """
+        with self._lock:
+            self._sync()
+            return (self._indptr[:self._rows + 1], self._ids[:self._indptr[self._rows]],
+                    self._lemmas)
+
+    def frequencies(self) -> Dict[str, int]:
+        """Число живых фраз с каждой леммой"""
+        indptr, ids, lemmas = self.column()
+        alive = self._store.alive_mask()[:len(indptr) - 1]
+        owners = np.repeat(alive, np.diff(indptr))
+        counts = np.bincount(ids[owners], minlength=len(lemmas))
+        return {lemmas[code]: int(counts[code]) for code in np.flatnonzero(counts).tolist()}
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Постраничный просмотр ключевых слов с сортировкой и фильтрами
+"""
+
+import base64
+import binascii
+import bisect
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .keyword_store import KeywordStore
+
+
+SORT_FIELDS = ('added', 'frequency', 'text', 'word_count')
+
+
+def encode_cursor(value: Optional[int], text: str, epoch: int) -> str:
+    """
+    Курсор - последняя выданная строка: значение ключа сортировки, текст
+    и эпоха хранилища (номер слота действителен только в своей эпохе)
+    """
+    raw = json.dumps([value, text, epoch], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[int], str, int]:
+    """Разобрать курсор, ValueError для повреждённого значения"""
+    try:
+        value, text, epoch = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (binascii.Error, UnicodeError, TypeError, ValueError):
+        raise ValueError(f"Некорректный курсор: {cursor!r}")
+    if (not isinstance(text, str) or not isinstance(epoch, int)
+            or not (value is None or isinstance(value, int))):
+        raise ValueError(f"Некорректный курсор: {cursor!r}")
+    return value, text, epoch
+
+
+class KeywordListing:
+    """
+    Упорядочивание живых строк хранилища для постраничного вывода
+
+    Строки сортируются по ключу (частотность, число слов или текст), при
+    равенстве ключа - по тексту; 'added' - порядок слотов, то есть порядок
+    добавления. Порядок вычисляется один раз на версию хранилища
+    и переиспользуется всеми страницами.
+
+    Пагинация курсорная: курсор хранит ключ и текст последней выданной
+    строки, поэтому добавления и удаления между запросами не приводят
+    к пропускам и повторам (в отличие от смещения).
+
+    Кэш порядков заполняется лениво при чтении, поэтому страницы разных
+    потоков вычисляются под блокировкой листинга.
+    """
+
+    def __init__(self, store: KeywordStore):
+        self._store = store
+        self._lock = threading.Lock()
+        self._version = None
+        self._sorted_texts: Optional[List[str]] = None
+        self._ranks: Optional[np.ndarray] = None
+        self._orders: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    def _sync(self):
+        """Сбросить кэш порядков после изменения хранилища"""
+        if self._version != self._store.version:
+            self._sorted_texts = None
+            self._ranks = None
+            self._orders = {}
+            self._version = self._store.version
+
+    def _text_ranks(self) -> np.ndarray:
+        """Ранг текста в алфавитном порядке для каждого слота (вычисляется лениво)"""
+        if self._ranks is None:
+            store = self._store
+            slots = store.live_slots()
+            texts = store.live_texts()
+            by_text = sorted(range(len(texts)), key=texts.__getitem__)
+            self._sorted_texts = [texts[i] for i in by_text]
+            self._ranks = np.zeros(store.slot_count, dtype=np.int64)
+            self._ranks[slots[by_text]] = np.arange(len(by_text))
+        return self._ranks
+
+    def _sort_keys(self, sort: str) -> np.ndarray:
+        """Первичный ключ сортировки по всем слотам"""
+        if sort == 'text':
+            return self._text_ranks()
+        if sort == 'added':
+            return np.arange(self._store.slot_count)
+        return self._store.column(sort).astype(np.int64)
+
+    def _order(self, sort: str):
+        """Слоты по возрастанию (ключ, текст), их ключи и ранги текста"""
+        if sort not in self._orders:
+            slots = self._store.live_slots()
+            if sort == 'added':
+                self._orders[sort] = (slots, slots, None)
+            else:
+                ranks = self._text_ranks()
+                order = slots[np.lexsort((ranks[slots], self._sort_keys(sort)[slots]))]
+                self._orders[sort] = (order, self._sort_keys(sort)[order], ranks[order])
+        return self._orders[sort]
+
+    def _cursor_key(self, sort: str, value, text: str, epoch: int):
+        """
+        Ключ и ранг курсора
+
+        Если строки курсора уже нет, её ранг - точка вставки в алфавитный
+        порядок, и сравнение со строками того же ключа остаётся корректным.
+
+        Returns:
+            tuple: (ключ, ранг или None для 'added', строка существует)
+        """
+        store = self._store
+        if sort == 'added':
+            if epoch != store.epoch:
+                # Хранилище уплотнено: ищем новый слот строки по тексту
+                value = store.find(text)
+                if value is None:
+                    raise ValueError("Курсор устарел, начните просмотр сначала")
+            if value is None:
+                raise ValueError("Курсор не соответствует сортировке")
+            exact = store.is_alive(value) and store.texts[value] == text
+            return value, None, exact
+
+        self._text_ranks()
+        rank = bisect.bisect_left(self._sorted_texts, text)
+        exact = rank < len(self._sorted_texts) and self._sorted_texts[rank] == text
+        if sort == 'text':
+            return rank, rank, exact
+        if value is None:
+            raise ValueError("Курсор не соответствует сортировке")
+        return value, rank, exact
+
+    def page(self, sort: str = 'added', descending: bool = False,
+             cursor: Optional[str] = None, limit: int = 100,
+             mask: Optional[np.ndarray] = None) -> Dict:
+        """
+        Страница слотов
+
+        Args:
+            sort: Поле сортировки ('added', 'frequency', 'text', 'word_count')
+            descending: Сортировка по убыванию
+            cursor: Курсор из предыдущей страницы (None - первая страница)
+            limit: Размер страницы
+            mask: Маска слотов, прошедших фильтры (None - все живые)
+
+        Returns:
+            dict: {'slots': номера слотов, 'total': строк с учётом фильтров,
+                   'next_cursor': курсор следующей страницы или None}
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Неизвестное поле сортировки: {sort}")
+        if limit < 1:
+            raise ValueError("Размер страницы должен быть положительным")
+
+        with self._lock:
+            return self._page(sort, descending, cursor, limit, mask)
+
+    def _page(self, sort: str, descending: bool, cursor: Optional[str], limit: int,
+              mask: Optional[np.ndarray]) -> Dict:
+        """Страница слотов (см. page), вызывается под блокировкой листинга"""
+        self._sync()
+        order, keys, ranks = self._order(sort)
+        if mask is not None:
+            selected = mask[order]
+            order, keys = order[selected], keys[selected]
+            ranks = None if ranks is None else ranks[selected]
+
+        # Граница курсора в порядке по возрастанию
+        if cursor is None:
+            boundary = len(order) if descending else 0
+        else:
+            key, rank, exact = self._cursor_key(sort, *decode_cursor(cursor))
+            side = 'right' if exact and not descending else 'left'
+            if rank is None:
+                boundary = int(np.searchsorted(keys, key, side))
+            else:
+                low = np.searchsorted(keys, key, 'left')
+                high = np.searchsorted(keys, key, 'right')
+                # Строки с тем же ключом упорядочены по рангу текста
+                boundary = low + int(np.searchsorted(ranks[low:high], rank, side))
+
+        if descending:
+            page = order[max(boundary - limit, 0):boundary][::-1]
+            has_more = boundary - limit > 0
+        else:
+            page = order[boundary:boundary + limit]
+            has_more = boundary + limit < len(order)
+
+        next_cursor = None
+        if has_more and len(page):
+            last = int(page[-1])
+            if sort == 'added':
+                value = last
+            else:
+                # Одно значение колонки - без копии всей колонки в _sort_keys
+                value = None if sort == 'text' else int(self._store.column(sort)[last])
+            next_cursor = encode_cursor(value, self._store.texts[last], self._store.epoch)
+        return {'slots': page, 'total': len(order), 'next_cursor': next_cursor}
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Минус-слова: скомпилированный фильтр по большому списку паттернов
+Время проверки фразы зависит от её длины, а не от количества паттернов:
+подстроки ищутся автоматом Ахо-Корасик, целые слова и основы - по
+префиксному дереву слов
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .normalizer import normalize, stem
+
+MODES = ('substring', 'word', 'stem')
+
+# Ключ перехода автомата: номер состояния и код символа в одном int
+_CHAR_BITS = 21
+# Ключ конца паттерна в узле дерева слов (слова - непустые строки)
+_END = ''
+
+
+def _fold(text: str) -> str:
+    return text.replace('ё', 'е')
+
+
+class MinusWordMatcher:
+    """
+    Проверка фраз по списку минус-слов
+
+    Паттерны и фразы сводятся к общему виду один раз. Режимы:
+
+    - substring - паттерн встречается в фразе как подстрока
+      («snow» исключает «snowrunner моды»); сравнение без учёта регистра,
+      пробелов и разницы ё/е, но символы не удаляются: «c++» не
+      превращается в «c», паттерн «!» не пропадает;
+    - word - слова паттерна идут в фразе подряд целыми словами
+      («купить дешево» исключает «где купить дешево», но не «купить дешевле»);
+    - stem - то же по основам слов (stem): «бесплатно» исключает
+      «бесплатный торрент».
+
+        matcher = MinusWordMatcher(["бесплатно", "своими руками"], mode='stem')
+        matcher.match("бурение скважин своими руками")  # 'своими руками'
+    """
+
+    def __init__(self, patterns: Iterable[str], mode: str = 'substring'):
+        """
+        Args:
+            patterns: Минус-слова и минус-фразы
+            mode: substring, word или stem
+
+        Raises:
+            ValueError: Неизвестный режим
+        """
+        if mode not in MODES:
+            raise ValueError(f"Неизвестный режим минус-слов: {mode}")
+        self.mode = mode
+        cleaned = (self._clean(pattern) for pattern in patterns if isinstance(pattern, str))
+        self.patterns: List[str] = list(dict.fromkeys(pattern for pattern in cleaned if pattern))
+        if mode == 'substring':
+            self._build_automaton()
+        else:
+            self._build_word_trie()
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def _clean(self, text: str) -> str:
+        """Паттерн или исходная фраза в виде для сравнения"""
+        if self.mode == 'substring':
+            return _fold(' '.join(text.lower().split()))
+        return normalize(text)
+
+    def _prepare(self, text: str, normalized: bool) -> str:
+        if not normalized:
+            return self._clean(text)
+        return _fold(text) if self.mode == 'substring' else text
+
+    # --- Подстроки: автомат Ахо-Корасик ---
+
+    def _build_automaton(self):
+        """Бор паттернов, суффиксные ссылки и выходы (обход в ширину)"""
+        children: List[Dict[int, int]] = [{}]
+        terminal: List[int] = [-1]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                code = ord(char)
+                following = children[state].get(code)
+                if following is None:
+                    following = len(children)
+                    children[state][code] = following
+                    children.append({})
+                    terminal.append(-1)
+                state = following
+            if terminal[state] < 0:
+                terminal[state] = index
+
+        goto: Dict[int, int] = {}
+        fail = [0] * len(children)
+        output = terminal[:]
+        queue = list(children[0].values())
+        for code, state in children[0].items():
+            goto[code] = state
+        for state in queue:
+            for code, following in children[state].items():
+                goto[state << _CHAR_BITS | code] = following
+                link = fail[state]
+                while link and (link << _CHAR_BITS | code) not in goto:
+                    link = fail[link]
+                fail[following] = goto.get(link << _CHAR_BITS | code, 0)
+                # Выход состояния - свой паттерн или ближайший по суффиксным ссылкам
+                if output[following] < 0:
+                    output[following] = output[fail[following]]
+                queue.append(following)
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+
+    def _scan(self, text: str) -> int:
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text:
+            code = ord(char)
+            while True:
+                following = goto.get(state << _CHAR_BITS | code)
+                if following is not None:
+                    state = following
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            if output[state] >= 0:
+                return output[state]
+        return -1
+
+    # --- Целые слова и основы: дерево слов ---
+
+    def _tokens(self, text: str) -> List[str]:
+        words = text.split(' ')
+        return [stem(word) for word in words] if self.mode == 'stem' else words
+
+    def _build_word_trie(self):
+        """Дерево последовательностей слов (основ); в конце паттерна - его номер"""
+        root: Dict[str, dict] = {}
+        for index, pattern in enumerate(self.patterns):
+            node = root
+            for token in self._tokens(pattern):
+                node = node.setdefault(token, {})
+            node.setdefault(_END, index)
+        self._trie = root
+
+    def _walk(self, text: str) -> int:
+        tokens = self._tokens(text)
+        root = self._trie
+        for start in range(len(tokens)):
+            node = root.get(tokens[start])
+            position = start + 1
+            while node is not None:
+                if _END in node:
+                    return node[_END]
+                if position == len(tokens):
+                    break
+                node = node.get(tokens[position])
+                position += 1
+        return -1
+
+    # --- Проверка ---
+
+    def _find(self, text: str) -> int:
+        if not self.patterns or not text:
+            return -1
+        return self._scan(text) if self.mode == 'substring' else self._walk(text)
+
+    def match(self, text: str, normalized: bool = False) -> Optional[str]:
+        """
+        Первый найденный паттерн или None
+
+        Args:
+            text: Фраза
+            normalized: Фраза уже нормализована (тексты ядра)
+        """
+        index = self._find(self._prepare(text, normalized))
+        return self.patterns[index] if index >= 0 else None
+
+    def matches(self, text: str, normalized: bool = False) -> bool:
+        """Исключается ли фраза"""
+        return self._find(self._prepare(text, normalized)) >= 0
+
+    def match_many(self, texts: Iterable[str], normalized: bool = False) -> np.ndarray:
+        """Маска исключаемых фраз"""
+        find, prepare = self._find, self._prepare
+        return np.fromiter((find(prepare(text, normalized)) >= 0 for text in texts),
+                           dtype=np.bool_)
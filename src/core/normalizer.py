@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Нормализация ключевых фраз
+Единые правила очистки для добавления, удаления, поиска и фильтров
+интеграций: нижний регистр, схлопывание пробелов, удаление спецсимволов
+(остаются буквы, цифры, пробелы и дефисы); лёгкий стемминг для
+сопоставления словоформ
+"""
+
+import re
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+CACHE_SIZE = 65536
+
+_SPECIAL_CHARS = re.compile(r'[^\w\s\-]')
+
+# Пакет очищается так: пробелы схлопываются через str.split/join (то же, что
+# strip + re.sub(r'\s+', ' ')), а нижний регистр и удаление спецсимволов
+# выполняются один раз над строкой, склеенной через разделитель
+_SEPARATOR = '\x00'
+_BATCH_SPECIAL_CHARS = re.compile(r'[^\w\s\-\x00]')
+
+# Окончания русских слов для stem: прилагательные и причастия,
+# существительные, глаголы. Основа - не короче трёх символов
+_ENDINGS = (
+    'ого ему ому его ими ыми ее ие ые ое ей ий ый ой ем им ым ом их ых ую юю ая яя ою ею '
+    'иями ями ами ием иям иях ия ья ье ьи ью ев ов ам ям ах ях а я о е и ы у ю ь й '
+    'ать ять еть ить уть ешь ишь ете ите ет ут ют ит ат ят ал ала ало али ил ила ило или '
+    'ел ела ело ели'
+).split()
+_STEM = re.compile(r'^(\w{3,}?)(?:%s)$' % '|'.join(sorted(set(_ENDINGS), key=len, reverse=True)))
+_REFLEXIVE = ('ся', 'сь')
+
+# Служебные слова: не влияют на сходство фраз (кластеризация, дедупликация)
+STOP_WORDS = frozenset(
+    'в во на для и или с со по от до из к ко у о об при без под над за как что '
+    'где когда какой какая какие сколько можно ли не же а но'.split()
+)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize(text: str) -> str:
+    """
+    Нормализовать одну фразу
+
+    Повторяющиеся фразы (минус-слова, запросы поиска, повторное добавление)
+    берутся из LRU-кэша.
+
+    Raises:
+        AttributeError: text не строка
+    """
+    return _SPECIAL_CHARS.sub('', ' '.join(text.lower().split()))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def stem(word: str) -> str:
+    """
+    Основа слова без окончания (без словаря, только для сопоставления)
+
+    Формы одного слова обычно дают одну основу: «бесплатно» и «бесплатный»
+    - «бесплатн», «скважина» и «скважины» - «скважин».
+    """
+    if len(word) > 5 and word.endswith(_REFLEXIVE):
+        word = word[:-2]
+    match = _STEM.match(word)
+    return match.group(1) if match else word
+
+
+def normalize_many(texts: Iterable[str]) -> List[Optional[str]]:
+    """
+    Нормализовать короткий список через кэш (минус-фразы, списки на удаление)
+
+    Не строки превращаются в None.
+    """
+    return [normalize(text) if isinstance(text, str) else None for text in texts]
+
+
+def normalize_batch(values) -> pd.Series:
+    """
+    Нормализовать пакет фраз за один проход регулярного выражения
+
+    Args:
+        values: Список или pandas Series
+
+    Returns:
+        pd.Series той же длины; не строки (None, числа) превращаются в NaN
+    """
+    values = values.tolist() if isinstance(values, pd.Series) else list(values)
+    is_text = np.fromiter((isinstance(value, str) for value in values),
+                          dtype=np.bool_, count=len(values))
+    texts = [' '.join(value.split()) if ok else "" for value, ok in zip(values, is_text)]
+
+    blob = _SEPARATOR.join(texts)
+    if not texts:
+        cleaned = []
+    elif blob.count(_SEPARATOR) == len(texts) - 1:
+        cleaned = _BATCH_SPECIAL_CHARS.sub('', blob.lower()).split(_SEPARATOR)
+    else:
+        # Разделитель встречается в самих данных - очищаем по одной фразе
+        cleaned = [_BATCH_SPECIAL_CHARS.sub('', text.lower()).replace(_SEPARATOR, '')
+                   for text in texts]
+
+    return pd.Series(cleaned, dtype=object).where(is_text)
+
+
+def cache_info():
+    """Статистика LRU-кэша normalize (hits, misses, maxsize, currsize)"""
+    return normalize.cache_info()
+
+
+def clear_cache():
+    """Очистить LRU-кэш normalize"""
+    normalize.cache_clear()
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Постоянное хранение проекта (семантического ядра) в SQLite
+Колонки хранилища пишутся сегментами-блобами, поэтому открытие проекта
+не разбирает строки по одной, а изменения сбрасываются пакетными транзакциями.
+Один файл проекта могут открыть несколько процессов (shared=True).
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .keyword_store import KeywordStore, StoreListener
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    first_row INTEGER PRIMARY KEY,
+    row_count INTEGER NOT NULL,
+    texts BLOB NOT NULL,
+    frequency BLOB NOT NULL,
+    competition BLOB NOT NULL,
+    cpc BLOB NOT NULL,
+    added_date BLOB NOT NULL,
+    word_count BLOB NOT NULL,
+    category BLOB NOT NULL,
+    source BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dictionaries (
+    name TEXT NOT NULL,
+    code INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (name, code)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS deleted (
+    row INTEGER PRIMARY KEY,
+    seq INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS updates (
+    row INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    value NOT NULL,
+    seq INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (row, name)
+) WITHOUT ROWID;
+"""
+
+SCHEMA_VERSION = '2'
+
+# Фразы нормализованы (пробелы схлопнуты), поэтому перевод строки - надёжный разделитель
+_TEXT_SEPARATOR = '\n'
+
+
+class ProjectStore(StoreListener):
+    """
+    Проект ключевых слов в файле SQLite (режим WAL)
+
+    Номер строки в проекте совпадает с номером слота KeywordStore:
+    - добавленные слоты дописываются сегментами (колонки целиком в блобах);
+    - удаления и изменения полей пишутся в таблицы deleted и updates
+      и накладываются на сегменты при открытии;
+    - после уплотнения или очистки хранилища (смена epoch), а также когда
+      накопилось много наложений, проект переписывается целиком.
+
+    Наблюдатель только копит изменения; запись в базу выполняет flush()
+    одной транзакцией.
+
+    Каждая запись увеличивает счётчик seq, полная перезапись - generation
+    (оба хранятся в meta). В режиме shared проект открыт несколькими
+    процессами: изменения делаются внутри transaction() - она берёт
+    блокировку записи SQLite, догоняет чужие изменения и записывает свои
+    при выходе; перед чтением sync() дочитывает чужие изменения.
+    """
+
+    SEGMENT_ROWS = 262144
+    # Переписать проект, когда наложений больше этой доли строк
+    REWRITE_RATIO = 0.25
+
+    def __init__(self, path: str, flush_rows: int = 10000, flush_interval: float = 1.0,
+                 shared: bool = False, busy_timeout: float = 60.0):
+        """
+        Args:
+            path: Путь к файлу проекта (создаётся при отсутствии)
+            flush_rows: Сколько изменений копить до записи в maybe_flush()
+            flush_interval: Максимальный возраст несохранённых изменений (с)
+            shared: Файл одновременно используют другие процессы
+            busy_timeout: Сколько ждать блокировку записи, занятую другим процессом (с)
+        """
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.shared = shared
+        self.logger = logging.getLogger(__name__)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                                     timeout=busy_timeout)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA mmap_size=1073741824")
+        # Схема создаётся под блокировкой записи: процессы могут открывать проект одновременно
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in SCHEMA.split(';'):
+                if statement.strip():
+                    self._conn.execute(statement)
+            self._check_schema()
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+        self._store: Optional[KeywordStore] = None
+        self._lock = threading.RLock()
+        self._depth = 0  # Вложенность transaction()
+        self._applying = False  # Изменения хранилища пришли из базы - не копить их
+        self._reset_pending()
+        self._rows = 0  # Сколько слотов уже записано сегментами
+        self._overlay_rows = 0  # Строк в deleted и updates
+        self._dictionary_sizes: Dict[str, int] = {}
+        self._generation: Optional[int] = None
+        self._seq = 0
+        self._data_version: Optional[int] = None
+
+    def _check_schema(self):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        if row is not None and row[0] == '1':
+            # Версия 1 не хранила номер записи у наложений
+            self._conn.execute("ALTER TABLE deleted ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("ALTER TABLE updates ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+        elif row is not None and row[0] != SCHEMA_VERSION:
+            raise ValueError(f"Неподдерживаемая версия проекта {row[0]} ({self.path})")
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                           (SCHEMA_VERSION,))
+        self._conn.executemany("INSERT OR IGNORE INTO meta (key, value) VALUES (?, '0')",
+                               [('generation',), ('seq',)])
+
+    def _meta(self, key: str) -> int:
+        return int(self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()[0])
+
+    def _set_meta(self, key: str, value: int):
+        self._conn.execute("UPDATE meta SET value = ? WHERE key = ?", (str(value), key))
+
+    def _reset_pending(self):
+        self._deleted: List[int] = []
+        self._updates: Dict[tuple, object] = {}
+        self._rewrite = False
+        self._first_change: Optional[float] = None
+
+    # --- Открытие и чтение ---
+
+    def attach(self, store: KeywordStore):
+        """
+        Загрузить проект в хранилище и подписаться на его изменения
+
+        Хранилище должно быть пустым; наблюдатели, подписанные раньше,
+        получат загруженные строки через on_append.
+        """
+        if len(store) or store.slot_count:
+            raise ValueError("Проект можно открыть только в пустом хранилище")
+        with self._lock:
+            self._store = store
+            self._read(self._reload)
+            store.add_listener(self)
+
+    def _read(self, apply):
+        """Выполнить apply() в читающей транзакции (согласованный снимок базы)"""
+        self._conn.execute("BEGIN")
+        try:
+            apply()
+        finally:
+            self._conn.execute("COMMIT")
+
+    def _reload(self):
+        """Загрузить проект целиком (открытие или чужая полная перезапись)"""
+        started = time.perf_counter()
+        texts, columns = self._read_segments(0)
+        for name, rows, values in self._read_updates():
+            columns[name][rows] = values
+        deleted = [row for row, in self._conn.execute("SELECT row FROM deleted")]
+
+        dictionaries = {}
+        for name in KeywordStore.DICTIONARY_COLUMNS:
+            values = self._read_dictionary(name, 0)
+            dictionaries[name] = values or [""]
+            self._dictionary_sizes[name] = len(values)
+
+        store = self._store
+        self._applying = True
+        try:
+            store.load(texts, columns, dictionaries, deleted)
+        finally:
+            self._applying = False
+        self._rows = store.slot_count
+        self._epoch = store.epoch
+        self._generation = self._meta('generation')
+        self._seq = self._meta('seq')
+        self._overlay_rows = self._conn.execute(
+            "SELECT (SELECT COUNT(*) FROM deleted) + (SELECT COUNT(*) FROM updates)").fetchone()[0]
+        self._reset_pending()
+        self.logger.info("Проект %s загружен: %d ключевых слов за %.2f с",
+                         self.path, len(store), time.perf_counter() - started)
+
+    def _read_segments(self, first_row: int):
+        """Тексты и колонки сегментов, начиная со строки first_row"""
+        texts: List[str] = []
+        parts: Dict[str, List[np.ndarray]] = {name: [] for name in KeywordStore.COLUMNS}
+        query = ("SELECT row_count, texts, " + ", ".join(KeywordStore.COLUMNS)
+                 + " FROM segments WHERE first_row >= ? ORDER BY first_row")
+        for row in self._conn.execute(query, (first_row,)):
+            count, blob = row[0], row[1]
+            if count:
+                texts.extend(blob.decode('utf-8').split(_TEXT_SEPARATOR))
+            for (name, dtype), data in zip(KeywordStore.COLUMNS.items(), row[2:]):
+                parts[name].append(np.frombuffer(data, dtype=dtype))
+        columns = {name: np.concatenate(arrays) if arrays else np.zeros(0, dtype=dtype)
+                   for (name, dtype), arrays in zip(KeywordStore.COLUMNS.items(),
+                                                    parts.values())}
+        return texts, columns
+
+    def _read_dictionary(self, name: str, first_code: int) -> List[str]:
+        return [value for value, in self._conn.execute(
+            "SELECT value FROM dictionaries WHERE name = ? AND code >= ? ORDER BY code",
+            (name, first_code))]
+
+    def _read_updates(self, after_seq: int = -1):
+        """Наложения полей по колонкам: (имя, номера строк, значения)"""
+        for name, dtype in KeywordStore.COLUMNS.items():
+            rows = self._conn.execute("SELECT row, value FROM updates WHERE name = ? AND seq > ?",
+                                      (name, after_seq)).fetchall()
+            if rows:
+                slots, values = zip(*rows)
+                yield name, np.array(slots, dtype=np.int64), np.array(values).astype(dtype)
+
+    def has_changes(self) -> bool:
+        """Есть ли записи других процессов, которые ещё не дочитаны (режим shared)"""
+        if not self.shared or self._store is None:
+            return False
+        with self._lock:
+            if self._depth:
+                return False
+            return self._conn.execute("PRAGMA data_version").fetchone()[0] != self._data_version
+
+    def sync(self):
+        """
+        Дочитать изменения, записанные другими процессами (режим shared)
+
+        Без чужих записей стоит один запрос PRAGMA data_version.
+        """
+        if not self.shared or self._store is None:
+            return
+        with self._lock:
+            if self._depth:
+                return
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return
+            self._read(self._catch_up)
+            self._data_version = data_version
+
+    def _catch_up(self):
+        """Применить к хранилищу записи, сделанные после нашей последней синхронизации"""
+        if self._meta('generation') != self._generation:
+            self._reload()
+            return
+        seq = self._meta('seq')
+        if seq == self._seq:
+            return
+
+        store = self._store
+        self._applying = True
+        try:
+            for name in KeywordStore.DICTIONARY_COLUMNS:
+                written = self._dictionary_sizes[name]
+                for code, value in enumerate(self._read_dictionary(name, written), written):
+                    if store.dictionaries[name].encode(value) != code:
+                        raise RuntimeError(f"Словарь '{name}' разошёлся с проектом {self.path}")
+                    self._dictionary_sizes[name] = code + 1
+
+            deleted = np.array([row for row, in self._conn.execute(
+                "SELECT row FROM deleted WHERE seq > ? OR row >= ?", (self._seq, self._rows))],
+                dtype=np.int64)
+            texts, columns = self._read_segments(self._rows)
+            if texts:
+                dead = np.zeros(len(texts), dtype=np.bool_)
+                dead[deleted[deleted >= self._rows] - self._rows] = True
+                store.append_encoded(texts, columns, dead)
+            store.delete_many(deleted[deleted < self._rows].tolist(), compact=False)
+
+            for name, rows, values in self._read_updates(self._seq):
+                dictionary = store.dictionaries.get(name)
+                for slot, value in zip(rows.tolist(), values.tolist()):
+                    if not store.is_alive(slot):
+                        continue
+                    if dictionary is not None:
+                        value = dictionary.decode(value)
+                    store.set_value(slot, name, value)
+        finally:
+            self._applying = False
+        self._rows = store.slot_count
+        self._seq = seq
+        self._reset_pending()
+
+    # --- Наблюдатель хранилища ---
+
+    def _touch(self):
+        if self._first_change is None:
+            self._first_change = time.monotonic()
+
+    def on_append(self, store: KeywordStore, slots: range):
+        # Новые слоты всегда идут подряд после уже записанных - их достаточно
+        # дописать при сбросе, запоминать номера не нужно
+        if not self._applying:
+            self._touch()
+
+    def on_delete(self, store: KeywordStore, slots: np.ndarray):
+        if not self._applying:
+            self._deleted.extend(slots.tolist())
+            self._touch()
+
+    def on_update(self, store: KeywordStore, slot: int, name: str, old, new):
+        if self._applying:
+            return
+        if slot < self._rows:
+            if name == 'added_date':
+                new = new.astype('datetime64[us]').astype(np.int64)
+            self._updates[(slot, name)] = new.item()
+        self._touch()
+
+    def on_update_many(self, store: KeywordStore, slots: np.ndarray, name: str,
+                       old: np.ndarray, new: np.ndarray):
+        if self._applying:
+            return
+        stored = slots < self._rows
+        if name == 'added_date':
+            new = new.astype('datetime64[us]').astype(np.int64)
+        self._updates.update(((slot, name), value) for slot, value
+                             in zip(slots[stored].tolist(), new[stored].tolist()))
+        self._touch()
+
+    def on_clear(self, store: KeywordStore):
+        if not self._applying:
+            self._rewrite = True
+            self._touch()
+
+    @property
+    def pending(self) -> int:
+        """Количество несохранённых изменений"""
+        if self._store is None:
+            return 0
+        return (max(self._store.slot_count - self._rows, 0) + len(self._deleted)
+                + len(self._updates) + int(self._rewrite))
+
+    # --- Запись ---
+
+    @contextmanager
+    def transaction(self):
+        """
+        Изменения хранилища, записываемые одной транзакцией
+
+        Блокировка записи SQLite удерживается на всё время блока, поэтому
+        изменения разных процессов не перемешиваются. В режиме shared перед
+        блоком хранилище догоняет чужие записи. Вложенные блоки входят
+        во внешнюю транзакцию.
+        """
+        with self._lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            self._depth = 1
+            try:
+                if self.shared:
+                    self._catch_up()
+                yield
+                if self.pending:
+                    self._write(self._store)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                if self.shared:
+                    # Хранилище могло измениться частично - перечитать проект
+                    # при следующей синхронизации
+                    self._generation = None
+                    self._data_version = None
+                    self._reset_pending()
+                raise
+            finally:
+                self._depth = 0
+            if self.shared:
+                self._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def maybe_flush(self):
+        """Сбросить изменения, если их накопилось flush_rows или они старше flush_interval"""
+        pending = self.pending
+        if pending and (pending >= self.flush_rows or
+                        time.monotonic() - self._first_change >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Записать накопленные изменения одной транзакцией (внутри transaction() - при выходе)"""
+        with self._lock:
+            if self._depth or self._store is None or not self.pending:
+                return
+            with self.transaction():
+                pass
+
+    def _write(self, store: KeywordStore):
+        """Записать накопленные изменения (вызывается внутри транзакции записи)"""
+        rewrite = (self._rewrite or store.epoch != self._epoch
+                   or self._overlay_rows + len(self._deleted) + len(self._updates)
+                   > max(self._rows, self.SEGMENT_ROWS) * self.REWRITE_RATIO)
+        conn = self._conn
+        seq = self._meta('seq') + 1
+        if rewrite:
+            for table in ('segments', 'deleted', 'updates', 'dictionaries'):
+                conn.execute(f"DELETE FROM {table}")
+            self._set_meta('generation', self._meta('generation') + 1)
+            dictionary_sizes = {}
+            first_row = 0
+            deleted = np.flatnonzero(~store.alive_mask()).tolist()
+            overlay_rows = len(deleted)
+        else:
+            dictionary_sizes = self._dictionary_sizes
+            first_row = self._rows
+            deleted = self._deleted
+            conn.executemany(
+                "INSERT INTO updates (row, name, value, seq) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (row, name) DO UPDATE SET value = excluded.value, seq = excluded.seq",
+                [(slot, name, value, seq) for (slot, name), value in self._updates.items()])
+            overlay_rows = self._overlay_rows + len(deleted) + len(self._updates)
+
+        dictionary_sizes = self._write_dictionaries(store, dictionary_sizes)
+        self._write_segments(store, first_row, store.slot_count)
+        conn.executemany("INSERT OR IGNORE INTO deleted (row, seq) VALUES (?, ?)",
+                         [(slot, seq) for slot in deleted])
+        self._set_meta('seq', seq)
+
+        # Состояние обновляется только после успешной записи всех таблиц
+        if rewrite:
+            self.logger.info("Проект %s переписан: %d строк", self.path, store.slot_count)
+            self._generation = self._meta('generation')
+        self._dictionary_sizes = dictionary_sizes
+        self._overlay_rows = overlay_rows
+        self._rows = store.slot_count
+        self._epoch = store.epoch
+        self._seq = seq
+        self._reset_pending()
+
+    def _write_dictionaries(self, store: KeywordStore, sizes: Dict[str, int]) -> Dict[str, int]:
+        """Дописать новые значения словарей; возвращает новые размеры"""
+        for name, dictionary in store.dictionaries.items():
+            written = sizes.get(name, 0)
+            self._conn.executemany(
+                "INSERT INTO dictionaries (name, code, value) VALUES (?, ?, ?)",
+                [(name, code, dictionary.values[code])
+                 for code in range(written, len(dictionary.values))])
+        return {name: len(dictionary.values) for name, dictionary in store.dictionaries.items()}
+
+    def _write_segments(self, store: KeywordStore, start: int, stop: int):
+        """Дописать слоты [start, stop) сегментами по SEGMENT_ROWS строк"""
+        names = list(KeywordStore.COLUMNS)
+        query = (f"INSERT INTO segments (first_row, row_count, texts, {', '.join(names)}) "
+                 f"VALUES ({', '.join('?' * (len(names) + 3))})")
+        for first in range(start, stop, self.SEGMENT_ROWS):
+            last = min(first + self.SEGMENT_ROWS, stop)
+            # Удалённые слоты сохраняют место пустой строкой
+            texts = _TEXT_SEPARATOR.join(text or "" for text in store.texts[first:last])
+            self._conn.execute(query, (first, last - first, texts.encode('utf-8'),
+                                       *(store.column(name)[first:last].tobytes()
+                                         for name in names)))
+
+    def close(self):
+        """Сохранить изменения и закрыть файл проекта"""
+        if self._conn is None:
+            return
+        self.flush()
+        self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        self._conn.close()
+        self._conn = None
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Фильтры ядра: предикаты по колонкам и тексту, вычисляемые масками NumPy
+Числовые, словарные и датовые условия - векторные сравнения колонок
+хранилища; текстовые (подстрока, регулярное выражение, лемма) - выборки
+из индексов или проверка только строк, прошедших остальные условия
+"""
+
+import re
+from datetime import datetime
+from typing import Iterable, Optional, Union
+
+import numpy as np
+
+from .keyword_store import KeywordStore
+from .lemmatizer import LemmaIndex
+from .normalizer import normalize
+from .search_index import SEARCH_MODES, TrigramIndex
+
+Values = Union[str, Iterable[str]]
+
+
+def _as_date(value, name: str) -> Optional[np.datetime64]:
+    """Граница даты: datetime, date, ISO-строка или None"""
+    if value is None:
+        return None
+    try:
+        return np.datetime64(value.isoformat() if isinstance(value, datetime) else value, 'us')
+    except (TypeError, ValueError):
+        raise ValueError(f"Некорректная дата {name}: {value!r}")
+
+
+class KeywordQuery:
+    """
+    Набор условий на ключевые слова (все условия объединяются через И)
+
+    Условия разбираются и проверяются один раз при создании, затем
+    применяются в порядке стоимости: сравнения колонок (частотность,
+    число слов - оно хранится в колонке, категория, источник, дата
+    добавления), выборка из индекса лемм, подстрока по триграммному
+    индексу (или просмотр, если строк осталось немного) и, последним,
+    регулярное выражение - только по строкам, оставшимся после остальных
+    условий.
+
+        query = KeywordQuery(min_frequency=100, max_words=3, category="бурение",
+                             contains="цена")
+        manager.filter_keywords(query)
+    """
+
+    # Если после условий по колонкам осталось меньше строк, подстрока
+    # проверяется просмотром этих строк, а не через триграммный индекс
+    SCAN_LIMIT = 200_000
+    # До стольких значений категории / источника - сравнения, дальше - таблица кодов
+    EQUALITY_LIMIT = 8
+
+    def __init__(self, min_frequency: Optional[int] = None, max_frequency: Optional[int] = None,
+                 min_words: Optional[int] = None, max_words: Optional[int] = None,
+                 category: Optional[Values] = None, source: Optional[Values] = None,
+                 added_from=None, added_to=None, contains: Optional[str] = None,
+                 mode: str = 'substring', regex: Optional[str] = None,
+                 lemma: Optional[str] = None):
+        """
+        Args:
+            min_frequency, max_frequency, min_words, max_words: Диапазоны (включительно)
+            category, source: Значение или список допустимых значений
+            added_from, added_to: Диапазон даты добавления (включительно)
+            contains: Текст (см. find_keywords), mode: substring, prefix или word
+            regex: Регулярное выражение для поиска в очищенном тексте
+            lemma: Слово или фраза - все её леммы должны быть во фразе
+
+        Raises:
+            ValueError: Неизвестный режим, некорректные регулярное выражение или дата
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Неизвестный режим поиска: {mode}")
+        self.ranges = [(name, low, high) for name, low, high in (
+            ('frequency', min_frequency, max_frequency), ('word_count', min_words, max_words))
+            if low is not None or high is not None]
+        self.dates = (_as_date(added_from, 'added_from'), _as_date(added_to, 'added_to'))
+        self.values = {name: (values,) if isinstance(values, str) else tuple(values)
+                       for name, values in (('category', category), ('source', source))
+                       if values is not None}
+        self.contains = normalize(contains) if contains else None
+        self.mode = mode
+        if self.contains:
+            # Фраза в склейке текстов - "\n фраза " (см. _contains_mask)
+            literal = {'substring': self.contains, 'prefix': f"\n {self.contains}",
+                       'word': f" {self.contains} "}[mode]
+            self._pattern = re.compile(re.escape(literal))
+        try:
+            self.regex = re.compile(regex) if regex else None
+        except re.error as e:
+            raise ValueError(f"Некорректное регулярное выражение: {e}")
+        self.lemma = lemma or None
+
+    @property
+    def empty(self) -> bool:
+        """Условий нет - подходят все ключевые слова"""
+        return not (self.ranges or self.values or self.dates != (None, None)
+                    or self.contains or self.regex or self.lemma)
+
+    def _column_mask(self, store: KeywordStore) -> np.ndarray:
+        """Маска живых слотов, прошедших условия по колонкам"""
+        mask = store.alive_mask().copy()
+        for name, low, high in self.ranges:
+            column = store.column(name)
+            if low is not None:
+                mask &= column >= low
+            if high is not None:
+                mask &= column <= high
+        low, high = self.dates
+        if low is not None:
+            mask &= store.column('added_date') >= low
+        if high is not None:
+            mask &= store.column('added_date') <= high
+        for name, values in self.values.items():
+            dictionary = store.dictionaries[name]
+            codes = [code for code in map(dictionary.lookup, values) if code is not None]
+            column = store.column(name)
+            if len(codes) <= self.EQUALITY_LIMIT:
+                # Несколько сравнений быстрее np.isin, который сортирует колонку
+                allowed = np.zeros(len(mask), dtype=np.bool_)
+                for code in codes:
+                    allowed |= column == code
+            else:
+                table = np.zeros(len(dictionary.values), dtype=np.bool_)
+                table[codes] = True
+                allowed = table[column]
+            mask &= allowed
+        return mask
+
+    def _contains_mask(self, store: KeywordStore, mask: np.ndarray,
+                       candidates: Optional[np.ndarray]) -> np.ndarray:
+        """
+        Оставить в маске строки (из кандидатов индекса), содержащие подстроку
+
+        Тексты склеиваются в одну строку "\\n текст \\n текст ..." (перевода
+        строки нет в очищенных фразах, пробелы по краям дают границы слов),
+        совпадения ищутся одним проходом по склейке, номер строки
+        совпадения - двоичный поиск по смещениям.
+        """
+        slots = np.flatnonzero(mask) if candidates is None else candidates[mask[candidates]]
+        texts = store.texts
+        selected = [texts[slot] for slot in slots.tolist()]
+        starts = np.zeros(len(selected), dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, selected), dtype=np.int64, count=len(selected))[:-1] + 3,
+                  out=starts[1:])
+        blob = "\n " + " \n ".join(selected) + " "
+        positions = np.fromiter((match.start() for match in self._pattern.finditer(blob)),
+                                dtype=np.int64)
+        found = np.zeros(len(mask), dtype=np.bool_)
+        found[slots[np.searchsorted(starts, positions, side='right') - 1]] = True
+        return found
+
+    def _regex_mask(self, store: KeywordStore, mask: np.ndarray) -> np.ndarray:
+        """Оставить в маске строки, в тексте которых найдено регулярное выражение"""
+        texts = store.texts
+        search = self.regex.search
+        found = np.zeros(len(mask), dtype=np.bool_)
+        found[[slot for slot in np.flatnonzero(mask).tolist() if search(texts[slot])]] = True
+        return found
+
+    def mask(self, store: KeywordStore, search_index: Optional[TrigramIndex] = None,
+             lemma_index: Optional[LemmaIndex] = None) -> np.ndarray:
+        """
+        Маска подходящих слотов хранилища
+
+        Args:
+            store: Хранилище
+            search_index: Триграммный индекс (без него подстрока ищется просмотром)
+            lemma_index: Индекс лемм (нужен для условия lemma)
+        """
+        mask = self._column_mask(store)
+        if self.lemma and mask.any():
+            if lemma_index is None:
+                raise ValueError("Для фильтра по лемме нужен индекс лемм")
+            found = np.zeros(len(mask), dtype=np.bool_)
+            found[lemma_index.slots(self.lemma)] = True
+            mask &= found
+        if self.contains and mask.any():
+            candidates = None
+            if search_index is not None and mask.sum() > self.SCAN_LIMIT:
+                candidates = search_index.candidates(self.contains, self.mode)
+            mask = self._contains_mask(store, mask, candidates)
+        if self.regex is not None and mask.any():
+            mask = self._regex_mask(store, mask)
+        return mask
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Блокировка «читатели-писатель» для KeywordManager
+Много потоков читают одновременно, изменения выполняются по одному
+"""
+
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    """
+    Блокировка «читатели-писатель» с приоритетом писателя
+
+    Пока писатель ждёт, новые читатели не входят - длинный поток чтений
+    не откладывает запись бесконечно. Блокировка повторно входимая:
+    поток может взять чтение внутри чтения, чтение и запись внутри
+    записи. Взять запись внутри чтения нельзя (RuntimeError) - два таких
+    потока ждали бы друг друга.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None  # Идентификатор потока-писателя
+        self._writer_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    @property
+    def owns_read(self) -> bool:
+        """Текущий поток держит блокировку чтения"""
+        return getattr(self._local, 'reads', 0) > 0
+
+    @property
+    def owns_write(self) -> bool:
+        """Текущий поток держит блокировку записи"""
+        return self._writer == threading.get_ident()
+
+    def acquire_read(self):
+        local = self._local
+        reads = getattr(local, 'reads', 0)
+        if not reads:
+            # Чтение внутри своей записи не занимает место читателя
+            local.counted = not self.owns_write
+            if local.counted:
+                with self._condition:
+                    while self._writer is not None or self._waiting_writers:
+                        self._condition.wait()
+                    self._readers += 1
+        local.reads = reads + 1
+
+    def release_read(self):
+        local = self._local
+        local.reads -= 1
+        if not local.reads and local.counted:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    def acquire_write(self):
+        if self.owns_write:
+            self._writer_depth += 1
+            return
+        if self.owns_read:
+            raise RuntimeError("Нельзя взять блокировку записи внутри чтения")
+        with self._condition:
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+                # Читатели, ждавшие этого писателя, проверят условие заново
+                self._condition.notify_all()
+            self._writer = threading.get_ident()
+            self._writer_depth = 1
+
+    def release_write(self):
+        self._writer_depth -= 1
+        if not self._writer_depth:
+            with self._condition:
+                self._writer = None
+                self._condition.notify_all()
+
+    @contextmanager
+    def read(self):
+        """Блок чтения"""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        """Блок записи"""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
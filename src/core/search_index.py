@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Триграммный индекс для поиска ключевых слов по подстроке
+"""
+
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .keyword_store import KeywordStore
+
+
+SEARCH_MODES = ('substring', 'prefix', 'word')
+
+
+def _gram_positions(padded_texts: List[str]):
+    """
+    Кодовые точки склеенных строк и позиции начала каждой триграммы
+
+    Returns:
+        tuple: (коды символов int64, позиции триграмм, номер строки для каждой триграммы)
+    """
+    lengths = np.fromiter(map(len, padded_texts), dtype=np.int64, count=len(padded_texts))
+    blob = "".join(padded_texts).encode('utf-32-le', errors='surrogatepass')
+    codes = np.frombuffer(blob, dtype=np.uint32).astype(np.int64)
+
+    # Триграмма не может начинаться на двух последних символах строки
+    # (все строки дополнены пробелами, поэтому их длина не меньше двух)
+    ends = np.cumsum(lengths)
+    valid = np.ones(len(codes), dtype=np.bool_)
+    valid[ends - 1] = False
+    valid[ends - 2] = False
+    positions = np.flatnonzero(valid)
+    text_ids = np.repeat(np.arange(len(padded_texts)), lengths - 2)
+    return codes, positions, text_ids
+
+
+def _pack(first, second, third, bits: int = 21):
+    """Упаковать три кода символов в один ключ"""
+    return (first << (2 * bits)) | (second << bits) | third
+
+
+def _pattern_keys(padded: str) -> List[int]:
+    """
+    Уникальные ключи триграмм одной строки
+
+    Триграмма кодируется тремя кодовыми точками Unicode (по 21 биту)
+    в одно число int64.
+    """
+    codes, positions, _ = _gram_positions([padded])
+    keys = _pack(codes[:-2], codes[1:-1], codes[2:])[positions]
+    return np.unique(keys).tolist()
+
+
+class TrigramIndex:
+    """
+    Инвертированный индекс триграмм по очищенному тексту ключевых слов
+
+    Индексируется строка " текст " (с пробелами по краям), поэтому кроме
+    подстроки поддерживаются запросы по началу фразы и по целым словам.
+
+    Основная часть индекса хранится в виде CSR: отсортированные ключи
+    триграмм, смещения и массив слотов. Строки, добавленные после
+    построения, догоняются при следующем запросе: небольшая порция
+    попадает в словарь-дельту, большая - приводит к перестроению.
+    Удалённые слоты отсекаются маской хранилища, после уплотнения или
+    очистки хранилища индекс перестраивается.
+
+    Догонять индекс могут одновременно несколько читающих потоков,
+    поэтому синхронизация идёт под собственной блокировкой индекса.
+    """
+
+    # Доля неиндексированных строк, после которой индекс перестраивается
+    REBUILD_RATIO = 0.1
+    REBUILD_MIN = 20000
+
+    def __init__(self, store: KeywordStore):
+        self._store = store
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        """Сбросить индекс (построится при следующем запросе)"""
+        self._epoch = None
+        self._indexed = 0
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._slots = np.zeros(0, dtype=np.int32)
+        self._delta: Dict[int, List[int]] = defaultdict(list)
+
+    def _sync(self):
+        """Привести индекс в соответствие с хранилищем"""
+        store = self._store
+        size = store.slot_count
+        if self._epoch != store.epoch:
+            self._build(size)
+            return
+
+        pending = size - self._indexed
+        if pending > max(self.REBUILD_MIN, self.REBUILD_RATIO * self._indexed):
+            self._build(size)
+        elif pending > 0:
+            texts = store.texts
+            for slot in range(self._indexed, size):
+                if texts[slot] is None:
+                    continue
+                for key in _pattern_keys(f" {texts[slot]} "):
+                    self._delta[key].append(slot)
+            self._indexed = size
+
+    def _build(self, size: int):
+        """Построить CSR-индекс по всем слотам хранилища"""
+        owners = self._store.live_slots().astype(np.int64)
+        texts = self._store.live_texts()
+        self._reset()
+        if len(owners):
+            codes, positions, text_ids = _gram_positions([f" {text} " for text in texts])
+            self._keys, self._offsets, self._slots = self._csr(codes, positions, owners[text_ids])
+        self._epoch = self._store.epoch
+        self._indexed = size
+
+    @staticmethod
+    def _csr(codes: np.ndarray, positions: np.ndarray, slots: np.ndarray):
+        """
+        CSR-представление пар (триграмма, слот) без повторов
+
+        Символы перекодируются в плотный алфавит, чтобы триграмма и слот
+        поместились в одно число int64 и сортировка шла по значениям,
+        а не через argsort.
+
+        Returns:
+            tuple: (уникальные ключи, смещения, слоты int32)
+        """
+        present = np.zeros(int(codes.max()) + 1, dtype=np.bool_)
+        present[codes] = True
+        alphabet = np.flatnonzero(present)
+        bits = max(int(len(alphabet) - 1).bit_length(), 1)
+
+        if 3 * bits + 32 <= 63:
+            dense = np.zeros(len(present), dtype=np.int64)
+            dense[alphabet] = np.arange(len(alphabet))
+            dense = dense[codes]
+            combined = _pack(dense[:-2], dense[1:-1], dense[2:], bits)[positions]
+            combined = np.unique((combined << 32) | slots)
+            packed = combined >> 32
+            slots = combined & 0xFFFFFFFF
+        else:
+            # Слишком большой алфавит: устойчивая сортировка по ключу
+            packed = _pack(codes[:-2], codes[1:-1], codes[2:])[positions]
+            order = np.argsort(packed, kind='stable')
+            packed, slots = packed[order], slots[order]
+            unique = np.ones(len(packed), dtype=np.bool_)
+            unique[1:] = (packed[1:] != packed[:-1]) | (slots[1:] != slots[:-1])
+            packed, slots = packed[unique], slots[unique]
+
+        first = np.flatnonzero(np.concatenate([[True], packed[1:] != packed[:-1]]))
+        keys = packed[first]
+        if 3 * bits + 32 <= 63:
+            mask = (1 << bits) - 1
+            keys = _pack(alphabet[keys >> (2 * bits)], alphabet[(keys >> bits) & mask],
+                         alphabet[keys & mask])
+        offsets = np.append(first, len(packed)).astype(np.int64)
+        return keys, offsets, slots.astype(np.int32)
+
+    def _postings(self, key: int) -> np.ndarray:
+        """Слоты, содержащие триграмму (по возрастанию)"""
+        position = np.searchsorted(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            base = self._slots[self._offsets[position]:self._offsets[position + 1]]
+        else:
+            base = self._slots[:0]
+        delta = self._delta.get(key)
+        if delta:
+            return np.concatenate([base, np.asarray(delta, dtype=np.int32)])
+        return base
+
+    def candidates(self, pattern: str, mode: str = 'substring') -> Optional[np.ndarray]:
+        """
+        Слоты-кандидаты для запроса
+
+        Кандидаты содержат все триграммы запроса, но требуют проверки
+        (и могут включать удалённые слоты).
+
+        Args:
+            pattern: Очищенный текст запроса
+            mode: 'substring', 'prefix' (начало фразы) или 'word' (целые слова)
+
+        Returns:
+            np.ndarray или None, если запрос слишком короток для индекса
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Неизвестный режим поиска: {mode}")
+
+        padded = {'substring': pattern, 'prefix': f" {pattern}", 'word': f" {pattern} "}[mode]
+        if len(padded) < 3:
+            return None
+
+        with self._lock:
+            self._sync()
+        postings = sorted((self._postings(key) for key in _pattern_keys(padded)), key=len)
+        result = postings[0]
+        # Пересекаем несколько самых коротких списков, остальное отсеет проверка
+        for other in postings[1:4]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, other, assume_unique=True)
+        return result
+
+    def memory_usage(self) -> int:
+        """Оценка занимаемой памяти в байтах"""
+        total = self._keys.nbytes + self._offsets.nbytes + self._slots.nbytes
+        total += sum(8 * len(slots) + 64 for slots in self._delta.values())
+        return total
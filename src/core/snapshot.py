@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бинарный снимок семантического ядра
+Один файл: куча строк UTF-8 с массивом смещений и колонки фиксированной
+ширины. Снимок открывается через mmap без копирования, поэтому несколько
+процессов разделяют одну физическую копию ядра только для чтения.
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .keyword_store import KeywordStore
+
+MAGIC = b'KCSNAP01'
+# Заголовок: сигнатура и длина JSON-описания секций
+_HEADER = struct.Struct('<8sQ')
+# Секции выравниваются, чтобы массивы NumPy над mmap были выровнены
+ALIGNMENT = 64
+
+# Порядок колонок в DataFrame (как у KeywordManager.to_dataframe)
+DATAFRAME_COLUMNS = ('keyword', 'frequency', 'competition', 'cpc', 'category', 'source',
+                     'word_count', 'added_date')
+
+
+def _padding(position: int) -> int:
+    return -position % ALIGNMENT
+
+
+def write_snapshot(store: KeywordStore, path: str) -> int:
+    """
+    Записать живые строки хранилища в снимок
+
+    Файл пишется во временный файл рядом и атомарно заменяет path, так что
+    процессы, открывающие снимок, всегда видят целый файл.
+
+    Returns:
+        int: Количество записанных строк
+    """
+    texts = store.live_texts()
+    encoded = [text.encode('utf-8') for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)),
+              out=offsets[1:])
+    # Порядок строк по байтам UTF-8 (совпадает с порядком кодовых точек) - для find
+    order = np.array(sorted(range(len(texts)), key=texts.__getitem__), dtype=np.int64)
+
+    sections = [('offsets', offsets), ('heap', b''.join(encoded)), ('order', order)]
+    sections += [(name, store.live_column(name)) for name in KeywordStore.COLUMNS]
+    del encoded
+
+    layout = {}
+    position = 0
+    for name, data in sections:
+        size = data.nbytes if isinstance(data, np.ndarray) else len(data)
+        layout[name] = [position, size]
+        position += size + _padding(size)
+    meta = json.dumps({
+        'rows': len(texts),
+        'columns': {name: np.dtype(dtype).str for name, dtype in KeywordStore.COLUMNS.items()},
+        'dictionaries': {name: dictionary.values
+                         for name, dictionary in store.dictionaries.items()},
+        'sections': layout,
+    }, ensure_ascii=False).encode('utf-8')
+    data_start = _HEADER.size + len(meta)
+    data_start += _padding(data_start)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as target:
+            target.write(_HEADER.pack(MAGIC, len(meta)))
+            target.write(meta)
+            target.write(b'\0' * (data_start - target.tell()))
+            for name, data in sections:
+                target.write(data.view(np.uint8).data if isinstance(data, np.ndarray) else data)
+                target.write(b'\0' * _padding(layout[name][1]))
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return len(texts)
+
+
+class KeywordSnapshot:
+    """
+    Снимок, открытый через mmap только для чтения
+
+    Колонки - массивы NumPy прямо над отображённым файлом (без копирования,
+    запись в них невозможна). Тексты декодируются по требованию; поиск
+    по тексту - двоичный поиск по сохранённому порядку строк.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Путь к файлу снимка
+
+        Raises:
+            ValueError: Файл не является снимком
+        """
+        self.path = path
+        with open(path, 'rb') as source:
+            self._mmap = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, meta_size = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"Файл {path} не является снимком ядра")
+
+        meta = json.loads(self._mmap[_HEADER.size:_HEADER.size + meta_size])
+        data_start = _HEADER.size + meta_size
+        data_start += _padding(data_start)
+        self.rows: int = meta['rows']
+        self.dictionaries: Dict[str, List[str]] = meta['dictionaries']
+
+        def section(name, dtype):
+            position, size = meta['sections'][name]
+            return np.frombuffer(self._mmap, dtype=dtype, count=size // np.dtype(dtype).itemsize,
+                                 offset=data_start + position)
+
+        self._offsets = section('offsets', np.int64)
+        self._heap = section('heap', np.uint8)
+        self._order = section('order', np.int64)
+        self._columns = {name: section(name, dtype) for name, dtype in meta['columns'].items()}
+
+    def __len__(self):
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _text_bytes(self, row: int) -> bytes:
+        return self._heap[self._offsets[row]:self._offsets[row + 1]].tobytes()
+
+    def text(self, row: int) -> str:
+        """Текст строки row"""
+        return self._text_bytes(row).decode('utf-8')
+
+    def texts(self) -> List[str]:
+        """Все тексты по порядку (декодируются одним проходом)"""
+        heap = self._heap.tobytes()
+        offsets = self._offsets.tolist()
+        return [heap[start:stop].decode('utf-8') for start, stop in zip(offsets, offsets[1:])]
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Колонка без копирования (только чтение)
+
+        Для категории и источника возвращаются коды словаря.
+        """
+        return self._columns[name]
+
+    def find(self, text: str) -> Optional[int]:
+        """Номер строки по очищенному тексту (None если нет)"""
+        key = text.encode('utf-8')
+        order = self._order
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            if self._text_bytes(order[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(order) and self._text_bytes(order[low]) == key:
+            return int(order[low])
+        return None
+
+    def get(self, row: int) -> Dict:
+        """Поля строки в виде словаря (как KeywordView.to_dict)"""
+        values = {'text': self.text(row)}
+        for name, column in self._columns.items():
+            if name == 'word_count':
+                continue
+            value = column[row]
+            if name in self.dictionaries:
+                value = self.dictionaries[name][value]
+            values[name] = value.item() if hasattr(value, 'item') else value
+        return values
+
+    def _decoded(self, name: str) -> pd.Categorical:
+        return pd.Categorical.from_codes(self._columns[name],
+                                         categories=self.dictionaries[name])
+
+    def _keyword_column(self):
+        """Тексты: без копирования через Arrow, если pyarrow установлен"""
+        try:
+            import pyarrow as pa
+        except ImportError:
+            return self.texts()
+        array = pa.LargeStringArray.from_buffers(
+            self.rows, pa.py_buffer(self._offsets), pa.py_buffer(self._heap))
+        return pd.arrays.ArrowExtensionArray(array)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        DataFrame над буферами снимка
+
+        Числовые колонки и даты оборачивают mmap без копирования;
+        категория и источник - pd.Categorical (копируются только коды),
+        тексты - без копирования при установленном pyarrow.
+        """
+        columns = {'keyword': self._keyword_column()}
+        for name in DATAFRAME_COLUMNS[1:]:
+            columns[name] = (self._decoded(name) if name in self.dictionaries
+                             else self._columns[name])
+        return pd.DataFrame(columns, copy=False)
+
+    def load_into(self, store: KeywordStore):
+        """Загрузить снимок в хранилище (колонки копируются и доступны на запись)"""
+        store.load(self.texts(), {name: column.copy() for name, column in self._columns.items()},
+                   self.dictionaries)
+
+    def close(self):
+        """
+        Закрыть отображение
+
+        Если снаружи остались массивы над снимком, файл остаётся отображённым
+        до их освобождения.
+        """
+        self._offsets = self._heap = self._order = None
+        self._columns = {}
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Инкрементальная статистика по ключевым словам
+Агрегаты обновляются при изменениях хранилища, чтение - O(1)
+"""
+
+import heapq
+import math
+import threading
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from .keyword_store import KeywordStore, StoreListener
+
+
+class FrequencySketch:
+    """
+    Логарифмическая гистограмма для квантилей (по схеме DDSketch)
+
+    Значение v > 0 попадает в корзину ceil(log(v) / log(gamma)), поэтому
+    квантиль определяется с относительной погрешностью relative_accuracy.
+    Скетчи с одинаковой точностью можно объединять (merge) и из них можно
+    удалять значения.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets: Counter = Counter()
+        self._zeros = 0  # значения <= 0
+        self.count = 0
+
+    def _bucket_indexes(self, values: np.ndarray) -> np.ndarray:
+        return np.ceil(np.log(values) / self._log_gamma).astype(np.int64)
+
+    def update(self, values: np.ndarray, weight: int = 1):
+        """Добавить (weight=1) или удалить (weight=-1) значения"""
+        values = np.asarray(values, dtype=np.float64)
+        positive = values[values > 0]
+        self._zeros += weight * (len(values) - len(positive))
+        if len(positive):
+            buckets, counts = np.unique(self._bucket_indexes(positive), return_counts=True)
+            for bucket, count in zip(buckets.tolist(), counts.tolist()):
+                self._buckets[bucket] += weight * count
+                if not self._buckets[bucket]:
+                    del self._buckets[bucket]
+        self.count += weight * len(values)
+
+    def add_value(self, value: float, weight: int = 1):
+        """Добавить или удалить одно значение (без накладных расходов NumPy)"""
+        if value > 0:
+            bucket = math.ceil(math.log(value) / self._log_gamma)
+            self._buckets[bucket] += weight
+            if not self._buckets[bucket]:
+                del self._buckets[bucket]
+        else:
+            self._zeros += weight
+        self.count += weight
+
+    def merge(self, other: 'FrequencySketch'):
+        """Объединить со скетчем той же точности"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Нельзя объединить скетчи с разной точностью")
+        self._buckets.update(other._buckets)
+        self._zeros += other._zeros
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        """Приближённый квантиль q (0..1); 0 для пустого скетча"""
+        if self.count <= 0:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self._zeros
+        if rank < seen:
+            return 0.0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if rank < seen:
+                return 2 * self._gamma ** bucket / (self._gamma + 1)
+        return 2 * self._gamma ** max(self._buckets) / (self._gamma + 1)
+
+    def clear(self):
+        self._buckets.clear()
+        self._zeros = 0
+        self.count = 0
+
+
+class _MinMax:
+    """
+    Мультимножество значений с минимумом и максимумом через две кучи
+
+    min() и max() выбрасывают устаревшие вершины куч, то есть меняют
+    кучи даже при чтении - для одновременных читателей это делается
+    под блокировкой.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+        self._min_heap = []
+        self._max_heap = []
+
+    def update(self, values: Iterable[int], counts: Iterable[int]):
+        """Изменить кратности значений на counts (отрицательные - удаление)"""
+        if not self._counts:
+            # Первое заполнение (открытие проекта, первый пакет) - кучи строятся
+            # одним heapify вместо поштучных вставок
+            self._counts.update({value: count for value, count in zip(values, counts)
+                                 if count > 0})
+            self._min_heap = list(self._counts)
+            self._max_heap = [-value for value in self._counts]
+            heapq.heapify(self._min_heap)
+            heapq.heapify(self._max_heap)
+            return
+        for value, count in zip(values, counts):
+            previous = self._counts[value]
+            self._counts[value] = previous + count
+            if previous <= 0 < previous + count:
+                heapq.heappush(self._min_heap, value)
+                heapq.heappush(self._max_heap, -value)
+            elif previous + count <= 0:
+                del self._counts[value]
+
+    def _top(self, heap, sign: int) -> Optional[int]:
+        # Ленивое удаление: выбрасываем значения, которых больше нет
+        with self._lock:
+            while heap and self._counts.get(sign * heap[0], 0) <= 0:
+                heapq.heappop(heap)
+            return sign * heap[0] if heap else None
+
+    def min(self) -> Optional[int]:
+        return self._top(self._min_heap, 1)
+
+    def max(self) -> Optional[int]:
+        return self._top(self._max_heap, -1)
+
+    def clear(self):
+        self._counts.clear()
+        self._min_heap.clear()
+        self._max_heap.clear()
+
+
+class RunningStatistics(StoreListener):
+    """
+    Агрегаты по живым строкам хранилища, обновляемые на добавление,
+    удаление, изменение и очистку
+
+    Хранятся: количество, сумма частотности, мультимножество частотности
+    (минимум и максимум), скетч квантилей, сумма числа слов и количество
+    строк по каждой категории.
+    """
+
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self, store: KeywordStore):
+        self.sketch = FrequencySketch()
+        self._frequencies = _MinMax()
+        self._reset()
+        self._add_slots(store, store.live_slots())
+        store.add_listener(self)
+
+    def _reset(self):
+        self.total = 0
+        self.frequency_sum = 0
+        self.word_count_sum = 0
+        self._category_counts: Counter = Counter()
+        self._frequencies.clear()
+        self.sketch.clear()
+
+    def _apply(self, frequencies: np.ndarray, word_counts: np.ndarray,
+               categories: np.ndarray, weight: int):
+        """Учесть (weight=1) или исключить (weight=-1) набор строк"""
+        self.total += weight * len(frequencies)
+        self.frequency_sum += weight * int(frequencies.sum())
+        self.word_count_sum += weight * int(word_counts.sum())
+
+        values, counts = np.unique(frequencies, return_counts=True)
+        self._frequencies.update(values.tolist(), (weight * counts).tolist())
+        self.sketch.update(frequencies, weight)
+
+        codes, counts = np.unique(categories[categories != 0], return_counts=True)
+        for code, count in zip(codes.tolist(), counts.tolist()):
+            self._category_counts[code] += weight * count
+            if self._category_counts[code] <= 0:
+                del self._category_counts[code]
+
+    def _add_slots(self, store: KeywordStore, slots, weight: int = 1):
+        if len(slots) == 1:
+            self._apply_one(store, int(slots[0]), weight)
+            return
+        self._apply(store.column('frequency')[slots], store.column('word_count')[slots],
+                    store.column('category')[slots], weight)
+
+    def _apply_one(self, store: KeywordStore, slot: int, weight: int):
+        """Быстрый путь для одной строки (добавление по одному ключевому слову)"""
+        frequency = int(store.column('frequency')[slot])
+        category = int(store.column('category')[slot])
+        self.total += weight
+        self.frequency_sum += weight * frequency
+        self.word_count_sum += weight * int(store.column('word_count')[slot])
+        self._frequencies.update((frequency,), (weight,))
+        self.sketch.add_value(frequency, weight)
+        if category:
+            self._category_counts[category] += weight
+            if self._category_counts[category] <= 0:
+                del self._category_counts[category]
+
+    def on_append(self, store: KeywordStore, slots: range):
+        self._add_slots(store, slots)
+
+    def on_delete(self, store: KeywordStore, slots: np.ndarray):
+        self._add_slots(store, slots, weight=-1)
+
+    def on_update(self, store: KeywordStore, slot: int, name: str, old, new):
+        if name == 'frequency':
+            old, new = int(old), int(new)
+            self.frequency_sum += new - old
+            self._frequencies.update((old, new), (-1, 1))
+            self.sketch.add_value(old, -1)
+            self.sketch.add_value(new, 1)
+        elif name == 'category':
+            old, new = int(old), int(new)
+            if old:
+                self._category_counts[old] -= 1
+                if self._category_counts[old] <= 0:
+                    del self._category_counts[old]
+            if new:
+                self._category_counts[new] += 1
+
+    def on_update_many(self, store: KeywordStore, slots: np.ndarray, name: str,
+                       old: np.ndarray, new: np.ndarray):
+        if name != 'category':
+            super().on_update_many(store, slots, name, old, new)
+            return
+        # Сначала прибавляем новые коды, затем вычитаем старые - счётчик
+        # категории не обнуляется посреди перестановки
+        for codes, weight in ((new, 1), (old, -1)):
+            values, counts = np.unique(codes[codes != 0], return_counts=True)
+            for code, count in zip(values.tolist(), counts.tolist()):
+                self._category_counts[code] += weight * count
+        for code in [code for code, count in self._category_counts.items() if count <= 0]:
+            del self._category_counts[code]
+
+    def on_clear(self, store: KeywordStore):
+        self._reset()
+
+    def category_counts(self, store: KeywordStore) -> Dict[str, int]:
+        """Количество ключевых слов по каждой непустой категории"""
+        dictionary = store.dictionaries['category']
+        return {dictionary.decode(code): count for code, count in self._category_counts.items()}
+
+    def snapshot(self) -> Dict:
+        """Статистика в формате KeywordManager.get_statistics()"""
+        stats = {
+            "total": self.total,
+            "avg_frequency": self.frequency_sum / self.total if self.total else 0,
+            "max_frequency": self._frequencies.max() or 0,
+            "min_frequency": self._frequencies.min() or 0,
+            "avg_word_count": self.word_count_sum / self.total if self.total else 0,
+            "categories": len(self._category_counts)
+        }
+        for percentile in self.PERCENTILES:
+            stats[f"p{percentile}_frequency"] = round(self.sketch.quantile(percentile / 100))
+        return stats
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Обход веб-страниц для импорта ключевых слов
+Страницы (списком или из sitemap) загружаются параллельно через общий пул
+соединений с ограничением одновременных запросов к одному хосту.
+HTML и XML разбираются потоково: парсер получает ответ кусками, а
+разобранные элементы сразу удаляются, поэтому дерево документа целиком
+не строится
+"""
+
+import logging
+import time
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from lxml import etree
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = 'KeyCollector-Python/1.0'
+CHUNK_SIZE = 64 * 1024
+# Элементы, текст которых становится фразой
+PHRASE_TAGS = frozenset({'title', 'h1', 'h2', 'h3'})
+
+
+def _drop_parsed(element):
+    """Очистить разобранный элемент и его предыдущих соседей"""
+    element.clear()
+    parent = element.getparent()
+    while parent is not None and element.getprevious() is not None:
+        del parent[0]
+
+
+def extract_phrases(chunks: Iterable[bytes], encoding: Optional[str] = None) -> List[str]:
+    """
+    Фразы из HTML, поданного кусками: meta keywords, title и заголовки h1-h3
+
+    Args:
+        chunks: Куски документа
+        encoding: Кодировка из заголовка ответа (None - определит парсер)
+
+    Returns:
+        list: Фразы с нормализованными пробелами в порядке документа
+    """
+    parser = etree.HTMLPullParser(events=('start', 'end'), encoding=encoding)
+    phrases: List[str] = []
+    depth = 0
+
+    def drain():
+        nonlocal depth
+        for event, element in parser.read_events():
+            tag = element.tag.lower() if isinstance(element.tag, str) else ''
+            if event == 'start':
+                if tag in PHRASE_TAGS:
+                    depth += 1
+                elif tag == 'meta' and (element.get('name') or '').lower() == 'keywords':
+                    phrases.extend((element.get('content') or '').split(','))
+                continue
+            if tag in PHRASE_TAGS:
+                depth -= 1
+                phrases.append(' '.join(element.itertext()))
+            # Внутри заголовка потомков не трогаем: их текст ещё понадобится
+            if depth == 0:
+                _drop_parsed(element)
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        drain()
+    parser.close()
+    drain()
+    return [' '.join(phrase.split()) for phrase in phrases if phrase.strip()]
+
+
+def parse_sitemap(chunks: Iterable[bytes],
+                  max_bytes: Optional[int] = None) -> Tuple[List[str], List[str]]:
+    """
+    Адреса из sitemap, поданного кусками (в том числе сжатого gzip)
+
+    Args:
+        chunks: Куски файла
+        max_bytes: Сколько байт XML разбирать (после распаковки); из обрезанного
+                   файла берутся адреса, прочитанные до лимита
+
+    Returns:
+        tuple: (адреса страниц из urlset, адреса вложенных sitemap из sitemapindex)
+    """
+    parser = etree.XMLPullParser(events=('end',), resolve_entities=False, no_network=True)
+    pages: List[str] = []
+    sitemaps: List[str] = []
+    inflate = None
+    fed = 0
+
+    def drain():
+        for _, element in parser.read_events():
+            if etree.QName(element).localname == 'loc' and element.text:
+                parent = element.getparent()
+                kind = etree.QName(parent).localname if parent is not None else ''
+                (sitemaps if kind == 'sitemap' else pages).append(element.text.strip())
+            _drop_parsed(element)
+
+    for chunk in chunks:
+        if inflate is None:
+            # Файлы .xml.gz часто отдаются без Content-Encoding - распаковываем сами
+            gzipped = chunk[:2] == b'\x1f\x8b'
+            inflate = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else False
+        if inflate:
+            chunk = inflate.decompress(chunk, max_bytes - fed if max_bytes else 0)
+        elif max_bytes:
+            chunk = chunk[:max_bytes - fed]
+        fed += len(chunk)
+        parser.feed(chunk)
+        drain()
+        if max_bytes and fed >= max_bytes:
+            break
+    else:
+        if inflate:
+            parser.feed(inflate.flush())
+    try:
+        parser.close()
+    except etree.XMLSyntaxError:
+        if not (max_bytes and fed >= max_bytes):
+            raise
+    drain()
+    return pages, sitemaps
+
+
+@dataclass
+class PageResult:
+    """Результат загрузки одной страницы"""
+    url: str
+    phrases: List[str] = field(default_factory=list)
+    size: int = 0
+    truncated: bool = False
+    error: Optional[str] = None
+
+
+class PageCrawler:
+    """
+    Параллельная загрузка страниц и извлечение из них фраз
+
+    Запросы выполняются в пуле потоков через одну requests.Session;
+    к одному хосту одновременно идёт не больше per_host запросов, а
+    свободные потоки берут страницы других хостов. Ответ читается кусками:
+    больше max_bytes не читается (страница помечается truncated), дольше
+    page_timeout страница не загружается.
+
+        crawler = PageCrawler(per_host=2)
+        for batch in crawler.iter_batches(sitemaps=['https://example.com/sitemap.xml']):
+            keyword_manager.add_keywords_batch(batch)
+    """
+
+    def __init__(self, max_workers: int = 8, per_host: int = 2, timeout: float = 10.0,
+                 page_timeout: float = 30.0, max_bytes: int = 2 * 1024 * 1024,
+                 max_sitemap_bytes: int = 50 * 1024 * 1024, max_pages: int = 1000,
+                 max_sitemaps: int = 50, max_phrases: int = 100, batch_size: int = 1000,
+                 session: Optional[requests.Session] = None, user_agent: str = USER_AGENT):
+        """
+        Args:
+            max_workers: Запросов одновременно
+            per_host: Запросов одновременно к одному хосту
+            timeout: Таймаут соединения и чтения (с)
+            page_timeout: Предельное время загрузки страницы целиком (с)
+            max_bytes: Сколько байт страницы читать
+            max_sitemap_bytes: Сколько байт sitemap читать (распакованных)
+            max_pages: Сколько страниц загружать за обход
+            max_sitemaps: Сколько файлов sitemap (с вложенными) читать
+            max_phrases: Сколько фраз брать с одной страницы
+            batch_size: Фраз в пакете iter_batches
+            session: Готовая requests.Session (по умолчанию своя, с пулом
+                     соединений на per_host к каждому хосту)
+            user_agent: Заголовок User-Agent
+        """
+        self.max_workers = max(1, max_workers)
+        self.per_host = max(1, per_host)
+        self.timeout = timeout
+        self.page_timeout = page_timeout
+        self.max_bytes = max_bytes
+        self.max_sitemap_bytes = max_sitemap_bytes
+        self.max_pages = max_pages
+        self.max_sitemaps = max_sitemaps
+        self.max_phrases = max_phrases
+        self.batch_size = batch_size
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=max(10, self.max_workers),
+                                  pool_maxsize=self.per_host)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        session.headers['User-Agent'] = user_agent
+        self.session = session
+        self.logger = logging.getLogger(__name__)
+        self.stats = {'pages': 0, 'failed': 0, 'truncated': 0, 'bytes': 0, 'phrases': 0}
+        self.errors: List[str] = []
+
+    # --- Загрузка ---
+
+    def _read(self, response: requests.Response, page: PageResult, limit: int,
+              deadline: float) -> Iterator[bytes]:
+        """Куски тела ответа не больше limit байт в сумме и не дольше deadline"""
+        for chunk in response.iter_content(CHUNK_SIZE):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Страница не загружена за {self.page_timeout} с")
+            if page.size + len(chunk) > limit:
+                page.truncated = True
+                chunk = chunk[:limit - page.size]
+                page.size += len(chunk)
+                if chunk:
+                    yield chunk
+                return
+            page.size += len(chunk)
+            yield chunk
+
+    def fetch(self, url: str) -> PageResult:
+        """
+        Загрузить страницу и извлечь фразы
+
+        Raises:
+            requests.RequestException: Ошибка загрузки
+            TimeoutError: Страница грузится дольше page_timeout
+            ValueError: Ответ не HTML
+        """
+        page = PageResult(url)
+        deadline = time.monotonic() + self.page_timeout
+        with self.session.get(url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            content_type = response.headers.get('Content-Type', '').lower()
+            if content_type and 'html' not in content_type:
+                raise ValueError(f"Не HTML: {content_type}")
+            # Без charset в заголовке кодировку определит парсер по <meta charset>
+            encoding = response.encoding if 'charset=' in content_type else None
+            phrases = extract_phrases(self._read(response, page, self.max_bytes, deadline),
+                                      encoding)
+        page.phrases = list(dict.fromkeys(phrases))[:self.max_phrases]
+        return page
+
+    def _fetch_quietly(self, url: str) -> PageResult:
+        try:
+            return self.fetch(url)
+        except Exception as e:
+            return PageResult(url, error=f"{url}: {e}")
+
+    def fetch_sitemap(self, url: str) -> Tuple[List[str], List[str]]:
+        """
+        Прочитать sitemap
+
+        Returns:
+            tuple: (адреса страниц, адреса вложенных sitemap)
+        """
+        page = PageResult(url)
+        deadline = time.monotonic() + self.page_timeout
+        with self.session.get(url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            chunks = self._read(response, page, self.max_sitemap_bytes, deadline)
+            return parse_sitemap(chunks, self.max_sitemap_bytes)
+
+    def expand_sitemaps(self, sitemaps: Iterable[str]) -> List[str]:
+        """Адреса страниц из sitemap и вложенных в них sitemap (не больше max_pages)"""
+        queue: Deque[str] = deque(sitemaps)
+        seen = set()
+        pages: List[str] = []
+        while queue and len(seen) < self.max_sitemaps and len(pages) < self.max_pages:
+            url = queue.popleft()
+            if url in seen:
+                continue
+            seen.add(url)
+            try:
+                found, nested = self.fetch_sitemap(url)
+            except Exception as e:
+                self._error(f"{url}: {e}")
+                continue
+            pages.extend(found)
+            queue.extend(nested)
+        return list(dict.fromkeys(pages))[:self.max_pages]
+
+    def iter_pages(self, urls: Iterable[str]) -> Iterator[PageResult]:
+        """
+        Загрузить страницы параллельно; результаты в порядке готовности
+
+        Ошибки не прерывают обход: страница с ошибкой приходит с полем error.
+        """
+        queues: 'OrderedDict[str, Deque[str]]' = OrderedDict()
+        for url in list(dict.fromkeys(urls))[:self.max_pages]:
+            queues.setdefault(urlsplit(url).netloc.lower(), deque()).append(url)
+
+        in_flight: Dict[str, int] = {}
+        futures = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='crawler')
+        try:
+            while queues or futures:
+                # Заполнить пул по кругу по хостам, не больше per_host на хост
+                for host in list(queues):
+                    while (len(futures) < self.max_workers and queues[host]
+                           and in_flight.get(host, 0) < self.per_host):
+                        future = executor.submit(self._fetch_quietly, queues[host].popleft())
+                        futures[future] = host
+                        in_flight[host] = in_flight.get(host, 0) + 1
+                    if not queues[host]:
+                        del queues[host]
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight[futures.pop(future)] -= 1
+                    yield future.result()
+        finally:
+            # Прерванный обход (отмена задачи) не ждёт оставшиеся страницы
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _error(self, message: str):
+        self.stats['failed'] += 1
+        self.errors.append(message)
+        del self.errors[:-100]
+        self.logger.warning("Обход: %s", message)
+
+    def iter_batches(self, urls: Iterable[str] = (),
+                     sitemaps: Iterable[str] = ()) -> Iterator[List[str]]:
+        """
+        Пакеты фраз по batch_size со страниц из списка и из sitemap
+
+        Счётчики обхода накапливаются в stats, тексты ошибок - в errors.
+        """
+        pages = list(urls)
+        if sitemaps:
+            pages.extend(self.expand_sitemaps(sitemaps))
+        batch: List[str] = []
+        for page in self.iter_pages(pages):
+            if page.error:
+                self._error(page.error)
+                continue
+            self.stats['pages'] += 1
+            self.stats['bytes'] += page.size
+            self.stats['truncated'] += page.truncated
+            self.stats['phrases'] += len(page.phrases)
+            batch.extend(page.phrases)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def close(self):
+        self.session.close()
@@ -10,6 +10,8 @@ import re
 from typing import List, Dict, Any, Optional
 import logging
 
+from ..core.minus_words import MinusWordMatcher
+
 class FixedWordstatIntegration:
     """Класс для добавления ВСЕХ ключевых слов из WordStat в KeywordManager"""
     
@@ -26,7 +28,8 @@ class FixedWordstatIntegration:
     def add_all_keywords_to_manager(self, keyword_manager, 
                                   min_frequency: int = 0,
                                   exclude_patterns: List[str] = None,
-                                  max_keywords: Optional[int] = None):
+                                  max_keywords: Optional[int] = None,
+                                  exclude_mode: str = 'substring'):
         """
         Добавляет ВСЕ ключевые слова в KeywordManager
         
@@ -35,6 +38,8 @@ class FixedWordstatIntegration:
             min_frequency: Минимальная частотность (по умолчанию 0 - все)
             exclude_patterns: Список паттернов для исключения (например, ['snowrunner'])
             max_keywords: Максимальное количество ключевых слов (None = все)
+            exclude_mode: Как сравнивать паттерны: substring (подстрока),
+                          word (целые слова) или stem (по основам слов)
         
         Returns:
             dict: Статистика добавления
@@ -45,6 +50,8 @@ class FixedWordstatIntegration:
         # Параметры по умолчанию
         if exclude_patterns is None:
             exclude_patterns = []
+        # Паттерны компилируются один раз: проверка фразы не зависит от их количества
+        exclude_matcher = MinusWordMatcher(exclude_patterns, exclude_mode)
         
         # Счетчики
         added_count = 0
@@ -56,7 +63,8 @@ class FixedWordstatIntegration:
         print(f"📊 Всего ключевых слов для обработки: {len(self.parser.keywords)}")
         print(f"⚙️ Фильтры:")
         print(f"   - Минимальная частотность: {min_frequency}")
-        print(f"   - Исключаемые паттерны: {exclude_patterns if exclude_patterns else 'нет'}")
+        print(f"   - Исключаемые паттерны: {len(exclude_matcher)} ({exclude_mode})"
+              if len(exclude_matcher) else "   - Исключаемые паттерны: нет")
         print(f"   - Максимум ключевых слов: {max_keywords if max_keywords else 'без ограничений'}")
         print()
         
@@ -77,11 +85,8 @@ class FixedWordstatIntegration:
                     continue
                 
                 # Фильтр по исключаемым паттернам
-                should_exclude = False
-                for pattern in exclude_patterns:
-                    if pattern.lower() in keyword.lower():
-                        should_exclude = True
-                        break
+                # Исходная фраза: в режиме substring знаки («c++») сравниваются как есть
+                should_exclude = exclude_matcher.matches(keyword)
                 
                 if should_exclude:
                     skipped_count += 1
@@ -99,7 +104,7 @@ class FixedWordstatIntegration:
                     
                     if existing_keyword:
                         # Обновляем частотность, если она больше
-                        if frequency > existing_keyword.get('frequency', 0):
+                        if frequency > existing_keyword.frequency:
                             keyword_manager.update_keyword_frequency(keyword, frequency)
                             print(f"🔄 Обновлено: '{keyword}' - {frequency} запросов")
                         else:
@@ -171,7 +176,7 @@ class FixedWordstatIntegration:
                         keyword=keyword,
                         frequency=frequency,
                         cpc=0.0,
-                        group=group_name  # Добавляем информацию о группе
+                        category=group_name  # Группа записывается в категорию
                     )
                     
                     added_count += 1
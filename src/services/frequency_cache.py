@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Постоянный кэш частотности, CPC и конкуренции
+Ответы API Wordstat и Google Ads хранятся в SQLite по ключу
+(источник, нормализованная фраза, регион, период) и переиспользуются
+при сборе ядер для смежных проектов
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from ..core.normalizer import normalize
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metrics (
+    provider TEXT NOT NULL,
+    phrase TEXT NOT NULL,
+    region TEXT NOT NULL,
+    period TEXT NOT NULL,
+    frequency INTEGER,
+    cpc REAL,
+    competition REAL,
+    fetched REAL NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (provider, phrase, region, period)
+);
+CREATE INDEX IF NOT EXISTS metrics_used ON metrics (used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+-- Число записей ведётся счётчиком: COUNT(*) по таблице - полный проход индекса
+CREATE TRIGGER IF NOT EXISTS metrics_added AFTER INSERT ON metrics BEGIN
+    UPDATE counters SET value = value + 1 WHERE name = 'entries';
+END;
+CREATE TRIGGER IF NOT EXISTS metrics_removed AFTER DELETE ON metrics BEGIN
+    UPDATE counters SET value = value - 1 WHERE name = 'entries';
+END;
+"""
+
+METRICS = ('frequency', 'cpc', 'competition')
+COUNTERS = ('hits', 'misses', 'expired', 'stored', 'evicted')
+
+
+class FrequencyCache:
+    """
+    Кэш метрик фраз с истечением по времени и ограничением размера
+
+    - запись старше ttl считается промахом (и перезаписывается новым ответом);
+    - при превышении max_entries удаляются записи, к которым дольше всего
+      не обращались (время обращения обновляется при попадании);
+    - счётчики попаданий и промахов хранятся в том же файле, поэтому
+      видны всем процессам (воркерам gunicorn, скриптам обогащения).
+
+    Регион и период - строки, которые выбирает клиент API (например,
+    '213' и 'month' для Wordstat, '2643' и '2024-01..2024-12' для Google).
+    """
+
+    # Обновлять время обращения не чаще, чем раз в столько секунд
+    TOUCH_INTERVAL = 3600.0
+
+    def __init__(self, path: str, ttl: float = 30 * 24 * 3600, max_entries: int = 1000000,
+                 clock=time.time):
+        """
+        Args:
+            path: Файл кэша (создаётся при отсутствии)
+            ttl: Время жизни записи (с)
+            max_entries: Максимальное количество записей
+            clock: Часы (подменяются в тестах)
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self.logger = logging.getLogger(__name__)
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                                     timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(metrics)")}
+        if 'competition' not in columns:
+            # Файлы первой версии кэша хранили только частотность и CPC
+            self._conn.execute("ALTER TABLE metrics ADD COLUMN competition REAL")
+        self._conn.executemany("INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)",
+                               [(name,) for name in COUNTERS])
+        # Файлы без счётчика записей: посчитать один раз (дальше его ведут триггеры)
+        self._conn.execute("INSERT OR IGNORE INTO counters (name, value) "
+                           "SELECT 'entries', COUNT(*) FROM metrics")
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _keys(phrases: Iterable[str]) -> Dict[str, str]:
+        """Нормализованный ключ для каждой фразы"""
+        return {phrase: normalize(phrase) for phrase in phrases}
+
+    def _count(self, **increments: int):
+        self._conn.executemany("UPDATE counters SET value = value + ? WHERE name = ?",
+                               [(value, name) for name, value in increments.items() if value])
+
+    def get_many(self, provider: str, phrases: Iterable[str], region: str = '',
+                 period: str = '') -> Dict[str, Dict[str, Optional[float]]]:
+        """
+        Найти свежие записи
+
+        Returns:
+            dict: {исходная фраза: {'frequency', 'cpc', 'competition'}} только для попаданий
+        """
+        keys = self._keys(phrases)
+        if not keys:
+            return {}
+        now = self._clock()
+        found: Dict[str, Tuple] = {}
+        expired = 0
+        with self._lock:
+            unique = list(set(keys.values()))
+            # Запрос по частям: ограничение SQLite на число параметров
+            for start in range(0, len(unique), 500):
+                part = unique[start:start + 500]
+                query = ("SELECT phrase, frequency, cpc, competition, fetched, used FROM metrics "
+                         "WHERE provider = ? AND region = ? AND period = ? AND phrase IN ("
+                         + ", ".join('?' * len(part)) + ")")
+                for phrase, *metrics, fetched, used in self._conn.execute(
+                        query, (provider, region, period, *part)):
+                    if now - fetched > self.ttl:
+                        expired += 1
+                    else:
+                        found[phrase] = (*metrics, used)
+
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                stale = [(now, provider, phrase, region, period)
+                         for phrase, (*_, used) in found.items()
+                         if now - used > self.TOUCH_INTERVAL]
+                self._conn.executemany(
+                    "UPDATE metrics SET used = ? WHERE provider = ? AND phrase = ? "
+                    "AND region = ? AND period = ?", stale)
+                hits = sum(key in found for key in keys.values())
+                self._count(hits=hits, misses=len(keys) - hits, expired=expired)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return {phrase: dict(zip(METRICS, found[key])) for phrase, key in keys.items()
+                if key in found}
+
+    def put_many(self, provider: str, values: Dict[str, Dict[str, Optional[float]]],
+                 region: str = '', period: str = ''):
+        """
+        Сохранить ответы API
+
+        Args:
+            values: {фраза: {'frequency', 'cpc', 'competition'}} (отсутствующее поле - NULL)
+        """
+        if not values:
+            return
+        now = self._clock()
+        rows = [(provider, key, region, period, *(metrics.get(name) for name in METRICS), now, now)
+                for key, metrics in zip(self._keys(values).values(), values.values())]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Не INSERT OR REPLACE: замена удаляет строку без срабатывания
+                # триггера удаления, и счётчик записей разошёлся бы с таблицей
+                self._conn.executemany(
+                    "INSERT INTO metrics (provider, phrase, region, period, frequency, "
+                    "cpc, competition, fetched, used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (provider, phrase, region, period) DO UPDATE SET "
+                    "frequency = excluded.frequency, cpc = excluded.cpc, "
+                    "competition = excluded.competition, fetched = excluded.fetched, "
+                    "used = excluded.used", rows)
+                self._count(stored=len(rows))
+                self._evict(now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _evict(self, now: float):
+        """Удалить истёкшие записи и самые давно использованные сверх max_entries"""
+        size = self._conn.execute(
+            "SELECT value FROM counters WHERE name = 'entries'").fetchone()[0]
+        if size <= self.max_entries:
+            return
+        evicted = self._conn.execute("DELETE FROM metrics WHERE fetched < ?",
+                                     (now - self.ttl,)).rowcount
+        excess = size - evicted - self.max_entries
+        if excess > 0:
+            evicted += self._conn.execute(
+                "DELETE FROM metrics WHERE rowid IN (SELECT rowid FROM metrics "
+                "ORDER BY used LIMIT ?)", (excess,)).rowcount
+        self._count(evicted=evicted)
+
+    def stats(self) -> Dict[str, float]:
+        """Счётчики (всех процессов), размер кэша и доля попаданий"""
+        with self._lock:
+            counters = dict(self._conn.execute("SELECT name, value FROM counters"))
+        lookups = counters['hits'] + counters['misses']
+        counters['hit_rate'] = round(counters['hits'] / lookups, 3) if lookups else 0.0
+        return counters
+
+    def clear(self):
+        """Удалить все записи и обнулить счётчики"""
+        with self._lock:
+            self._conn.execute("DELETE FROM metrics")
+            self._conn.execute("UPDATE counters SET value = 0")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
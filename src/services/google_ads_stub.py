@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Локальная заглушка Google Ads API (GenerateKeywordHistoricalMetrics)
+для тестов и бенчмарков: задержка ответа, ограничение частоты и заданное
+количество сбоев
+"""
+
+import json
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+PATH = re.compile(r'^/v\d+/customers/(\d+):generateKeywordHistoricalMetrics$')
+
+
+def stub_metrics(phrase: str) -> Dict[str, float]:
+    """Метрики фразы в заглушке - как их вернёт parse_metrics клиента"""
+    seed = zlib.crc32(phrase.lower().encode('utf-8'))
+    low, high = seed % 50 * 10000, seed % 50 * 10000 + 2000000
+    return {'frequency': seed % 10000, 'competition': seed % 101 / 100,
+            'cpc': round((low + high) / 2 / 1e6, 2)}
+
+
+class StubGoogleAdsServer:
+    """
+    HTTP-сервер заглушки на 127.0.0.1 (порт выбирается свободный)
+
+    Первые fail_first запросов отвечают HTTP 503, запросы сверх max_rate
+    в секунду - 429 RESOURCE_EXHAUSTED, запрос без developer-token - 401.
+    connections - сколько TCP-соединений открыл клиент (проверка пула).
+    Фразы в ответе приводятся к нижнему регистру, как это делает API.
+
+        with StubGoogleAdsServer(latency=0.1) as server:
+            client = GoogleAdsClient("dev", "token", "1234567890", url=server.url)
+    """
+
+    def __init__(self, latency: float = 0.0, fail_first: int = 0, max_rate: float = 0.0):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.max_rate = max_rate
+        self.requests = 0
+        self.keywords_per_request: List[int] = []
+        self.connections = 0
+        self._window: List[float] = []
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive: клиент переиспользует соединения из пула
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                status, answer = stub._handle(self.path, self.headers, body)
+                data = json.dumps(answer, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @staticmethod
+    def _error(status: int, name: str, message: str):
+        return status, {'error': {'code': status, 'status': name, 'message': message}}
+
+    def _handle(self, path: str, headers, body: Dict):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+            if not PATH.match(path):
+                return self._error(404, 'NOT_FOUND', path)
+            if not headers.get('developer-token'):
+                return self._error(401, 'UNAUTHENTICATED', 'developer-token не передан')
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                return self._error(503, 'UNAVAILABLE', 'Сервис временно недоступен')
+            if self.max_rate:
+                now = time.monotonic()
+                self._window = [moment for moment in self._window if now - moment < 1.0]
+                if len(self._window) >= self.max_rate:
+                    return self._error(429, 'RESOURCE_EXHAUSTED', 'Превышена квота')
+                self._window.append(now)
+            self.keywords_per_request.append(len(body['keywords']))
+
+        results = []
+        for phrase in body['keywords']:
+            metrics = stub_metrics(phrase)
+            low = int(round(metrics['cpc'] * 1e6)) - 1000000
+            results.append({'text': phrase.lower(), 'keywordMetrics': {
+                'avgMonthlySearches': str(metrics['frequency']),
+                'competition': 'LOW',
+                'competitionIndex': str(round(metrics['competition'] * 100)),
+                'lowTopOfPageBidMicros': str(low),
+                'highTopOfPageBidMicros': str(low + 2000000),
+            }})
+        return 200, {'results': results}
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Клиент Google Ads API (KeywordPlanIdeaService) для CPC и конкуренции
+Фразы отправляются в GenerateKeywordHistoricalMetrics пакетами до
+MAX_KEYWORDS штук, пакеты выполняются параллельно через общий пул
+соединений под ограничением частоты запросов
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..core.normalizer import normalize
+from .frequency_cache import FrequencyCache
+from .latency import LatencyHistogram
+from .rate_limit import TokenBucket, backoff_delay
+
+API_URL = 'https://googleads.googleapis.com'
+API_VERSION = 'v17'
+
+# languageConstants/1031 - русский язык
+RUSSIAN = 1031
+# Значения перечисления MonthOfYear
+MONTHS = ('JANUARY', 'FEBRUARY', 'MARCH', 'APRIL', 'MAY', 'JUNE', 'JULY', 'AUGUST',
+          'SEPTEMBER', 'OCTOBER', 'NOVEMBER', 'DECEMBER')
+
+
+class GoogleAdsApiError(Exception):
+    """Ошибка Google Ads API (HTTP-статус и статус gRPC из ответа)"""
+
+    def __init__(self, message: str, status: Optional[int] = None, retryable: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+
+
+def parse_metrics(keyword_metrics: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Метрики ключевого слова из ответа API в поля Keyword
+
+    frequency - среднее число запросов в месяц, competition - индекс
+    конкуренции 0..1, cpc - середина диапазона ставки за показ вверху
+    страницы (в валюте аккаунта).
+    """
+    bids = [int(keyword_metrics[name]) / 1e6
+            for name in ('lowTopOfPageBidMicros', 'highTopOfPageBidMicros')
+            if keyword_metrics.get(name) is not None]
+    return {
+        'frequency': int(keyword_metrics.get('avgMonthlySearches') or 0),
+        'competition': int(keyword_metrics.get('competitionIndex') or 0) / 100,
+        'cpc': round(sum(bids) / len(bids), 2) if bids else 0.0,
+    }
+
+
+class GoogleAdsClient:
+    """
+    Исторические метрики фраз из Google Ads
+
+    Запрос - один вызов GenerateKeywordHistoricalMetrics на пакет фраз.
+    Пакеты выполняются в пуле потоков через одну requests.Session
+    (соединения переиспользуются), каждый вызов забирает токен из общего
+    токен-бакета; HTTP 429 (RESOURCE_EXHAUSTED) и 5xx повторяются
+    с экспоненциальной задержкой. Задержки вызовов собираются
+    в гистограмму latency. С кэшем частотности в API уходят только фразы,
+    которых нет в кэше.
+    """
+
+    # Имя источника в кэше частотности
+    CACHE_PROVIDER = 'google'
+    # Ограничения API: фраз в запросе, длина фразы и слов в ней
+    MAX_KEYWORDS = 10000
+    MAX_KEYWORD_LENGTH = 80
+    MAX_KEYWORD_WORDS = 10
+
+    def __init__(self, developer_token: str, access_token: str, customer_id: str,
+                 login_customer_id: Optional[str] = None, url: str = API_URL,
+                 version: str = API_VERSION, geo_target_ids: Sequence[int] = (),
+                 language_id: int = RUSSIAN, network: str = 'GOOGLE_SEARCH',
+                 month_range: Optional[Tuple[str, str]] = None,
+                 batch_size: int = MAX_KEYWORDS, max_workers: int = 2, rate: float = 1.0,
+                 burst: Optional[float] = None, max_retries: int = 5, backoff: float = 1.0,
+                 timeout: float = 60.0, session: Optional[requests.Session] = None,
+                 cache: Optional[FrequencyCache] = None):
+        """
+        Args:
+            developer_token: Токен разработчика Google Ads
+            access_token: OAuth-токен доступа
+            customer_id: Аккаунт, от имени которого идут запросы (без дефисов)
+            login_customer_id: Управляющий аккаунт (MCC), если доступ через него
+            url, version: Адрес и версия REST API (адрес подменяется заглушкой в тестах)
+            geo_target_ids: Регионы geoTargetConstants (пусто - все)
+            language_id: Язык languageConstants
+            network: GOOGLE_SEARCH или GOOGLE_SEARCH_AND_PARTNERS
+            month_range: Период ('2024-01', '2024-12'); None - последние 12 месяцев
+            batch_size: Фраз в одном запросе (не больше MAX_KEYWORDS)
+            max_workers: Запросов одновременно
+            rate, burst: Запросов в секунду и допустимый всплеск
+            max_retries: Повторов одного запроса при временной ошибке
+            backoff: Базовая задержка повтора (с), удваивается с каждой попыткой
+            timeout: Таймаут HTTP-запроса (с)
+            session: Готовая requests.Session (по умолчанию своя, с пулом
+                     соединений на max_workers)
+            cache: Кэш частотности (None - всегда запрашивать API)
+        """
+        self.url = url.rstrip('/')
+        self.version = version
+        self.customer_id = customer_id.replace('-', '')
+        self.geo_target_ids = list(geo_target_ids)
+        self.language_id = language_id
+        self.network = network
+        self.month_range = month_range
+        self.batch_size = max(1, min(batch_size, self.MAX_KEYWORDS))
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        session.headers.update({'Authorization': f'Bearer {access_token}',
+                                'developer-token': developer_token})
+        if login_customer_id:
+            session.headers['login-customer-id'] = login_customer_id.replace('-', '')
+        self.session = session
+        self.cache = cache
+        self.latency = LatencyHistogram()
+        self.logger = logging.getLogger(__name__)
+
+        self._counters_lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.cache_hits = 0
+
+    @property
+    def region(self) -> str:
+        """Регион в ключе кэша: отсортированные geo_target_ids через запятую"""
+        return ','.join(str(geo_id) for geo_id in sorted(self.geo_target_ids))
+
+    @property
+    def period(self) -> str:
+        """Период в ключе кэша (язык и сеть тоже влияют на метрики)"""
+        months = '..'.join(self.month_range) if self.month_range else 'last12'
+        return f"{months}:{self.language_id}:{self.network}"
+
+    def acceptable(self, phrase: str) -> bool:
+        """Примет ли API фразу (слишком длинная валит весь запрос)"""
+        return (len(phrase) <= self.MAX_KEYWORD_LENGTH
+                and len(phrase.split()) <= self.MAX_KEYWORD_WORDS)
+
+    # --- Вызовы API ---
+
+    def _call(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Запрос GenerateKeywordHistoricalMetrics с ограничением частоты и повторами"""
+        url = (f"{self.url}/{self.version}/customers/{self.customer_id}"
+               f":generateKeywordHistoricalMetrics")
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            with self._counters_lock:
+                self.requests += 1
+            started = time.perf_counter()
+            try:
+                return self._request(url, body)
+            except GoogleAdsApiError as e:
+                if not e.retryable or attempt == self.max_retries:
+                    raise
+                error = e
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise GoogleAdsApiError(str(e), retryable=True) from e
+                error = e
+            finally:
+                self.latency.observe(time.perf_counter() - started)
+            delay = backoff_delay(attempt, self.backoff)
+            with self._counters_lock:
+                self.retries += 1
+            self.logger.debug("Google Ads: %s, повтор через %.2f с", error, delay)
+            time.sleep(delay)
+
+    def _request(self, url: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        response = self.session.post(url, json=body, timeout=self.timeout)
+        if response.status_code == 200:
+            return response.json()
+        try:
+            error = response.json().get('error', {})
+        except ValueError:
+            error = {}
+        status = response.status_code
+        message = f"HTTP {status} {error.get('status', '')} {error.get('message', '')}"
+        raise GoogleAdsApiError(message.strip(), status=status,
+                                retryable=status == 429 or status >= 500)
+
+    # --- Пакеты ---
+
+    def fetch_batch(self, phrases: Sequence[str]) -> Dict[str, Dict[str, float]]:
+        """
+        Метрики одного пакета фраз (один запрос)
+
+        API нормализует фразы и склеивает близкие варианты, поэтому ответ
+        сопоставляется по нормализованному тексту и closeVariants. Фраза
+        без данных получает нулевые метрики.
+
+        Returns:
+            dict: {фраза: {'frequency', 'competition', 'cpc'}}
+        """
+        if len(phrases) > self.MAX_KEYWORDS:
+            raise ValueError(f"В запросе не больше {self.MAX_KEYWORDS} фраз")
+        body: Dict[str, Any] = {
+            'keywords': list(phrases),
+            'language': f'languageConstants/{self.language_id}',
+            'keywordPlanNetwork': self.network,
+        }
+        if self.geo_target_ids:
+            body['geoTargetConstants'] = [f'geoTargetConstants/{geo_id}'
+                                          for geo_id in self.geo_target_ids]
+        if self.month_range:
+            start, end = ([int(part) for part in month.split('-')] for month in self.month_range)
+            body['historicalMetricsOptions'] = {'yearMonthRange': {
+                'start': {'year': start[0], 'month': MONTHS[start[1] - 1]},
+                'end': {'year': end[0], 'month': MONTHS[end[1] - 1]},
+            }}
+
+        by_text: Dict[str, Dict[str, float]] = {}
+        for result in self._call(body).get('results', []):
+            metrics = parse_metrics(result.get('keywordMetrics') or {})
+            for text in (result.get('text', ''), *result.get('closeVariants', [])):
+                by_text.setdefault(normalize(text), metrics)
+
+        empty = {'frequency': 0, 'competition': 0.0, 'cpc': 0.0}
+        return {phrase: dict(by_text.get(normalize(phrase), empty)) for phrase in phrases}
+
+    def fetch_metrics(self, phrases: Iterable[str],
+                      on_batch: Optional[Callable[[Dict[str, Dict[str, float]]], None]] = None
+                      ) -> Dict[str, Any]:
+        """
+        Метрики списка фраз: пакеты по batch_size, запросы параллельно
+
+        Args:
+            phrases: Фразы (повторы отправляются один раз)
+            on_batch: Вызывается в вызывающем потоке с результатом каждого
+                      готового пакета; найденное в кэше передаётся первым пакетом
+
+        Returns:
+            dict: {'metrics': {фраза: метрики}, 'failed': фразы пакетов
+                   с ошибкой, 'errors': тексты ошибок, 'skipped': фразы,
+                   которые API не примет, 'cached': сколько фраз взято из кэша}
+        """
+        unique = list(dict.fromkeys(phrases))
+        skipped = [phrase for phrase in unique if not self.acceptable(phrase)]
+        if skipped:
+            unique = [phrase for phrase in unique if self.acceptable(phrase)]
+
+        metrics: Dict[str, Dict[str, float]] = {}
+        if self.cache is not None and unique:
+            metrics = self.cache.get_many(self.CACHE_PROVIDER, unique, self.region, self.period)
+            if metrics:
+                unique = [phrase for phrase in unique if phrase not in metrics]
+                with self._counters_lock:
+                    self.cache_hits += len(metrics)
+                if on_batch is not None:
+                    on_batch(dict(metrics))
+        cached_count = len(metrics)
+
+        batches = [unique[start:start + self.batch_size]
+                   for start in range(0, len(unique), self.batch_size)]
+        failed: List[str] = []
+        errors: List[str] = []
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix='google-ads') as executor:
+            futures = {executor.submit(self.fetch_batch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failed.extend(futures[future])
+                    errors.append(str(e))
+                    self.logger.error("Пакет Google Ads из %d фраз не получен: %s",
+                                      len(futures[future]), e)
+                    continue
+                metrics.update(result)
+                if self.cache is not None:
+                    self.cache.put_many(self.CACHE_PROVIDER, result, self.region, self.period)
+                if on_batch is not None:
+                    on_batch(result)
+        return {'metrics': metrics, 'failed': failed, 'errors': errors, 'skipped': skipped,
+                'cached': cached_count}
+
+    def close(self):
+        self.session.close()
+
+
+def enrich_metrics(keyword_manager, client: GoogleAdsClient,
+                   keywords: Optional[Iterable[str]] = None, only_missing: bool = True,
+                   write_frequency: bool = False, write_every: int = 10000) -> Dict[str, Any]:
+    """
+    Заполнить CPC и конкуренцию ключевых слов менеджера из Google Ads
+
+    Результаты записываются в менеджер пакетами update_keywords_bulk по
+    write_every фраз. Частотность по умолчанию не трогается: в ядре она
+    из Wordstat.
+
+    Args:
+        keyword_manager: Объект KeywordManager
+        client: Клиент Google Ads
+        keywords: Какие фразы обогащать (None - все из менеджера)
+        only_missing: Только фразы с нулевыми CPC и конкуренцией
+        write_frequency: Записать и частотность Google
+        write_every: Сколько результатов копить до записи
+
+    Returns:
+        dict: {'requested', 'updated', 'failed', 'skipped', 'cached', 'requests',
+               'retries', 'elapsed', 'keywords_per_sec', 'latency'}
+    """
+    with keyword_manager.reading():
+        if keywords is None:
+            views = keyword_manager.get_all_keywords()
+        else:
+            views = [view for view in map(keyword_manager.get_keyword, keywords)
+                     if view is not None]
+        texts = [view.text for view in views
+                 if not only_missing or (view.cpc == 0 and view.competition == 0)]
+
+    stats: Dict[str, Any] = {'requested': len(texts), 'updated': 0}
+    fields = ('cpc', 'competition', 'frequency') if write_frequency else ('cpc', 'competition')
+    pending: Dict[str, Dict[str, float]] = {}
+
+    def write():
+        stats['updated'] += keyword_manager.update_keywords_bulk(pending)['updated']
+        pending.clear()
+
+    def on_batch(result: Dict[str, Dict[str, float]]):
+        for phrase, values in result.items():
+            pending[phrase] = {name: values[name] for name in fields if values[name] is not None}
+        if len(pending) >= write_every:
+            write()
+
+    requests_before, retries = client.requests, client.retries
+    started = time.perf_counter()
+    result = client.fetch_metrics(texts, on_batch=on_batch)
+    if pending:
+        write()
+    elapsed = time.perf_counter() - started
+    stats.update(failed=len(result['failed']), skipped=len(result['skipped']),
+                 cached=result['cached'], requests=client.requests - requests_before,
+                 retries=client.retries - retries, elapsed=round(elapsed, 3),
+                 keywords_per_sec=round(stats['updated'] / elapsed, 1) if elapsed else 0.0,
+                 latency=client.latency.snapshot())
+    return stats
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Гистограмма задержек вызовов внешних API
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Dict
+
+
+class LatencyHistogram:
+    """
+    Счётчики задержек по логарифмическим корзинам (границы в мс)
+
+    Процентили оцениваются по верхней границе корзины, поэтому
+    гистограмма занимает постоянную память при любом числе вызовов.
+    Потокобезопасна: вызовы из пула потоков пишут в одну гистограмму.
+    """
+
+    BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float):
+        """Добавить одну задержку (с)"""
+        ms = seconds * 1000
+        with self._lock:
+            self.counts[bisect_left(self.BOUNDS_MS, ms)] += 1
+            self.count += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> float:
+        """Оценка процентиля q (0..100) в мс: граница корзины, где он лежит"""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = q / 100 * self.count
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if count and seen >= rank and index < len(self.BOUNDS_MS):
+                    return float(self.BOUNDS_MS[index])
+            return self.max_ms
+
+    def snapshot(self) -> Dict:
+        """Сводка: число вызовов, среднее, процентили и непустые корзины"""
+        summary = {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 1) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 1),
+            'p50_ms': self.percentile(50),
+            'p90_ms': self.percentile(90),
+            'p99_ms': self.percentile(99),
+        }
+        with self._lock:
+            labels = [f"<={bound}ms" for bound in self.BOUNDS_MS] + [f">{self.BOUNDS_MS[-1]}ms"]
+            summary['buckets'] = {label: count for label, count in zip(labels, self.counts) if count}
+        return summary
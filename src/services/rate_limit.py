@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ограничение частоты запросов к внешним API
+Токен-бакет, общий для всех потоков клиента, и экспоненциальная
+задержка между повторами
+"""
+
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+
+class TokenBucket:
+    """
+    Токен-бакет: в среднем rate запросов в секунду, всплеск до capacity
+
+    Токены пополняются непрерывно; acquire() блокирует поток, пока токена
+    нет. Ожидание идёт вне блокировки, поэтому один медленный поток
+    не мешает другим забирать пополнение.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            rate: Токенов в секунду
+            capacity: Размер бакета (по умолчанию rate, но не меньше 1)
+            clock, sleep: Часы и ожидание (подменяются в тестах)
+        """
+        if rate <= 0:
+            raise ValueError("Частота должна быть положительной")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Забрать токены, если они есть
+
+        Returns:
+            float: 0, если токены забраны, иначе сколько секунд подождать
+        """
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Дождаться и забрать токены
+
+        Returns:
+            float: Сколько секунд пришлось ждать
+        """
+        waited = 0.0
+        while True:
+            delay = self.try_acquire(tokens)
+            if not delay:
+                return waited
+            self._sleep(delay)
+            waited += delay
+
+
+def backoff_delay(attempt: int, base: float, cap: float = 30.0) -> float:
+    """
+    Задержка перед повтором attempt (с нуля): экспонента с «полным джиттером»
+
+    Случайная задержка в [0, base * 2^attempt] разводит повторы потоков,
+    упёршихся в ограничение одновременно.
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
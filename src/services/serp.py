@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Кластеризация по выдаче (SERP): фразы с общими URL в топе поиска
+попадают в одну группу. Выдачи берутся из локального кэша SQLite,
+недостающие - у подключаемого поставщика (API съёма позиций, парсер)
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from ..core.clustering import greedy_clusters, serp_edges
+from ..core.normalizer import normalize
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS serps (
+    engine TEXT NOT NULL,
+    region TEXT NOT NULL,
+    phrase TEXT NOT NULL,
+    urls BLOB NOT NULL,
+    fetched REAL NOT NULL,
+    PRIMARY KEY (engine, region, phrase)
+);
+CREATE INDEX IF NOT EXISTS serps_fetched ON serps (fetched);
+"""
+
+
+class StaticSerpProvider:
+    """
+    Поставщик выдачи из готового словаря {фраза: [URL]}
+
+    Используется в тестах и для выдач, снятых внешним инструментом.
+    Любой другой поставщик - объект с атрибутами name, region
+    и методом fetch(phrases) -> {фраза: [URL в порядке позиций]}.
+    """
+
+    def __init__(self, results: Dict[str, List[str]], name: str = 'static', region: str = ''):
+        self.name = name
+        self.region = region
+        self.results = {normalize(phrase): urls for phrase, urls in results.items()}
+        self.requests = 0
+        self.phrases_requested = 0
+
+    def fetch(self, phrases: Sequence[str]) -> Dict[str, List[str]]:
+        self.requests += 1
+        self.phrases_requested += len(phrases)
+        return {phrase: self.results[phrase] for phrase in phrases if phrase in self.results}
+
+
+class SerpCache:
+    """
+    Кэш выдач в SQLite
+
+    URL хранятся один раз в таблице urls, выдача фразы - массив номеров
+    URL (int32) в BLOB: сотни тысяч выдач по 10 URL занимают в несколько
+    раз меньше места, чем тексты, а номера сразу пригодны для сравнения.
+    Запись старше ttl считается отсутствующей.
+    """
+
+    def __init__(self, path: str, ttl: float = 14 * 24 * 3600, clock=time.time):
+        """
+        Args:
+            path: Файл кэша (создаётся при отсутствии)
+            ttl: Время жизни выдачи (с)
+            clock: Часы (подменяются в тестах)
+        """
+        self.path = path
+        self.ttl = ttl
+        self._clock = clock
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                                     timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _intern(self, urls: Iterable[str]) -> Dict[str, int]:
+        """Номера URL; новые URL добавляются (другие процессы могут добавлять те же)"""
+        missing = list({url for url in urls if url not in self._ids})
+        for start in range(0, len(missing), 500):
+            part = missing[start:start + 500]
+            self._conn.executemany("INSERT OR IGNORE INTO urls (url) VALUES (?)",
+                                   [(url,) for url in part])
+            self._ids.update(self._conn.execute(
+                "SELECT url, id FROM urls WHERE url IN (" + ", ".join('?' * len(part)) + ")",
+                part))
+        return self._ids
+
+    def get_many(self, engine: str, region: str,
+                 phrases: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        Свежие выдачи нормализованных фраз
+
+        Returns:
+            dict: {фраза: массив номеров URL} только для найденных
+        """
+        oldest = self._clock() - self.ttl
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for start in range(0, len(phrases), 500):
+                part = list(phrases[start:start + 500])
+                query = ("SELECT phrase, urls FROM serps WHERE engine = ? AND region = ? "
+                         "AND fetched >= ? AND phrase IN (" + ", ".join('?' * len(part)) + ")")
+                for phrase, blob in self._conn.execute(query, (engine, region, oldest, *part)):
+                    found[phrase] = np.frombuffer(blob, dtype=np.int32)
+            self.hits += len(found)
+            self.misses += len(phrases) - len(found)
+        return found
+
+    def put_many(self, engine: str, region: str,
+                 serps: Dict[str, List[str]]) -> Dict[str, np.ndarray]:
+        """
+        Сохранить выдачи
+
+        Returns:
+            dict: {фраза: массив номеров URL} - те же выдачи в виде номеров
+        """
+        now = self._clock()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                ids = self._intern(url for urls in serps.values() for url in urls)
+                encoded = {phrase: np.array([ids[url] for url in urls], dtype=np.int32)
+                           for phrase, urls in serps.items()}
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO serps (engine, region, phrase, urls, fetched) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(engine, region, phrase, values.tobytes(), now)
+                     for phrase, values in encoded.items()])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return encoded
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            serps = self._conn.execute("SELECT COUNT(*) FROM serps").fetchone()[0]
+            urls = self._conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {'serps': serps, 'urls': urls, 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM serps")
+            self._conn.execute("DELETE FROM urls")
+            self._ids.clear()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SerpClusterer:
+    """
+    Кластеризация фраз по общим URL в топе выдачи
+
+    Две фразы связаны, если в их топ-depth не меньше min_overlap общих URL.
+    Группы строятся вокруг самых частотных фраз: в режиме hard фраза
+    принимается в группу, только если связана со всеми её фразами, в режиме
+    soft - если связана с главной (см. greedy_clusters).
+
+    URL заменяются номерами (кэша или локальными), общие URL считаются
+    векторно по инвертированному индексу - без множеств Python.
+
+        clusterer = SerpClusterer(provider, SerpCache("serp.sqlite"), min_overlap=3)
+        manager.cluster_keywords(clusterer=clusterer)
+    """
+
+    def __init__(self, provider=None, cache: Optional[SerpCache] = None, min_overlap: int = 3,
+                 depth: int = 10, mode: str = 'hard', max_url_df: int = 1000,
+                 batch_size: int = 1000):
+        """
+        Args:
+            provider: Поставщик выдачи (name, region, fetch); None - только кэш
+            cache: Кэш выдач
+            min_overlap: Порог - сколько общих URL связывают фразы
+            depth: Сколько первых URL выдачи учитывать
+            mode: hard или soft
+            max_url_df: URL из большего числа выдач не учитываются
+            batch_size: Фраз в одном запросе к поставщику
+
+        Raises:
+            ValueError: Неизвестный режим или порог вне [1, depth]
+        """
+        if mode not in ('hard', 'soft'):
+            raise ValueError(f"Неизвестный режим кластеризации: {mode}")
+        if not 1 <= min_overlap <= depth:
+            raise ValueError(f"Порог общих URL должен быть от 1 до {depth}: {min_overlap}")
+        self.provider = provider
+        self.cache = cache
+        self.min_overlap = min_overlap
+        self.depth = depth
+        self.mode = mode
+        self.max_url_df = max_url_df
+        self.batch_size = batch_size
+        self.stats: Dict[str, float] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def _source(self):
+        name = getattr(self.provider, 'name', 'serp')
+        return name, str(getattr(self.provider, 'region', ''))
+
+    def load(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Выдачи фраз: из кэша, недостающие - у поставщика (с сохранением в кэш)
+
+        Returns:
+            list: Номера URL для каждой фразы (None - выдачи нет)
+        """
+        engine, region = self._source()
+        serps: Dict[str, np.ndarray] = {}
+        local: Dict[str, int] = {}
+        fetched = 0
+        for start in range(0, len(texts), self.batch_size):
+            batch = list(dict.fromkeys(texts[start:start + self.batch_size]))
+            found = self.cache.get_many(engine, region, batch) if self.cache else {}
+            missing = [text for text in batch if text not in found]
+            if missing and self.provider is not None:
+                results = {phrase: list(dict.fromkeys(urls))[:self.depth]
+                           for phrase, urls in self.provider.fetch(missing).items() if urls}
+                fetched += len(results)
+                if self.cache is not None:
+                    found.update(self.cache.put_many(engine, region, results))
+                else:
+                    found.update((phrase, np.array([local.setdefault(url, len(local))
+                                                    for url in urls], dtype=np.int32))
+                                 for phrase, urls in results.items())
+            serps.update(found)
+        self.stats.update(fetched=fetched, with_serp=len(serps))
+        return [serps.get(text) for text in texts]
+
+    def fit(self, texts: Sequence[str], frequencies: Optional[Sequence[int]] = None) -> np.ndarray:
+        """
+        Кластеризовать нормализованные фразы
+
+        Returns:
+            np.ndarray: Метка каждой фразы - номер главной фразы кластера
+            (фразы без выдачи и без пары - сами себе)
+        """
+        started = time.perf_counter()
+        self.stats = {'phrases': len(texts)}
+        serps = self.load(texts)
+        lengths = np.fromiter((0 if urls is None else min(len(urls), self.depth)
+                               for urls in serps), dtype=np.int64, count=len(texts))
+        flat = [urls[:self.depth] for urls in serps if urls is not None]
+        ids = np.concatenate(flat) if flat else np.zeros(0, dtype=np.int32)
+        # Номера кэша разрежены - сжимаем в 0..число URL
+        _, ids = np.unique(ids, return_inverse=True)
+        indptr = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+
+        left, right, stats = serp_edges(indptr, ids, self.min_overlap, self.max_url_df)
+        labels = greedy_clusters(len(texts), left, right, frequencies, self.mode)
+        self.stats.update(stats, seconds=round(time.perf_counter() - started, 3))
+        self.logger.info("Кластеризация по выдаче: %s", self.stats)
+        return labels
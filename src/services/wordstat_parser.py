@@ -1,161 +1,271 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-Простой тест - добавляет в sys.path и импортирует правильно
+Парсер выгрузок Яндекс.Wordstat (Excel)
+Читает файл потоково через openpyxl в режиме read-only и отдаёт данные
+пакетами, поэтому память не зависит от размера выгрузки
 """
 
-import sys
+import logging
 import os
+import re
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
-# Добавляем папки в путь поиска модулей
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src', 'services'))
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src', 'core'))
-
-def simple_test():
-    """Простой тест добавления всех ключевых слов"""
-    
-    print("🧪 ПРОСТОЙ ФИНАЛЬНЫЙ ТЕСТ")
-    print("="*50)
-    
-    try:
-        # Пробуем импорт
-        print("🔍 Попытка импорта...")
-        
-        # Импортируем напрямую из папок
-        from wordstat_parser import WordstatParser
-        from keyword_manager import KeywordManager, Keyword
-        
-        print("✅ Импорты успешны!")
-        
-        # Создаем объекты
-        parser = WordstatParser()
-        manager = KeywordManager()
-        
-        print("✅ Объекты созданы!")
-        
-        # Загружаем данные
-        parser.parse_file("data/input/геологоразведка wordstat.xlsx")
-        
-        print(f"📁 Загружено: {len(parser.keywords)} ключевых слов")
-        
-        # Показываем первые 3
-        print(f"\n🔍 Первые 3 ключевых слова:")
-        for i, kw_data in enumerate(parser.keywords[:3]):
-            keyword = kw_data.get('keyword', '')
-            frequency = kw_data.get('frequency', 0)
-            print(f"   {i+1}. '{keyword}' → {frequency}")
-        
-        # Добавляем ВСЕ в менеджер
-        print(f"\n🚀 Добавляем все ключевые слова...")
-        
-        added = 0
-        for kw_data in parser.keywords:
-            keyword_text = kw_data.get('keyword', '').strip()
-            frequency = kw_data.get('frequency', 0)
-            
-            if keyword_text:
-                success = manager.add_keyword(
-                    keyword=keyword_text,
-                    frequency=frequency,
-                    cpc=0.0
-                )
-                if success:
-                    added += 1
-        
-        total = len(manager.keywords)
-        
-        print(f"\n📊 РЕЗУЛЬТАТЫ:")
-        print(f"   📁 В файле: {len(parser.keywords)}")
-        print(f"   ✅ Добавлено: {added}")
-        print(f"   🎯 В менеджере: {total}")
-        
-        # Проверяем частотность
-        print(f"\n🔍 Частотность первых 5:")
-        for i, kw in enumerate(manager.keywords[:5]):
-            print(f"   {i+1}. '{kw.text}' → {kw.frequency}")
-        
-        # Топ по частотности
-        sorted_kw = sorted(manager.keywords, key=lambda x: x.frequency, reverse=True)
-        max_freq = sorted_kw[0].frequency if sorted_kw else 0
-        
-        print(f"\n🏆 Топ-3 по частотности:")
-        for i, kw in enumerate(sorted_kw[:3], 1):
-            print(f"   {i}. '{kw.text}' → {kw.frequency:,}")
-        
-        # Итог
-        if total == len(parser.keywords) and max_freq > 10000:
-            print(f"\n🎉 ПОЛНЫЙ УСПЕХ!")
-            print(f"   ✅ Все {total} ключевых слов добавлены!")
-            print(f"   ✅ Частотность правильная: {max_freq:,}")
-            return True
-        elif total >= len(parser.keywords) * 0.95:
-            print(f"\n✅ ПОЧТИ УСПЕХ!")
-            print(f"   ✅ {total} из {len(parser.keywords)} добавлено (95%+)")
-            print(f"   ✅ Максимальная частота: {max_freq:,}")
-            return True
-        else:
-            print(f"\n⚠️ ПРОБЛЕМЫ:")
-            print(f"   ❌ Добавлено только {total} из {len(parser.keywords)}")
-            print(f"   ❌ Максимальная частота: {max_freq}")
-            return False
-            
-    except ImportError as e:
-        print(f"❌ Ошибка импорта: {e}")
-        
-        print(f"\n🔧 Попробуем план Б...")
-        
-        # План Б - прямой импорт
+import numpy as np
+import pandas as pd
+
+from ..core.clustering import KeywordClusterer, cluster_names
+from ..core.normalizer import normalize
+
+
+# Заголовки колонок в выгрузках Wordstat (в нижнем регистре)
+PHRASE_HEADERS = ('формулировка', 'фраза', 'ключевая фраза', 'запрос', 'ключевое слово',
+                  'keyword', 'phrase', 'query')
+FREQUENCY_HEADERS = ('число запросов', 'частотность', 'частота', 'показов в месяц',
+                     'количество запросов', 'frequency', 'impressions', 'count')
+
+# Разделители разрядов в числах, сохранённых как текст ("2 000", "11,047")
+_THOUSANDS = re.compile(r'[\s,]')
+
+
+def parse_frequency(values: Sequence[Any]) -> np.ndarray:
+    """
+    Векторное преобразование частотности в int64
+
+    Числа берутся как есть, строки очищаются от разделителей разрядов,
+    всё остальное (пустые ячейки, текст) превращается в 0.
+    """
+    series = pd.Series(values, dtype=object)
+    numeric = pd.to_numeric(series, errors='coerce')
+    textual = numeric.isna() & series.map(lambda value: isinstance(value, str))
+    if textual.any():
+        cleaned = series[textual].str.replace(_THOUSANDS, '', regex=True)
+        numeric[textual] = pd.to_numeric(cleaned, errors='coerce')
+    return numeric.fillna(0).to_numpy(dtype=np.float64).astype(np.int64)
+
+
+class SheetLayout:
+    """Расположение данных на листе: номера колонок и первая строка данных"""
+
+    __slots__ = ('phrase_column', 'frequency_column', 'first_row')
+
+    def __init__(self, phrase_column: int, frequency_column: Optional[int], first_row: int):
+        self.phrase_column = phrase_column
+        self.frequency_column = frequency_column
+        self.first_row = first_row
+
+    def __repr__(self):
+        return (f"SheetLayout(phrase={self.phrase_column}, frequency={self.frequency_column}, "
+                f"first_row={self.first_row})")
+
+
+class WordstatParser:
+    """
+    Потоковый парсер Excel-выгрузок Wordstat
+
+    Колонки фразы и частотности определяются один раз для каждого листа
+    по первым строкам (по заголовку, а если его нет - по типам значений),
+    после чего строки читаются только из этих двух колонок.
+    """
+
+    # Сколько первых строк листа просматривать при поиске заголовка
+    DETECT_ROWS = 20
+
+    def __init__(self, batch_size: int = 5000):
+        """
+        Args:
+            batch_size: Количество строк в одном пакете
+        """
+        self.batch_size = batch_size
+        self.keywords: List[Dict[str, Any]] = []
+        self.errors: List[str] = []
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def _match(value, headers: Tuple[str, ...]) -> bool:
+        return isinstance(value, str) and value.strip().lower() in headers
+
+    def detect_layout(self, rows: List[tuple]) -> Optional[SheetLayout]:
+        """
+        Определить колонки фразы и частотности по первым строкам листа
+
+        Args:
+            rows: Первые строки листа (значения ячеек)
+
+        Returns:
+            SheetLayout или None, если на листе нет колонки с фразами
+        """
+        for index, row in enumerate(rows):
+            phrase = next((i for i, value in enumerate(row) if self._match(value, PHRASE_HEADERS)), None)
+            if phrase is None:
+                continue
+            frequency = next((i for i, value in enumerate(row)
+                              if self._match(value, FREQUENCY_HEADERS)), None)
+            return SheetLayout(phrase, frequency, index + 1)
+
+        # Заголовка нет: фразы - первая текстовая колонка, частотность - первая числовая
+        width = max((len(row) for row in rows), default=0)
+        phrase = frequency = None
+        for column in range(width):
+            values = [row[column] for row in rows if column < len(row) and row[column] is not None]
+            if not values:
+                continue
+            if phrase is None and sum(isinstance(value, str) for value in values) > len(values) / 2:
+                phrase = column
+            elif (frequency is None
+                  and sum(isinstance(value, (int, float)) for value in values) > len(values) / 2):
+                frequency = column
+        if phrase is None:
+            return None
+        return SheetLayout(phrase, frequency, 0)
+
+    def iter_batches(self, file_path: str,
+                     sheets: Optional[Sequence[str]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Читать выгрузку пакетами
+
+        Args:
+            file_path: Путь к .xlsx файлу
+            sheets: Имена листов (None - все листы)
+
+        Yields:
+            pd.DataFrame с колонками keyword (str), frequency (int64) и sheet
+        """
+        from openpyxl import load_workbook
+
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension not in ('.xlsx', '.xlsm'):
+            raise ValueError(f"Неподдерживаемый формат файла Wordstat: {extension}")
+
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
         try:
-            sys.path.append('src/services')
-            sys.path.append('src/core')
-            
-            import importlib.util
-            
-            # Импортируем файлы напрямую
-            wordstat_spec = importlib.util.spec_from_file_location(
-                "wordstat_parser", 
-                "src/services/wordstat_parser.py"
-            )
-            wordstat_module = importlib.util.module_from_spec(wordstat_spec)
-            
-            keyword_spec = importlib.util.spec_from_file_location(
-                "keyword_manager", 
-                "src/core/keyword_manager.py"
-            )
-            keyword_module = importlib.util.module_from_spec(keyword_spec)
-            
-            print("✅ Файлы найдены, пробуем загрузить...")
-            
-            return False  # Остановимся пока на диагностике
-            
-        except Exception as e:
-            print(f"❌ План Б тоже не сработал: {e}")
-            
-            print(f"\n📋 Проверьте файлы:")
-            print(f"   1. src/services/wordstat_parser.py - есть ли класс WordstatParser?")
-            print(f"   2. src/core/keyword_manager.py - есть ли класс KeywordManager?")
-            print(f"   3. Нет ли циклических импортов в файлах?")
-            
-            return False
-    
-    except Exception as e:
-        print(f"❌ Другая ошибка: {e}")
-        return False
-
-
-if __name__ == "__main__":
-    success = simple_test()
-    
-    if success:
-        print(f"\n🎊 Тест успешен!")
-    else:
-        print(f"\n🔧 Нужна отладка...")
-        
-        # Показываем содержимое проблемного файла
-        print(f"\n📋 Первые 10 строк wordstat_parser.py:")
+            for sheet in workbook.worksheets:
+                if sheets is not None and sheet.title not in sheets:
+                    continue
+                yield from self._iter_sheet(sheet)
+        finally:
+            workbook.close()
+
+    def _iter_sheet(self, sheet) -> Iterator[pd.DataFrame]:
+        """Пакеты одного листа"""
+        head = list(sheet.iter_rows(max_row=self.DETECT_ROWS, values_only=True))
+        layout = self.detect_layout(head)
+        if layout is None:
+            self.logger.info("Лист '%s': колонка с фразами не найдена, пропускаем", sheet.title)
+            return
+        self.logger.info("Лист '%s': %r", sheet.title, layout)
+
+        # Читаем только нужные колонки (нумерация openpyxl с единицы)
+        columns = [layout.phrase_column]
+        if layout.frequency_column is not None:
+            columns.append(layout.frequency_column)
+        rows = sheet.iter_rows(min_row=layout.first_row + 1, min_col=min(columns) + 1,
+                               max_col=max(columns) + 1, values_only=True)
+        phrase_at = layout.phrase_column - min(columns)
+        frequency_at = None if layout.frequency_column is None else layout.frequency_column - min(columns)
+
+        phrases, frequencies = [], []
+        for row in rows:
+            if not row or phrase_at >= len(row):
+                continue
+            phrase = row[phrase_at]
+            if phrase is None:
+                continue
+            phrases.append(phrase)
+            frequencies.append(row[frequency_at] if frequency_at is not None
+                               and frequency_at < len(row) else None)
+            if len(phrases) >= self.batch_size:
+                yield self._batch(phrases, frequencies, sheet.title)
+                phrases, frequencies = [], []
+        if phrases:
+            yield self._batch(phrases, frequencies, sheet.title)
+
+    @staticmethod
+    def _batch(phrases: List[Any], frequencies: List[Any], sheet: str) -> pd.DataFrame:
+        keywords = pd.Series(phrases, dtype=object)
+        # Числа в колонке фраз (например "1") приводим к строке
+        numeric = ~keywords.map(lambda value: isinstance(value, str))
+        if numeric.any():
+            keywords[numeric] = keywords[numeric].astype(str)
+        return pd.DataFrame({
+            'keyword': keywords,
+            'frequency': parse_frequency(frequencies),
+            'sheet': sheet
+        })
+
+    def load_into(self, keyword_manager, file_path: str, sheets: Optional[Sequence[str]] = None,
+                  min_frequency: int = 0, source: str = "wordstat") -> Dict[str, int]:
+        """
+        Загрузить выгрузку в KeywordManager пакетами (add_keywords_batch)
+
+        Args:
+            keyword_manager: Объект KeywordManager
+            file_path: Путь к .xlsx файлу
+            sheets: Имена листов (None - все листы)
+            min_frequency: Пропускать фразы с меньшей частотностью
+            source: Источник, записываемый в ключевые слова
+
+        Returns:
+            dict: {'rows', 'added', 'duplicates', 'errors', 'skipped'}
+        """
+        stats = {'rows': 0, 'added': 0, 'duplicates': 0, 'errors': 0, 'skipped': 0}
+        for batch in self.iter_batches(file_path, sheets):
+            stats['rows'] += len(batch)
+            if min_frequency:
+                keep = batch['frequency'].to_numpy() >= min_frequency
+                stats['skipped'] += int((~keep).sum())
+                batch = batch[keep]
+            result = keyword_manager.add_keywords_batch(batch['keyword'],
+                                                        frequency=batch['frequency'].to_numpy(),
+                                                        source=source)
+            for key in ('added', 'duplicates', 'errors'):
+                stats[key] += result[key]
+        self.logger.info("Загружено из %s: %s", file_path, stats)
+        return stats
+
+    def parse_file(self, file_path: str, sheets: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Прочитать выгрузку целиком в self.keywords (список словарей)
+
+        Оставлено для небольших файлов и старого кода
+        (FixedWordstatIntegration); для больших выгрузок используйте
+        iter_batches или load_into.
+        """
+        self.keywords = []
+        self.errors = []
         try:
-            with open('src/services/wordstat_parser.py', 'r', encoding='utf-8', errors='ignore') as f:
-                for i, line in enumerate(f.readlines()[:10], 1):
-                    print(f"   {i:2d}: {line.rstrip()}")
-        except:
-            print("❌ Не удалось прочитать файл")
\ No newline at end of file
+            for batch in self.iter_batches(file_path, sheets):
+                self.keywords.extend(
+                    {'keyword': keyword.strip(), 'frequency': int(frequency), 'sheet': sheet}
+                    for keyword, frequency, sheet in batch.itertuples(index=False, name=None))
+        except Exception as e:
+            self.errors.append(f"Ошибка чтения {file_path}: {e}")
+            self.logger.error("Ошибка чтения %s: %s", file_path, e)
+        return self.keywords
+
+    def get_keyword_groups(self, threshold: float = 0.5,
+                           min_size: int = 2) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Сгруппировать прочитанные фразы (self.keywords) по сходству состава слов
+
+        Группа называется самой частотной фразой; фразы без пары попадают
+        в группу с пустым именем.
+
+        Args:
+            threshold: Порог сходства (см. KeywordClusterer)
+            min_size: Минимальный размер группы
+
+        Returns:
+            Dict: {имя группы: [словари фраз]} для add_keywords_by_groups
+        """
+        texts = [normalize(item['keyword']) for item in self.keywords]
+        labels = KeywordClusterer(threshold).fit(texts)
+        rows, heads = cluster_names(labels, [item['frequency'] for item in self.keywords],
+                                    min_size)
+        names = [""] * len(texts)
+        for row, head in zip(rows.tolist(), heads.tolist()):
+            names[row] = self.keywords[head]['keyword']
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for name, item in zip(names, self.keywords):
+            groups.setdefault(name, []).append(item)
+        return groups
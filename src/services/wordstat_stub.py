@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Локальная заглушка API Wordstat (Директ v4 Live) для тестов и бенчмарков
+Реализует методы отчётов Wordstat, задержку ответа, ограничение частоты
+и заданное количество сбоев
+"""
+
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+
+def stub_frequency(phrase: str) -> int:
+    """Детерминированная «частотность» фразы в заглушке"""
+    return zlib.crc32(phrase.encode('utf-8')) % 100000
+
+
+class StubWordstatServer:
+    """
+    HTTP-сервер заглушки на 127.0.0.1 (порт выбирается свободный)
+
+    Отчёт готов после ready_after проверок списка отчётов. Первые
+    fail_first вызовов отвечают HTTP 503, вызовы сверх max_rate в секунду
+    получают ошибку 56; одновременно хранится не больше max_reports
+    отчётов (ошибка 31).
+
+        with StubWordstatServer(latency=0.05) as server:
+            client = YandexWordstatClient("token", url=server.url)
+    """
+
+    def __init__(self, latency: float = 0.0, ready_after: int = 1, fail_first: int = 0,
+                 max_rate: float = 0.0, max_reports: int = 5):
+        self.latency = latency
+        self.ready_after = ready_after
+        self.fail_first = fail_first
+        self.max_rate = max_rate
+        self.max_reports = max_reports
+        self.calls: Dict[str, int] = {}
+        self.phrases_per_report: List[int] = []
+        self._reports: Dict[int, Dict] = {}
+        self._next_id = 1
+        self._window: List[float] = []
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                status, answer = stub._handle(body)
+                data = json.dumps(answer, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/json/"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handle(self, body: Dict):
+        if self.latency:
+            time.sleep(self.latency)
+        method = body.get('method')
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                return 503, {}
+            if self.max_rate:
+                now = time.monotonic()
+                self._window = [moment for moment in self._window if now - moment < 1.0]
+                if len(self._window) >= self.max_rate:
+                    return 200, {'error_code': 56, 'error_str': 'Превышен лимит запросов'}
+                self._window.append(now)
+
+            if method == 'CreateNewWordstatReport':
+                if len(self._reports) >= self.max_reports:
+                    return 200, {'error_code': 31, 'error_str': 'Очередь отчётов заполнена'}
+                phrases = body['param']['Phrases']
+                report_id = self._next_id
+                self._next_id += 1
+                self._reports[report_id] = {'phrases': phrases, 'polls': 0}
+                self.phrases_per_report.append(len(phrases))
+                return 200, {'data': report_id}
+            if method == 'GetWordstatReportList':
+                reports = []
+                for report_id, report in self._reports.items():
+                    report['polls'] += 1
+                    status = 'Done' if report['polls'] >= self.ready_after else 'Pending'
+                    reports.append({'ReportID': report_id, 'StatusReport': status})
+                return 200, {'data': reports}
+            if method == 'GetWordstatReport':
+                report = self._reports[body['param']]
+                return 200, {'data': [{
+                    'Phrase': phrase,
+                    'GeoID': [],
+                    'SearchedWith': [{'Phrase': phrase, 'Shows': stub_frequency(phrase)}],
+                    'SearchedAlso': [],
+                } for phrase in report['phrases']]}
+            if method == 'DeleteWordstatReport':
+                self._reports.pop(body['param'], None)
+                return 200, {'data': 1}
+        return 200, {'error_code': 55, 'error_str': f'Неизвестный метод {method}'}
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Клиент Яндекс.Wordstat (API Директа v4 Live) для получения частотности
+Фразы отправляются отчётами по MAX_PHRASES штук, отчёты выполняются
+параллельно в пуле потоков под общим ограничением частоты запросов
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .frequency_cache import FrequencyCache
+from .rate_limit import TokenBucket, backoff_delay
+
+API_URL = 'https://api.direct.yandex.ru/live/v4/json/'
+
+
+class WordstatApiError(Exception):
+    """Ошибка API Wordstat (error_code из ответа или HTTP-статус)"""
+
+    def __init__(self, message: str, code: Optional[int] = None, retryable: bool = False):
+        super().__init__(message)
+        self.code = code
+        self.retryable = retryable
+
+
+class YandexWordstatClient:
+    """
+    Частотность фраз через отчёты Wordstat
+
+    Отчёт - это CreateNewWordstatReport (до MAX_PHRASES фраз), ожидание
+    статуса Done в GetWordstatReportList, GetWordstatReport и удаление
+    отчёта. Отчёты разных пакетов выполняются параллельно (не больше
+    MAX_REPORTS одновременно - столько API хранит на пользователя).
+    Каждый вызов API забирает токен из общего токен-бакета; сетевые
+    ошибки, HTTP 429/5xx и временные ошибки API повторяются
+    с экспоненциальной задержкой. С кэшем частотности в API уходят только
+    фразы, которых нет в кэше (или запись в нём устарела).
+    """
+
+    # Имя источника в кэше частотности
+    CACHE_PROVIDER = 'wordstat'
+
+    # Ограничения API: фраз в отчёте и одновременно хранимых отчётов
+    MAX_PHRASES = 10
+    MAX_REPORTS = 5
+    # Временные ошибки API: 52 - сервер временно недоступен,
+    # 56 - превышен лимит запросов к методу, 31 - очередь отчётов заполнена
+    RETRYABLE_CODES = frozenset({31, 52, 56})
+
+    def __init__(self, token: str, url: str = API_URL, geo_ids: Sequence[int] = (),
+                 batch_size: int = MAX_PHRASES, max_workers: int = MAX_REPORTS,
+                 rate: float = 5.0, burst: Optional[float] = None, max_retries: int = 5,
+                 backoff: float = 0.5, poll_interval: float = 2.0, report_timeout: float = 300.0,
+                 timeout: float = 30.0, session: Optional[requests.Session] = None,
+                 cache: Optional[FrequencyCache] = None, period: str = 'month'):
+        """
+        Args:
+            token: OAuth-токен Директа
+            url: Адрес JSON API (подменяется заглушкой в тестах)
+            geo_ids: Регионы (пусто - все)
+            batch_size: Фраз в одном отчёте (не больше MAX_PHRASES)
+            max_workers: Отчётов одновременно
+            rate, burst: Вызовов API в секунду и допустимый всплеск
+            max_retries: Повторов одного вызова при временной ошибке
+            backoff: Базовая задержка повтора (с), удваивается с каждой попыткой
+            poll_interval: Пауза между проверками готовности отчёта (с)
+            report_timeout: Сколько ждать готовности отчёта (с)
+            timeout: Таймаут HTTP-запроса (с)
+            session: Готовая requests.Session (по умолчанию своя, с пулом
+                     соединений на max_workers)
+            cache: Кэш частотности (None - всегда запрашивать API)
+            period: Период статистики в ключе кэша (Wordstat отдаёт последний месяц)
+        """
+        self.token = token
+        self.url = url
+        self.geo_ids = list(geo_ids)
+        self.batch_size = max(1, min(batch_size, self.MAX_PHRASES))
+        self.max_workers = max(1, min(max_workers, self.MAX_REPORTS))
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.poll_interval = poll_interval
+        self.report_timeout = report_timeout
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+        self.cache = cache
+        self.period = period
+        self.logger = logging.getLogger(__name__)
+
+        self._counters_lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.cache_hits = 0
+
+    @property
+    def region(self) -> str:
+        """Регион в ключе кэша: отсортированные geo_ids через запятую"""
+        return ','.join(str(geo_id) for geo_id in sorted(self.geo_ids))
+
+    # --- Вызовы API ---
+
+    def _call(self, method: str, param: Any = None) -> Any:
+        """Вызов метода API с ограничением частоты и повторами; возвращает поле data"""
+        payload = {'method': method, 'token': self.token, 'locale': 'ru'}
+        if param is not None:
+            payload['param'] = param
+
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            with self._counters_lock:
+                self.calls += 1
+            try:
+                return self._request(payload)
+            except WordstatApiError as e:
+                if not e.retryable or attempt == self.max_retries:
+                    raise
+                error = e
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise WordstatApiError(f"{method}: {e}", retryable=True) from e
+                error = e
+            delay = backoff_delay(attempt, self.backoff)
+            with self._counters_lock:
+                self.retries += 1
+            self.logger.debug("%s: %s, повтор через %.2f с", method, error, delay)
+            time.sleep(delay)
+
+    def _request(self, payload: Dict[str, Any]) -> Any:
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        if response.status_code == 429 or response.status_code >= 500:
+            raise WordstatApiError(f"{payload['method']}: HTTP {response.status_code}",
+                                   code=response.status_code, retryable=True)
+        if response.status_code != 200:
+            raise WordstatApiError(f"{payload['method']}: HTTP {response.status_code}",
+                                   code=response.status_code)
+        body = response.json()
+        if 'error_code' in body:
+            code = int(body['error_code'])
+            message = f"{body.get('error_str', '')} {body.get('error_detail', '')}".strip()
+            raise WordstatApiError(f"{payload['method']}: {message} ({code})",
+                                   code=code, retryable=code in self.RETRYABLE_CODES)
+        return body.get('data')
+
+    # --- Отчёты ---
+
+    def fetch_batch(self, phrases: Sequence[str]) -> Dict[str, int]:
+        """
+        Частотность одного пакета фраз (один отчёт)
+
+        Returns:
+            dict: {фраза: число показов в месяц}
+        """
+        if len(phrases) > self.MAX_PHRASES:
+            raise ValueError(f"В отчёте не больше {self.MAX_PHRASES} фраз")
+        param = {'Phrases': list(phrases)}
+        if self.geo_ids:
+            param['GeoID'] = self.geo_ids
+        report_id = self._call('CreateNewWordstatReport', param)
+        try:
+            self._wait_report(report_id)
+            items = self._call('GetWordstatReport', report_id) or []
+        finally:
+            try:
+                self._call('DeleteWordstatReport', report_id)
+            except Exception:
+                # Неудалённый отчёт занимает место в очереди - только предупреждаем
+                self.logger.warning("Не удалось удалить отчёт Wordstat %s", report_id)
+
+        # Элементы отчёта идут в порядке фраз; первая строка SearchedWith - сама фраза
+        result = {}
+        for phrase, item in zip(phrases, items):
+            searched_with = item.get('SearchedWith') or []
+            result[phrase] = int(searched_with[0].get('Shows', 0)) if searched_with else 0
+        return result
+
+    def _wait_report(self, report_id: int):
+        deadline = time.monotonic() + self.report_timeout
+        while True:
+            reports = self._call('GetWordstatReportList') or []
+            status = next((report.get('StatusReport') for report in reports
+                           if report.get('ReportID') == report_id), None)
+            if status == 'Done':
+                return
+            if status == 'Failed':
+                raise WordstatApiError(f"Отчёт {report_id} завершился ошибкой")
+            if time.monotonic() > deadline:
+                raise WordstatApiError(f"Отчёт {report_id} не готов за {self.report_timeout} с")
+            time.sleep(self.poll_interval)
+
+    def fetch_frequencies(self, phrases: Iterable[str],
+                          on_batch: Optional[Callable[[Dict[str, int]], None]] = None
+                          ) -> Dict[str, Any]:
+        """
+        Частотность списка фраз: пакеты по batch_size, отчёты параллельно
+
+        Args:
+            phrases: Фразы (повторы отправляются один раз)
+            on_batch: Вызывается в вызывающем потоке с результатом каждого
+                      готового пакета (например, запись в менеджер); найденное
+                      в кэше передаётся первым пакетом
+
+        Returns:
+            dict: {'frequencies': {фраза: показы}, 'failed': фразы пакетов
+                   с ошибкой, 'errors': тексты ошибок, 'cached': сколько
+                   фраз взято из кэша}
+        """
+        unique = list(dict.fromkeys(phrases))
+        frequencies: Dict[str, int] = {}
+        if self.cache is not None and unique:
+            cached = self.cache.get_many(self.CACHE_PROVIDER, unique, self.region, self.period)
+            frequencies = {phrase: int(metrics['frequency']) for phrase, metrics in cached.items()
+                           if metrics['frequency'] is not None}
+            if frequencies:
+                unique = [phrase for phrase in unique if phrase not in frequencies]
+                with self._counters_lock:
+                    self.cache_hits += len(frequencies)
+                if on_batch is not None:
+                    on_batch(dict(frequencies))
+        cached_count = len(frequencies)
+
+        batches = [unique[start:start + self.batch_size]
+                   for start in range(0, len(unique), self.batch_size)]
+        failed: List[str] = []
+        errors: List[str] = []
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix='wordstat') as executor:
+            futures = {executor.submit(self.fetch_batch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failed.extend(futures[future])
+                    errors.append(str(e))
+                    self.logger.error("Пакет Wordstat из %d фраз не получен: %s",
+                                      len(futures[future]), e)
+                    continue
+                frequencies.update(result)
+                if self.cache is not None:
+                    self.cache.put_many(self.CACHE_PROVIDER,
+                                        {phrase: {'frequency': shows}
+                                         for phrase, shows in result.items()},
+                                        self.region, self.period)
+                if on_batch is not None:
+                    on_batch(result)
+        return {'frequencies': frequencies, 'failed': failed, 'errors': errors,
+                'cached': cached_count}
+
+    def close(self):
+        self.session.close()
+
+
+def enrich_frequencies(keyword_manager, client: YandexWordstatClient,
+                       keywords: Optional[Iterable[str]] = None, only_missing: bool = True,
+                       write_every: int = 1000) -> Dict[str, int]:
+    """
+    Заполнить частотность ключевых слов менеджера из Wordstat
+
+    Результаты записываются в менеджер пакетами update_keywords_bulk по
+    write_every фраз, поэтому прерванное обогащение не теряет уже
+    полученные данные.
+
+    Args:
+        keyword_manager: Объект KeywordManager
+        client: Клиент Wordstat
+        keywords: Какие фразы обогащать (None - все из менеджера)
+        only_missing: Только фразы с нулевой частотностью
+        write_every: Сколько результатов копить до записи
+
+    Returns:
+        dict: {'requested', 'updated', 'failed', 'calls', 'retries', 'cached'}
+    """
+    with keyword_manager.reading():
+        if keywords is None:
+            views = (keyword_manager.filter_by_frequency(0, 0) if only_missing
+                     else keyword_manager.get_all_keywords())
+            texts = [view.text for view in views]
+        else:
+            texts = []
+            for keyword in keywords:
+                view = keyword_manager.get_keyword(keyword)
+                if view is not None and (not only_missing or view.frequency == 0):
+                    texts.append(view.text)
+
+    stats = {'requested': len(texts), 'updated': 0, 'failed': 0}
+    pending: Dict[str, Dict[str, int]] = {}
+
+    def write():
+        stats['updated'] += keyword_manager.update_keywords_bulk(pending)['updated']
+        pending.clear()
+
+    def on_batch(result: Dict[str, int]):
+        pending.update((phrase, {'frequency': shows}) for phrase, shows in result.items())
+        if len(pending) >= write_every:
+            write()
+
+    calls, retries = client.calls, client.retries
+    result = client.fetch_frequencies(texts, on_batch=on_batch)
+    if pending:
+        write()
+    stats['failed'] = len(result['failed'])
+    stats['calls'] = client.calls - calls
+    stats['retries'] = client.retries - retries
+    stats['cached'] = result['cached']
+    return stats
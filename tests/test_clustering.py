@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты кластеризации фраз
+"""
+
+import random
+import threading
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from src.core.clustering import (KeywordClusterer, connected_components, greedy_clusters,
+                                 tokenize)
+from src.core.keyword_manager import KeywordManager
+from src.services.fixed_wordstat_integration import FixedWordstatIntegration
+from src.services.wordstat_parser import WordstatParser
+
+
+def brute_force_edges(texts, threshold):
+    """Эталон: попарное сравнение всех фраз с теми же весами IDF"""
+    tokens = [set(tokenize(text)) for text in texts]
+    df = Counter(token for row in tokens for token in row)
+    idf = {token: np.log((1 + len(texts)) / (1 + count)) + 1 for token, count in df.items()}
+    left, right = [], []
+    for first in range(len(texts)):
+        for second in range(first + 1, len(texts)):
+            common = sum(idf[token] for token in tokens[first] & tokens[second])
+            union = sum(idf[token] for token in tokens[first] | tokens[second])
+            if union and common >= threshold * union - 1e-9:
+                left.append(first)
+                right.append(second)
+    return np.array(left, dtype=np.int64), np.array(right, dtype=np.int64)
+
+
+@pytest.mark.parametrize("threshold", [0.3, 0.5, 0.8])
+def test_prefix_filter_matches_brute_force(threshold):
+    rng = random.Random(5)
+    words = ["бурение", "скважин", "скважины", "насос", "цена", "воду", "глубина", "песок",
+             "артезианская", "ремонт", "на", "для", "промывка", "обсадная", "труба"]
+    texts = [" ".join(rng.sample(words, rng.randint(1, 4))) for _ in range(300)]
+
+    frequencies = [rng.randint(0, 1000) for _ in texts]
+    left, right = brute_force_edges(texts, threshold)
+    similar = set(zip(left.tolist(), right.tolist()))
+    for mode in KeywordClusterer.MODES:
+        clusterer = KeywordClusterer(threshold, max_df=1.0, max_postings=10 ** 6,
+                                     chunk_pairs=500, mode=mode)
+        labels = clusterer.fit(texts, frequencies)
+        expected = (connected_components(len(texts), left, right) if mode == 'components'
+                    else greedy_clusters(len(texts), left, right, frequencies, mode))
+        assert labels.tolist() == expected.tolist()
+        assert clusterer.stats['tasks'] > 1
+        assert clusterer.stats['candidates'] < len(texts) * (len(texts) - 1) // 2
+        if mode == 'hard':
+            # Все фразы жёсткого кластера попарно похожи
+            for label in set(labels.tolist()):
+                members = np.flatnonzero(labels == label).tolist()
+                assert all((first, second) in similar for index, first in enumerate(members)
+                           for second in members[index + 1:])
+
+
+def test_pool_only_from_main_thread():
+    rng = random.Random(8)
+    words = ["бурение", "скважин", "насос", "цена", "воду", "ремонт", "промывка", "труба"]
+    texts = [" ".join(rng.sample(words, rng.randint(1, 3))) for _ in range(400)]
+    expected = KeywordClusterer(0.5, max_df=1.0).fit(texts).tolist()
+
+    def fit(results):
+        clusterer = KeywordClusterer(0.5, max_df=1.0, chunk_pairs=200, max_workers=2,
+                                     parallel_from=0)
+        results.append((clusterer.fit(texts).tolist(), clusterer.stats['workers']))
+
+    # Из потока (запрос, фоновая задача) fork небезопасен - работа в текущем процессе
+    threaded = []
+    thread = threading.Thread(target=fit, args=(threaded,))
+    thread.start()
+    thread.join()
+    assert threaded == [(expected, 1)]
+
+    direct = []
+    single = threading.active_count() == 1
+    fit(direct)
+    assert direct == [(expected, 2 if single else 1)]
+
+
+def test_connected_components():
+    labels = connected_components(7, np.array([5, 3, 1, 4]), np.array([6, 4, 3, 1]))
+    assert labels.tolist() == [0, 1, 2, 1, 1, 5, 5]
+    with pytest.raises(ValueError):
+        KeywordClusterer(threshold=0)
+    with pytest.raises(ValueError):
+        KeywordClusterer(mode='single')
+
+
+def test_cluster_keywords_writes_categories(tmp_path):
+    path = str(tmp_path / "core.kcp")
+    manager = KeywordManager(project_path=path)
+    manager.add_keywords_batch(
+        ["бурение скважин", "бурение скважины цена", "цена бурения скважин",
+         "скважинный насос", "насос скважинный глубинный", "глубинный насос",
+         "ремонт крыши"], frequency=[100, 20, 30, 5, 50, 1, 7])
+    manager.update_keyword("ремонт крыши", category="ремонт")
+
+    preview = manager.cluster_keywords(0.4, dry_run=True)
+    assert preview['clusters'] == 2 and manager.get_category_counts() == {"ремонт": 1}
+
+    # Компоненты связности склеивают цепочку «скважинный насос ~ насос
+    # скважинный глубинный ~ глубинный насос», жёсткий кластер - нет
+    chained = manager.cluster_keywords(0.4, mode='components', dry_run=True)
+    assert chained['clustered'] == 6 and chained['skipped_postings'] == 0
+
+    stats = manager.cluster_keywords(0.4)
+    assert stats['keywords'] == 7 and stats['clusters'] == 2 and stats['clustered'] == 5
+    assert stats['sample'] == {"бурение скважин": 3, "насос скважинный глубинный": 2}
+    assert manager.get_keyword("цена бурения скважин").category == "бурение скважин"
+    assert manager.get_keyword("скважинный насос").category == "насос скважинный глубинный"
+    assert manager.get_keyword("глубинный насос").category == ""
+    # Одиночные фразы сохраняют свою категорию
+    assert manager.get_keyword("ремонт крыши").category == "ремонт"
+    assert manager.get_category_counts() == {
+        "бурение скважин": 3, "насос скважинный глубинный": 2, "ремонт": 1}
+    manager.close()
+    # Категории сохранены в проект
+    reopened = KeywordManager(project_path=path)
+    assert reopened.get_keyword("бурение скважины цена").category == "бурение скважин"
+    reopened.close()
+
+
+def test_parser_groups_feed_integration():
+    parser = WordstatParser()
+    parser.keywords = [{'keyword': "Бурение скважин", 'frequency': 10},
+                       {'keyword': "бурение скважины", 'frequency': 40},
+                       {'keyword': "ремонт крыши", 'frequency': 3}]
+    groups = parser.get_keyword_groups()
+    assert {name: len(items) for name, items in groups.items()} == {"бурение скважины": 2, "": 1}
+
+    manager = KeywordManager()
+    added = FixedWordstatIntegration(parser).add_keywords_by_groups(manager, groups)
+    assert added == 3
+    assert manager.get_keyword("бурение скважин").category == "бурение скважины"
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты потокобезопасности KeywordManager и блокировки читатели-писатель
+"""
+
+import random
+import threading
+import time
+
+import pytest
+
+from src.core.keyword_manager import KeywordManager
+from src.core.keyword_store import KeywordStore
+from src.core.rwlock import ReadWriteLock
+
+
+def test_rwlock_readers_share_writer_waits():
+    lock = ReadWriteLock()
+    inside = threading.Barrier(3, timeout=5)
+    events = []
+
+    def reader():
+        with lock.read():
+            inside.wait()  # Оба читателя внутри одновременно
+            time.sleep(0.05)
+            events.append('read')
+
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    for thread in readers:
+        thread.start()
+    inside.wait()
+    with lock.write():
+        events.append('write')
+    for thread in readers:
+        thread.join()
+    assert events == ['read', 'read', 'write']
+
+
+def test_rwlock_reentrancy():
+    lock = ReadWriteLock()
+    with lock.write():
+        with lock.write(), lock.read():
+            assert lock.owns_write and lock.owns_read
+    with lock.read():
+        with lock.read():
+            pass
+        with pytest.raises(RuntimeError):
+            lock.acquire_write()
+    assert not lock.owns_read and not lock.owns_write
+
+    # Ожидающий писатель не пропускает новых читателей, но вложенное чтение проходит
+    entered = threading.Event()
+    with lock.read():
+        writer = threading.Thread(target=lock.acquire_write, daemon=True)
+        writer.start()
+        while not lock._waiting_writers:
+            time.sleep(0.001)
+        with lock.read():
+            entered.set()
+    writer.join(5)
+    assert entered.is_set() and lock._writer == writer.ident
+
+
+def test_concurrent_readers_and_writers(monkeypatch):
+    # Частые уплотнения, чтобы читатели пересекались с перенумерацией слотов
+    monkeypatch.setattr(KeywordStore, 'COMPACT_MIN_DEAD', 50)
+    monkeypatch.setattr(KeywordStore, 'COMPACT_RATIO', 0.02)
+    manager = KeywordManager()
+    manager.add_keywords_batch([f"бурение скважин {number}" for number in range(2000)],
+                               frequency=list(range(2000)), category="бурение")
+    epoch = manager._store.epoch
+    stop = threading.Event()
+    failures = []
+
+    def guarded(work):
+        def run(seed):
+            rnd = random.Random(seed)
+            try:
+                while not stop.is_set():
+                    work(rnd)
+            except Exception as e:  # pragma: no cover - сообщение попадёт в assert
+                failures.append(repr(e))
+                stop.set()
+        return run
+
+    @guarded
+    def importer(rnd):
+        start = rnd.randrange(100000)
+        manager.add_keywords_batch([f"цена бурения {start + i}" for i in range(200)],
+                                   frequency=rnd.randrange(1000), category="цены")
+
+    @guarded
+    def remover(rnd):
+        texts = [kw.text for kw in manager.find_keywords("цена", limit=150)]
+        manager.remove_keywords_bulk(texts)
+        manager.update_keyword(f"бурение скважин {rnd.randrange(2000)}",
+                               frequency=rnd.randrange(5000))
+
+    @guarded
+    def reader(rnd):
+        with manager.reading():
+            stats = manager.get_statistics()
+            assert stats['total'] == len(manager) == len(manager._store.keys())
+            assert sum(manager.get_category_counts().values()) == stats['total']
+            for kw in manager.find_keywords(str(rnd.randrange(10)), limit=50):
+                assert manager.get_keyword(kw.text) is not None
+                kw.to_dict()
+            page = manager.list_keywords(sort='frequency', descending=True, limit=20)
+            assert len(page['keywords']) == min(20, stats['total'])
+            frequencies = [kw.frequency for kw in page['keywords']]
+            assert frequencies == sorted(frequencies, reverse=True)
+        # Уплотнение между порциями выгрузки её не прерывает
+        assert sum(len(frame) for frame in manager.iter_dataframes(chunk_size=500)) > 0
+
+    threads = ([threading.Thread(target=importer, args=(seed,)) for seed in range(2)]
+               + [threading.Thread(target=remover, args=(seed,)) for seed in range(2, 4)]
+               + [threading.Thread(target=reader, args=(seed,)) for seed in range(4, 10)])
+    for thread in threads:
+        thread.start()
+    time.sleep(2.0)
+    stop.set()
+    for thread in threads:
+        thread.join(30)
+
+    assert failures == []
+    store = manager._store
+    assert store.epoch > epoch
+    live = store.live_slots()
+    assert len(live) == len(store.keys()) == manager.get_statistics()['total']
+    assert all(store.find(store.texts[slot]) == slot for slot in live.tolist())
+    assert len(manager.find_keywords("скважин")) == 2000
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты обхода страниц и sitemap на локальном HTTP-сервере
+"""
+
+import gzip
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.core.data_parser import DataParser
+from src.core.import_jobs import ImportJobManager
+from src.core.keyword_manager import KeywordManager
+from src.services.crawler import PageCrawler, extract_phrases
+
+PAGES = 12
+
+
+def page_html(number: int) -> bytes:
+    return (f'<html><head><meta name="keywords" content="бурение {number}, скважина {number}">'
+            f'<title>Бурение скважин {number}</title></head><body>'
+            f'<h1>Цена <span>бурения</span> {number}</h1><p>текст</p>'
+            f'<h2>Глубина {number}</h2></body></html>').encode('utf-8')
+
+
+class Site:
+    """Локальный сайт: sitemap, страницы, медленная и огромная страница"""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with site._lock:
+                    site.active += 1
+                    site.max_active = max(site.max_active, site.active)
+                try:
+                    site.route(self)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Клиент не дождался медленной страницы
+                    pass
+                finally:
+                    with site._lock:
+                        site.active -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    @staticmethod
+    def send(handler, body: bytes, content_type: str = 'text/html', status: int = 200):
+        handler.send_response(status)
+        handler.send_header('Content-Type', content_type)
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def route(self, handler):
+        path = handler.path
+        if path == '/sitemap.xml':
+            body = ('<?xml version="1.0" encoding="UTF-8"?>'
+                    '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                    f'<sitemap><loc>{self.url}/pages.xml.gz</loc></sitemap></sitemapindex>')
+            self.send(handler, body.encode(), 'application/xml')
+        elif path == '/pages.xml.gz':
+            locs = [f'{self.url}/page/{number}' for number in range(PAGES)]
+            locs += [f'{self.url}/slow', f'{self.url}/huge', f'{self.url}/missing']
+            body = ('<?xml version="1.0" encoding="UTF-8"?>'
+                    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                    + ''.join(f'<url><loc>{loc}</loc></url>' for loc in locs) + '</urlset>')
+            self.send(handler, gzip.compress(body.encode()), 'application/x-gzip')
+        elif path.startswith('/page/'):
+            time.sleep(0.05)
+            self.send(handler, page_html(int(path.rsplit('/', 1)[1])))
+        elif path == '/cp1251':
+            body = ('<html><head><meta charset="windows-1251"><title>Артезианская скважина'
+                    '</title></head></html>').encode('cp1251')
+            self.send(handler, body)
+        elif path == '/slow':
+            time.sleep(1.0)
+            self.send(handler, page_html(0))
+        elif path == '/huge':
+            filler = b'<p>' + b'x' * 1000 + b'</p>'
+            self.send(handler, page_html(99).replace(b'</body>', filler * 500 + b'</body>'))
+        else:
+            self.send(handler, b'not found', 'text/plain', 404)
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def site():
+    with Site() as server:
+        yield server
+
+
+def test_extract_phrases_streaming():
+    html = page_html(7)
+    # Документ подаётся по 5 байт - разбор не зависит от границ кусков
+    chunks = [html[start:start + 5] for start in range(0, len(html), 5)]
+    assert extract_phrases(chunks) == ["бурение 7", "скважина 7", "Бурение скважин 7",
+                                       "Цена бурения 7", "Глубина 7"]
+
+
+def test_crawl_sitemap_with_limits(site):
+    crawler = PageCrawler(max_workers=8, per_host=2, timeout=0.3, max_bytes=64 * 1024,
+                          batch_size=20)
+    batches = list(crawler.iter_batches([f"{site.url}/cp1251"], [f"{site.url}/sitemap.xml"]))
+
+    phrases = [phrase for batch in batches for phrase in batch]
+    assert all(len(batch) >= 20 for batch in batches[:-1])
+    assert "Артезианская скважина" in phrases
+    assert {f"Цена бурения {number}" for number in range(PAGES)} <= set(phrases)
+    # Огромная страница обрезана, но заголовки из её начала получены
+    assert "Глубина 99" in phrases
+    assert crawler.stats['truncated'] == 1
+    assert crawler.stats['pages'] == PAGES + 2
+    # Медленная страница - таймаут, отсутствующая - 404
+    assert crawler.stats['failed'] == 2
+    assert any('/slow' in error for error in crawler.errors)
+    assert any('/missing' in error and '404' in error for error in crawler.errors)
+    assert site.max_active <= 2
+    crawler.close()
+
+
+def test_url_import_job(site):
+    jobs = ImportJobManager(KeywordManager())
+    parser = DataParser(batch_size=10)
+    try:
+        urls = [f"{site.url}/page/{number}" for number in range(3)]
+        job = jobs.submit('url', lambda: parser.iter_urls(urls), source='url')
+        failed = jobs.submit('url', lambda: parser.iter_urls([f"{site.url}/missing"]))
+        deadline = time.time() + 10
+        while not (job.finished and failed.finished) and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        jobs.shutdown()
+
+    assert job.to_dict()['status'] == 'done' and job.to_dict()['rows_added'] == 15
+    view = jobs.keyword_manager.get_keyword("цена бурения 2")
+    assert view is not None and view.source == 'url'
+    assert failed.to_dict()['status'] == 'failed' and '404' in failed.to_dict()['error']
+    assert parser.fetch_url_keywords(urls[1])[:2] == ["бурение 1", "скважина 1"]
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты поиска неявных дубликатов
+"""
+
+import pytest
+
+from src.core.dedup import signature
+from src.core.keyword_manager import KeywordManager
+
+
+def test_signatures():
+    assert signature("цена купить бур", 'sorted') == signature("купить бур цена", 'sorted')
+    assert signature("бурение скважины", 'lemma') == signature("скважин бурение", 'lemma')
+    assert signature("бурение на воду", 'stopwords') == "бурение воду"
+    assert signature("на для", 'stopwords') == "на для"
+    assert signature("ёлка купить", 'sorted') == signature("купить елка", 'sorted')
+    with pytest.raises(ValueError):
+        signature("бур", 'phonetic')
+
+
+def test_add_rejects_near_duplicates():
+    manager = KeywordManager(dedup_modes=('sorted', 'stopwords'))
+    stats = manager.add_keywords_batch(["купить бур цена", "Цена купить бур", "бурение на воду",
+                                        "бурение воду", "ёлка", "елка", "купить бур цена"])
+    assert stats == {'added': 3, 'duplicates': 4, 'errors': 0}
+    assert [view.text for view in manager.get_all_keywords()] == [
+        "купить бур цена", "бурение на воду", "ёлка"]
+
+    assert not manager.add_keyword("бур цена купить")
+    assert not manager.add_keyword("бурение для воду")
+    assert manager.add_keyword("бурение скважин")
+
+    # После удаления ключ освобождается
+    manager.remove_keyword("купить бур цена")
+    assert manager.add_keyword("цена бур купить")
+
+    manager.set_dedup_modes(['lemma'])
+    assert manager.dedup_modes == ('lemma',)
+    assert not manager.add_keyword("бурения скважины")
+    assert manager.add_keyword("воду бурение")
+    with pytest.raises(ValueError):
+        manager.set_dedup_modes(['phonetic'])
+
+
+def test_failed_batch_does_not_leak_hashes():
+    manager = KeywordManager(dedup_modes=('sorted',))
+    # Длина частотностей не совпадает с пакетом - пакет отклоняется целиком
+    with pytest.raises(ValueError):
+        manager.add_keywords_batch(["купить слона"], frequency=[1, 2])
+    assert manager.add_keyword("бур купить")
+    assert not manager.add_keyword("купить бур")
+    assert manager.add_keyword("слона купить")
+
+
+def test_deduplicate_existing_core():
+    manager = KeywordManager()
+    manager.add_keywords_batch(["бурение скважин", "скважины бурение", "бурение скважин на воду",
+                                "скважин бурение на воду", "елка", "ёлка"],
+                               frequency=[1, 5, 3, 4, 0, 9])
+
+    preview = manager.deduplicate(keep='frequency', dry_run=True)
+    assert preview['duplicates'] == 3 and preview['removed'] == 0 and len(manager) == 6
+    assert preview['by_mode'] == {'sorted': 2, 'lemma': 1, 'stopwords': 0}
+    assert preview['sample'] == {"бурение скважин": "скважины бурение",
+                                 "бурение скважин на воду": "скважин бурение на воду",
+                                 "елка": "ёлка"}
+
+    stats = manager.deduplicate(modes=['sorted'])
+    assert stats['removed'] == 2
+    assert [view.text for view in manager.get_all_keywords()] == [
+        "бурение скважин", "скважины бурение", "бурение скважин на воду", "елка"]
+    with pytest.raises(ValueError):
+        manager.deduplicate(keep='last')
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты потокового экспорта
+"""
+
+import gzip
+import io
+import json
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from src.core.export_manager import ExportManager
+from src.core.keyword_manager import KeywordManager
+
+
+@pytest.fixture
+def exporter():
+    """Экспорт 2500 ключевых слов порциями по 1000"""
+    manager = KeywordManager()
+    manager.add_keywords_batch([f"бурение скважин {i}" for i in range(2500)],
+                               frequency=list(range(2500)), category="бурение")
+    manager.remove_keyword("бурение скважин 0")
+    return ExportManager(manager, chunk_size=1000)
+
+
+def test_iter_dataframes_in_chunks(exporter):
+    chunks = list(exporter.keyword_manager.iter_dataframes(1000))
+    assert [len(df) for df in chunks] == [1000, 1000, 499]
+    assert pd.concat(chunks, ignore_index=True).equals(exporter.keyword_manager.to_dataframe())
+
+
+def test_iter_dataframes_survives_compaction(exporter):
+    manager = exporter.keyword_manager
+    chunks = manager.iter_dataframes(1000)
+    first = next(chunks)
+    # Между порциями из ядра удаляются строки, и оно уплотняется
+    manager.remove_keywords_bulk([f"бурение скважин {i}" for i in range(1500, 1600)])
+    manager._store.compact()
+    rest = list(chunks)
+    assert len(first) == 1000 and [len(df) for df in rest] == [900, 499]
+    frame = pd.concat([first] + rest, ignore_index=True)
+    assert frame['keyword'].iloc[-1] == "бурение скважин 2499"
+    assert frame.equals(manager.to_dataframe())
+
+
+def test_ndjson_and_gzip(exporter):
+    plain = b"".join(exporter.stream('ndjson'))
+    assert gzip.decompress(b"".join(exporter.stream('ndjson', compress=True))) == plain
+
+    rows = [json.loads(line) for line in plain.decode('utf-8').splitlines()]
+    assert len(rows) == 2499
+    assert rows[0]['keyword'] == "бурение скважин 1"
+    assert rows[0]['category'] == "бурение"
+    assert rows[-1]['frequency'] == 2499
+
+
+def test_csv_has_single_header(exporter):
+    data = b"".join(exporter.stream('csv'))
+    df = pd.read_csv(io.BytesIO(data), encoding='utf-8-sig')
+    assert len(df) == 2499
+    assert df['keyword'].iloc[-1] == "бурение скважин 2499"
+    assert df['word_count'].eq(3).all()
+
+
+def test_xlsx(exporter, tmp_path):
+    path = tmp_path / "keywords.xlsx"
+    exporter.export_to_file(str(path))
+    sheet = load_workbook(path, read_only=True).active
+    rows = list(sheet.iter_rows(values_only=True))
+    assert rows[0][:2] == ('keyword', 'frequency')
+    assert rows[1][:2] == ("бурение скважин 1", 1)
+    assert len(rows) == 2500
+
+    with pytest.raises(ValueError):
+        exporter.stream('pdf')
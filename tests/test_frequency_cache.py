@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты постоянного кэша частотности
+"""
+
+from src.core.keyword_manager import KeywordManager
+from src.services.frequency_cache import FrequencyCache
+from src.services.wordstat_stub import StubWordstatServer, stub_frequency
+from src.services.yandex_wordstat import YandexWordstatClient, enrich_frequencies
+
+
+def test_key_ttl_and_eviction(tmp_path):
+    now = [1000.0]
+    path = str(tmp_path / "cache.sqlite")
+    cache = FrequencyCache(path, ttl=100, max_entries=3, clock=lambda: now[0])
+    cache.put_many('wordstat', {"Бурение  Скважин": {'frequency': 10},
+                                "цена бурения": {'frequency': 5, 'cpc': 12.5}}, region='213')
+
+    # Ключ - нормализованная фраза в своём регионе и периоде
+    assert cache.get_many('wordstat', ["бурение скважин", "цена бурения"], region='213') == {
+        "бурение скважин": {'frequency': 10, 'cpc': None, 'competition': None},
+        "цена бурения": {'frequency': 5, 'cpc': 12.5, 'competition': None}}
+    assert cache.get_many('wordstat', ["бурение скважин"], region='2') == {}
+    assert cache.get_many('google', ["бурение скважин"], region='213') == {}
+
+    # Истёкшая запись - промах
+    now[0] += 150
+    assert cache.get_many('wordstat', ["цена бурения"], region='213') == {}
+
+    # Сверх max_entries вытесняются истёкшие, затем давно не использованные
+    for phrase in "abcd":
+        cache.put_many('wordstat', {phrase: {'frequency': 1}})
+        now[0] += 1
+    stats = cache.stats()
+    assert stats['entries'] == 3 and stats['evicted'] == 3
+    assert set(cache.get_many('wordstat', list("abcd"))) == {"b", "c", "d"}
+    cache.close()
+
+    # Записи и счётчики переживают переоткрытие
+    reopened = FrequencyCache(path, ttl=100, clock=lambda: now[0])
+    assert reopened.stats()['stored'] == 6 and reopened.stats()['hits'] > 0
+
+    # Счётчик записей ведут триггеры: перезапись ключа его не меняет
+    reopened.put_many('wordstat', {"d": {'frequency': 2}, "e": {'frequency': 3}})
+    assert reopened.stats()['entries'] == 4
+    assert reopened.get_many('wordstat', ["d"]) == {
+        "d": {'frequency': 2, 'cpc': None, 'competition': None}}
+    reopened._conn.execute("DELETE FROM counters WHERE name = 'entries'")
+    reopened.close()
+    # Файл без счётчика записей - он считается при открытии
+    reopened = FrequencyCache(path, ttl=100, clock=lambda: now[0])
+    assert reopened.stats()['entries'] == 4
+    reopened.clear()
+    assert reopened.stats()['entries'] == 0
+    reopened.close()
+
+
+def test_wordstat_client_uses_cache(tmp_path):
+    cache = FrequencyCache(str(tmp_path / "cache.sqlite"))
+    phrases = [f"бурение скважин {number}" for number in range(15)]
+
+    with StubWordstatServer() as server:
+        client = YandexWordstatClient("token", url=server.url, rate=1000.0, poll_interval=0.01,
+                                      geo_ids=[213], cache=cache)
+        first = client.fetch_frequencies(phrases[:10])
+        assert first['cached'] == 0 and server.calls['CreateNewWordstatReport'] == 1
+
+        manager = KeywordManager()
+        manager.add_keywords_batch(phrases)
+        stats = enrich_frequencies(manager, client)
+
+    # Из API запрошены только 5 новых фраз
+    assert stats['cached'] == 10 and stats['updated'] == 15
+    assert server.phrases_per_report == [10, 5]
+    assert all(manager.get_keyword(phrase).frequency == stub_frequency(phrase)
+               for phrase in phrases)
+    counters = cache.stats()
+    assert counters['hits'] == 10 and counters['misses'] == 15
+    assert counters['entries'] == 15 and counters['hit_rate'] == 0.4
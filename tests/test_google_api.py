@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты клиента Google Ads на локальной заглушке API
+"""
+
+import pytest
+
+from src.core.keyword_manager import KeywordManager
+from src.services.frequency_cache import FrequencyCache
+from src.services.google_ads_stub import StubGoogleAdsServer, stub_metrics
+from src.services.google_api import (GoogleAdsApiError, GoogleAdsClient, enrich_metrics,
+                                     parse_metrics)
+
+
+def client_for(server, **options):
+    options.setdefault('rate', 1000.0)
+    return GoogleAdsClient("dev-token", "access-token", "123-456-7890", url=server.url,
+                           backoff=0.01, **options)
+
+
+def test_parse_metrics():
+    assert parse_metrics({'avgMonthlySearches': '1300', 'competitionIndex': '42',
+                          'lowTopOfPageBidMicros': '1500000',
+                          'highTopOfPageBidMicros': '4500000'}) == {
+        'frequency': 1300, 'competition': 0.42, 'cpc': 3.0}
+    assert parse_metrics({}) == {'frequency': 0, 'competition': 0.0, 'cpc': 0.0}
+
+
+def test_enrich_batches_retries_and_writes_back(tmp_path):
+    manager = KeywordManager()
+    phrases = [f"Бурение скважин {number}" for number in range(25)]
+    too_long = " ".join(["слово"] * 11)
+    manager.add_keywords_batch(phrases + [too_long])
+    manager.update_keyword(phrases[0], cpc=9.5)
+    cache = FrequencyCache(str(tmp_path / "cache.sqlite"))
+
+    with StubGoogleAdsServer(fail_first=2) as server:
+        client = client_for(server, batch_size=10, max_workers=3, cache=cache)
+        stats = enrich_metrics(manager, client)
+
+    assert stats['requested'] == 25 and stats['updated'] == 24
+    assert stats['skipped'] == 1 and stats['failed'] == 0 and stats['retries'] == 2
+    assert sorted(server.keywords_per_request) == [4, 10, 10]
+    # Соединения из пула переиспользуются между запросами
+    assert server.connections <= 3
+    assert stats['latency']['count'] == stats['requests'] == 5
+
+    assert manager.get_keyword(phrases[0]).cpc == 9.5
+    for phrase in phrases[1:]:
+        view, expected = manager.get_keyword(phrase), stub_metrics(phrase)
+        assert (view.cpc, view.competition) == (expected['cpc'], expected['competition'])
+        assert view.frequency == 0
+
+    # Повторно из API запрашивается только фраза, которой нет в кэше
+    with StubGoogleAdsServer() as server:
+        client = client_for(server, cache=cache)
+        stats = enrich_metrics(manager, client, only_missing=False, write_frequency=True)
+    assert stats['cached'] == 24 and server.keywords_per_request == [1]
+    assert stats['updated'] == 25
+    assert manager.get_keyword(phrases[1]).frequency == stub_metrics(phrases[1])['frequency']
+
+
+def test_errors_are_reported():
+    with StubGoogleAdsServer() as server:
+        client = client_for(server, max_retries=0)
+        del client.session.headers['developer-token']
+        result = client.fetch_metrics(["бурение", "цена бурения"])
+        assert result['metrics'] == {}
+        assert result['failed'] == ["бурение", "цена бурения"]
+        assert "UNAUTHENTICATED" in result['errors'][0]
+
+        client = client_for(server, max_retries=0)
+        server.fail_first = 1
+        with pytest.raises(GoogleAdsApiError) as error:
+            client.fetch_batch(["бурение"])
+        assert error.value.status == 503 and error.value.retryable
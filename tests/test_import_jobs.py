@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты фоновых задач импорта и разбора файлов
+"""
+
+import json
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from src.core.data_parser import DataParser
+from src.core.import_jobs import ImportJobManager, JobRegistry
+from src.core.keyword_manager import KeywordManager
+
+
+def wait(job, timeout=5.0):
+    """Дождаться завершения задачи"""
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+    return job.to_dict()
+
+
+@pytest.fixture
+def jobs():
+    manager = ImportJobManager(KeywordManager(), max_workers=2)
+    yield manager
+    manager.shutdown()
+
+
+def test_job_reports_progress(jobs):
+    batches = [pd.DataFrame({'keyword': ["бурение", "цена"], 'frequency': [10, 20]}),
+               ["бурение", "вода"]]
+    finished = []
+    job = jobs.submit('test', lambda: iter(batches), total_rows=4, source="тест",
+                      on_finish=lambda: finished.append(True))
+    state = wait(job)
+
+    assert state['status'] == 'done'
+    assert (state['rows_parsed'], state['rows_added'], state['duplicates']) == (4, 3, 1)
+    assert state['progress'] == 1.0 and state['eta'] is None
+    assert finished == [True]
+    assert jobs.keyword_manager.get_keyword("цена").frequency == 20
+    assert jobs.keyword_manager.get_keyword("вода").source == "тест"
+    assert jobs.get(job.id) is job and jobs.list_jobs() == [job]
+
+
+def test_cancel_stops_before_next_batch(jobs):
+    proceed = threading.Event()
+
+    def batches():
+        yield [f"фраза {i}" for i in range(100)]
+        proceed.wait(5)
+        yield ["после отмены"]
+
+    job = jobs.submit('test', batches)
+    while job.rows_parsed < 100:
+        time.sleep(0.01)
+    assert jobs.cancel(job.id) is True
+    proceed.set()
+
+    assert wait(job)['status'] == 'cancelled'
+    assert len(jobs.keyword_manager) == 100
+    assert jobs.cancel(job.id) is False
+    assert jobs.cancel("нет такой") is False
+
+
+def test_failed_job_keeps_error(jobs):
+    def batches():
+        yield ["бурение"]
+        raise ValueError("битый файл")
+
+    state = wait(jobs.submit('test', batches))
+    assert state['status'] == 'failed'
+    assert state['error'] == "битый файл"
+    assert state['rows_added'] == 1
+
+
+def test_finished_jobs_are_evicted():
+    jobs = ImportJobManager(KeywordManager(), max_workers=1, keep_finished=2)
+    submitted = [jobs.submit('test', lambda: [["фраза"]]) for _ in range(3)]
+    for job in submitted:
+        wait(job)
+    jobs.submit('test', lambda: [])
+    assert jobs.get(submitted[0].id) is None
+    jobs.shutdown()
+
+
+def test_registry_shares_jobs_between_processes(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    worker = ImportJobManager(KeywordManager(), max_workers=1, registry=JobRegistry(path))
+    other = ImportJobManager(KeywordManager(), registry=JobRegistry(path))
+    proceed = threading.Event()
+
+    def batches():
+        yield ["бурение", "цена"]
+        proceed.wait(5)
+        yield ["после отмены"]
+
+    job = worker.submit('test', batches, description="файл.csv")
+    while other.status(job.id)['rows_parsed'] < 2:
+        time.sleep(0.01)
+    assert [state['id'] for state in other.statuses()] == [job.id]
+    assert other.cancel(job.id) is True
+    proceed.set()
+
+    wait(job)
+    worker.shutdown()
+    state = other.status(job.id)
+    assert state['status'] == 'cancelled' and state['rows_added'] == 2
+    assert other.cancel(job.id) is False
+    assert other.status("нет такой") is None
+    other.shutdown()
+
+
+def test_data_parser_files(tmp_path):
+    parser = DataParser(batch_size=2)
+
+    csv_path = tmp_path / "keywords.csv"
+    csv_path.write_text("Фраза;Частотность\nбурение;1 200\nцена;\nвода;5\n", encoding='utf-8')
+    batches = list(parser.iter_file(str(csv_path)))
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert pd.concat(batches)['frequency'].tolist() == [1200, 0, 5]
+
+    txt_path = tmp_path / "keywords.txt"
+    txt_path.write_text("бурение\n\nцена\nвода\n", encoding='utf-8')
+    assert parser.estimate_rows(str(txt_path)) == 4
+    assert parser.auto_detect_format(str(txt_path)).keywords == ["бурение", "цена", "вода"]
+
+    json_path = tmp_path / "keywords.json"
+    json_path.write_text(json.dumps([{"keyword": "бурение", "frequency": 7}, "цена"]), encoding='utf-8')
+    batch = next(parser.iter_file(str(json_path)))
+    assert batch.to_dict('list') == {'keyword': ["бурение", "цена"], 'frequency': [7, 0]}
+
+    assert parser.auto_detect_format(str(tmp_path / "keywords.pdf")).errors
+    assert parser.parse_text("бурение, цена", ",").keywords == ["бурение", "цена"]
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты KeywordManager
+"""
+
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from src.core.keyword_manager import Keyword, KeywordManager
+
+
+@pytest.fixture
+def manager():
+    """Менеджер с несколькими ключевыми словами"""
+    manager = KeywordManager()
+    manager.add_keyword("Бурение скважин", frequency=500, category="бурение")
+    manager.add_keyword("бурение   скважин под ключ", frequency=120, category="бурение")
+    manager.add_keyword("геологоразведка", frequency=11047, source="wordstat")
+    manager.add_keyword("цена бурения!", frequency=30)
+    return manager
+
+
+def test_add_keyword_cleans_and_deduplicates(manager):
+    assert len(manager) == 4
+    assert manager.add_keyword("БУРЕНИЕ скважин") is False
+    assert manager.keywords[1].text == "бурение скважин под ключ"
+    assert manager.keywords[-1].text == "цена бурения"
+
+
+def test_keyword_view_reads_and_writes_columns(manager):
+    view = manager.keywords[2]
+    assert view.frequency == 11047
+    assert view.source == "wordstat"
+    assert view.word_count() == 1
+    assert isinstance(view.added_date, datetime)
+
+    view.frequency = 12000
+    view.category = "разведка"
+    assert manager.keywords[2].frequency == 12000
+    assert manager.get_statistics()["categories"] == 2
+    assert str(view) == str(Keyword(text="геологоразведка", frequency=12000))
+
+
+def test_remove_keyword_keeps_order(manager):
+    assert manager.remove_keyword("Бурение скважин") is True
+    assert manager.remove_keyword("нет такого") is False
+    assert [kw.text for kw in manager.keywords] == [
+        "бурение скважин под ключ", "геологоразведка", "цена бурения"]
+    assert manager.keywords[0].frequency == 120
+    assert manager.add_keyword("бурение скважин") is True
+
+
+def test_filters(manager):
+    assert [kw.text for kw in manager.filter_by_word_count(3, 10)] == [
+        "бурение скважин под ключ"]
+    assert [kw.text for kw in manager.filter_by_frequency(100, 1000)] == [
+        "бурение скважин", "бурение скважин под ключ"]
+    assert [kw.text for kw in manager.find_keywords("БУРЕН")] == [
+        "бурение скважин", "бурение скважин под ключ", "цена бурения"]
+
+
+def test_statistics(manager):
+    stats = manager.get_statistics()
+    assert stats["total"] == 4
+    assert stats["max_frequency"] == 11047
+    assert stats["min_frequency"] == 30
+    assert stats["avg_frequency"] == pytest.approx((500 + 120 + 11047 + 30) / 4)
+    assert stats["avg_word_count"] == pytest.approx((2 + 4 + 1 + 2) / 4)
+    assert stats["categories"] == 1
+
+    manager.clear_all()
+    assert manager.get_statistics()["total"] == 0
+
+
+def test_to_dataframe(manager):
+    df = manager.to_dataframe()
+    assert list(df.columns) == ['keyword', 'frequency', 'competition', 'cpc',
+                                'category', 'source', 'word_count', 'added_date']
+    assert df['keyword'].tolist()[0] == "бурение скважин"
+    assert df['category'].tolist() == ["бурение", "бурение", "", ""]
+    assert df['word_count'].tolist() == [2, 4, 1, 2]
+    assert KeywordManager().to_dataframe().empty
+
+
+def test_store_grows_beyond_initial_capacity():
+    manager = KeywordManager()
+    stats = manager.add_keywords_bulk([f"фраза {i}" for i in range(3000)])
+    assert stats == {"added": 3000, "duplicates": 0, "errors": 0}
+    assert manager.keywords[2999].text == "фраза 2999"
+    assert manager.get_statistics()["avg_word_count"] == 2
+
+
+def test_get_and_update_keyword(manager):
+    assert manager.get_keyword("ГЕОЛОГОРАЗВЕДКА").frequency == 11047
+    assert manager.get_keyword("нет такого") is None
+
+    assert manager.update_keyword_frequency("геологоразведка", 12500) is True
+    assert manager.update_keyword("цена бурения", cpc=15.5, category="цены") is True
+    assert manager.update_keyword("нет такого", cpc=1.0) is False
+    assert manager.get_keyword("геологоразведка").frequency == 12500
+    assert manager.get_keyword("цена бурения").category == "цены"
+
+
+def test_remove_keywords_bulk_compacts_and_keeps_order():
+    manager = KeywordManager()
+    manager.add_keywords_bulk([f"фраза {i}" for i in range(5000)])
+    survivor = manager.get_keyword("фраза 4999")
+
+    stats = manager.remove_keywords_bulk([f"фраза {i}" for i in range(0, 5000, 2)] + ["нет такой"])
+    assert stats == {"removed": 2500, "not_found": 1}
+    assert len(manager) == 2500
+    assert manager._store.epoch > 0  # хранилище уплотнено
+    assert manager.keywords[0].text == "фраза 1"
+    assert [kw.text for kw in manager.keywords[-2:]] == ["фраза 4997", "фраза 4999"]
+
+    # Представление переживает перенумерацию слотов
+    survivor.frequency = 7
+    assert manager.get_keyword("фраза 4999").frequency == 7
+    assert manager.to_dataframe()['keyword'].tolist()[:2] == ["фраза 1", "фраза 3"]
+
+
+def test_removed_view_raises(manager):
+    view = manager.get_keyword("геологоразведка")
+    manager.remove_keyword("геологоразведка")
+    with pytest.raises(LookupError):
+        view.frequency
+    assert manager.get_statistics()["total"] == 3
+    assert "геологоразведка" not in manager._keyword_set
+
+
+def test_add_keywords_batch_matches_add_keyword():
+    raw = ["Бурение  скважин", "бурение скважин", "цена!", None, 42, " ", "новая фраза"]
+
+    sequential = KeywordManager()
+    expected = {"added": 0, "duplicates": 0, "errors": 0}
+    for keyword in raw:
+        try:
+            expected["added" if sequential.add_keyword(keyword) else "duplicates"] += 1
+        except Exception:
+            expected["errors"] += 1
+
+    batched = KeywordManager()
+    assert batched.add_keywords_batch(raw) == expected
+    assert [kw.text for kw in batched.keywords] == [kw.text for kw in sequential.keywords]
+    assert ([kw.word_count() for kw in batched.keywords]
+            == [kw.word_count() for kw in sequential.keywords])
+
+
+def test_add_keywords_batch_columns(manager):
+    stats = manager.add_keywords_batch(
+        pd.Series(["геологоразведка", "бурение на воду", "бурение на песок"], index=[7, 8, 9]),
+        frequency=[1, "2 000", 300],
+        cpc=12.5,
+        category=["", "вода", "песок"]
+    )
+    assert stats == {"added": 2, "duplicates": 1, "errors": 0}
+    assert manager.get_keyword("бурение на воду").frequency == 0  # нечисловое значение
+    assert manager.get_keyword("бурение на песок").frequency == 300
+    assert manager.get_keyword("бурение на песок").cpc == 12.5
+    assert manager.get_keyword("бурение на воду").category == "вода"
+    assert manager.get_keyword("геологоразведка").frequency == 11047
+
+
+def test_events_are_batched_unless_verbose(capsys):
+    events = []
+    manager = KeywordManager(on_event=lambda event, data: events.append((event, data)))
+    manager.add_keywords_bulk(["бурение", "бурение", "цена"])
+    manager.add_keyword("цена")
+    manager.remove_keywords_bulk(["цена", "нет такого"])
+    manager.clear_all()
+
+    assert events == [
+        ('batch_added', {'added': 2, 'duplicates': 1, 'errors': 0}),
+        ('batch_removed', {'removed': 1, 'not_found': 1}),
+        ('cleared', {'count': 1}),
+    ]
+    assert capsys.readouterr().out == ""
+
+
+def test_verbose_events_per_keyword(caplog):
+    events = []
+    manager = KeywordManager(verbose=True, on_event=lambda event, data: events.append(event))
+    with caplog.at_level("DEBUG", logger="src.core.keyword_manager"):
+        manager.add_keyword("бурение")
+        manager.add_keyword("Бурение")
+        manager.remove_keyword("бурение")
+        manager.remove_keyword("бурение")
+
+    assert events == ['keyword_added', 'keyword_duplicate', 'keyword_removed', 'keyword_not_found']
+    assert "Добавлено: 'бурение' (freq: 0, cpc: 0.0)" in caplog.messages
+
+
+def test_find_keywords_modes(manager):
+    manager.add_keyword("буровая установка")
+    texts = lambda found: [kw.text for kw in found]
+
+    assert texts(manager.find_keywords("скважин")) == [
+        "бурение скважин", "бурение скважин под ключ"]
+    assert texts(manager.find_keywords("буре", mode='prefix')) == [
+        "бурение скважин", "бурение скважин под ключ"]
+    assert texts(manager.find_keywords("бурения", mode='word')) == ["цена бурения"]
+    assert texts(manager.find_keywords("бур", mode='word')) == []
+    assert texts(manager.find_keywords("бур", limit=2)) == [
+        "бурение скважин", "бурение скважин под ключ"]
+    assert len(manager.find_keywords("")) == 5
+    assert texts(manager.find_keywords("ц")) == ["цена бурения"]
+    with pytest.raises(ValueError):
+        manager.find_keywords("бур", mode='regex')
+
+
+def test_search_index_follows_store_changes():
+    import random
+
+    rnd = random.Random(7)
+    words = ["бур", "бурение", "скважина", "цена", "вода", "ключ", "глубина"]
+    manager = KeywordManager()
+    manager.add_keywords_bulk([" ".join(rnd.choices(words, k=3)) + f" {i}" for i in range(3000)])
+
+    def check(pattern, mode='substring'):
+        expected = [kw.text for kw in manager.keywords
+                    if {'substring': pattern in kw.text,
+                        'prefix': kw.text.startswith(pattern),
+                        'word': f" {pattern} " in f" {kw.text} "}[mode]]
+        assert [kw.text for kw in manager.find_keywords(pattern, mode=mode)] == expected
+
+    check("ение ск")
+    manager.add_keyword("бурение скважина новая")          # попадает в дельту индекса
+    manager.remove_keywords_bulk([kw.text for kw in manager.keywords[::3]])
+    check("ение ск")
+    check("вода", mode='word')
+    manager.remove_keywords_bulk([kw.text for kw in manager.keywords[::2]])  # уплотнение
+    check("скважина", mode='prefix')
+    check("новая")
+    manager.clear_all()
+    assert manager.find_keywords("бур") == []
+
+
+def test_statistics_follow_store_changes(manager):
+    def expected():
+        frequencies = [kw.frequency for kw in manager.keywords]
+        return {
+            "total": len(frequencies),
+            "max_frequency": max(frequencies, default=0),
+            "min_frequency": min(frequencies, default=0),
+            "avg_frequency": pytest.approx(sum(frequencies) / len(frequencies) if frequencies else 0),
+            "avg_word_count": pytest.approx(
+                sum(kw.word_count() for kw in manager.keywords) / len(frequencies) if frequencies else 0),
+            "categories": len({kw.category for kw in manager.keywords} - {""}),
+        }
+
+    def check():
+        stats = manager.get_statistics()
+        assert {key: stats[key] for key in expected()} == expected()
+
+    manager.get_keyword("геологоразведка").frequency = 5
+    check()
+    manager.update_keyword("цена бурения", category="цены")
+    assert manager.get_category_counts() == {"бурение": 2, "цены": 1}
+    manager.remove_keyword("бурение скважин")
+    manager.add_keywords_batch(["бурение на воду", "бурение на песок"], frequency=[70000, 0],
+                               category="вода")
+    check()
+    manager.remove_keywords_bulk([kw.text for kw in manager.keywords])
+    check()
+    manager.add_keyword("новая фраза", frequency=3)
+    manager.clear_all()
+    check()
+
+
+def test_frequency_percentiles():
+    from src.core.statistics import FrequencySketch
+
+    manager = KeywordManager()
+    manager.add_keywords_batch([f"фраза {i}" for i in range(10000)], frequency=list(range(1, 10001)))
+    stats = manager.get_statistics()
+    assert stats["p50_frequency"] == pytest.approx(5000, rel=0.02)
+    assert stats["p90_frequency"] == pytest.approx(9000, rel=0.02)
+    assert stats["p99_frequency"] == pytest.approx(9900, rel=0.02)
+
+    manager.remove_keywords_bulk([f"фраза {i}" for i in range(5000, 10000)])
+    assert manager.get_statistics()["p90_frequency"] == pytest.approx(4500, rel=0.02)
+
+    # Скетчи частей объединяются в скетч целого
+    left, right = FrequencySketch(), FrequencySketch()
+    left.update(range(1, 5001))
+    right.update(range(5001, 10001))
+    left.merge(right)
+    assert left.count == 10000
+    assert left.quantile(0.5) == pytest.approx(5000, rel=0.02)
+
+
+def test_list_keywords_pages_with_cursor():
+    manager = KeywordManager()
+    manager.add_keywords_batch([f"фраза {i}" for i in range(250)], frequency=[i % 10 for i in range(250)])
+
+    def collect(**kwargs):
+        texts, cursor = [], None
+        while True:
+            page = manager.list_keywords(cursor=cursor, limit=40, **kwargs)
+            texts.extend(kw.text for kw in page['keywords'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                return texts, page['total']
+
+    assert collect() == ([kw.text for kw in manager.keywords], 250)
+    by_frequency = sorted(manager.keywords, key=lambda kw: (kw.frequency, kw.text))
+    assert collect(sort='frequency')[0] == [kw.text for kw in by_frequency]
+    assert collect(sort='text', descending=True)[0] == sorted(
+        (kw.text for kw in manager.keywords), reverse=True)
+
+    texts, total = collect(sort='frequency', descending=True, min_frequency=8, query="фраза 1")
+    assert total == len(texts) == 22  # 18, 19, 108, 109, ..., 198, 199
+    assert texts[:3] == ["фраза 199", "фраза 19", "фраза 189"]
+
+
+def test_list_keywords_cursor_survives_changes(manager):
+    page = manager.list_keywords(sort='frequency', limit=2)
+    assert [kw.text for kw in page['keywords']] == ["цена бурения", "бурение скважин под ключ"]
+
+    # Последняя выданная строка удалена, добавлены новые - продолжение без пропусков
+    manager.remove_keyword("бурение скважин под ключ")
+    manager.add_keyword("бурение дешево", frequency=200)
+    manager.add_keyword("бурение дорого", frequency=5)
+    rest = manager.list_keywords(sort='frequency', cursor=page['next_cursor'])
+    assert [kw.text for kw in rest['keywords']] == [
+        "бурение дешево", "бурение скважин", "геологоразведка"]
+    assert rest['next_cursor'] is None
+
+    assert manager.list_keywords(category="бурение")['total'] == 1
+    assert manager.list_keywords(category="нет такой")['total'] == 0
+    with pytest.raises(ValueError):
+        manager.list_keywords(sort='cpc')
+    with pytest.raises(ValueError):
+        manager.list_keywords(cursor="мусор")
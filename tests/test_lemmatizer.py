@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты лемматизатора и индекса лемм
+"""
+
+import random
+import threading
+
+import pytest
+
+from src.core import lemmatizer as lemmatizer_module
+from src.core.keyword_manager import KeywordManager
+from src.core.lemmatizer import Lemmatizer
+
+
+def test_lemmatizer_cache_is_bounded():
+    lemmatizer = Lemmatizer(backend='stem', cache_size=3)
+    assert lemmatizer.lemmatize("Бурения скважины") == ["бурен", "скважин"]
+    assert lemmatizer.lemmatize_words(["бурения", "бурение", "насосы", "бурения"]) == [
+        "бурен", "бурен", "насос", "бурен"]
+    info = lemmatizer.cache_info()
+    assert info['size'] == 3 and info['backend'] == 'stem'
+    assert info['hits'] == 2 and info['misses'] == 4
+    # Пул процессов даёт те же леммы
+    words = [f"слово{index}ами" for index in range(200)]
+    pooled = Lemmatizer(backend='stem', max_workers=2, parallel_from=100)
+    assert pooled.lemmatize_words(words) == Lemmatizer(backend='stem').lemmatize_words(words)
+    with pytest.raises(ValueError):
+        Lemmatizer(backend='mystem')
+
+
+def test_no_pool_outside_main_thread(monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("пул процессов запущен из потока")
+
+    monkeypatch.setattr(lemmatizer_module, 'ProcessPoolExecutor', no_pool)
+    words = [f"слово{index}ами" for index in range(200)]
+    pooled = Lemmatizer(backend='stem', max_workers=2, parallel_from=100)
+    results = []
+    thread = threading.Thread(target=lambda: results.append(pooled.lemmatize_words(words)))
+    thread.start()
+    thread.join()
+    assert results == [Lemmatizer(backend='stem').lemmatize_words(words)]
+
+
+def test_lemma_index_follows_store():
+    rng = random.Random(3)
+    words = ["бурение", "бурения", "скважин", "скважины", "насос", "насосы", "цена", "воду"]
+    manager = KeywordManager(lemmatizer=Lemmatizer(backend='stem'))
+    manager.add_keywords_batch([" ".join(rng.sample(words, rng.randint(1, 3)))
+                                for _ in range(300)])
+    index = manager._lemma_index
+    index.REBUILD_MIN = 5
+
+    def expected(query):
+        lemmas = set(manager.lemmatizer.lemmatize(query))
+        return [view.text for view in manager.get_all_keywords()
+                if lemmas <= set(manager.lemmatizer.lemmatize(view.text))]
+
+    for query in ("бурение", "скважины бурения", "насосы цена", "ремонт"):
+        assert [view.text for view in manager.find_keywords(query, mode='lemma')] == \
+            expected(query)
+    # Новые строки догоняются по колонке лемм, удалённые отсекаются
+    manager.add_keyword("бурением насосов")
+    manager.add_keywords_batch(["насос бурения", "ремонт насоса"])
+    manager.remove_keywords_bulk([view.text for view in manager.get_all_keywords()[:30]])
+    for query in ("бурение", "насос", "ремонт насосы"):
+        assert [view.text for view in manager.find_keywords(query, mode='lemma')] == \
+            expected(query)
+    # После уплотнения (слоты перенумерованы) колонка строится заново
+    manager._store.compact()
+    for query in ("бурение", "ремонт насосы"):
+        assert [view.text for view in manager.find_keywords(query, mode='lemma')] == \
+            expected(query)
+    assert sorted(index.lemmas(manager._store.find("ремонт насоса"))) == ["насос", "ремонт"]
+    assert len(manager.find_keywords("насос", mode='lemma', limit=2)) == 2
+    assert manager.get_lemma_counts(top=1) == {"насос": len(expected("насос"))}
+
+
+def test_eager_index_on_project_load(tmp_path):
+    path = str(tmp_path / "core.kcp")
+    manager = KeywordManager(project_path=path)
+    manager.add_keywords_batch(["бурение скважин", "скважина на воду", "ремонт крыши"])
+    manager.close()
+
+    lemmatizer = Lemmatizer(backend='stem')
+    reopened = KeywordManager(project_path=path, lemmatizer=lemmatizer, index_lemmas=True)
+    # Колонка лемм построена при загрузке, поиск лемматизирует только запрос
+    assert lemmatizer.cache_info()['misses'] == 7
+    assert [view.text for view in reopened.find_keywords("скважины", mode='lemma')] == [
+        "бурение скважин", "скважина на воду"]
+    assert lemmatizer.cache_info()['misses'] == 8
+
+    reopened.clear_all()
+    assert reopened.find_keywords("скважины", mode='lemma') == []
+    reopened.close()
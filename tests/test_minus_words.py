@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты фильтра минус-слов
+"""
+
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.keyword_manager import KeywordManager
+from src.core.minus_words import MinusWordMatcher
+from src.services.fixed_wordstat_integration import FixedWordstatIntegration
+
+
+def test_substring_automaton_matches_naive_check():
+    rng = random.Random(7)
+    alphabet = "абвгд "
+    patterns = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))).strip() or "а"
+                for _ in range(300)]
+    texts = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30))) for _ in range(500)]
+    texts = [" ".join(text.split()) for text in texts]
+
+    matcher = MinusWordMatcher(patterns)
+    expected = [any(pattern in text for pattern in matcher.patterns) for text in texts]
+    assert matcher.match_many(texts, normalized=True).tolist() == expected
+    for text in texts[:50]:
+        found = matcher.match(text)
+        assert found is None or found in text
+
+
+def test_word_and_stem_modes():
+    patterns = ["Бесплатно", "своими руками", "snow"]
+    texts = ["бурение скважин бесплатно", "бесплатный проект скважины",
+             "скважина своими руками", "руками своими", "snowrunner бурение"]
+
+    assert MinusWordMatcher(patterns).match_many(texts).tolist() == [
+        True, False, True, False, True]
+    assert MinusWordMatcher(patterns, mode='word').match_many(texts).tolist() == [
+        True, False, True, False, False]
+    stem = MinusWordMatcher(patterns, mode='stem')
+    assert stem.match_many(texts).tolist() == [True, True, True, False, False]
+    assert stem.match("Бесплатная консультация") == "бесплатно"
+    with pytest.raises(ValueError):
+        MinusWordMatcher(patterns, mode='regex')
+
+
+def test_apply_minus_words_to_core():
+    manager = KeywordManager()
+    manager.add_keywords_batch(["бурение скважин", "бурение скважин бесплатно",
+                                "бесплатный проект", "цена бурения", "snowrunner карта"])
+
+    preview = manager.apply_minus_words(["бесплатно", "snowrunner"], mode='stem', dry_run=True)
+    assert preview['matched'] == 3 and preview['removed'] == 0 and len(manager) == 5
+
+    stats = manager.apply_minus_words(["бесплатно", "snowrunner"], mode='stem')
+    assert stats == {'checked': 5, 'matched': 3, 'removed': 3,
+                     'sample': ["бурение скважин бесплатно", "бесплатный проект",
+                                "snowrunner карта"]}
+    assert [view.text for view in manager.get_all_keywords()] == ["бурение скважин",
+                                                                 "цена бурения"]
+
+
+def test_integration_uses_matcher():
+    parser = SimpleNamespace(keywords=[{'keyword': "бурение скважин", 'frequency': 10},
+                                       {'keyword': "игра snowrunner", 'frequency': 5},
+                                       {'keyword': "скважина бесплатно", 'frequency': 3}])
+    manager = KeywordManager()
+    stats = FixedWordstatIntegration(parser).add_all_keywords_to_manager(
+        manager, exclude_patterns=["SnowRunner", "бесплатный"], exclude_mode='stem')
+    assert stats['added'] == 1 and stats['skipped'] == 2
+    assert manager.get_keyword("бурение скважин") is not None
+
+
+def test_substring_patterns_keep_punctuation():
+    matcher = MinusWordMatcher(["C++", "!", "Ёмкость"])
+    assert matcher.patterns == ["c++", "!", "емкость"]
+    texts = ["курсы c++", "c# для начинающих", "купить сейчас!", "емкость для воды",
+             "ёмкость 200 л", "обсадная труба"]
+    assert matcher.match_many(texts).tolist() == [True, False, True, True, True, False]
+    # Тексты ядра уже без знаков - «c++» в них не найти
+    assert not matcher.matches("курсы c", normalized=True)
+    assert matcher.match("ёмкость", normalized=True) == "емкость"
+
+    parser = SimpleNamespace(keywords=[{'keyword': "курсы C++", 'frequency': 10},
+                                       {'keyword': "c# курсы", 'frequency': 5},
+                                       {'keyword': "бурение скважин", 'frequency': 3}])
+    manager = KeywordManager()
+    stats = FixedWordstatIntegration(parser).add_all_keywords_to_manager(
+        manager, exclude_patterns=["c++"])
+    assert stats['added'] == 2 and stats['skipped'] == 1
+    assert manager.get_keyword("курсы c") is None
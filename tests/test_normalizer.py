@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты нормализации ключевых фраз
+"""
+
+import re
+
+import pandas as pd
+
+from src.core import normalizer
+from src.core.keyword_manager import KeywordManager
+
+
+def legacy(text):
+    """Прежние правила Keyword._clean_keyword"""
+    cleaned = re.sub(r'\s+', ' ', text.strip().lower())
+    return re.sub(r'[^\w\s\-]', '', cleaned)
+
+
+SAMPLES = ["  Бурение   СКВАЖИН!! ", "цена\tбурения\nна воду?", "c++ и c#", "ёлка-палка",
+           "", "   ", "a\x00b", "İstanbul", "под ключ (москва)"]
+
+
+def test_normalize_matches_legacy_rules():
+    for text in SAMPLES:
+        assert normalizer.normalize(text) == legacy(text)
+    assert normalizer.normalize_batch(SAMPLES).tolist() == [legacy(text) for text in SAMPLES]
+    assert normalizer.normalize_many(SAMPLES + [None]) == [legacy(text) for text in SAMPLES] + [None]
+
+
+def test_normalize_batch_marks_non_strings():
+    cleaned = normalizer.normalize_batch(pd.Series(["Цена!", None, 42, "вода"]))
+    assert cleaned.isna().tolist() == [False, True, True, False]
+    assert cleaned[0] == "цена" and cleaned[3] == "вода"
+    assert normalizer.normalize_batch([]).empty
+
+
+def test_normalize_cache():
+    normalizer.clear_cache()
+    normalizer.normalize("Бурение")
+    normalizer.normalize("Бурение")
+    info = normalizer.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_entry_points_share_rules():
+    manager = KeywordManager()
+    manager.add_keyword("Бурение  скважин!")
+    manager.add_keywords_batch(["Цена бурения?"])
+
+    assert manager.get_keyword("БУРЕНИЕ СКВАЖИН") is not None
+    assert [kw.text for kw in manager.find_keywords("  Цена   БУРЕНИЯ! ")] == ["цена бурения"]
+    assert manager.remove_keywords_bulk(["цена-бурения", None]) == {'removed': 0, 'not_found': 2}
+    assert manager.remove_keywords_bulk(["ЦЕНА БУРЕНИЯ"]) == {'removed': 1, 'not_found': 0}
+    assert manager.remove_keyword(" бурение скважин ") is True
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты сохранения проекта в SQLite
+"""
+
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from src.core.keyword_manager import KeywordManager
+from src.core.keyword_store import KeywordStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "project" / "core.sqlite")
+
+
+def reopen(manager, path):
+    frame = manager.to_dataframe()
+    manager.close()
+    reopened = KeywordManager(project_path=path)
+    pd.testing.assert_frame_equal(reopened.to_dataframe(), frame)
+    return reopened
+
+
+def test_reopen_restores_rows_and_overlays(path):
+    manager = KeywordManager(project_path=path)
+    manager.add_keywords_batch(["бурение скважин", "цена бурения", "геологоразведка"],
+                               frequency=[500, 30, 11047], category="бурение", source="wordstat")
+    manager.add_keyword("скважина на воду", frequency=70, category="вода")
+    manager.update_keyword("цена бурения", frequency=31, category="цены",
+                           added_date=datetime(2024, 5, 1, 12, 30))
+    manager.remove_keyword("геологоразведка")
+
+    manager = reopen(manager, path)
+    assert len(manager) == 3
+    assert manager.get_keyword("геологоразведка") is None
+    assert manager.get_keyword("цена бурения").category == "цены"
+    assert manager.get_statistics()['total'] == 3
+    assert manager.get_category_counts() == {"бурение": 1, "цены": 1, "вода": 1}
+    assert [kw.text for kw in manager.find_keywords("бурен")] == ["бурение скважин",
+                                                                  "цена бурения"]
+
+    # Повторное добавление после открытия и новые значения словаря
+    assert manager.add_keyword("бурение скважин") is False
+    manager.add_keywords_batch(["геологоразведка"], category="разведка")
+    manager = reopen(manager, path)
+    assert manager.get_keyword("геологоразведка").category == "разведка"
+    manager.close()
+
+
+def test_single_changes_are_batched(path):
+    manager = KeywordManager(project_path=path)
+    for number in range(5):
+        manager.add_keyword(f"фраза {number}")
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0] == 0
+    manager.flush()
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT SUM(row_count) FROM segments").fetchone()[0] == 5
+
+    manager.add_keyword("фраза 5")
+    reopen(manager, path).close()
+
+
+def test_compaction_and_clear_rewrite_project(path, monkeypatch):
+    monkeypatch.setattr(KeywordStore, 'COMPACT_MIN_DEAD', 2)
+    manager = KeywordManager(project_path=path)
+    manager.add_keywords_batch([f"фраза {number}" for number in range(10)],
+                               frequency=list(range(10)))
+    epoch = manager._store.epoch
+    manager.remove_keywords_bulk(["фраза 1", "фраза 2", "фраза 3"])
+    assert manager._store.epoch == epoch + 1
+
+    manager = reopen(manager, path)
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM deleted").fetchone()[0] == 0
+
+    manager.clear_all()
+    manager = reopen(manager, path)
+    assert len(manager) == 0
+    manager.add_keyword("новая фраза")
+    assert len(reopen(manager, path)) == 1
+
+
+def test_shared_managers_see_each_others_writes(path, monkeypatch):
+    monkeypatch.setattr(KeywordStore, 'COMPACT_MIN_DEAD', 3)
+    first = KeywordManager(project_path=path, shared=True)
+    second = KeywordManager(project_path=path, shared=True)
+
+    first.add_keywords_batch(["бурение скважин", "цена бурения", "геологоразведка"],
+                             frequency=[500, 30, 11047], category="бурение")
+    assert len(second) == 3
+    assert second.get_statistics()['max_frequency'] == 11047
+
+    # Изменения второго процесса поверх несинхронизированного первого
+    second.update_keyword("цена бурения", frequency=31, category="цены")
+    second.remove_keyword("геологоразведка")
+    second.add_keyword("скважина на воду", frequency=70, category="вода")
+    second.add_keyword("удалённая фраза")
+    second.remove_keyword("удалённая фраза")
+    assert first.add_keyword("скважина на воду") is False
+    assert first.get_keyword("цена бурения").category == "цены"
+    assert first.get_category_counts() == {"бурение": 1, "цены": 1, "вода": 1}
+    assert [kw.text for kw in first.find_keywords("скваж")] == ["бурение скважин",
+                                                                "скважина на воду"]
+    pd.testing.assert_frame_equal(first.to_dataframe(), second.to_dataframe())
+
+    # Уплотнение в одном процессе переписывает проект, другой загружает его заново
+    first.remove_keywords_bulk(["бурение скважин", "цена бурения"])
+    assert [kw.text for kw in second.get_all_keywords()] == ["скважина на воду"]
+    second.clear_all()
+    assert len(first) == 0
+    first.add_keyword("новая фраза")
+    assert second.get_keyword("новая фраза") is not None
+
+    first.close()
+    second.close()
+    assert len(KeywordManager(project_path=path)) == 1
+
+
+def test_shared_reload_skips_deleted_rows_in_statistics(path):
+    first = KeywordManager(project_path=path, shared=True)
+    second = KeywordManager(project_path=path, shared=True)
+    first.add_keyword("старая фраза")
+    assert len(second) == 1
+
+    # Полная перезапись с удалённой строкой: второй загружает проект заново
+    first.clear_all()
+    first.add_keywords_batch(["x y", "a b c", "z w"], frequency=[2, 4, 12])
+    first.remove_keyword("z w")
+    stats = second.get_statistics()
+    assert len(second) == stats['total'] == 2
+    assert stats['avg_frequency'] == 3.0
+    assert stats['max_frequency'] == 4
+    first.close()
+    second.close()
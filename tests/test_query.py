@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты фильтров ядра (KeywordQuery)
+"""
+
+import random
+import re
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.core.keyword_manager import KeywordManager
+from src.core.lemmatizer import Lemmatizer
+from src.core.query import KeywordQuery
+
+
+@pytest.fixture
+def manager():
+    rng = random.Random(11)
+    words = ["бурение", "бурения", "скважин", "скважины", "насос", "цена", "воду", "под", "ключ"]
+    texts = list(dict.fromkeys(" ".join(rng.sample(words, rng.randint(1, 4)))
+                               for _ in range(2000)))
+    manager = KeywordManager(lemmatizer=Lemmatizer(backend='stem'))
+    manager.add_keywords_batch(
+        texts, frequency=[rng.randint(0, 1000) for _ in texts],
+        category=[rng.choice(["бурение", "насосы", ""]) for _ in texts],
+        source=[rng.choice(["wordstat", "ads"]) for _ in texts])
+    start = datetime(2026, 1, 1)
+    for index, view in enumerate(manager.get_all_keywords()):
+        view.added_date = start + timedelta(days=index % 30)
+    manager.remove_keywords_bulk(texts[::7])
+    return manager
+
+
+def test_combined_filters_match_brute_force(manager):
+    lemmatizer = manager.lemmatizer
+    conditions = [
+        dict(min_frequency=100, max_frequency=600, min_words=2),
+        dict(max_words=2, category=["насосы", "бурение"], source="ads"),
+        dict(added_from="2026-01-05", added_to=datetime(2026, 1, 10), contains="скваж"),
+        dict(contains="цена", mode='word', regex=r"^бурени[ея] "),
+        dict(contains="насос ц", mode='prefix', min_words=3),
+        dict(lemma="бурение скважина", min_frequency=500, category="бурение"),
+        dict(category="нет такой"),
+    ]
+    views = manager.get_all_keywords()
+    for condition in conditions:
+        query = KeywordQuery(**condition)
+
+        def ok(view):
+            lemmas = set(lemmatizer.lemmatize(condition.get('lemma', "")))
+            padded = f" {condition.get('contains', '')} "
+            categories = condition.get('category')
+            return (condition.get('min_frequency', 0) <= view.frequency
+                    <= condition.get('max_frequency', 10 ** 9)
+                    and condition.get('min_words', 0) <= view.word_count()
+                    <= condition.get('max_words', 100)
+                    and (categories is None or view.category in
+                         ([categories] if isinstance(categories, str) else categories))
+                    and view.source == condition.get('source', view.source)
+                    and (view.added_date >= datetime(2026, 1, 5)
+                         or 'added_from' not in condition)
+                    and (view.added_date <= datetime(2026, 1, 10)
+                         or 'added_to' not in condition)
+                    and (padded in f" {view.text} " if condition.get('mode') == 'word'
+                         else view.text.startswith(padded.strip())
+                         if condition.get('mode') == 'prefix'
+                         else condition.get('contains', "") in view.text)
+                    and re.search(condition.get('regex', ""), view.text) is not None
+                    and lemmas <= set(lemmatizer.lemmatize(view.text)))
+
+        expected = [view.text for view in views if ok(view)]
+        assert manager.filter_keywords(query).texts() == expected, condition
+        arguments = dict(condition)
+        if 'lemma' in arguments:
+            arguments.update(query=arguments.pop('lemma'), mode='lemma')
+        elif 'contains' in arguments:
+            arguments['query'] = arguments.pop('contains')
+        page = manager.list_keywords(limit=5, **arguments)
+        assert page['total'] == len(expected)
+
+
+def test_selection_is_lazy(manager):
+    selection = manager.filter_keywords(min_frequency=900)
+    assert len(selection) == len(selection.slots) > 0
+    assert all(view.frequency >= 900 for view in selection)
+    assert (selection.column('frequency') >= 900).all()
+    assert selection[1:3].texts() == selection.texts()[1:3]
+    assert selection[-1].text == selection.texts()[-1]
+    assert [view.text for view in manager.filter_by_frequency(900, 10 ** 9)] == \
+        selection.texts()
+
+    manager._store.compact()
+    with pytest.raises(LookupError):
+        selection[0]
+
+
+def test_invalid_conditions():
+    with pytest.raises(ValueError):
+        KeywordQuery(regex="[")
+    with pytest.raises(ValueError):
+        KeywordQuery(added_from="вчера")
+    with pytest.raises(ValueError):
+        KeywordQuery(contains="бур", mode='fuzzy')
+    assert KeywordQuery().empty and not KeywordQuery(min_words=2).empty
+    manager = KeywordManager()
+    with pytest.raises(ValueError):
+        manager.list_keywords(regex="(")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты кластеризации по выдаче
+"""
+
+import random
+
+import numpy as np
+
+from src.core.clustering import serp_edges
+from src.core.keyword_manager import KeywordManager
+from src.services.serp import SerpCache, SerpClusterer, StaticSerpProvider
+
+
+def serp(*numbers):
+    return [f"https://site{number}.ru/page" for number in numbers] + ["https://wiki.org/"]
+
+
+SERPS = {
+    "бурение скважин": serp(1, 2, 3, 4, 5, 6),
+    "бурение скважин цена": serp(1, 2, 3, 7, 8, 9),
+    "скважина под ключ": serp(4, 5, 6, 1, 10, 11),
+    "обсадная труба": serp(20, 21, 22, 23),
+    "трубы для скважины": serp(20, 21, 22, 24),
+    "ремонт крыши": serp(30, 31),
+}
+FREQUENCIES = [100, 40, 30, 20, 10, 5]
+
+
+def test_serp_edges_match_set_intersections():
+    rng = random.Random(11)
+    serps = [rng.sample(range(60), 10) for _ in range(200)]
+    indptr = np.cumsum([0] + [len(urls) for urls in serps])
+    for overlap in (1, 3, 5):
+        left, right, stats = serp_edges(indptr, np.concatenate(serps), overlap, chunk_pairs=300)
+        expected = {(first, second) for first in range(200) for second in range(first + 1, 200)
+                    if len(set(serps[first]) & set(serps[second])) >= overlap}
+        assert set(zip(left.tolist(), right.tolist())) == expected
+        assert stats['edges'] == len(expected)
+
+
+def test_hard_and_soft_clusters_with_cache(tmp_path):
+    provider = StaticSerpProvider(SERPS)
+    cache = SerpCache(str(tmp_path / "serp.sqlite"))
+    texts = list(SERPS)
+
+    hard = SerpClusterer(provider, cache, min_overlap=3, max_url_df=5)
+    labels = hard.fit(texts, FREQUENCIES)
+    # «цена» и «под ключ» связаны с главной фразой, но не друг с другом
+    assert labels.tolist() == [0, 0, 2, 3, 3, 5]
+    assert hard.stats['hub_urls'] == 1 and hard.stats['fetched'] == 6
+    assert provider.requests == 1
+
+    soft = SerpClusterer(provider, cache, min_overlap=3, mode='soft', max_url_df=5)
+    assert soft.fit(texts, FREQUENCIES).tolist() == [0, 0, 0, 3, 3, 5]
+    # Повторно выдачи берутся из кэша
+    assert provider.requests == 1 and soft.stats['fetched'] == 0
+    assert cache.stats()['serps'] == 6 and cache.stats()['urls'] == 19
+    cache.close()
+
+
+def test_manager_writes_serp_clusters(tmp_path):
+    manager = KeywordManager()
+    manager.add_keywords_batch(list(SERPS) + ["фраза без выдачи"], frequency=FREQUENCIES + [1])
+    clusterer = SerpClusterer(StaticSerpProvider(SERPS), min_overlap=3)
+    stats = manager.cluster_keywords(clusterer=clusterer)
+
+    assert stats['clusters'] == 2 and stats['clustered'] == 4
+    assert manager.get_keyword("бурение скважин цена").category == "бурение скважин"
+    assert manager.get_keyword("трубы для скважины").category == "обсадная труба"
+    assert manager.get_keyword("скважина под ключ").category == ""
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты бинарного снимка ядра
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.core.keyword_manager import KeywordManager
+from src.core.snapshot import KeywordSnapshot
+
+
+@pytest.fixture
+def manager():
+    manager = KeywordManager()
+    manager.add_keywords_batch(["бурение скважин", "цена бурения", "геологоразведка", "ёмкость"],
+                               frequency=[500, 30, 11047, 7], cpc=[1.5, 0, 2.25, 0],
+                               category=["бурение", "", "разведка", "бурение"],
+                               source="wordstat")
+    manager.remove_keyword("цена бурения")
+    return manager
+
+
+def test_snapshot_roundtrip(manager, tmp_path):
+    path = str(tmp_path / "core.kcsnap")
+    assert manager.save_snapshot(path) == 3
+
+    with KeywordSnapshot(path) as snapshot:
+        frame = snapshot.to_dataframe()
+        pd.testing.assert_frame_equal(frame, manager.to_dataframe())
+        assert np.shares_memory(frame['frequency'].to_numpy(), snapshot.column('frequency'))
+        assert not snapshot.column('cpc').flags.writeable
+
+        assert [snapshot.find(text) for text in ("ёмкость", "бурение скважин", "цена бурения")] \
+            == [2, 0, None]
+        assert snapshot.get(1)['category'] == "разведка"
+        assert snapshot.texts() == ["бурение скважин", "геологоразведка", "ёмкость"]
+
+    restored = KeywordManager()
+    restored.load_snapshot(path)
+    pd.testing.assert_frame_equal(restored.to_dataframe(), manager.to_dataframe())
+    assert restored.get_category_counts() == {"бурение": 2, "разведка": 1}
+    assert restored.add_keyword("ёмкость") is False
+
+
+def test_empty_and_invalid_snapshot(tmp_path):
+    path = str(tmp_path / "empty.kcsnap")
+    KeywordManager().save_snapshot(path)
+    with KeywordSnapshot(path) as snapshot:
+        assert len(snapshot) == 0
+        assert snapshot.find("бурение") is None
+        assert snapshot.to_dataframe().empty
+
+    broken = tmp_path / "broken.kcsnap"
+    broken.write_bytes(b"not a snapshot at all")
+    with pytest.raises(ValueError):
+        KeywordSnapshot(str(broken))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты потокового парсера выгрузок Wordstat
+"""
+
+import pytest
+from openpyxl import Workbook
+
+from src.core.keyword_manager import KeywordManager
+from src.services.wordstat_parser import WordstatParser, parse_frequency
+
+WORDSTAT_FILE = "data/input/геологоразведка wordstat.xlsx"
+
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    """Книга из трёх листов: с заголовком, без заголовка и без фраз"""
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Data"
+    sheet.append(["Топ запросов «бурение»"])
+    sheet.append([None, "Формулировка", "Число запросов"])
+    sheet.append([None, "бурение скважин", 1200])
+    sheet.append([None, "цена бурения", "2 000"])
+    sheet.append([None, None, 5])
+    sheet.append([None, "бурение", None])
+
+    similar = workbook.create_sheet("Похожие")
+    similar.append(["бурение на воду", 300])
+    similar.append(["бурение скважин", 100])
+    similar.append([42, "1,500"])
+
+    workbook.create_sheet("Пустой").append([1, 2, 3])
+    path = tmp_path / "wordstat.xlsx"
+    workbook.save(path)
+    return str(path)
+
+
+def test_parse_frequency():
+    assert parse_frequency([11047, "2 000", "1 500", "11,047", 3.0, None, "нет"]).tolist() == [
+        11047, 2000, 1500, 11047, 3, 0, 0]
+
+
+def test_iter_batches_detects_columns(workbook_path):
+    batches = list(WordstatParser(batch_size=2).iter_batches(workbook_path))
+    assert [len(batch) for batch in batches] == [2, 1, 2, 1]
+    rows = [row for batch in batches for row in batch.itertuples(index=False, name=None)]
+    assert rows == [
+        ("бурение скважин", 1200, "Data"), ("цена бурения", 2000, "Data"), ("бурение", 0, "Data"),
+        ("бурение на воду", 300, "Похожие"), ("бурение скважин", 100, "Похожие"), ("42", 1500, "Похожие"),
+    ]
+
+
+def test_load_into_manager(workbook_path):
+    manager = KeywordManager()
+    stats = WordstatParser().load_into(manager, workbook_path, min_frequency=1)
+    assert stats == {'rows': 6, 'added': 4, 'duplicates': 1, 'errors': 0, 'skipped': 1}
+    assert manager.get_keyword("бурение скважин").frequency == 1200
+    assert manager.get_keyword("бурение на воду").source == "wordstat"
+
+    with pytest.raises(ValueError):
+        list(WordstatParser().iter_batches("keywords.csv"))
+
+
+def test_real_wordstat_export():
+    parser = WordstatParser()
+    manager = KeywordManager()
+    assert parser.load_into(manager, WORDSTAT_FILE)['added'] == 352
+    assert manager.get_statistics()['max_frequency'] == 11047
+
+    # Старый интерфейс: список словарей
+    assert len(parser.parse_file(WORDSTAT_FILE)) == 352
+    assert parser.keywords[0] == {'keyword': "геологоразведка", 'frequency': 11047, 'sheet': "Data"}
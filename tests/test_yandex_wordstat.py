@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты клиента Wordstat на локальной заглушке API
+"""
+
+import pytest
+
+from src.core.keyword_manager import KeywordManager
+from src.services.rate_limit import TokenBucket
+from src.services.wordstat_stub import StubWordstatServer, stub_frequency
+from src.services.yandex_wordstat import (WordstatApiError, YandexWordstatClient,
+                                          enrich_frequencies)
+
+
+def client_for(server, **options):
+    options.setdefault('rate', 1000.0)
+    return YandexWordstatClient("token", url=server.url, backoff=0.01, poll_interval=0.01,
+                                **options)
+
+
+def test_token_bucket_limits_rate():
+    now = [0.0]
+    bucket = TokenBucket(rate=2.0, capacity=2.0, clock=lambda: now[0],
+                         sleep=lambda delay: now.__setitem__(0, now[0] + delay))
+    waits = [bucket.acquire() for _ in range(6)]
+    assert waits[:2] == [0.0, 0.0]
+    # Дальше по токену каждые полсекунды
+    assert now[0] == pytest.approx(2.0)
+    assert bucket.try_acquire() == pytest.approx(0.5)
+
+
+def test_enrich_batches_retries_and_writes_back():
+    manager = KeywordManager()
+    phrases = [f"бурение скважин {number}" for number in range(23)]
+    manager.add_keywords_batch(phrases)
+    manager.update_keyword(phrases[0], frequency=7)
+
+    with StubWordstatServer(fail_first=2, max_rate=50) as server:
+        client = client_for(server, max_workers=3)
+        stats = enrich_frequencies(manager, client, write_every=5)
+
+    assert stats['requested'] == 22 and stats['updated'] == 22 and stats['failed'] == 0
+    assert stats['retries'] >= 2
+    assert sorted(server.phrases_per_report) == [2, 10, 10]
+    assert server.calls['DeleteWordstatReport'] == 3
+    assert manager.get_keyword(phrases[0]).frequency == 7
+    assert all(manager.get_keyword(phrase).frequency == stub_frequency(phrase)
+               for phrase in phrases[1:])
+
+
+def test_failed_batches_are_reported():
+    with StubWordstatServer(fail_first=100) as server:
+        client = client_for(server, max_retries=1)
+        result = client.fetch_frequencies(["бурение", "цена бурения"])
+    assert result['frequencies'] == {}
+    assert result['failed'] == ["бурение", "цена бурения"]
+    assert "HTTP 503" in result['errors'][0]
+
+    with StubWordstatServer() as server:
+        client = client_for(server, max_retries=0)
+        with pytest.raises(ValueError):
+            client.fetch_batch([f"фраза {number}" for number in range(11)])
+        server.fail_first = 1
+        with pytest.raises(WordstatApiError) as error:
+            client.fetch_batch(["бурение"])
+        assert error.value.code == 503 and error.value.retryable